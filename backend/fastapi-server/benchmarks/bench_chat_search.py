@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Chat search benchmark: full-text index against substring matching.
+
+Fills a scratch SQLite database with synthetic chats, then times the same
+queries through the FTS5 index and through the LIKE fallback.
+
+Usage:
+    python benchmarks/bench_chat_search.py [--chats 200000] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+WORDS = (
+    "sales revenue orders customers users churn region monthly daily weekly chart "
+    "table metric gauge trend growth inventory stock traffic errors latency signups "
+    "mysql mongodb csv dashboard refresh interval component query group filter"
+).split()
+
+QUERIES = ["revenue", "churn region", "cust*", '"line chart"', "inventory gauge"]
+
+
+def populate(db, count: int, seed: int) -> None:
+    from fastapi_server.models import Chat
+
+    rng = random.Random(seed)
+    batch = []
+    for i in range(count):
+        batch.append(
+            Chat(
+                session_id=f"session-{i % 1000}",
+                user_message=" ".join(rng.choices(WORDS, k=10)),
+                agent_response=" ".join(rng.choices(WORDS, k=40)) + " line chart",
+            )
+        )
+        if len(batch) == 10000:
+            db.add_all(batch)
+            db.commit()
+            batch = []
+    db.add_all(batch)
+    db.commit()
+
+
+def time_queries(db, index, repeat: int) -> Dict[str, List[float]]:
+    timings: Dict[str, List[float]] = {}
+    for query in QUERIES:
+        for session_id in (None, "session-7"):
+            label = query + (" [session]" if session_id else "")
+            for _ in range(repeat):
+                started = time.perf_counter()
+                index.search(db, query, session_id=session_id, limit=20)
+                timings.setdefault(label, []).append(
+                    (time.perf_counter() - started) * 1000
+                )
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chats", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.mkdtemp(prefix="bench_search_"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from fastapi_server.models import Base
+    from fastapi_server.repositories.chat_search import (
+        ChatSearchIndex,
+        install_search_index,
+    )
+
+    engine = create_engine(os.environ["DATABASE_URL"])
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    started = time.perf_counter()
+    populate(db, args.chats, args.seed)
+    print(f"inserted {args.chats} chats in {time.perf_counter() - started:.1f}s")
+    started = time.perf_counter()
+    index = install_search_index(engine)
+    print(f"built {index.name} index in {time.perf_counter() - started:.1f}s")
+
+    results = {
+        index.name: time_queries(db, index, args.repeat),
+        "like": time_queries(db, ChatSearchIndex(), max(1, args.repeat // 10)),
+    }
+    print(f"\n{'query':<28}" + "".join(f"{name + ' p50 ms':>16}" for name in results))
+    for label in results["like"]:
+        print(
+            f"{label:<28}"
+            + "".join(
+                f"{statistics.median(timings[label]):>16.2f}"
+                for timings in results.values()
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Chat write benchmark: storing bursts of chats in each CHAT_WRITE_MODE.
+
+Fires --chats concurrent chat writes (a chat, its stage rows and its
+session summary, as a chat request stores them) at a scratch SQLite file
+and reports chats/s, per-write latency and how many transactions it took.
+
+Usage:
+    python benchmarks/bench_chat_writes.py [--chats 2000] [--concurrency 64]
+        [--modes immediate,batched,write_behind] [--database-async true]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+TIMING = {
+    "queue_ms": 2.0,
+    "tasks": {
+        name: {"start_ms": 0.0, "duration_ms": 100.0, "llm_calls": 1, "llm_ms": 90.0}
+        for name in ("intent_task", "component_task", "response_task")
+    },
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def burst(mode: str, args: argparse.Namespace) -> Dict[str, Any]:
+    from fastapi_server.ai.conversation import RollingSummary
+    from fastapi_server.config import Config
+    from fastapi_server.database import dispose_engines, open_db
+    from fastapi_server.repositories.chat_writer import ChatWriter
+
+    writer = ChatWriter(
+        mode=mode,
+        batch_size=Config.CHAT_WRITE_BATCH_SIZE,
+        flush_interval=Config.CHAT_WRITE_FLUSH_MS / 1000,
+        id_block_size=Config.CHAT_ID_BLOCK_SIZE,
+    )
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int) -> float:
+        async with semaphore:
+            async with open_db() as db:
+                started = time.perf_counter()
+                await writer.write(
+                    db,
+                    [
+                        {
+                            "session_id": f"{mode}-{i % 100}",
+                            "user_message": f"show revenue by region #{i}",
+                            "agent_response": "Here is a bar chart of revenue.",
+                            "processing_time": 300,
+                        }
+                    ],
+                    [TIMING],
+                    RollingSummary(),
+                )
+                return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(one(i) for i in range(args.chats)))
+    acknowledged = time.perf_counter() - started
+    await writer.close()
+    stored = time.perf_counter() - started
+    # Pooled connections belong to this event loop
+    await dispose_engines()
+    return {
+        "acknowledged_per_s": args.chats / acknowledged,
+        "stored_per_s": args.chats / stored,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        # Immediate mode writes through the request sessions, one transaction each
+        "transactions": writer.get_stats()["transactions"] or args.chats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chats", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--modes", default="immediate,batched,write_behind")
+    parser.add_argument("--database-async", default=os.getenv("DATABASE_ASYNC", "true"))
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.mkdtemp(prefix="bench_writes_"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    os.environ["DATABASE_ASYNC"] = args.database_async
+
+    from fastapi_server.database import create_tables
+
+    create_tables()
+    results = {mode: asyncio.run(burst(mode, args)) for mode in args.modes.split(",")}
+
+    print(
+        f"\nchats={args.chats} concurrency={args.concurrency} "
+        f"database_async={args.database_async}"
+    )
+    print(
+        f"{'mode':<14}{'acked/s':>10}{'stored/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'txns':>8}"
+    )
+    for mode, result in results.items():
+        print(
+            f"{mode:<14}"
+            f"{result['acknowledged_per_s']:>10.0f}"
+            f"{result['stored_per_s']:>10.0f}"
+            f"{result['p50_ms']:>10.1f}"
+            f"{result['p95_ms']:>10.1f}"
+            f"{result['transactions']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+"""
+Database concurrency benchmark: requests per second with blocking and async sessions.
+
+Runs the API in one event loop, as a single uvicorn worker would, and fires
+concurrent requests at the database-backed read endpoints (component list,
+chat history, chat search). Each mode runs in a fresh interpreter because
+DATABASE_ASYNC is read at import:
+    sync   DATABASE_ASYNC=false, queries block the event loop
+    async  DATABASE_ASYNC=true, queries wait on aiosqlite/asyncpg
+
+The default database is a scratch SQLite file, where queries cost CPU time
+rather than waiting. Point --database-url at a networked database (e.g.
+PostgreSQL), or add --db-latency-ms to wait that long per statement the way
+each driver would wait on the network: a blocking sleep for the sync driver,
+a yield to the event loop for the async one.
+
+Usage:
+    python benchmarks/bench_db_concurrency.py [--requests 2000] [--concurrency 32]
+        [--chats 20000] [--database-url postgresql://...] [--db-latency-ms 2]
+        [--modes sync,async]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+SESSIONS = 200
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def populate(chats: int) -> None:
+    from fastapi_server.database import SessionLocal, create_tables
+    from fastapi_server.models import Chat, Component
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        if db.query(Chat).count() >= chats:
+            return
+        db.add_all(
+            Component(
+                name=f"component {i}",
+                component_type="chart",
+                query="SELECT 1",
+                data_source="mysql",
+                description="monthly revenue" if i % 2 else "weekly churn",
+            )
+            for i in range(500)
+        )
+        for start in range(0, chats, 10000):
+            db.add_all(
+                Chat(
+                    session_id=f"session-{i % SESSIONS}",
+                    user_message=f"show revenue by region #{i}",
+                    agent_response="Here is a bar chart of revenue by region.",
+                    processing_time=100,
+                )
+                for i in range(start, min(chats, start + 10000))
+            )
+            db.commit()
+    finally:
+        db.close()
+
+
+def paths(count: int) -> List[str]:
+    mix = []
+    for i in range(count):
+        session = f"session-{i % SESSIONS}"
+        mix.append(
+            [
+                "/components?limit=50",
+                f"/chat/history/{session}?limit=50",
+                f"/chat/search?search_term=revenue&session_id={session}&limit=20",
+                "/components/search?search_term=churn&limit=20",
+            ][i % 4]
+        )
+    return mix
+
+
+def simulate_latency(latency_ms: float) -> None:
+    """Wait before every statement of the request sessions, as a network round trip would."""
+    from sqlalchemy import event
+    from sqlalchemy.util.concurrency import await_only
+
+    from fastapi_server import database
+
+    delay = latency_ms / 1000
+
+    if database.Config.DATABASE_ASYNC:
+        # Statements run in a greenlet of the event loop; suspend it like asyncpg would
+        @event.listens_for(database.async_engine.sync_engine, "before_cursor_execute")
+        def wait_async(*_):
+            await_only(asyncio.sleep(delay))
+
+    else:
+
+        @event.listens_for(database.engine, "before_cursor_execute")
+        def wait_blocking(*_):
+            time.sleep(delay)
+
+
+def run_child(args: argparse.Namespace) -> Dict[str, Any]:
+    """Serve the request mix in this interpreter; DATABASE_* are already set."""
+    import httpx
+
+    from fastapi_server.database import dispose_engines
+    from fastapi_server.main import app
+
+    populate(args.chats)
+    if args.db_latency_ms:
+        simulate_latency(args.db_latency_ms)
+
+    async def main() -> Tuple[List[float], float]:
+        semaphore = asyncio.Semaphore(args.concurrency)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+
+            async def one(path: str) -> float:
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    response.raise_for_status()
+                    return (time.perf_counter() - started) * 1000
+
+            # Warm the connection pool and caches
+            await asyncio.gather(*(one(p) for p in paths(args.concurrency)))
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*(one(p) for p in paths(args.requests)))
+            elapsed = time.perf_counter() - started
+            await dispose_engines()
+            return latencies, elapsed
+
+    latencies, elapsed = asyncio.run(main())
+    return {
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "mean_ms": statistics.mean(latencies),
+    }
+
+
+def run_mode(mode: str, args: argparse.Namespace, database_url: str) -> Dict[str, Any]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC, env.get("PYTHONPATH")]))
+    env["DATABASE_URL"] = database_url
+    env["DATABASE_ASYNC"] = str(mode == "async").lower()
+    # Only the database is measured
+    env["WARM_START_MODE"] = "lazy"
+    completed = subprocess.run(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--child",
+            "--requests",
+            str(args.requests),
+            "--concurrency",
+            str(args.concurrency),
+            "--chats",
+            str(args.chats),
+            "--db-latency-ms",
+            str(args.db_latency_ms),
+        ],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if completed.returncode != 0:
+        sys.exit(f"{mode} run failed:\n{completed.stderr[-2000:]}")
+    # The app logs to stdout; the result is the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--chats", type=int, default=20000)
+    parser.add_argument(
+        "--database-url", help="Database to run against (default: scratch SQLite)"
+    )
+    parser.add_argument(
+        "--db-latency-ms",
+        type=float,
+        default=0.0,
+        help="Simulated round trip per statement",
+    )
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args)))
+        return
+
+    database_url = args.database_url or (
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_db_'), 'bench.db')}"
+    )
+    results = {
+        mode: run_mode(mode, args, database_url) for mode in args.modes.split(",")
+    }
+
+    print(
+        f"\nrequests={args.requests} concurrency={args.concurrency} "
+        f"chats={args.chats} database={database_url.split(':', 1)[0]} "
+        f"db_latency_ms={args.db_latency_ms}"
+    )
+    print(f"{'mode':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for mode, result in results.items():
+        print(
+            f"{mode:<8}"
+            f"{result['requests_per_second']:>10.1f}"
+            f"{result['p50_ms']:>10.1f}"
+            f"{result['p95_ms']:>10.1f}"
+            f"{result['mean_ms']:>10.1f}"
+        )
+    if "sync" in results and "async" in results:
+        speedup = (
+            results["async"]["requests_per_second"]
+            / results["sync"]["requests_per_second"]
+        )
+        print(f"\nasync/sync throughput: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
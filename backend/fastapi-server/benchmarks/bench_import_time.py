@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+Import-time profile: how long importing the server takes, and which modules cost most.
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters and
+reports the median total import time and the slowest top-level imports.
+With a budget it exits non-zero when the import is slower than allowed or
+pulls in a module that should only load on first use, so CI can track
+cold-start regressions.
+
+Usage:
+    python benchmarks/bench_import_time.py [--module fastapi_server.main]
+        [--runs 5] [--top 15] [--budget-ms 1500] [--forbid crewai,langchain]
+        [--json report.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Loaded by the chat agent on first use; importing the app must not need them
+DEFAULT_FORBIDDEN = [
+    "crewai",
+    "langchain",
+    "langchain_openai",
+    "litellm",
+    "fastapi_server.chat_agent",
+    "fastapi_server.ai.crew",
+]
+
+
+def parse_importtime(output: str) -> Dict[str, Tuple[int, float]]:
+    """
+    Parse -X importtime output into {module: (nesting depth, cumulative us)}.
+
+    Depth 0 are the imports the interpreter itself made, depth 1 what those
+    imported directly, and so on.
+    """
+    modules: Dict[str, Tuple[int, float]] = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        _, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        # One space after the bar, then two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (depth, float(cumulative_us))
+    return modules
+
+
+def profile_once(module: str) -> Dict[str, Tuple[int, float]]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC, env.get("PYTHONPATH")]))
+    # Importing the app must not touch a real database
+    env.setdefault(
+        "DATABASE_URL",
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_import_'), 'bench.db')}",
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if completed.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+    return parse_importtime(completed.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="fastapi_server.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.getenv("IMPORT_TIME_BUDGET_MS", 0)),
+        help="Fail when the median import takes longer (0 disables the check)",
+    )
+    parser.add_argument(
+        "--forbid",
+        default=",".join(DEFAULT_FORBIDDEN),
+        help="Comma-separated modules the import must not load",
+    )
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    runs = [profile_once(args.module) for _ in range(max(1, args.runs))]
+    totals = [
+        sum(us for depth, us in modules.values() if depth == 0) / 1000
+        for modules in runs
+    ]
+    # Report the run with the median total
+    median_run = sorted(range(len(runs)), key=totals.__getitem__)[len(runs) // 2]
+    total_ms = totals[median_run]
+    modules = runs[median_run]
+
+    forbidden = [m.strip() for m in args.forbid.split(",") if m.strip()]
+    loaded = sorted(
+        name
+        for name in modules
+        if any(name == m or name.startswith(m + ".") for m in forbidden)
+    )
+    # What the module pulls in directly is what a change can make lazy
+    slowest: List[Tuple[str, float]] = sorted(
+        ((name, us) for name, (depth, us) in modules.items() if depth == 1),
+        key=lambda item: item[1],
+        reverse=True,
+    )[: args.top]
+
+    print(f"\nmodule={args.module} runs={len(runs)} modules_imported={len(modules)}")
+    print(
+        f"import time: median {total_ms:.1f} ms "
+        f"(min {min(totals):.1f}, max {max(totals):.1f})"
+    )
+    print("\nslowest direct imports (cumulative ms)")
+    for name, cumulative in slowest:
+        print(f"  {name:<48}{cumulative / 1000:>10.1f}")
+
+    failures = []
+    if loaded:
+        failures.append(f"imports modules that should load lazily: {', '.join(loaded)}")
+    if args.budget_ms and total_ms > args.budget_ms:
+        failures.append(f"{total_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "module": args.module,
+                    "median_ms": round(total_ms, 1),
+                    "runs_ms": [round(t, 1) for t in totals],
+                    "budget_ms": args.budget_ms or None,
+                    "slowest": {name: round(us / 1000, 1) for name, us in slowest},
+                    "forbidden_loaded": loaded,
+                },
+                f,
+                indent=2,
+            )
+
+    for failure in failures:
+        print(f"\nFAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark: JSON extraction from agent output.
+
+Compares the single-pass scanner in fastapi_server.ai.json_extractor with the
+regex implementation it replaced in DashboardCrew._extract_json_from_result.
+
+Usage:
+    python benchmarks/bench_json_extraction.py [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fastapi_server.ai.json_extractor import (  # noqa: E402
+    extract_json_objects,
+    extract_key_value_pairs,
+)
+
+
+def legacy_extract_key_value_pairs(text: str) -> dict:
+    """Previous fallback: four regex scans over the whole text."""
+    pairs = {}
+    patterns = [
+        r'"([^"]+)"\s*:\s*"([^"]*)"',
+        r'"([^"]+)"\s*:\s*([^,\s]+)',
+        r'([a-zA-Z_][a-zA-Z0-9_]*)\s*:\s*"([^"]*)"',
+        r"([a-zA-Z_][a-zA-Z0-9_]*)\s*:\s*([^,\s]+)",
+    ]
+    for pattern in patterns:
+        for key, value in re.findall(pattern, text):
+            key = key.strip()
+            value = value.strip().strip('"')
+            if value.lower() in ["true", "false"]:
+                value = value.lower() == "true"
+            elif value.isdigit():
+                value = int(value)
+            elif value.replace(".", "").isdigit():
+                value = float(value)
+            pairs[key] = value
+    return pairs
+
+
+def legacy_extract_json(result_text: str) -> dict:
+    """Previous implementation: two regex passes, json.loads per candidate."""
+    json_patterns = [
+        r"\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}",
+        r"\{.*?\}",
+    ]
+    for pattern in json_patterns:
+        for match in re.findall(pattern, result_text, re.DOTALL):
+            try:
+                cleaned = match.strip()
+                if cleaned.startswith("{") and cleaned.endswith("}"):
+                    return json.loads(cleaned)
+            except (json.JSONDecodeError, ValueError):
+                continue
+    return legacy_extract_key_value_pairs(result_text)
+
+
+def scanner_extract_json(result_text: str) -> dict:
+    objects = extract_json_objects(result_text)
+    if objects:
+        return objects[0].value
+    return extract_key_value_pairs(result_text)
+
+
+COMPONENT = {
+    "name": "Sales Overview",
+    "component_type": "chart",
+    "query": "SELECT date, SUM(amount) FROM sales GROUP BY date",
+    "data_source": "mysql",
+    "fields": {"x": "date", "y": {"field": "amount", "agg": "sum"}},
+    "interval": "10 min",
+}
+
+REASONING = (
+    "Thought: The user wants a chart of sales. I should consider the data "
+    "source, the {placeholder} fields and the refresh interval carefully. "
+)
+
+
+def build_cases():
+    """Agent outputs of increasing size and awkwardness, with the expected result."""
+    obj = json.dumps(COMPONENT, indent=2)
+    nested = {"level": {"level": {"level": {"level": COMPONENT}}}}
+    prose = "component_type: chart, data_source: mysql, " * 100
+    return {
+        "short, one object": (f"Final Answer: {obj}", COMPONENT),
+        "long reasoning, fenced object": (
+            REASONING * 200 + f"\nFinal Answer:\n```json\n{obj}\n```",
+            COMPONENT,
+        ),
+        "deeply nested object": ("Result: " + json.dumps(nested), nested),
+        "no JSON, key-value prose": (
+            prose,
+            {"component_type": "chart", "data_source": "mysql"},
+        ),
+        "unbalanced braces in prose": (("{ see note " * 300) + obj, COMPONENT),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(
+        f"{'case':<32} {'chars':>7} {'legacy µs':>10} {'scanner µs':>11} "
+        f"{'speedup':>8} {'legacy ok':>10} {'scanner ok':>11}"
+    )
+    for name, (text, expected) in build_cases().items():
+        legacy = timeit.timeit(lambda: legacy_extract_json(text), number=args.repeat)
+        scanner = timeit.timeit(lambda: scanner_extract_json(text), number=args.repeat)
+        print(
+            f"{name:<32} {len(text):>7} {legacy / args.repeat * 1e6:>10.1f} "
+            f"{scanner / args.repeat * 1e6:>11.1f} {legacy / scanner:>7.1f}x "
+            f"{str(legacy_extract_json(text) == expected):>10} "
+            f"{str(scanner_extract_json(text) == expected):>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
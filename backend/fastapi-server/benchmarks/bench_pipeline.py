@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+"""
+End-to-end benchmark: chat pipeline latency against the offline mock LLM.
+
+Every agent is answered by fastapi_server.ai.mock_llm from a script with
+configurable latency, so the run needs no network or API keys and is
+repeatable with a fixed seed. Framework overhead is reported as wall time
+minus the time spent waiting on (simulated) model calls.
+
+Modes:
+    crew  DashboardCrew.process_message from a pool of threads
+    api   POST /chat through the ASGI app (service, cache, database included)
+
+Usage:
+    python benchmarks/bench_pipeline.py [--mode crew|api] [--requests 20]
+        [--concurrency 4] [--latency-scale 1.0] [--seed 7] [--process graph]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+MESSAGES = [
+    "Create a line chart of sales from mysql every 10 min",
+    "Build a table of recent orders from mongodb",
+    "Make a metric card showing active users from the csv export",
+    "Generate a bar chart of revenue by region from mysql",
+    "Design a dashboard component for error rates over time",
+]
+
+
+def configure(args: argparse.Namespace) -> None:
+    """Point the app at the mock LLM and a scratch database; must run before imports."""
+    os.environ["LLM_MODEL_OVERRIDE"] = "mock"
+    os.environ["MOCK_LLM_LATENCY_SCALE"] = str(args.latency_scale)
+    os.environ["MOCK_LLM_SEED"] = str(args.seed)
+    if args.script:
+        os.environ["MOCK_LLM_SCRIPT"] = args.script
+    os.environ["CREW_PROCESS"] = args.process
+    os.environ["LLM_STREAMING"] = "false"
+    os.environ["LLM_HEDGING_ENABLED"] = "false"
+    os.environ["CREW_WARM_UP"] = "false"
+    # Every request should reach the crew
+    os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+    os.environ["CHAT_COALESCING_ENABLED"] = "false"
+    os.environ["INTENT_FAST_PATH_ENABLED"] = str(args.fast_path).lower()
+    # No MCP data server in the loop
+    os.environ["MCP_PREVIEW_ROWS"] = "0"
+    database = os.path.join(tempfile.mkdtemp(prefix="bench_pipeline_"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Sample:
+    def __init__(self, wall_ms: float, timing: Optional[Dict[str, Any]]):
+        self.wall_ms = wall_ms
+        self.timing = timing or {}
+
+    @property
+    def llm_ms(self) -> float:
+        return self.timing.get("llm_ms", 0.0)
+
+
+def run_crew(args: argparse.Namespace) -> Tuple[List[Sample], float]:
+    from fastapi_server.ai.crew import DashboardCrew
+
+    crew = DashboardCrew()
+    crew.warm_up()
+
+    def one(i: int) -> Sample:
+        started = time.perf_counter()
+        result = crew.process_message(
+            f"{MESSAGES[i % len(MESSAGES)]} (#{i})", session_id=f"bench-{i}"
+        )
+        return Sample((time.perf_counter() - started) * 1000, result.get("timing"))
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            samples = list(pool.map(one, range(args.requests)))
+        return samples, time.perf_counter() - started
+    finally:
+        crew.shutdown()
+
+
+def run_api(args: argparse.Namespace) -> Tuple[List[Sample], float]:
+    import httpx
+
+    from fastapi_server.database import create_tables
+    from fastapi_server.main import app, chat_service
+
+    async def main() -> List[Sample]:
+        semaphore = asyncio.Semaphore(args.concurrency)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+
+            async def one(i: int) -> Sample:
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post(
+                        "/chat",
+                        json={
+                            "message": f"{MESSAGES[i % len(MESSAGES)]} (#{i})",
+                            "session_id": f"bench-{i}",
+                        },
+                    )
+                    wall_ms = (time.perf_counter() - started) * 1000
+                    response.raise_for_status()
+                    return Sample(wall_ms, response.json().get("timing"))
+
+            return await asyncio.gather(*(one(i) for i in range(args.requests)))
+
+    # ASGITransport doesn't run the app's lifespan, so set up what it would
+    create_tables()
+    chat_service.crew.warm_up()
+    try:
+        started = time.perf_counter()
+        samples = asyncio.run(main())
+        return samples, time.perf_counter() - started
+    finally:
+        chat_service.crew.shutdown()
+
+
+def report(args: argparse.Namespace, samples: List[Sample], elapsed: float) -> None:
+    wall = [s.wall_ms for s in samples]
+    overhead = [s.wall_ms - s.llm_ms for s in samples]
+    print(
+        f"\nmode={args.mode} process={args.process} requests={len(samples)} "
+        f"concurrency={args.concurrency} latency_scale={args.latency_scale}"
+    )
+    print(f"throughput: {len(samples) / elapsed:.2f} req/s")
+    print(f"{'':<22}{'p50':>10}{'p95':>10}{'p99':>10}{'mean':>10}")
+    for label, values in (
+        ("end-to-end (ms)", wall),
+        ("model wait (ms)", [s.llm_ms for s in samples]),
+        ("overhead (ms)", overhead),
+    ):
+        print(
+            f"{label:<22}"
+            f"{percentile(values, 50):>10.1f}"
+            f"{percentile(values, 95):>10.1f}"
+            f"{percentile(values, 99):>10.1f}"
+            f"{statistics.mean(values):>10.1f}"
+        )
+
+    stages: Dict[str, List[float]] = {}
+    for sample in samples:
+        for name, span in sample.timing.get("tasks", {}).items():
+            stages.setdefault(name, []).append(span["duration_ms"])
+    if stages:
+        print("\nper-stage duration (ms)")
+        for name, values in stages.items():
+            print(
+                f"  {name:<28}"
+                f"p50 {percentile(values, 50):>8.1f}  "
+                f"p95 {percentile(values, 95):>8.1f}  "
+                f"n={len(values)}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=("crew", "api"), default="crew")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--latency-scale",
+        type=float,
+        default=1.0,
+        help="Multiply scripted latencies (0 measures pure framework overhead)",
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--script", help="Mock LLM script (default: mock_llm.yaml)")
+    parser.add_argument(
+        "--process", choices=("sequential", "graph"), default="sequential"
+    )
+    parser.add_argument(
+        "--fast-path",
+        action="store_true",
+        help="Allow the local intent parser to skip planning and intent tasks",
+    )
+    args = parser.parse_args()
+
+    configure(args)
+    samples, elapsed = run_crew(args) if args.mode == "crew" else run_api(args)
+    report(args, samples, elapsed)
+
+
+if __name__ == "__main__":
+    main()
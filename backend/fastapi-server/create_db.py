@@ -10,7 +10,15 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
 from fastapi_server.database import create_tables
-from fastapi_server.models import Component, Chat  # Import models to register them
+from fastapi_server.models import (
+    Component,
+    Chat,
+    ChatSummary,
+    ChatStage,
+    ChatAggregate,
+    StageAggregate,
+    ComponentAggregate,
+)  # Import models to register them
 
 
 def main():
@@ -25,6 +33,12 @@ def main():
         print("📋 Tables created:")
         print("   - components")
         print("   - chats")
+        print("   - chat_summaries")
+        print("   - chat_stages")
+        print("   - chat_aggregates")
+        print("   - stage_aggregates")
+        print("   - component_aggregates")
+        print("   - latency_sketch_bins")
 
     except Exception as e:
         print(f"❌ Error creating database: {e}")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+"""
+Recompute the statistics aggregates from the stored chats, stages and components.
+
+The running totals behind /chat/statistics, /chat/statistics/latency and
+/components/statistics are kept up to date as rows are stored and deleted.
+Run this after changing rows outside the server (manual SQL, restored
+backups) to bring them back in line, and after changing LATENCY_BUCKET_SECONDS
+or LATENCY_SKETCH_ACCURACY.
+"""
+
+import sys
+import os
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from fastapi_server.database import SessionLocal, create_tables
+from fastapi_server.repositories.statistics_repository import StatisticsRepository
+
+
+def main():
+    """Rebuild every aggregate table in one transaction."""
+    print("Rebuilding statistics aggregates...")
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        written = StatisticsRepository().rebuild(db)
+        print("✅ Statistics rebuilt!")
+        for table, rows in written.items():
+            print(f"   - {table}: {rows} rows")
+    except Exception as e:
+        print(f"❌ Error rebuilding statistics: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
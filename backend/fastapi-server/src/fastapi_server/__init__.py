@@ -2,10 +2,6 @@
 FastAPI server for component management with chat endpoint.
 """
 
-from .main import app
-from .chat_agent import ChatAgent
-from .ai import DashboardCrew
-
 __version__ = "0.1.0"
 
 __all__ = [
@@ -13,3 +9,19 @@ __all__ = [
     "ChatAgent",
     "DashboardCrew",
 ]
+
+# Importing the app or the AI crew is slow (crewai, langchain); load them on
+# first access so importing a submodule doesn't pay for it
+_LAZY_ATTRIBUTES = {
+    "app": ".main",
+    "ChatAgent": ".chat_agent",
+    "DashboardCrew": ".ai.crew",
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    return getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
@@ -3,6 +3,13 @@ AI module for dashboard component processing.
 Clean, simple implementation using CrewAI.
 """
 
-from .crew import DashboardCrew
-
 __all__ = ["DashboardCrew"]
+
+
+def __getattr__(name):
+    # crewai is slow to import; only load the crew when it is asked for
+    if name == "DashboardCrew":
+        from .crew import DashboardCrew
+
+        return DashboardCrew
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,23 @@
+"""
+LangChain callback handlers shared by every LLM client.
+"""
+
+from typing import Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .run_context import current_run
+
+
+class RunCallbackHandler(BaseCallbackHandler):
+    """
+    Routes LLM events to the run that is active in the calling thread.
+
+    LLM clients are shared across runs, so the handler is attached once per
+    client and looks up the current run through a context variable.
+    """
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        run = current_run.get()
+        if run is not None:
+            run.on_token(token)
@@ -0,0 +1,258 @@
+"""
+Conversation context for crew prompts.
+Keeps a rolling per-session summary and fits it, plus the latest turns, into a token budget.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+NO_CONTEXT = "No previous conversation context."
+
+# Component facts kept in the summary, newest last
+MAX_FACTS = 10
+
+# Tokens for the "Message N: " prefix and line break around each verbatim turn
+_TURN_OVERHEAD = 6
+
+# Roughly one token per word piece or punctuation mark
+_TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """tiktoken encoding when installed (it ships with the OpenAI stack)."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = None
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Count prompt tokens locally, without an API call."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cut text down to at most budget tokens, marking the cut with an ellipsis."""
+    if budget <= 0:
+        return ""
+    if count_tokens(text) <= budget:
+        return text
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[: budget - 1]).rstrip() + "…"
+    tokens = list(_TOKEN_PATTERN.finditer(text))
+    return text[: tokens[budget - 1].start()].rstrip() + "…"
+
+
+def describe_intent(intent: Optional[Dict[str, Any]]) -> str:
+    """Compact description of a parsed intent, e.g. "add_chart sales from mysql"."""
+    if not intent or intent.get("action") in (None, "unknown"):
+        return ""
+    parts = [str(intent["action"])]
+    if intent.get("query"):
+        parts.append(str(intent["query"]))
+    if intent.get("data_source"):
+        parts.append(f"from {intent['data_source']}")
+    if intent.get("interval"):
+        parts.append(f"every {intent['interval']}")
+    return " ".join(parts)
+
+
+def _first_sentence(text: str, max_tokens: int) -> str:
+    sentence = re.split(r"(?<=[.!?])\s", (text or "").strip(), maxsplit=1)[0]
+    return truncate_to_tokens(" ".join(sentence.split()), max_tokens)
+
+
+class RollingSummary:
+    """
+    Incrementally maintained summary of a chat session.
+
+    Each turn is folded in once as a short gist; component requests are also
+    kept as facts. When the rendered summary outgrows its token budget the
+    oldest gists are dropped, so its size stays flat as the session grows.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 300,
+        facts: Optional[List[str]] = None,
+        turns: Optional[List[Dict[str, Any]]] = None,
+        turn_count: int = 0,
+        last_chat_id: Optional[int] = None,
+    ):
+        self.token_budget = token_budget
+        self.facts = list(facts or [])
+        self.turns = list(turns or [])
+        self.turn_count = turn_count
+        self.last_chat_id = last_chat_id
+
+    @classmethod
+    def from_dict(
+        cls, data: Optional[Dict[str, Any]], token_budget: int = 300
+    ) -> "RollingSummary":
+        data = data or {}
+        return cls(
+            token_budget=token_budget,
+            facts=data.get("facts"),
+            turns=data.get("turns"),
+            turn_count=data.get("turn_count", 0),
+            last_chat_id=data.get("last_chat_id"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "facts": self.facts,
+            "turns": self.turns,
+            "turn_count": self.turn_count,
+            "last_chat_id": self.last_chat_id,
+            "token_count": count_tokens(self.render()),
+        }
+
+    def rebase(self, stored: Optional[Dict[str, Any]]) -> None:
+        """
+        Continue from a stored summary unless this one has seen later turns.
+
+        Turns of a session that run at the same time each fold themselves
+        into their own copy; rebasing onto what the others saved first keeps
+        every turn in.
+        """
+        if not stored or (stored.get("last_chat_id") or 0) < (self.last_chat_id or 0):
+            return
+        self.facts = list(stored.get("facts") or [])
+        self.turns = list(stored.get("turns") or [])
+        self.turn_count = stored.get("turn_count", 0)
+        self.last_chat_id = stored.get("last_chat_id")
+
+    def add_turn(self, chat: Dict[str, Any]) -> None:
+        """Fold one stored chat turn into the summary."""
+        if chat.get("id") is not None and self._has_folded(chat["id"]):
+            return
+
+        intent = describe_intent(chat.get("intent"))
+        if intent:
+            if intent in self.facts:
+                self.facts.remove(intent)
+            self.facts = (self.facts + [intent])[-MAX_FACTS:]
+
+        gist = f"User: {_first_sentence(chat.get('user_message', ''), 30)}"
+        if intent:
+            gist += f" [{intent}]"
+        gist += f" → Assistant: {_first_sentence(chat.get('agent_response', ''), 30)}"
+        self.turns.append({"chat_id": chat.get("id"), "gist": gist})
+
+        self.turn_count += 1
+        if chat.get("id") is not None:
+            self.last_chat_id = max(self.last_chat_id or 0, chat["id"])
+
+        # Oldest gists go first; the facts line keeps what they asked for
+        while len(self.turns) > 1 and count_tokens(self.render()) > self.token_budget:
+            self.turns.pop(0)
+
+    def _has_folded(self, chat_id: int) -> bool:
+        if self.last_chat_id is None or chat_id > self.last_chat_id:
+            return False
+        # A turn stored before one already folded in (concurrent turns) still
+        # counts as new unless its gist is kept or older than every kept gist
+        kept = [t["chat_id"] for t in self.turns if t["chat_id"] is not None]
+        return not kept or chat_id in kept or chat_id < min(kept)
+
+    def render(self, exclude_chat_ids: Optional[set] = None) -> str:
+        """Summary text, leaving out turns that are already shown verbatim."""
+        exclude_chat_ids = exclude_chat_ids or set()
+        lines = []
+        if self.facts:
+            lines.append(f"Components discussed: {'; '.join(self.facts)}")
+        gists = [t["gist"] for t in self.turns if t["chat_id"] not in exclude_chat_ids]
+        if gists:
+            lines.append("Earlier turns:")
+            lines.extend(f"- {gist}" for gist in gists)
+        return "\n".join(lines)
+
+
+def format_turn(chat: Dict[str, Any]) -> str:
+    """One verbatim turn for the prompt."""
+    intent = describe_intent(chat.get("intent"))
+    intent_str = f" (Intent: {intent})" if intent else ""
+    return (
+        f'User: "{chat.get("user_message", "")}" | '
+        f'Assistant: "{chat.get("agent_response", "")}"{intent_str}'
+    )
+
+
+def build_conversation_context(
+    summary: Optional[RollingSummary],
+    recent_chats: List[Dict[str, Any]],
+    token_budget: int,
+) -> str:
+    """
+    Build the conversation_context prompt input within a token budget.
+
+    Args:
+        summary: Rolling summary of the session, if any
+        recent_chats: Latest turns to include verbatim, newest first
+        token_budget: Maximum tokens for the whole context
+
+    Returns:
+        Summary followed by as many recent turns as fit, oldest to newest
+    """
+    if not recent_chats and (summary is None or not summary.turn_count):
+        return NO_CONTEXT
+
+    turn_count = summary.turn_count if summary else len(recent_chats)
+    note = f"[Note: This is message {turn_count + 1} in the conversation.]"
+    remaining = token_budget - count_tokens(note) - count_tokens("Recent messages:")
+
+    # Keep room for the summary (up to half the budget), then let the newest
+    # turns claim the rest
+    reserved = 0
+    if summary is not None:
+        older = summary.render(exclude_chat_ids={c.get("id") for c in recent_chats})
+        reserved = min(count_tokens(older), remaining // 2)
+    remaining -= reserved
+
+    verbatim: List[str] = []
+    shown_ids = set()
+    for chat in recent_chats:
+        turn = format_turn(chat)
+        cost = count_tokens(turn) + _TURN_OVERHEAD
+        if cost > remaining:
+            if not verbatim:
+                # Always show at least part of the latest turn
+                verbatim.append(truncate_to_tokens(turn, remaining - _TURN_OVERHEAD))
+                shown_ids.add(chat.get("id"))
+            break
+        verbatim.append(turn)
+        shown_ids.add(chat.get("id"))
+        remaining -= cost
+
+    remaining += reserved
+    sections = []
+    if summary is not None:
+        summary_text = summary.render(exclude_chat_ids=shown_ids)
+        if summary_text and remaining > 0:
+            # One token for the line break after it
+            sections.append(truncate_to_tokens(summary_text, remaining - 1))
+    if verbatim:
+        sections.append(
+            "Recent messages:\n"
+            + "\n".join(
+                f"Message {i}: {turn}" for i, turn in enumerate(reversed(verbatim), 1)
+            )
+        )
+    sections.append(note)
+    return "\n".join(sections)
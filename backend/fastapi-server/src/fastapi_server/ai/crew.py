@@ -5,10 +5,33 @@ Modern implementation using decorators and YAML configuration.
 
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
-from langchain_openai import ChatOpenAI
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+import functools
 import json
 import os
+import threading
+from ..config import Config
+from .callbacks import RunCallbackHandler
+from .conversation import build_conversation_context
+from .deadline import DeadlineExceededError, RunInterruptedError
+from .intent_parser import IntentParser
+from .json_extractor import (
+    COMPONENT_SCHEMA,
+    INTENT_SCHEMA,
+    Field,
+    extract_first_valid,
+    extract_json_objects,
+    extract_key_value_pairs,
+)
+from .llm_pool import parse_rate_limits
+from .llm_providers import LLMProviders, PooledChatModel
+from .llm_recorder import create_llm_recorder
+from .mcp_client import MCPClient, ToolResultCache, parse_tool_timeouts
+from .mcp_tools import MCPTool, create_mcp_tools
+from .registry import CrewRegistry
+from .router import DIRECT_MODEL, MessageRouter
+from .run_context import RunContext, current_run, current_task
+from .scheduler import TaskGraph, critical_path, timing_report
 
 
 @CrewBase
@@ -18,172 +41,263 @@ class DashboardCrew:
     agents: List[Agent]
     tasks: List[Task]
 
+    # Task lists for each crew profile, in execution order
+    CREW_PROFILES: Dict[str, List[str]] = {
+        "full": [
+            "message_planning_task",
+            "intent_analysis_task",
+            "data_retrieval_task",
+            "component_generation_task",
+            "response_generation_task",
+        ],
+        "minimal": ["message_planning_task", "response_generation_task"],
+        # Follow-ups about an existing component: understand, then answer
+        "intent_only": ["intent_analysis_task", "response_generation_task"],
+        # Intent already parsed locally; planning and intent analysis are skipped
+        "intent_fast": [
+            "data_retrieval_task",
+            "component_generation_task",
+            "response_generation_task",
+        ],
+        # Lean variants drop the optional planning and data retrieval tasks,
+        # for requests with little time left before their deadline
+        "full_lean": [
+            "intent_analysis_task",
+            "component_generation_task",
+            "response_generation_task",
+        ],
+        "minimal_lean": ["response_generation_task"],
+        "intent_fast_lean": ["component_generation_task", "response_generation_task"],
+    }
+    LEAN_PROFILES: Dict[str, str] = {
+        "full": "full_lean",
+        "minimal": "minimal_lean",
+        "intent_only": "minimal_lean",
+        "intent_fast": "intent_fast_lean",
+    }
+
+    # Agents that can query the data sources through the MCP server
+    MCP_TOOL_AGENTS = ("data_connector",)
+
+    _registry: Optional[CrewRegistry] = None
+    _registry_lock = threading.Lock()
+    _llm_providers: Optional[LLMProviders] = None
+    _mcp_client: Optional[MCPClient] = None
+    _mcp_tools: Optional[List[MCPTool]] = None
+    _rule_intent_parser: Optional[IntentParser] = None
+    _router: Optional[MessageRouter] = None
+
+    @property
+    def rule_intent_parser(self) -> IntentParser:
+        """
+        Local rule-based intent parser, compiled once from intents.yaml.
+
+        Not to be confused with the intent_parser agent below.
+        """
+        if self._rule_intent_parser is None:
+            self._rule_intent_parser = IntentParser.from_yaml()
+        return self._rule_intent_parser
+
+    @property
+    def router(self) -> MessageRouter:
+        """Routing classifier, from the saved model or trained on seed examples."""
+        if self._router is None:
+            with self._registry_lock:
+                if self._router is None:
+                    self._router = MessageRouter.from_yaml(
+                        intent_parser=self.rule_intent_parser,
+                        model_path=Config.ROUTER_MODEL_PATH,
+                    )
+        return self._router
+
+    @property
+    def registry(self) -> CrewRegistry:
+        """Registry of warm LLM clients and pooled crews for this instance."""
+        if self._registry is None:
+            with self._registry_lock:
+                if self._registry is None:
+                    self._registry = CrewRegistry(
+                        builders={
+                            profile: functools.partial(self._build_crew, task_names)
+                            for profile, task_names in self.CREW_PROFILES.items()
+                        },
+                        llm_factory=self._build_llm,
+                        pool_size=Config.CREW_MAX_WORKERS,
+                    )
+        return self._registry
+
+    @property
+    def llm_providers(self) -> LLMProviders:
+        """Rate-limited, circuit-broken LLM provider clients for this instance."""
+        if self._llm_providers is None:
+            with self._registry_lock:
+                if self._llm_providers is None:
+                    self._llm_providers = LLMProviders(
+                        fallbacks=Config.LLM_FALLBACKS,
+                        rate_limits=parse_rate_limits(Config.LLM_RATE_LIMITS),
+                        circuit_failure_threshold=Config.LLM_CIRCUIT_FAILURE_THRESHOLD,
+                        circuit_reset_seconds=Config.LLM_CIRCUIT_RESET_SECONDS,
+                        max_workers=Config.LLM_POOL_MAX_WORKERS,
+                        ollama_base_url=Config.OLLAMA_BASE_URL,
+                        pool_options={
+                            "hedging": Config.LLM_HEDGING_ENABLED,
+                            "hedge_percentile": Config.LLM_HEDGE_PERCENTILE,
+                            "hedge_min_delay": Config.LLM_HEDGE_MIN_DELAY_MS / 1000,
+                            "hedge_default_delay": Config.LLM_HEDGE_DEFAULT_DELAY_MS
+                            / 1000,
+                            "acquire_timeout": Config.LLM_RATE_LIMIT_TIMEOUT_SECONDS,
+                        },
+                        mock_options={
+                            "script": Config.MOCK_LLM_SCRIPT or None,
+                            "seed": Config.MOCK_LLM_SEED,
+                            "latency_scale": Config.MOCK_LLM_LATENCY_SCALE,
+                        },
+                        recorder=create_llm_recorder(
+                            Config.LLM_RECORD_MODE, Config.LLM_RECORDINGS_PATH
+                        ),
+                    )
+        return self._llm_providers
+
+    @property
+    def mcp_client(self) -> MCPClient:
+        """Pooled MCP data server client shared by agents and data previews."""
+        if self._mcp_client is None:
+            with self._registry_lock:
+                if self._mcp_client is None:
+                    self._mcp_client = MCPClient(
+                        Config.MCP_SERVER_URL,
+                        path=Config.MCP_SERVER_PATH,
+                        timeout=Config.MCP_TIMEOUT_SECONDS,
+                        tool_timeouts=parse_tool_timeouts(Config.MCP_TOOL_TIMEOUTS),
+                        cache=(
+                            ToolResultCache(
+                                Config.MCP_CACHE_TTL_SECONDS,
+                                max_entries=Config.MCP_CACHE_MAX_ENTRIES,
+                            )
+                            if Config.MCP_CACHE_TTL_SECONDS > 0
+                            else None
+                        ),
+                        max_connections=Config.MCP_MAX_CONNECTIONS,
+                    )
+        return self._mcp_client
+
+    @property
+    def mcp_tools(self) -> List[MCPTool]:
+        """CrewAI tools for the MCP data server; stateless, so shared by all crews."""
+        if self._mcp_tools is None:
+            self._mcp_tools = create_mcp_tools(self.mcp_client)
+        return self._mcp_tools
+
+    def warm_up(self) -> None:
+        """Build LLM clients and one crew per profile ahead of the first request."""
+        print("🔥 Warming up crew registry...")
+        # Lean profiles are only used near deadlines; build them on demand
+        lean = set(self.LEAN_PROFILES.values())
+        self.registry.warm_up(p for p in self.CREW_PROFILES if p not in lean)
+        if Config.ROUTER_ENABLED:
+            self.router
+        print(f"✅ Crew registry warm: {self.registry.get_stats()}")
+
+    def shutdown(self) -> None:
+        """Stop the LLM provider worker pool and close MCP connections."""
+        if self._llm_providers is not None:
+            self._llm_providers.shutdown()
+        if self._mcp_client is not None:
+            self._mcp_client.close()
+
     def _create_llm(self, llm_config: str):
-        """Create LLM instance from configuration string."""
+        """Get the shared LLM instance for a configuration string."""
+        return self.registry.get_llm(Config.LLM_MODEL_OVERRIDE or llm_config)
+
+    def _build_llm(self, llm_config: str):
+        """
+        Create the chat model for an agents.yaml llm string ("provider/model").
+
+        Requests go through the provider pool: the configured model first,
+        then Config.LLM_FALLBACKS for hedging and failover.
+        """
         try:
-            if llm_config.startswith("openai/"):
-                model = llm_config.replace("openai/", "")
-                return ChatOpenAI(model=model)
-            # Add other LLM providers as needed
-            return ChatOpenAI(model="gpt-4o")
+            return PooledChatModel(
+                pool=self.llm_providers.pool_for(llm_config),
+                # Streaming lets the active run forward response tokens as they arrive
+                streaming=Config.LLM_STREAMING,
+                callbacks=[RunCallbackHandler()],
+            )
         except Exception as e:
-            print(f"⚠️ Warning: Error creating LLM with config '{llm_config}': {e}")
-            # Fallback to a basic model
-            try:
-                return ChatOpenAI(model="gpt-4o")
-            except Exception as fallback_error:
-                print(f"❌ Critical: Could not create any LLM: {fallback_error}")
-                raise fallback_error
+            print(f"❌ Critical: Could not create LLM '{llm_config}': {e}")
+            raise
 
-    @agent
-    def message_planner(self) -> Agent:
-        agent_config = self.agents_config["message_planner"].copy()  # type: ignore[index]
+    def _build_agent(self, name: str) -> Agent:
+        """Create a new agent from its YAML configuration."""
+        agent_config = self.agents_config[name].copy()  # type: ignore[index]
         llm = self._create_llm(agent_config.pop("llm", "openai/gpt-4o"))
+        tools = (
+            self.mcp_tools
+            if Config.MCP_TOOLS_ENABLED and name in self.MCP_TOOL_AGENTS
+            else []
+        )
         return Agent(
             llm=llm,
+            tools=tools,
             **agent_config,
             verbose=True,
             allow_delegation=False,
         )
 
+    def _build_task(self, name: str, task_agent: Agent) -> Task:
+        """Create a new task from its YAML configuration."""
+        task_config = self.tasks_config[name]  # type: ignore[index]
+        # The agent and context fields are wired up by the crew builders
+        return Task(
+            description=task_config["description"],
+            expected_output=task_config["expected_output"],
+            agent=task_agent,
+            **{
+                k: v
+                for k, v in task_config.items()
+                if k not in ["description", "expected_output", "agent", "context"]
+            },
+        )
+
+    @agent
+    def message_planner(self) -> Agent:
+        return self._build_agent("message_planner")
+
     @agent
     def intent_parser(self) -> Agent:
-        agent_config = self.agents_config["intent_parser"].copy()  # type: ignore[index]
-        llm = self._create_llm(agent_config.pop("llm", "openai/gpt-4o"))
-        return Agent(
-            llm=llm,
-            **agent_config,
-            verbose=True,
-            allow_delegation=False,
-        )
+        return self._build_agent("intent_parser")
 
     @agent
     def data_connector(self) -> Agent:
-        agent_config = self.agents_config["data_connector"].copy()  # type: ignore[index]
-        llm = self._create_llm(agent_config.pop("llm", "openai/gpt-4o"))
-        return Agent(
-            llm=llm,
-            **agent_config,
-            verbose=True,
-            allow_delegation=False,
-        )
+        return self._build_agent("data_connector")
 
     @agent
     def component_generator(self) -> Agent:
-        agent_config = self.agents_config["component_generator"].copy()  # type: ignore[index]
-        llm = self._create_llm(agent_config.pop("llm", "openai/gpt-4o"))
-        return Agent(
-            llm=llm,
-            **agent_config,
-            verbose=True,
-            allow_delegation=False,
-        )
+        return self._build_agent("component_generator")
 
     @agent
     def response_generator(self) -> Agent:
-        agent_config = self.agents_config["response_generator"].copy()  # type: ignore[index]
-        llm = self._create_llm(agent_config.pop("llm", "openai/gpt-4o"))
-        return Agent(
-            llm=llm,
-            **agent_config,
-            verbose=True,
-            allow_delegation=False,
-        )
+        return self._build_agent("response_generator")
 
     @task
     def message_planning_task(self) -> Task:
-        task_config = self.tasks_config["message_planning_task"].copy()  # type: ignore[index]
-        # Remove the agent and context fields from config as they will be handled by decorators
-        if "agent" in task_config:
-            del task_config["agent"]
-        if "context" in task_config:
-            del task_config["context"]
-        return Task(
-            description=task_config["description"],
-            expected_output=task_config["expected_output"],
-            agent=self.message_planner(),
-            **{
-                k: v
-                for k, v in task_config.items()
-                if k not in ["description", "expected_output", "agent", "context"]
-            },
-        )
+        return self._build_task("message_planning_task", self.message_planner())
 
     @task
     def intent_analysis_task(self) -> Task:
-        task_config = self.tasks_config["intent_analysis_task"].copy()  # type: ignore[index]
-        # Remove the agent and context fields from config as they will be handled by decorators
-        if "agent" in task_config:
-            del task_config["agent"]
-        if "context" in task_config:
-            del task_config["context"]
-        return Task(
-            description=task_config["description"],
-            expected_output=task_config["expected_output"],
-            agent=self.intent_parser(),
-            **{
-                k: v
-                for k, v in task_config.items()
-                if k not in ["description", "expected_output", "agent", "context"]
-            },
-        )
+        return self._build_task("intent_analysis_task", self.intent_parser())
 
     @task
     def data_retrieval_task(self) -> Task:
-        task_config = self.tasks_config["data_retrieval_task"].copy()  # type: ignore[index]
-        # Remove the agent and context fields from config as they will be handled by decorators
-        if "agent" in task_config:
-            del task_config["agent"]
-        if "context" in task_config:
-            del task_config["context"]
-        return Task(
-            description=task_config["description"],
-            expected_output=task_config["expected_output"],
-            agent=self.data_connector(),
-            **{
-                k: v
-                for k, v in task_config.items()
-                if k not in ["description", "expected_output", "agent", "context"]
-            },
-        )
+        return self._build_task("data_retrieval_task", self.data_connector())
 
     @task
     def component_generation_task(self) -> Task:
-        task_config = self.tasks_config["component_generation_task"].copy()  # type: ignore[index]
-        # Remove the agent and context fields from config as they will be handled by decorators
-        if "agent" in task_config:
-            del task_config["agent"]
-        if "context" in task_config:
-            del task_config["context"]
-        return Task(
-            description=task_config["description"],
-            expected_output=task_config["expected_output"],
-            agent=self.component_generator(),
-            **{
-                k: v
-                for k, v in task_config.items()
-                if k not in ["description", "expected_output", "agent", "context"]
-            },
-        )
+        return self._build_task("component_generation_task", self.component_generator())
 
     @task
     def response_generation_task(self) -> Task:
-        task_config = self.tasks_config["response_generation_task"].copy()  # type: ignore[index]
-        # Remove the agent and context fields from config as they will be handled by decorators
-        if "agent" in task_config:
-            del task_config["agent"]
-        if "context" in task_config:
-            del task_config["context"]
-        return Task(
-            description=task_config["description"],
-            expected_output=task_config["expected_output"],
-            agent=self.response_generator(),
-            **{
-                k: v
-                for k, v in task_config.items()
-                if k not in ["description", "expected_output", "agent", "context"]
-            },
-        )
+        return self._build_task("response_generation_task", self.response_generator())
 
     @crew
     def crew(self) -> Crew:
@@ -195,81 +309,59 @@ class DashboardCrew:
             verbose=True,
         )
 
-    def _extract_json_from_result(self, result_text: str) -> dict:
-        """Extract JSON from agent result text."""
+    def _extract_json_from_result(
+        self, result_text: str, schema: Optional[Dict[str, Field]] = None
+    ) -> dict:
+        """
+        Extract JSON from agent result text.
+
+        Args:
+            result_text: Raw agent output
+            schema: Optional schema (e.g. INTENT_SCHEMA); when given, the first
+                object that matches it is returned instead of the first object
+        """
         if not result_text:
             return {}
 
         try:
-            import re
-            import json
-
-            # Try to find JSON objects in the text
-            json_patterns = [
-                r"\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}",  # Nested JSON objects
-                r"\{.*?\}",  # Simple JSON objects
-            ]
-
-            for pattern in json_patterns:
-                matches = re.findall(pattern, result_text, re.DOTALL)
-                for match in matches:
-                    try:
-                        # Clean up the match
-                        cleaned = match.strip()
-                        if cleaned.startswith("{") and cleaned.endswith("}"):
-                            return json.loads(cleaned)
-                    except (json.JSONDecodeError, ValueError):
-                        continue
+            if schema is not None:
+                return extract_first_valid(result_text, schema) or {}
+
+            objects = extract_json_objects(result_text)
+            if objects:
+                return objects[0].value
 
             # If no JSON found, try to extract key-value pairs
-            return self._extract_key_value_pairs(result_text)
+            return extract_key_value_pairs(result_text)
 
         except Exception as e:
             print(f"Error extracting JSON from result: {e}")
             return {}
 
-    def _extract_key_value_pairs(self, text: str) -> dict:
-        """Extract key-value pairs from text when JSON parsing fails."""
-        try:
-            import re
-
-            # Look for patterns like "key": "value" or key: value
-            pairs = {}
-            patterns = [
-                r'"([^"]+)"\s*:\s*"([^"]*)"',  # "key": "value"
-                r'"([^"]+)"\s*:\s*([^,\s]+)',  # "key": value
-                r'([a-zA-Z_][a-zA-Z0-9_]*)\s*:\s*"([^"]*)"',  # key: "value"
-                r"([a-zA-Z_][a-zA-Z0-9_]*)\s*:\s*([^,\s]+)",  # key: value
-            ]
-
-            for pattern in patterns:
-                matches = re.findall(pattern, text)
-                for key, value in matches:
-                    # Clean up the key and value
-                    key = key.strip()
-                    value = value.strip().strip('"')
-
-                    # Try to convert value to appropriate type
-                    if value.lower() in ["true", "false"]:
-                        value = value.lower() == "true"
-                    elif value.isdigit():
-                        value = int(value)
-                    elif value.replace(".", "").isdigit():
-                        value = float(value)
-
-                    pairs[key] = value
-
-            return pairs
+    def _structured_outputs(
+        self, outputs: Dict[str, str], parsed_intent: Optional[Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Intent and component specification from the tasks that produce them.
 
-        except Exception as e:
-            print(f"Error extracting key-value pairs: {e}")
-            return {}
+        The rule-based intent, when there is one, stands in for the intent
+        analysis task (which the fast path skips). Tasks that did not run, or
+        whose output has no object matching the schema, give an empty dict.
+        """
+        intent = parsed_intent or self._extract_json_from_result(
+            outputs.get("intent_analysis_task", ""), INTENT_SCHEMA
+        )
+        component_suggestion = self._extract_json_from_result(
+            outputs.get("component_generation_task", ""), COMPONENT_SCHEMA
+        )
+        return intent, component_suggestion
 
     def process_message(
         self,
         message: str,
         session_id: Optional[str] = None,
         chat_history: Optional[List[Dict[str, Any]]] = None,
+        conversation_context: Optional[str] = None,
     ) -> dict:
         """
         Process user message through the crew workflow with chat history context.
@@ -278,6 +370,8 @@ class DashboardCrew:
             message: The user's natural language message
             session_id: Optional session ID for conversation tracking
             chat_history: Optional list of previous chat messages
+            conversation_context: Optional prebuilt conversation context; built
+                from chat_history when omitted
 
         Returns:
             Dict containing response, component_suggestion, and data
@@ -300,6 +394,7 @@ class DashboardCrew:
                 "component_suggestion": {},
                 "data": {},
                 "intent": {},
+                "model_used": DIRECT_MODEL,
             }
 
         # Check if this is a component request
@@ -321,6 +416,43 @@ class DashboardCrew:
             keyword in message_lower for keyword in component_keywords
         )
 
+        candidate = self.rule_intent_parser.parse(message)
+        print(
+            f"🧭 Local intent parse: {candidate['action']} (confidence {candidate['confidence']})"
+        )
+        # The keyword rule decides when the classifier is off or unsure
+        keyword_route = "full" if is_component_request else "minimal"
+        routing = None
+        if Config.ROUTER_ENABLED:
+            routing = self.router.route(message, keyword_route, intent=candidate)
+            print(
+                f"🔀 Routed to {routing.route} "
+                f"(confidence {routing.confidence:.2f}, {routing.source})"
+            )
+            direct_reply = (
+                self.router.direct_reply(message) if routing.route == "direct" else None
+            )
+            if direct_reply is not None:
+                return {
+                    "response": direct_reply,
+                    "component_suggestion": {},
+                    "data": {},
+                    "intent": {},
+                    "model_used": DIRECT_MODEL,
+                    "routing": routing.to_dict(),
+                }
+
+        # Confident local parses of new component requests skip the planning and
+        # intent analysis LLM calls; the router's follow-ups keep their own crew
+        route = routing.route if routing is not None else keyword_route
+        parsed_intent = None
+        if (
+            Config.INTENT_FAST_PATH_ENABLED
+            and (routing is None or route == "full")
+            and self.rule_intent_parser.is_confident(candidate)
+        ):
+            parsed_intent = candidate
+
         try:
             print(f"🚀 Starting crew processing for message: '{message}'")
             print(f"🔍 Component request detected: {is_component_request}")
@@ -328,32 +460,51 @@ class DashboardCrew:
                 f"📚 Chat history available: {len(chat_history) if chat_history else 0} previous messages"
             )
 
-            # Create crew based on message type
-            if is_component_request:
-                print("📋 Creating full crew for component request...")
-                crew_instance = self._create_full_crew()
+            # Pick the pooled crew profile based on message type
+            if parsed_intent is not None:
+                print("📋 Using intent fast-path crew for parsed component request...")
+                profile = "intent_fast"
+            elif route == "full":
+                print("📋 Using full crew for component request...")
+                profile = "full"
+            elif route == "intent_only":
+                print("📋 Using intent-only crew for component follow-up...")
+                profile = "intent_only"
             else:
-                print("📋 Creating minimal crew for general query...")
-                crew_instance = self._create_minimal_crew()
+                print("📋 Using minimal crew for general query...")
+                profile = "minimal"
+
+            # Skip optional stages when the remaining budget is too small
+            run = current_run.get()
+            remaining = run.deadline.remaining() if run and run.deadline else None
+            if remaining is not None and remaining < Config.CREW_LEAN_BUDGET_SECONDS:
+                print(
+                    f"⏳ {remaining:.1f}s left before the deadline, skipping optional stages"
+                )
+                profile = self.LEAN_PROFILES.get(profile, profile)
 
             # Prepare inputs with chat history context
             inputs = {
                 "message": message,
                 "session_id": session_id,
                 "chat_history": chat_history or [],
-                "conversation_context": (
-                    self._format_chat_history(chat_history)
-                    if chat_history
-                    else "No previous conversation context."
+                "conversation_context": conversation_context
+                or build_conversation_context(
+                    None, chat_history or [], Config.CONTEXT_TOKEN_BUDGET
+                ),
+                "parsed_intent": (
+                    json.dumps(parsed_intent) if parsed_intent else "Not available."
                 ),
             }
             print(f"📥 Inputs prepared with chat history context")
 
             # Run the crew
-            print("🔄 Starting crew execution...")
-            result = crew_instance.kickoff(inputs=inputs)
+            print(f"🔄 Starting crew execution ({Config.CREW_PROCESS})...")
+            result, outputs, timing = self._run_profile(profile, inputs)
 
             print(f"✅ Crew execution completed")
+            path = " → ".join(timing["critical_path"])
+            print(f"⏱️ Critical path ({timing['critical_path_ms']}ms): {path}")
             print(f"📊 Crew result: {result}")  # Debug output
 
             # The crew returns a single result string with the final response
@@ -364,15 +515,51 @@ class DashboardCrew:
             if not response_text or response_text.strip() == "":
                 response_text = "I understand your message. How can I help you create dashboard components or answer your questions?"
 
-            # For now, return the response text and empty structured data
-            # The crew is working well and generating comprehensive responses
+            intent, component_suggestion = self._structured_outputs(
+                outputs, parsed_intent
+            )
             return {
                 "response": response_text,
-                "component_suggestion": {},
+                "component_suggestion": component_suggestion,
                 "data": {},
-                "intent": {},
+                "intent": intent,
+                "timing": timing,
+                "model_used": timing["models"][0] if timing["models"] else None,
+                "routing": dict(
+                    routing.to_dict() if routing is not None else {},
+                    profile=profile,
+                ),
             }
 
+        except DeadlineExceededError as e:
+            outputs = getattr(e, "outputs", {})
+            if not outputs:
+                raise
+            # Return what the completed stages produced, marked as partial
+            print(
+                f"⏳ Deadline exceeded, returning partial result from {list(outputs)}"
+            )
+            last_output = list(outputs.values())[-1]
+            intent, component_suggestion = self._structured_outputs(
+                outputs, parsed_intent
+            )
+            return {
+                "response": (
+                    "I ran out of time before finishing your request. "
+                    f"Here is what I have so far:\n\n{last_output}"
+                ),
+                "component_suggestion": component_suggestion,
+                "data": {},
+                "intent": intent,
+                "timing": getattr(e, "timing", None),
+                "partial": True,
+                "incomplete_stages": getattr(e, "timing", {}).get(
+                    "incomplete_tasks", []
+                ),
+                "model_used": (getattr(e, "timing", {}).get("models") or [None])[0],
+            }
+        except RunInterruptedError:
+            raise
         except Exception as e:
             import traceback
 
@@ -389,67 +576,162 @@ class DashboardCrew:
                 "intent": None,
             }
 
-    def _format_chat_history(self, chat_history: List[Dict[str, Any]]) -> str:
-        """Format chat history for inclusion in crew inputs."""
-        if not chat_history:
-            return "No previous conversation context."
-
-        formatted_history = []
-        for i, chat in enumerate(chat_history[-5:], 1):  # Last 5 messages
-            user_msg = chat.get("user_message", "")
-            agent_msg = chat.get("agent_response", "")
-
-            # Extract key information from the agent response
-            intent = chat.get("intent", {})
-            component_suggestion = chat.get("component_suggestion", {})
-
-            # Format with more context
-            context_info = []
-            if intent:
-                context_info.append(f"Intent: {intent}")
-            if component_suggestion:
-                context_info.append(f"Component: {component_suggestion}")
-
-            context_str = f" ({'; '.join(context_info)})" if context_info else ""
+    def _task_graph(self, profile: str) -> TaskGraph:
+        """Dependency graph of a profile's tasks, from their YAML context."""
+        return TaskGraph.from_tasks_config(
+            self.tasks_config, self.CREW_PROFILES[profile]  # type: ignore[arg-type]
+        )
 
-            formatted_history.append(
-                f'Message {i}: User: "{user_msg}" | Assistant: "{agent_msg}"{context_str}'
-            )
+    def _run_profile(self, profile: str, inputs: Dict[str, Any]):
+        """
+        Run a pooled crew for the profile.
 
-        # Add a summary of the conversation
-        if len(chat_history) > 5:
-            summary = f"\n[Note: This is message {len(chat_history) + 1} in the conversation. Previous {len(chat_history)} messages provide context.]"
+        Returns the final output, the output of each task, and a timing report
+        with per-task spans and the critical path.
+        """
+        task_names = self.CREW_PROFILES[profile]
+        graph_mode = Config.CREW_PROCESS == "graph"
+
+        # Stage tracking needs a run context even when no caller provided one
+        run = current_run.get()
+        run_token = None
+        if run is None:
+            run = RunContext()
+            run_token = current_run.set(run)
+
+        graph = self._task_graph(profile) if graph_mode else None
+        interrupted: Optional[RunInterruptedError] = None
+        try:
+            run.start(task_names, sequential=not graph_mode)
+            run.check_deadline()
+            with self.registry.checkout(profile) as crew_instance:
+                try:
+                    if graph is not None:
+                        graph_run = graph.run(
+                            functools.partial(
+                                self._run_single_task,
+                                dict(zip(task_names, crew_instance.tasks)),
+                                inputs,
+                            ),
+                            max_parallel=Config.CREW_GRAPH_MAX_PARALLEL,
+                            on_start=run.stage_started,
+                            on_complete=run.stage_completed,
+                        )
+                        result = graph_run.outputs[task_names[-1]]
+                    else:
+                        result = crew_instance.kickoff(inputs=inputs)
+                except Exception as e:
+                    interrupted = self._interruption(run, e)
+                    if interrupted is None:
+                        raise
+        finally:
+            if run_token is not None:
+                current_run.reset(run_token)
+
+        # Tasks wait on their graph dependencies, or on the task before them
+        if graph is not None:
+            dependencies = graph.dependencies
         else:
-            summary = f"\n[Note: This is message {len(chat_history) + 1} in the conversation.]"
+            dependencies = {
+                name: task_names[i - 1 : i] for i, name in enumerate(task_names)
+            }
+        path, path_ms = critical_path(run.spans, dependencies)
+        timing = timing_report(run.spans, path, path_ms)
+
+        # Queue wait and per-task LLM latency, tokens, retries and models
+        usage = run.usage_report()
+        for name, task_usage in usage.pop("tasks").items():
+            timing["tasks"].setdefault(name, {}).update(task_usage)
+        timing.update(usage)
+
+        if interrupted is not None:
+            timing["partial"] = True
+            timing["incomplete_tasks"] = run.incomplete_tasks
+            interrupted.timing = timing  # type: ignore[attr-defined]
+            interrupted.outputs = dict(run.outputs)  # type: ignore[attr-defined]
+            raise interrupted
+        return result, dict(run.outputs), timing
+
+    def _interruption(
+        self, run: RunContext, error: Exception
+    ) -> Optional[RunInterruptedError]:
+        """
+        The deadline or cancellation behind a failed run, if that is why it failed.
 
-        return "\n".join(formatted_history) + summary
+        CrewAI may wrap or swallow errors raised inside LLM calls, so the run's
+        deadline is consulted as well as the exception itself.
+        """
+        if isinstance(error, RunInterruptedError):
+            return error
+        try:
+            run.check_deadline()
+        except RunInterruptedError as interrupted:
+            return interrupted
+        return None
 
-    def _create_minimal_crew(self) -> Crew:
-        """Create a minimal crew for general queries (no component creation)."""
-        return Crew(
-            agents=[self.message_planner(), self.response_generator()],
-            tasks=[self.message_planning_task(), self.response_generation_task()],
+    def _run_single_task(
+        self,
+        tasks: Dict[str, Task],
+        inputs: Dict[str, Any],
+        task_name: str,
+        upstream: Dict[str, Any],
+    ) -> str:
+        """Run one task of a task graph as a single-task crew."""
+        task = tasks[task_name]
+        run = current_run.get()
+        if run is not None:
+            run.check_deadline()
+        # Attributes this thread's LLM calls to the task
+        current_task.set(task_name)
+        # Upstream outputs reach the task through task.context, which points at
+        # the already-completed Task objects
+        single_task_crew = Crew(
+            agents=[task.agent],
+            tasks=[task],
             process=Process.sequential,
             verbose=True,
         )
+        output = str(single_task_crew.kickoff(inputs=inputs))
+        if run is not None:
+            run.record_output(task_name, output)
+        return output
+
+    def _build_crew(self, task_names: List[str]) -> Crew:
+        """Create a crew with fresh agents and tasks; LLM clients are shared."""
+        agents: Dict[str, Agent] = {}
+        tasks: Dict[str, Task] = {}
+        for task_name in task_names:
+            agent_name = self.tasks_config[task_name]["agent"]  # type: ignore[index]
+            if agent_name not in agents:
+                agents[agent_name] = self._build_agent(agent_name)
+            tasks[task_name] = self._build_task(task_name, agents[agent_name])
+
+        # Wire the YAML context edges that fall inside this crew
+        graph = TaskGraph.from_tasks_config(
+            self.tasks_config, task_names  # type: ignore[arg-type]
+        )
+        for task_name, deps in graph.dependencies.items():
+            if deps:
+                tasks[task_name].context = [tasks[dep] for dep in deps]
 
-    def _create_full_crew(self) -> Crew:
-        """Create a full crew for component requests."""
         return Crew(
-            agents=[
-                self.message_planner(),
-                self.intent_parser(),
-                self.data_connector(),
-                self.component_generator(),
-                self.response_generator(),
-            ],
-            tasks=[
-                self.message_planning_task(),
-                self.intent_analysis_task(),
-                self.data_retrieval_task(),
-                self.component_generation_task(),
-                self.response_generation_task(),
-            ],
+            agents=list(agents.values()),
+            tasks=list(tasks.values()),
             process=Process.sequential,
             verbose=True,
+            task_callback=self._on_task_complete,
         )
+
+    def _on_task_complete(self, task_output: Any) -> None:
+        """Report stage progress to the run that owns the current thread."""
+        run = current_run.get()
+        if run is not None:
+            run.task_completed(str(getattr(task_output, "raw", task_output)))
+
+    def _create_minimal_crew(self) -> Crew:
+        """Create a minimal crew for general queries (no component creation)."""
+        return self._build_crew(self.CREW_PROFILES["minimal"])
+
+    def _create_full_crew(self) -> Crew:
+        """Create a full crew for component requests."""
+        return self._build_crew(self.CREW_PROFILES["full"])
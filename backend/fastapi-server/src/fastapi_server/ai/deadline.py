@@ -0,0 +1,72 @@
+"""
+Request deadlines and cooperative cancellation.
+Carried by the run context so crew worker threads can stop early.
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class RunInterruptedError(Exception):
+    """Base for runs stopped before they finished."""
+
+
+class DeadlineExceededError(RunInterruptedError):
+    """Raised when a request runs past its deadline."""
+
+    status_code = 504
+
+
+class RunCancelledError(RunInterruptedError):
+    """Raised when nobody is waiting for the run any more (e.g. client disconnected)."""
+
+    status_code = 499
+
+
+class Deadline:
+    """
+    Point in time by which a request must finish, plus a cancellation flag.
+
+    Created on the event loop and checked from worker threads between units
+    of work (tasks, LLM calls); nothing is interrupted preemptively.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.expires_at = time.monotonic() + timeout if timeout is not None else None
+        self.reason: Optional[str] = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None without a deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        self.reason = reason
+        self._cancelled.set()
+
+    def extend(self, other: "Deadline") -> None:
+        """Push the expiry out to another deadline's, when that is later."""
+        with self._lock:
+            if self.expires_at is None:
+                return
+            if other.expires_at is None or other.expires_at > self.expires_at:
+                self.expires_at = other.expires_at
+
+    def check(self) -> None:
+        """Raise if the run should stop now."""
+        if self._cancelled.is_set():
+            raise RunCancelledError(f"Run cancelled: {self.reason}")
+        if self.expired:
+            raise DeadlineExceededError("Request deadline exceeded")
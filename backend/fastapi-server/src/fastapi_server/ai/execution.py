@@ -0,0 +1,280 @@
+"""
+Crew execution engine.
+Runs blocking crew kickoffs on a bounded worker pool so the event loop stays free.
+"""
+
+import asyncio
+import contextvars
+import functools
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+ANONYMOUS_SESSION = "__anonymous__"
+
+
+class CrewBackpressureError(Exception):
+    """Raised when a crew run cannot be admitted to the execution queue."""
+
+    status_code = 503
+
+
+class CrewQueueFullError(CrewBackpressureError):
+    """The global admission queue is full."""
+
+    status_code = 503
+
+
+class SessionQueueFullError(CrewBackpressureError):
+    """A single session already has too many crew runs pending."""
+
+    status_code = 429
+
+
+class _Job:
+    """A crew run waiting for, or occupying, a worker slot."""
+
+    __slots__ = (
+        "session_key",
+        "call",
+        "future",
+        "enqueued_at",
+        "started_at",
+    )
+
+    def __init__(
+        self, session_key: str, call: Callable[[], Any], future: asyncio.Future
+    ):
+        self.session_key = session_key
+        self.call = call
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+
+
+class CrewExecutor:
+    """
+    Bounded, session-fair executor for blocking crew runs.
+
+    Jobs are queued per session and dispatched round-robin across sessions, so
+    one chatty session cannot starve the others. When the queue is full new
+    work is rejected immediately instead of piling up behind slow LLM calls.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        kind: str = "thread",
+        max_queue_size: int = 32,
+        max_pending_per_session: int = 2,
+        sample_size: int = 1024,
+        initializer: Optional[Callable[[], None]] = None,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue_size = max(1, max_queue_size)
+        self.max_pending_per_session = max(1, max_pending_per_session)
+        self.initializer = initializer
+
+        self._pool: Optional[Executor] = None
+        self._queues: "OrderedDict[str, Deque[_Job]]" = OrderedDict()
+        self._pending_by_session: Dict[str, int] = {}
+        self._queued = 0
+        self._running = 0
+
+        # Metrics
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._rejected_queue_full = 0
+        self._rejected_session_limit = 0
+        self._total_wait_ms = 0.0
+        self._max_wait_ms = 0.0
+        self._total_run_ms = 0.0
+        self._wait_samples: Deque[float] = deque(maxlen=sample_size)
+
+    def _get_pool(self) -> Executor:
+        """Create the worker pool on first use."""
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, initializer=self.initializer
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="crew-worker",
+                    initializer=self.initializer,
+                )
+        return self._pool
+
+    async def submit(
+        self, session_id: Optional[str], fn: Callable[..., Any], /, *args, **kwargs
+    ) -> Any:
+        """
+        Run fn(*args, **kwargs) on the worker pool and await its result.
+
+        session_id and fn are positional-only so fn can take a session_id
+        keyword argument of its own.
+
+        Args:
+            session_id: Session the run belongs to, used for fairness and limits
+            fn: Blocking callable; must be picklable when kind is "process"
+
+        Raises:
+            CrewQueueFullError: If the global queue is at capacity
+            SessionQueueFullError: If the session already has too much pending work
+        """
+        loop = asyncio.get_running_loop()
+        session_key = session_id or ANONYMOUS_SESSION
+
+        if self._queued >= self.max_queue_size:
+            self._rejected_queue_full += 1
+            raise CrewQueueFullError(
+                "Chat processing queue is full, please retry shortly"
+            )
+        if self._pending_by_session.get(session_key, 0) >= self.max_pending_per_session:
+            self._rejected_session_limit += 1
+            raise SessionQueueFullError(
+                "Too many chat requests in progress for this session"
+            )
+
+        if self.kind == "thread":
+            # Carry context variables (e.g. streaming sinks) into the worker thread
+            ctx = contextvars.copy_context()
+            call = functools.partial(ctx.run, fn, *args, **kwargs)
+        else:
+            call = functools.partial(fn, *args, **kwargs)
+
+        job = _Job(session_key, call, loop.create_future())
+        self._queues.setdefault(session_key, deque()).append(job)
+        self._pending_by_session[session_key] = (
+            self._pending_by_session.get(session_key, 0) + 1
+        )
+        self._queued += 1
+        self._submitted += 1
+        self._dispatch(loop)
+
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            if job.started_at is None:
+                self._remove_queued(job)
+            self._cancelled += 1
+            raise
+
+    def _next_job(self) -> Optional[_Job]:
+        """Pop the next job, rotating across sessions."""
+        while self._queues:
+            session_key, session_queue = self._queues.popitem(last=False)
+            if not session_queue:
+                continue
+            job = session_queue.popleft()
+            if session_queue:
+                self._queues[session_key] = session_queue
+            return job
+        return None
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start queued jobs while worker slots are free."""
+        while self._running < self.max_workers:
+            job = self._next_job()
+            if job is None:
+                return
+            self._queued -= 1
+            if job.future.done():
+                self._release(job)
+                continue
+
+            job.started_at = time.monotonic()
+            wait_ms = (job.started_at - job.enqueued_at) * 1000
+            self._total_wait_ms += wait_ms
+            self._max_wait_ms = max(self._max_wait_ms, wait_ms)
+            self._wait_samples.append(wait_ms)
+
+            self._running += 1
+            run_future = loop.run_in_executor(self._get_pool(), job.call)
+            run_future.add_done_callback(functools.partial(self._on_done, job, loop))
+
+    def _on_done(
+        self, job: _Job, loop: asyncio.AbstractEventLoop, run_future: asyncio.Future
+    ) -> None:
+        """Settle a finished job and hand its slot to the next one."""
+        self._running -= 1
+        self._release(job)
+        self._total_run_ms += (time.monotonic() - (job.started_at or 0)) * 1000
+
+        if run_future.cancelled():
+            self._failed += 1
+            if not job.future.done():
+                job.future.cancel()
+        elif run_future.exception() is not None:
+            self._failed += 1
+            if not job.future.done():
+                job.future.set_exception(run_future.exception())
+        else:
+            self._completed += 1
+            if not job.future.done():
+                job.future.set_result(run_future.result())
+
+        self._dispatch(loop)
+
+    def _release(self, job: _Job) -> None:
+        """Drop a job from the per-session pending counts."""
+        remaining = self._pending_by_session.get(job.session_key, 1) - 1
+        if remaining > 0:
+            self._pending_by_session[job.session_key] = remaining
+        else:
+            self._pending_by_session.pop(job.session_key, None)
+
+    def _remove_queued(self, job: _Job) -> None:
+        """Remove a job that was cancelled before it started."""
+        session_queue = self._queues.get(job.session_key)
+        if session_queue and job in session_queue:
+            session_queue.remove(job)
+            if not session_queue:
+                del self._queues[job.session_key]
+            self._queued -= 1
+            self._release(job)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, throughput and wait-time metrics."""
+        started = self._completed + self._failed + self._running
+        samples = sorted(self._wait_samples)
+        p95_wait = samples[int(0.95 * (len(samples) - 1))] if samples else 0.0
+
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue_size": self.max_queue_size,
+            "queue_depth": self._queued,
+            "running": self._running,
+            "active_sessions": len(self._pending_by_session),
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "cancelled": self._cancelled,
+            "rejected_queue_full": self._rejected_queue_full,
+            "rejected_session_limit": self._rejected_session_limit,
+            "average_wait_ms": (
+                round(self._total_wait_ms / started, 2) if started else 0
+            ),
+            "p95_wait_ms": round(p95_wait, 2),
+            "max_wait_ms": round(self._max_wait_ms, 2),
+            "average_run_ms": (
+                round(self._total_run_ms / (self._completed + self._failed), 2)
+                if self._completed + self._failed
+                else 0
+            ),
+        }
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the worker pool, dropping work that has not started."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,229 @@
+"""
+Rule-based intent parser.
+Fills the intent dict for common component requests without an LLM round-trip.
+"""
+
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple
+
+import yaml
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config", "intents.yaml")
+
+# Words skipped when guessing the query subject of an unknown entity
+_SUBJECT_STOPWORDS = {
+    "a",
+    "an",
+    "the",
+    "my",
+    "our",
+    "all",
+    "latest",
+    "recent",
+    "current",
+    "daily",
+    "monthly",
+    "weekly",
+    "data",
+    "details",
+    "me",
+}
+
+# Confidence contributed by each signal
+_WEIGHTS = {
+    "component_type": 0.4,
+    "action": 0.2,
+    "entity": 0.25,
+    "guessed_entity": 0.05,
+    "data_source": 0.1,
+    "default_data_source": 0.05,
+    "interval": 0.05,
+}
+_AMBIGUITY_PENALTY = 0.3
+_QUESTION_PENALTY = 0.3
+_NEGATION_PENALTY = 0.5
+
+
+def _phrase_pattern(phrases: Iterable[str]) -> Pattern[str]:
+    """Compile phrases into one word-bounded alternation, longest first."""
+    ordered = sorted({p.lower() for p in phrases}, key=len, reverse=True)
+    alternation = "|".join(re.escape(p).replace(r"\ ", r"\s+") for p in ordered)
+    return re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE)
+
+
+class _PhraseTable:
+    """Maps phrases back to the canonical name they belong to."""
+
+    def __init__(self, table: Dict[str, List[str]]):
+        self._lookup = {
+            re.sub(r"\s+", " ", phrase.lower()): name
+            for name, phrases in table.items()
+            for phrase in phrases
+        }
+        self.pattern = _phrase_pattern(self._lookup) if self._lookup else None
+
+    def find_all(self, text: str) -> List[Tuple[str, int]]:
+        """Canonical names found in text, with their match offsets."""
+        if self.pattern is None:
+            return []
+        return [
+            (self._lookup[re.sub(r"\s+", " ", m.group(0).lower())], m.start())
+            for m in self.pattern.finditer(text)
+        ]
+
+
+class IntentParser:
+    """
+    Compiled keyword/grammar parser for dashboard component requests.
+
+    parse() always returns an intent dict with a "confidence" score in [0, 1].
+    Callers should only trust intents at or above min_confidence and hand
+    everything else to the crew.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.min_confidence = float(config.get("min_confidence", 0.75))
+        self.default_data_source = config.get("default_data_source")
+
+        self._actions = _phrase_pattern(config.get("action_verbs", []))
+        self._questions = _phrase_pattern(config.get("question_markers", []))
+        # Verb of a non-add action -> its markers; removals win over edits
+        self._modifiers = [
+            (verb, _phrase_pattern(config[key]))
+            for verb, key in (("remove", "delete_markers"), ("update", "edit_markers"))
+            if config.get(key)
+        ]
+        self._negations = (
+            _phrase_pattern(config["negation_markers"])
+            if config.get("negation_markers")
+            else None
+        )
+        self._component_types = _PhraseTable(config.get("component_types", {}))
+        self._data_sources = _PhraseTable(config.get("data_sources", {}))
+        self._entities = _PhraseTable(config.get("entities", {}))
+
+        self._unit_lookup = {
+            phrase.lower(): unit
+            for unit, phrases in config.get("interval_units", {}).items()
+            for phrase in phrases
+        }
+        units = "|".join(
+            re.escape(u) for u in sorted(self._unit_lookup, key=len, reverse=True)
+        )
+        self._interval = re.compile(
+            rf"\b(?:every|each|per)\s+(\d+)\s*({units})\b", re.IGNORECASE
+        )
+        self._interval_aliases = {
+            k.lower(): v for k, v in config.get("interval_aliases", {}).items()
+        }
+        self._interval_alias_pattern = (
+            _phrase_pattern(self._interval_aliases) if self._interval_aliases else None
+        )
+        self._subject = re.compile(
+            r"\b(?:of|for|showing|shows|show|about|on)\s+((?:[a-z_]+\s+){0,3}[a-z_]+)",
+            re.IGNORECASE,
+        )
+
+    @classmethod
+    def from_yaml(cls, path: str = DEFAULT_CONFIG_PATH) -> "IntentParser":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(yaml.safe_load(f) or {})
+
+    def parse(self, message: str) -> Dict[str, Any]:
+        """
+        Parse a message into the structured intent used by the crew.
+
+        Returns:
+            Dict with action, component_type, data_source, query, interval
+            and confidence
+        """
+        text = (message or "").strip()
+        intent: Dict[str, Any] = {
+            "action": "unknown",
+            "component_type": None,
+            "data_source": None,
+            "query": None,
+            "interval": None,
+            "confidence": 0.0,
+        }
+        if not text:
+            return intent
+
+        component_types = self._component_types.find_all(text)
+        if not component_types:
+            return intent
+
+        score = _WEIGHTS["component_type"]
+        distinct_types = {name for name, _ in component_types}
+        if len(distinct_types) > 1:
+            score -= _AMBIGUITY_PENALTY
+        component_type, type_offset = component_types[0]
+        intent["component_type"] = component_type
+        verb = next(
+            (verb for verb, pattern in self._modifiers if pattern.search(text)), "add"
+        )
+        intent["action"] = f"{verb}_{component_type}"
+
+        if self._actions.search(text):
+            score += _WEIGHTS["action"]
+        if self._questions.search(text) or text.endswith("?"):
+            score -= _QUESTION_PENALTY
+        if self._negations is not None and self._negations.search(text):
+            score -= _NEGATION_PENALTY
+
+        entities = self._entities.find_all(text)
+        if entities:
+            intent["query"] = entities[0][0]
+            score += _WEIGHTS["entity"]
+        else:
+            subject = self._guess_subject(text[type_offset:])
+            if subject:
+                intent["query"] = subject
+                score += _WEIGHTS["guessed_entity"]
+
+        data_sources = self._data_sources.find_all(text)
+        if data_sources:
+            intent["data_source"] = data_sources[0][0]
+            score += _WEIGHTS["data_source"]
+        elif self.default_data_source:
+            intent["data_source"] = self.default_data_source
+            score += _WEIGHTS["default_data_source"]
+
+        interval = self._parse_interval(text)
+        if interval:
+            intent["interval"] = interval
+            score += _WEIGHTS["interval"]
+
+        intent["confidence"] = round(max(0.0, min(1.0, score)), 2)
+        return intent
+
+    def is_confident(self, intent: Dict[str, Any]) -> bool:
+        """Whether the intent can stand in for the crew's: a confident new component."""
+        return (
+            str(intent.get("action", "")).startswith("add_")
+            and intent.get("confidence", 0.0) >= self.min_confidence
+        )
+
+    def _parse_interval(self, text: str) -> Optional[str]:
+        match = self._interval.search(text)
+        if match:
+            amount, unit = match.groups()
+            return f"{int(amount)} {self._unit_lookup[unit.lower()]}"
+        if self._interval_alias_pattern is not None:
+            alias = self._interval_alias_pattern.search(text)
+            if alias:
+                return self._interval_aliases[
+                    re.sub(r"\s+", " ", alias.group(0).lower())
+                ]
+        return None
+
+    def _guess_subject(self, text: str) -> Optional[str]:
+        """Take the first meaningful word after "of"/"for"/"showing"."""
+        match = self._subject.search(text)
+        if not match:
+            return None
+        for word in match.group(1).lower().split():
+            if word not in _SUBJECT_STOPWORDS:
+                return word
+        return None
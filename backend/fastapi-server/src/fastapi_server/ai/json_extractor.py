@@ -0,0 +1,282 @@
+"""
+JSON extraction from agent output.
+Single-pass, balanced-brace scanner that works on whole strings or streamed chunks.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Outside objects only braces and backticks matter
+_OUTSIDE = re.compile(r"[{`]")
+_NON_SPACE = re.compile(r"\S")
+# Inside an object, outside strings
+_INSIDE = re.compile(r'[{}"]')
+# Inside a string
+_IN_STRING = re.compile(r'["\\]')
+
+_DECODER = json.JSONDecoder()
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?\Z")
+
+# key: value / "key": "value" pairs, for output that has no JSON object at all
+_KEY_VALUE = re.compile(r'"?([A-Za-z_]\w*)"?\s*:\s*(?:"([^"\n]*)"|([^,\s}{]+))')
+
+
+class ExtractedObject:
+    """A top-level JSON object found in the text, with its character offsets."""
+
+    def __init__(self, value: Dict[str, Any], start: int, end: int, fenced: bool):
+        self.value = value
+        self.start = start
+        self.end = end
+        self.fenced = fenced  # inside a ``` code block
+
+    def __repr__(self) -> str:
+        return (
+            f"ExtractedObject(start={self.start}, end={self.end}, fenced={self.fenced})"
+        )
+
+
+class JSONObjectScanner:
+    """
+    Incremental scanner for top-level JSON objects.
+
+    Each character is examined once: the scanner jumps between braces, quotes,
+    backslashes and code fences, tracking nesting depth and string state.
+    Outside objects only a brace followed by a quote or closing brace opens a
+    candidate, so prose such as "{placeholder}" or a stray "{" is skipped.
+    Complete objects are decoded directly; objects cut off at the end of a
+    chunk are tracked brace by brace until they close. Text outside objects is
+    discarded as it is scanned, so memory stays bounded by the largest object.
+
+    Usage:
+        scanner = JSONObjectScanner()
+        for chunk in tokens:
+            for obj in scanner.feed(chunk):
+                ...
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._offset = 0  # absolute offset of _buffer[0]
+        self._pos = 0  # next position to scan in _buffer
+        self._depth = 0
+        self._in_string = False
+        self._object_start: Optional[int] = None
+        self._fenced = False
+
+    def feed(self, chunk: str) -> List[ExtractedObject]:
+        """Scan the next chunk and return the objects it completed."""
+        if not chunk:
+            return []
+
+        self._buffer += chunk
+        buffer = self._buffer
+        size = len(buffer)
+        pos = self._pos
+        found: List[ExtractedObject] = []
+
+        while pos < size:
+            if self._in_string:
+                match = _IN_STRING.search(buffer, pos)
+                if match is None:
+                    pos = size
+                    break
+                if match.group() == "\\":
+                    # Skip the escaped character, which may be in the next chunk
+                    pos = match.end() + 1
+                    continue
+                self._in_string = False
+                pos = match.end()
+            elif self._depth > 0:
+                match = _INSIDE.search(buffer, pos)
+                if match is None:
+                    pos = size
+                    break
+                char = match.group()
+                pos = match.end()
+                if char == '"':
+                    self._in_string = True
+                elif char == "{":
+                    self._depth += 1
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        obj = self._close_object(self._offset + pos)
+                        if obj is not None:
+                            found.append(obj)
+            else:
+                match = _OUTSIDE.search(buffer, pos)
+                if match is None:
+                    pos = size
+                    break
+                start = match.start()
+                if match.group() == "`":
+                    if buffer.startswith("```", start):
+                        self._fenced = not self._fenced
+                        pos = start + 3
+                    elif size - start < 3 and buffer.endswith("`" * (size - start)):
+                        # Possibly a fence split across chunks
+                        pos = start
+                        break
+                    else:
+                        pos = start + 1
+                    continue
+
+                # Only a brace followed by a quote or closing brace opens an object
+                next_char = _NON_SPACE.search(buffer, start + 1)
+                if next_char is None:
+                    # Undecided until more text arrives
+                    pos = start
+                    break
+                if next_char.group() not in '"}':
+                    pos = start + 1
+                    continue
+
+                # Fast path: a complete object decodes in one C-level pass
+                try:
+                    value, end = _DECODER.raw_decode(buffer, start)
+                except ValueError:
+                    value = None
+                if isinstance(value, dict):
+                    found.append(
+                        ExtractedObject(
+                            value,
+                            self._offset + start,
+                            self._offset + end,
+                            self._fenced,
+                        )
+                    )
+                    pos = end
+                    continue
+                # Incomplete (more chunks to come) or invalid: track braces
+                self._object_start = self._offset + start
+                self._depth = 1
+                pos = start + 1
+
+        # Keep only the text still needed: an open object or an undecided tail
+        keep_from = (
+            self._object_start - self._offset if self._depth > 0 else min(pos, size)
+        )
+        self._buffer = buffer[keep_from:]
+        self._offset += keep_from
+        self._pos = pos - keep_from
+        return found
+
+    def _close_object(self, end: int) -> Optional[ExtractedObject]:
+        start = self._object_start
+        text = self._buffer[start - self._offset : end - self._offset]
+        self._object_start = None
+        try:
+            value = json.loads(text)
+        except ValueError:
+            return None
+        if not isinstance(value, dict):
+            return None
+        return ExtractedObject(value, start, end, self._fenced)
+
+
+def extract_json_objects(text: str) -> List[ExtractedObject]:
+    """Every top-level JSON object in text, in order of appearance."""
+    return JSONObjectScanner().feed(text or "")
+
+
+def extract_key_value_pairs(text: str) -> Dict[str, Any]:
+    """Best-effort key/value pairs from text that contains no JSON object."""
+    pairs: Dict[str, Any] = {}
+    for match in _KEY_VALUE.finditer(text or ""):
+        key = match.group(1).strip()
+        if match.group(2) is not None:
+            pairs[key] = match.group(2)
+            continue
+        value: Any = match.group(3)
+        lowered = value.lower()
+        if lowered in ("true", "false"):
+            value = lowered == "true"
+        elif _NUMBER.match(value):
+            value = float(value) if "." in value else int(value)
+        pairs[key] = value
+    return pairs
+
+
+class Field:
+    """Expected type (and optionally allowed values) of one object key."""
+
+    def __init__(
+        self,
+        types: Tuple[type, ...],
+        required: bool = False,
+        choices: Optional[Iterable[Any]] = None,
+    ):
+        self.types = types
+        self.required = required
+        self.choices = set(choices) if choices is not None else None
+
+
+DATA_SOURCES = ("mysql", "mongodb", "csv")
+
+# Structured intent, as produced by the intent parser or intent analysis task
+INTENT_SCHEMA: Dict[str, Field] = {
+    "component_type": Field((str,), required=True),
+    "action": Field((str,)),
+    "data_source": Field((str, type(None)), choices=DATA_SOURCES + (None,)),
+    "query": Field((str, type(None))),
+    "interval": Field((str, type(None))),
+    "confidence": Field((int, float)),
+}
+
+# Component specification, matching the Component model
+COMPONENT_SCHEMA: Dict[str, Field] = {
+    "name": Field((str,), required=True),
+    "component_type": Field((str,), required=True),
+    "query": Field((str,), required=True),
+    "data_source": Field((str,), required=True, choices=DATA_SOURCES),
+    "fields": Field((dict, list, type(None))),
+    "interval": Field((str, type(None))),
+    "description": Field((str, type(None))),
+}
+
+
+def validate_object(obj: Any, schema: Dict[str, Field]) -> List[str]:
+    """
+    Check an extracted object against a schema.
+
+    Returns:
+        List of problems; empty when the object matches. Keys not in the
+        schema are allowed.
+    """
+    if not isinstance(obj, dict):
+        return ["expected a JSON object"]
+
+    errors = []
+    for key, field in schema.items():
+        if key not in obj:
+            if field.required:
+                errors.append(f"missing required key '{key}'")
+            continue
+        value = obj[key]
+        # bool is an int subclass, but never a valid number here
+        if not isinstance(value, field.types) or (
+            isinstance(value, bool) and bool not in field.types
+        ):
+            expected = " or ".join(t.__name__ for t in field.types)
+            errors.append(f"'{key}' should be {expected}, got {type(value).__name__}")
+        elif field.choices is not None and value not in field.choices:
+            errors.append(f"'{key}' has unsupported value {value!r}")
+    return errors
+
+
+def extract_first_valid(
+    text: str, schema: Dict[str, Field]
+) -> Optional[Dict[str, Any]]:
+    """
+    The first object in text that matches the schema.
+
+    Fenced (```json) objects are preferred over objects embedded in prose.
+    """
+    objects = extract_json_objects(text)
+    for obj in sorted(objects, key=lambda o: not o.fenced):
+        if not validate_object(obj.value, schema):
+            return obj.value
+    return None
@@ -0,0 +1,492 @@
+"""
+LLM provider pool.
+Rate limits, circuit breaking and tail-latency hedging across LLM providers.
+"""
+
+import collections
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .deadline import Deadline
+
+# Called as call(messages, stop, on_token) -> response text. on_token is None
+# unless the caller wants the response streamed; it returns False once the
+# attempt has lost a hedge race and should stop. Calls that know the real
+# token usage return it as a ProviderText.
+ProviderCall = Callable[
+    [Any, Optional[List[str]], Optional[Callable[[str], bool]]], str
+]
+
+
+class ProviderText(str):
+    """Response text with the token usage the provider reported for it."""
+
+    def __new__(cls, text: str, prompt_tokens: int, completion_tokens: int):
+        response = super().__new__(cls, text)
+        response.usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        }
+        return response
+
+
+# How often a request with a deadline checks for cancellation while waiting
+_DEADLINE_POLL_SECONDS = 0.25
+
+
+class LLMUnavailableError(Exception):
+    """Raised when no provider can serve a request."""
+
+    status_code = 503
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for a token."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait_for = (1 - self._tokens) / self.rate
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(wait_for, remaining))
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return round(self._tokens, 2)
+
+
+class CircuitBreaker:
+    """
+    Stops sending traffic to a failing provider.
+
+    Opens after `failure_threshold` consecutive failures. After
+    `reset_timeout` seconds one trial request is let through (half-open); its
+    outcome closes the circuit again or restarts the timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (reserves the half-open trial)."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of response latencies for percentile estimates."""
+
+    def __init__(self, sample_size: int = 200):
+        self._samples: Deque[float] = collections.deque(maxlen=sample_size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class Provider:
+    """One LLM endpoint (provider/model) with its limits and health state."""
+
+    def __init__(
+        self,
+        name: str,
+        call: ProviderCall,
+        bucket: Optional[TokenBucket] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        sample_size: int = 200,
+    ):
+        self.name = name
+        self.call = call
+        self.bucket = bucket
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker(sample_size)
+        self.requests = 0
+        self.failures = 0
+        self.hedges = 0  # requests sent to this provider as a hedge
+        self.hedge_wins = 0
+        # Concurrent generations share the provider, so counts change under a lock
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        return self.bucket is None or self.bucket.try_acquire()
+
+    def acquire(self, timeout: float) -> bool:
+        return self.bucket is None or self.bucket.acquire(timeout)
+
+    def record_request(self, hedge: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            if hedge:
+                self.hedges += 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+    def record_hedge_win(self) -> None:
+        with self._lock:
+            self.hedge_wins += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        p50 = self.latency.percentile(50)
+        p95 = self.latency.percentile(95)
+        with self._lock:
+            counts = {
+                "requests": self.requests,
+                "failures": self.failures,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
+        return {
+            "circuit": self.breaker.state,
+            **counts,
+            "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+            "rate_limit_tokens": self.bucket.available if self.bucket else None,
+        }
+
+
+def _record_latency(attempt: "_Attempt", future: Future) -> None:
+    """Time an answered attempt, whether or not it won."""
+    if attempt.abandoned:
+        return  # cut short by the stream's owner, not a full response
+    if not future.cancelled() and future.exception() is None:
+        attempt.provider.latency.record(time.monotonic() - attempt.started_at)
+
+
+class _Attempt:
+    def __init__(self, provider: Provider, hedge: bool):
+        self.provider = provider
+        self.hedge = hedge
+        self.started_at = time.monotonic()
+        self.emitted = False  # streamed at least one token to the caller
+        self.abandoned = False  # stopped early after losing the stream
+
+
+class GenerationResult:
+    """Winning response of a pooled request and how it was obtained."""
+
+    def __init__(self, text: str, provider: str, attempts: int, failures: int):
+        self.text = str(text)
+        # Token counts reported by the provider, None when it reported none
+        self.usage: Optional[Dict[str, int]] = getattr(text, "usage", None)
+        self.provider = provider  # provider/model string that answered
+        self.attempts = attempts  # requests sent, including hedges and failovers
+        self.failures = failures  # attempts that raised before the winner answered
+
+
+class LLMPool:
+    """
+    Sends each request to the first healthy provider, hedging slow ones.
+
+    Providers are tried in order. When the primary has not answered by its
+    recent p95 latency (`hedge_percentile`), the same request is also sent to
+    the next healthy provider with rate-limit headroom, and whichever answers
+    first wins. Failed requests fail over to the next provider. When
+    streaming, the first attempt to produce a token owns the stream and the
+    other attempt is abandoned.
+
+    Provider clients are blocking, so the losing attempt of a hedge keeps its
+    worker thread until the provider responds; its result is discarded.
+    """
+
+    def __init__(
+        self,
+        providers: List[Provider],
+        executor: ThreadPoolExecutor,
+        hedging: bool = True,
+        hedge_percentile: float = 95.0,
+        hedge_min_delay: float = 0.5,
+        hedge_default_delay: float = 5.0,
+        hedge_min_samples: int = 20,
+        acquire_timeout: float = 10.0,
+    ):
+        if not providers:
+            raise ValueError("LLMPool needs at least one provider")
+        self.providers = providers
+        self._executor = executor
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.acquire_timeout = acquire_timeout
+
+    def hedge_delay(self, provider: Provider) -> float:
+        """How long to wait on a provider before hedging."""
+        if len(provider.latency) < self.hedge_min_samples:
+            return self.hedge_default_delay
+        return max(
+            self.hedge_min_delay, provider.latency.percentile(self.hedge_percentile)
+        )
+
+    def generate(
+        self,
+        messages: Any,
+        stop: Optional[List[str]] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> str:
+        """Run one completion through the pool and return the response text."""
+        return self.generate_with_info(messages, stop, on_token, deadline).text
+
+    def generate_with_info(
+        self,
+        messages: Any,
+        stop: Optional[List[str]] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> GenerationResult:
+        """
+        Run one completion through the pool.
+
+        Args:
+            messages: Prompt messages, passed through to the provider call
+            stop: Optional stop sequences
+            on_token: Optional callback for streamed response tokens
+            deadline: Optional request deadline; waiting stops when it passes
+                or the run is cancelled, abandoning the attempts in flight
+
+        Returns:
+            The winning attempt's response, provider and attempt counts
+
+        Raises:
+            LLMUnavailableError: If every provider is open, rate limited or failed
+            DeadlineExceededError, RunCancelledError: If the deadline stops the request
+        """
+        remaining = list(self.providers)
+        running: Dict[Future, _Attempt] = {}
+        stream_owner: List[_Attempt] = []
+        owner_lock = threading.Lock()
+        last_error: Optional[BaseException] = None
+        attempts = 0
+        failures = 0
+
+        def start(attempt: _Attempt) -> None:
+            nonlocal attempts
+
+            def claim(token: str) -> bool:
+                with owner_lock:
+                    if not stream_owner:
+                        stream_owner.append(attempt)
+                    if stream_owner[0] is not attempt:
+                        attempt.abandoned = True
+                        return False
+                attempt.emitted = True
+                on_token(token)
+                return True
+
+            attempts += 1
+            attempt.provider.record_request(attempt.hedge)
+            ctx = contextvars.copy_context()
+            future = self._executor.submit(
+                ctx.run,
+                attempt.provider.call,
+                messages,
+                stop,
+                claim if on_token is not None else None,
+            )
+            # Hedge losers are timed too, when they finish after the winner
+            # returned; winners alone would only show a provider's fast calls
+            # and keep pulling its hedge delay down
+            future.add_done_callback(functools.partial(_record_latency, attempt))
+            running[future] = attempt
+
+        def next_provider(block: bool) -> Optional[Provider]:
+            """Pop the next provider whose circuit and rate limit allow a request."""
+            while remaining:
+                provider = remaining.pop(0)
+                if not provider.breaker.allow():
+                    continue
+                acquire_timeout = self.acquire_timeout
+                if deadline is not None and deadline.remaining() is not None:
+                    acquire_timeout = min(acquire_timeout, deadline.remaining())
+                if provider.try_acquire() or (
+                    block and provider.acquire(acquire_timeout)
+                ):
+                    return provider
+                # Out of rate-limit tokens; release a reserved half-open trial
+                if provider.breaker.state == CircuitBreaker.HALF_OPEN:
+                    provider.breaker.record_failure()
+            return None
+
+        if deadline is not None:
+            deadline.check()
+        primary = next_provider(block=True)
+        if primary is None:
+            raise LLMUnavailableError("No LLM provider is available")
+        start(_Attempt(primary, hedge=False))
+        hedged = not self.hedging
+
+        while running:
+            hedge_at = None
+            if not hedged and not stream_owner:
+                first = next(iter(running.values()))
+                hedge_at = first.started_at + self.hedge_delay(first.provider)
+            timeout = (
+                None if hedge_at is None else max(0.0, hedge_at - time.monotonic())
+            )
+            if deadline is not None:
+                deadline.check()
+                # Wake up periodically to notice cancellation
+                poll = min(
+                    _DEADLINE_POLL_SECONDS,
+                    deadline.remaining() or _DEADLINE_POLL_SECONDS,
+                )
+                timeout = poll if timeout is None else min(timeout, poll)
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                if deadline is not None:
+                    deadline.check()
+                if hedge_at is None or time.monotonic() < hedge_at:
+                    continue
+                # Primary is slower than its p95: hedge to the next provider
+                hedged = True
+                alternate = next_provider(block=False)
+                if alternate is not None:
+                    start(_Attempt(alternate, hedge=True))
+                continue
+
+            for future in done:
+                attempt = running.pop(future)
+                provider = attempt.provider
+                error = future.exception()
+                if error is None:
+                    provider.breaker.record_success()
+                    if stream_owner and stream_owner[0] is not attempt:
+                        continue  # abandoned after losing the stream
+                    if attempt.hedge:
+                        provider.record_hedge_win()
+                    return GenerationResult(
+                        future.result(), provider.name, attempts, failures
+                    )
+
+                failures += 1
+                provider.record_failure()
+                if getattr(error, "provider_fault", True):
+                    provider.breaker.record_failure()
+                else:
+                    # e.g. a replay miss: the provider itself is healthy
+                    provider.breaker.record_success()
+                last_error = error
+                print(f"⚠️ LLM provider {provider.name} failed: {error}")
+                if attempt.emitted:
+                    # Tokens already reached the caller; a retry would repeat them
+                    raise error
+
+            if not running:
+                # Everything in flight failed: fail over to the next provider
+                fallback = next_provider(block=True)
+                if fallback is not None:
+                    start(_Attempt(fallback, hedge=False))
+
+        raise LLMUnavailableError(
+            f"All LLM providers failed; last error: {last_error}"
+        ) from last_error
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {provider.name: provider.get_stats() for provider in self.providers}
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[float, Optional[float]]]:
+    """
+    Parse "provider:rate[:burst],..." into per-provider token bucket settings.
+
+    Example: "openai:10:20,anthropic:5" allows OpenAI 10 requests/s with
+    bursts of 20, and Anthropic 5 requests/s.
+    """
+    limits: Dict[str, Tuple[float, Optional[float]]] = {}
+    for entry in (spec or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        parts = entry.split(":")
+        if len(parts) not in (2, 3):
+            raise ValueError(f"Invalid rate limit entry: '{entry}'")
+        burst = float(parts[2]) if len(parts) == 3 else None
+        limits[parts[0].strip().lower()] = (float(parts[1]), burst)
+    return limits
@@ -0,0 +1,300 @@
+"""
+LLM provider clients.
+Maps agents.yaml `llm:` strings to pooled, rate-limited chat models.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from .conversation import count_tokens
+from .llm_pool import (
+    CircuitBreaker,
+    LLMPool,
+    Provider,
+    ProviderCall,
+    ProviderText,
+    TokenBucket,
+)
+from .llm_recorder import LLMRecorder
+from .mock_llm import MockLLM
+from .run_context import current_run
+
+
+class LLMConfigError(Exception):
+    """Raised for llm strings that name an unknown or uninstalled provider."""
+
+
+# pyproject extras that install the LangChain package of each provider
+PROVIDER_EXTRAS = {
+    "anthropic": "anthropic",
+    "google": "google",
+    "gemini": "google",
+    "mistral": "mistral",
+    "ollama": "ollama",
+}
+
+
+def _import_chat_model(provider: str) -> Callable[..., BaseChatModel]:
+    """LangChain chat model class for a provider, imported on first use."""
+    try:
+        if provider == "openai":
+            from langchain_openai import ChatOpenAI
+
+            return ChatOpenAI
+        if provider == "anthropic":
+            from langchain_anthropic import ChatAnthropic
+
+            return ChatAnthropic
+        if provider in ("google", "gemini"):
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+            return ChatGoogleGenerativeAI
+        if provider == "mistral":
+            from langchain_mistralai import ChatMistralAI
+
+            return ChatMistralAI
+        if provider == "ollama":
+            from langchain_community.chat_models import ChatOllama
+
+            return ChatOllama
+    except ImportError as e:
+        extra = PROVIDER_EXTRAS.get(provider)
+        hint = f"poetry install --extras {extra}" if extra else "poetry install"
+        raise LLMConfigError(
+            f"LLM provider '{provider}' needs the {e.name} package; "
+            f"install it with `{hint}`"
+        ) from e
+    raise LLMConfigError(f"Unknown LLM provider '{provider}'")
+
+
+def split_llm_config(llm_config: str) -> Tuple[str, str]:
+    """Split "provider/model"; bare model names are OpenAI models."""
+    provider, sep, model = llm_config.partition("/")
+    if not sep:
+        if llm_config.lower() == "mock":
+            return "mock", "default"
+        return "openai", llm_config
+    return provider.lower(), model
+
+
+def create_chat_model(llm_config: str, ollama_base_url: Optional[str] = None):
+    """Create a LangChain chat model for a "provider/model" string."""
+    provider, model = split_llm_config(llm_config)
+    chat_model = _import_chat_model(provider)
+    if provider == "ollama" and ollama_base_url:
+        return chat_model(model=model, base_url=ollama_base_url)
+    return chat_model(model=model)
+
+
+def _with_usage(text: str, message: Any) -> str:
+    """Response text, carrying the token usage reported with the message if any."""
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return ProviderText(
+            text, usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        )
+    # Older integrations only report it in the provider's own format
+    # (the llm_output of a generate() call)
+    metadata = getattr(message, "response_metadata", None) or {}
+    usage = metadata.get("token_usage") or metadata.get("usage")
+    if usage:
+        return ProviderText(
+            text,
+            usage.get("prompt_tokens", usage.get("input_tokens", 0)),
+            usage.get("completion_tokens", usage.get("output_tokens", 0)),
+        )
+    return text
+
+
+def provider_call(client: BaseChatModel) -> ProviderCall:
+    """Adapt a chat model to the call signature used by LLMPool."""
+
+    def call(messages: Any, stop: Optional[List[str]], on_token) -> str:
+        if on_token is None:
+            message = client.invoke(messages, stop=stop)
+            return _with_usage(str(message.content), message)
+
+        parts = []
+        message = None  # chunks added up, which sums their usage
+        for chunk in client.stream(messages, stop=stop):
+            message = chunk if message is None else message + chunk
+            text = str(chunk.content)
+            if not text:
+                continue
+            if not on_token(text):
+                break  # another provider owns the stream
+            parts.append(text)
+        return _with_usage("".join(parts), message)
+
+    return call
+
+
+class LLMProviders:
+    """
+    Process-wide provider state.
+
+    Each distinct llm string gets one client and circuit breaker, shared by
+    every agent that uses it. Rate limits apply per provider (e.g. all OpenAI
+    models share one token bucket). All hedged and failed-over attempts run
+    on one shared worker pool.
+    """
+
+    def __init__(
+        self,
+        fallbacks: Optional[List[str]] = None,
+        rate_limits: Optional[Dict[str, Tuple[float, Optional[float]]]] = None,
+        circuit_failure_threshold: int = 5,
+        circuit_reset_seconds: float = 30.0,
+        max_workers: int = 16,
+        ollama_base_url: Optional[str] = None,
+        pool_options: Optional[Dict[str, Any]] = None,
+        mock_options: Optional[Dict[str, Any]] = None,
+        recorder: Optional[LLMRecorder] = None,
+    ):
+        self.fallbacks = list(fallbacks or [])
+        self.rate_limits = rate_limits or {}
+        self.circuit_failure_threshold = circuit_failure_threshold
+        self.circuit_reset_seconds = circuit_reset_seconds
+        self.ollama_base_url = ollama_base_url
+        self.pool_options = pool_options or {}
+        self.mock_options = mock_options or {}
+        self._mock: Optional[MockLLM] = None
+        self.recorder = recorder
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="llm"
+        )
+        self._lock = threading.Lock()
+        self._providers: Dict[str, Provider] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def provider(self, llm_config: str) -> Provider:
+        """Shared Provider (client, breaker, rate limit) for an llm string."""
+        with self._lock:
+            provider = self._providers.get(llm_config)
+            if provider is not None:
+                return provider
+
+            name, _ = split_llm_config(llm_config)
+            if name == "mock":
+                call = self._mock_llm().call
+            elif self.recorder is not None:
+                # The client is only created if a request has to reach the provider
+                call = self.recorder.wrap(
+                    llm_config,
+                    lambda: provider_call(
+                        create_chat_model(llm_config, self.ollama_base_url)
+                    ),
+                )
+            else:
+                call = provider_call(
+                    create_chat_model(llm_config, self.ollama_base_url)
+                )
+            if name in self.rate_limits and name not in self._buckets:
+                rate, burst = self.rate_limits[name]
+                self._buckets[name] = TokenBucket(rate, burst)
+
+            provider = Provider(
+                llm_config,
+                call,
+                bucket=self._buckets.get(name),
+                breaker=CircuitBreaker(
+                    self.circuit_failure_threshold, self.circuit_reset_seconds
+                ),
+            )
+            self._providers[llm_config] = provider
+            return provider
+
+    def _mock_llm(self) -> MockLLM:
+        """The offline mock, shared by every "mock" llm string."""
+        if self._mock is None:
+            options = dict(self.mock_options)
+            self._mock = MockLLM.from_yaml(options.pop("script", None), **options)
+        return self._mock
+
+    def pool_for(self, llm_config: str) -> LLMPool:
+        """Pool with the configured model first and the fallbacks after it."""
+        providers = [self.provider(llm_config)]
+        for fallback in self.fallbacks:
+            if fallback == llm_config:
+                continue
+            try:
+                providers.append(self.provider(fallback))
+            except LLMConfigError as e:
+                print(f"⚠️ Skipping LLM fallback '{fallback}': {e}")
+        return LLMPool(providers, self._executor, **self.pool_options)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = dict(self._providers)
+        stats = {name: provider.get_stats() for name, provider in providers.items()}
+        if self._mock is not None:
+            stats["mock"] = self._mock.get_stats()
+        return stats
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PooledChatModel(BaseChatModel):
+    """
+    LangChain chat model backed by an LLMPool.
+
+    Agents use it like any other chat model; each call is routed through the
+    pool's rate limits, circuit breakers and hedging. Streamed tokens are
+    reported through the usual callbacks.
+    """
+
+    pool: Any
+    streaming: bool = False
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "pooled"
+
+    def _generate(
+        self,
+        messages: List[Any],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        on_token = None
+        if self.streaming and run_manager is not None:
+            on_token = run_manager.on_llm_new_token
+        run = current_run.get()
+        started = time.monotonic()
+        generation = self.pool.generate_with_info(
+            messages,
+            stop=stop,
+            on_token=on_token,
+            deadline=run.deadline if run is not None else None,
+        )
+        text = generation.text
+        if run is not None:
+            # Counts are estimated locally only when the provider reported none
+            usage = generation.usage
+            if usage is None:
+                usage = {
+                    "prompt_tokens": sum(
+                        count_tokens(str(getattr(m, "content", m))) for m in messages
+                    ),
+                    "completion_tokens": count_tokens(text),
+                }
+            run.record_llm_call(
+                time.monotonic() - started,
+                model=generation.provider,
+                prompt_tokens=usage["prompt_tokens"],
+                completion_tokens=usage["completion_tokens"],
+                retries=generation.attempts - 1,
+            )
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
@@ -0,0 +1,244 @@
+"""
+Record/replay layer for LLM calls.
+Saves request/response pairs keyed by a prompt hash so runs can be repeated offline.
+"""
+
+import collections
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .llm_pool import ProviderCall
+
+MODES = ("off", "record", "replay", "auto")
+
+_REPLAY_TOKEN = re.compile(r"\S+\s*|\s+")
+
+
+class LLMReplayMissError(Exception):
+    """Raised in replay mode for a request that has no recording."""
+
+    status_code = 503
+    # Not the provider's fault: keeps circuit breakers closed
+    provider_fault = False
+
+
+def _message_dict(message: Any) -> Dict[str, str]:
+    if isinstance(message, str):
+        return {"role": "text", "content": message}
+    return {
+        "role": str(getattr(message, "type", "text")),
+        "content": str(getattr(message, "content", message)),
+    }
+
+
+def request_key(model: str, messages: Any, stop: Optional[List[str]] = None) -> str:
+    """Content hash of a request: model, role-tagged messages and stop sequences."""
+    if isinstance(messages, str):
+        messages = [messages]
+    payload = json.dumps(
+        {
+            "model": model,
+            "messages": [_message_dict(m) for m in messages],
+            "stop": list(stop or []),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _compress(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def _decompress(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8")
+
+
+class RecordingStore:
+    """SQLite store of compressed request/response pairs, indexed by request key."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_recordings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                request BLOB NOT NULL,
+                response BLOB NOT NULL,
+                recorded_at REAL NOT NULL,
+                replays INTEGER NOT NULL DEFAULT 0
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_llm_recordings_model "
+            "ON llm_recordings (model)"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_recordings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE llm_recordings SET replays = replays + 1 WHERE key = ?",
+                (key,),
+            )
+        return _decompress(row[0])
+
+    def put(self, key: str, model: str, request: str, response: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_recordings "
+                "(key, model, request, response, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model, _compress(request), _compress(response), time.time()),
+            )
+
+    def count(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM llm_recordings"
+            ).fetchone()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class LLMRecorder:
+    """
+    Wraps provider calls to record or replay their responses.
+
+    Modes:
+        record  call the provider and save every response (overwriting)
+        replay  serve saved responses only; a miss raises LLMReplayMissError
+        auto    serve saved responses, call and record the provider on a miss
+
+    Provider clients are created through a factory on the first call that
+    actually needs them, so replay runs need no API keys or network.
+    """
+
+    def __init__(
+        self, store: RecordingStore, mode: str = "replay", max_misses: int = 50
+    ):
+        if mode not in MODES or mode == "off":
+            raise ValueError(f"Invalid LLM record mode: '{mode}'")
+        self.store = store
+        self.mode = mode
+        self.hits = 0
+        self.recorded = 0
+        self.misses = 0
+        self._recent_misses: Deque[Dict[str, Any]] = collections.deque(
+            maxlen=max_misses
+        )
+        self._lock = threading.Lock()
+
+    def wrap(
+        self, model: str, call_factory: Callable[[], ProviderCall]
+    ) -> ProviderCall:
+        """Provider call for `model` that goes through the recordings."""
+        real_call: List[ProviderCall] = []
+        factory_lock = threading.Lock()
+
+        def provider() -> ProviderCall:
+            with factory_lock:
+                if not real_call:
+                    real_call.append(call_factory())
+            return real_call[0]
+
+        def call(messages: Any, stop: Optional[List[str]], on_token) -> str:
+            key = request_key(model, messages, stop)
+            if self.mode != "record":
+                text = self.store.get(key)
+                if text is not None:
+                    with self._lock:
+                        self.hits += 1
+                    return _replay(text, on_token)
+                self._record_miss(key, model, messages)
+                if self.mode == "replay":
+                    raise LLMReplayMissError(
+                        f"No recorded response for {model} request {key[:12]}"
+                    )
+
+            complete = [True]
+
+            def tracked(token: str) -> bool:
+                if on_token(token):
+                    return True
+                complete[0] = False
+                return False
+
+            text = provider()(messages, stop, tracked if on_token else None)
+            if not complete[0]:
+                # Lost a hedge race mid-stream: the text is truncated
+                return text
+            request = json.dumps(
+                [_message_dict(m) for m in _as_list(messages)], ensure_ascii=False
+            )
+            self.store.put(key, model, request, text)
+            with self._lock:
+                self.recorded += 1
+            return text
+
+        return call
+
+    def _record_miss(self, key: str, model: str, messages: Any) -> None:
+        prompt = "\n".join(_message_dict(m)["content"] for m in _as_list(messages))
+        with self._lock:
+            self.misses += 1
+            self._recent_misses.append(
+                {"key": key, "model": model, "prompt_preview": prompt[:200]}
+            )
+        if self.mode == "replay":
+            print(f"⚠️ LLM replay miss for {model}: {key[:12]} ({prompt[:80]!r})")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "mode": self.mode,
+                "path": self.store.path,
+                "recordings": self.store.count(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "recorded": self.recorded,
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+                "recent_misses": list(self._recent_misses),
+            }
+
+
+def _as_list(messages: Any) -> List[Any]:
+    return [messages] if isinstance(messages, str) else list(messages)
+
+
+def _replay(text: str, on_token: Optional[Callable[[str], bool]]) -> str:
+    """Return a recorded response, streaming it word by word if asked."""
+    if on_token is None:
+        return text
+    sent = []
+    for token in _REPLAY_TOKEN.findall(text):
+        if not on_token(token):
+            break
+        sent.append(token)
+    return "".join(sent)
+
+
+def create_llm_recorder(mode: str, path: str) -> Optional[LLMRecorder]:
+    """Recorder for LLM_RECORD_MODE, or None when recording is off."""
+    if mode == "off":
+        return None
+    return LLMRecorder(RecordingStore(path), mode=mode)
@@ -0,0 +1,503 @@
+"""
+Pooled client for the MCP data server.
+Keeps keep-alive connections open across calls and caches tool results.
+"""
+
+import asyncio
+import collections
+import functools
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .deadline import Deadline
+
+PROTOCOL_VERSION = "2025-03-26"
+SESSION_HEADER = "Mcp-Session-Id"
+
+# Table, collection and file names that can go into a preview query as is
+_SAFE_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class MCPError(Exception):
+    """Raised when the MCP server can't be reached or a tool call fails."""
+
+    status_code = 502
+
+
+class MCPTimeoutError(MCPError):
+    """Raised when a tool call runs past its timeout."""
+
+    status_code = 504
+
+
+def parse_tool_timeouts(spec: str) -> Dict[str, float]:
+    """
+    Parse "tool:seconds,..." into per-tool timeouts.
+
+    Example: "mysql_query:20,csv_list_files:2"
+    """
+    timeouts: Dict[str, float] = {}
+    for entry in (spec or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        parts = entry.split(":")
+        if len(parts) != 2:
+            raise ValueError(f"Invalid tool timeout entry: '{entry}'")
+        timeouts[parts[0].strip()] = float(parts[1])
+    return timeouts
+
+
+def data_preview_calls(
+    intent: Dict[str, Any], rows: int
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Tool calls that preview the data behind a parsed intent: the layout and a
+    few sample rows of the table, collection or CSV file it names, or the
+    list of what the source has when it names nothing usable.
+    """
+    source = intent.get("data_source")
+    subject = str(intent.get("query") or "").strip().lower().replace(" ", "_")
+    if not _SAFE_NAME.match(subject):
+        subject = ""
+
+    if source == "mongodb":
+        if not subject:
+            return [("mongo_get_collections", {})]
+        return [
+            ("mongo_get_schema", {"collection": subject}),
+            ("mongo_query", {"collection": subject, "query": "{}", "limit": rows}),
+        ]
+    if source == "csv":
+        if not subject:
+            return [("csv_list_files", {})]
+        filename = f"{subject}.csv"
+        return [
+            ("csv_get_info", {"filename": filename}),
+            ("csv_read", {"filename": filename, "limit": rows}),
+        ]
+    if source in (None, "mysql"):
+        if not subject:
+            return [("mysql_get_tables", {})]
+        return [
+            ("mysql_get_schema", {"table_name": subject}),
+            ("mysql_query", {"query": f"SELECT * FROM `{subject}` LIMIT {int(rows)}"}),
+        ]
+    return []
+
+
+class ToolResultCache:
+    """LRU cache of tool results keyed by tool name and arguments, with a TTL."""
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int = 1000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "collections.OrderedDict[str, Tuple[float, Any]]" = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(name: str, arguments: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"tool": name, "arguments": arguments}, sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, name: str, arguments: Dict[str, Any]) -> Optional[Any]:
+        key = self.key(name, arguments)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, name: str, arguments: Dict[str, Any], result: Any) -> None:
+        key = self.key(name, arguments)
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+            }
+
+
+class MCPClient:
+    """
+    Client for an MCP server's streamable HTTP endpoint.
+
+    One instance is shared by the chat agent and every crew worker thread:
+    the HTTP connection pool and the MCP session are set up once and reused,
+    successful tool results are cached, identical calls in flight share one
+    request, and each tool can have its own timeout
+    (further capped by the request deadline). Calls are blocking; the async
+    and batch variants run them on a small thread pool so they overlap.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        path: str = "/mcp",
+        timeout: float = 10.0,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        cache: Optional[ToolResultCache] = None,
+        max_connections: int = 10,
+        transport: Optional[httpx.BaseTransport] = None,
+    ):
+        self.endpoint = base_url.rstrip("/") + path
+        self.timeout = timeout
+        self.tool_timeouts = tool_timeouts or {}
+        self.cache = cache
+        self._http = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            transport=transport,
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_connections, thread_name_prefix="mcp"
+        )
+        self._ids = itertools.count(1)
+        self._session_lock = threading.Lock()
+        self._initialized = False
+        self._session_id: Optional[str] = None
+        self._stats_lock = threading.Lock()
+        self._tool_stats: Dict[str, Dict[str, float]] = {}
+        self._inflight_lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self.sessions = 0
+        self.coalesced = 0
+
+    def call_tool(
+        self,
+        name: str,
+        arguments: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None,
+        use_cache: bool = True,
+    ) -> Any:
+        """
+        Call a tool and return its result (decoded JSON where possible).
+
+        Raises:
+            MCPError: If the server is unreachable or the tool reports an error
+            MCPTimeoutError: If the call outlives the tool's timeout
+            DeadlineExceededError, RunCancelledError: If the deadline stops the call
+        """
+        arguments = arguments or {}
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(name, arguments)
+            if cached is not None:
+                return cached
+        if deadline is not None:
+            deadline.check()
+        if not use_cache:
+            return self._call(name, arguments, deadline, use_cache)
+
+        # Identical calls already in flight (e.g. the schema lookups of a
+        # batch of similar messages) share one request
+        key = ToolResultCache.key(name, arguments)
+        with self._inflight_lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = self._inflight[key] = Future()
+                owner = True
+            else:
+                self.coalesced += 1
+                owner = False
+        if not owner:
+            return pending.result()
+        try:
+            output = self._call(name, arguments, deadline, use_cache)
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        else:
+            pending.set_result(output)
+            return output
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+    def _call(
+        self,
+        name: str,
+        arguments: Dict[str, Any],
+        deadline: Optional[Deadline],
+        use_cache: bool,
+    ) -> Any:
+        timeout = self.tool_timeouts.get(name, self.timeout)
+        if deadline is not None:
+            deadline.check()
+            remaining = deadline.remaining()
+            if remaining is not None:
+                timeout = min(timeout, remaining)
+
+        started = time.monotonic()
+        try:
+            result = self._rpc(
+                "tools/call", {"name": name, "arguments": arguments}, timeout
+            )
+            output = _tool_output(name, result)
+        except MCPError as e:
+            self._record(name, time.monotonic() - started, e)
+            if isinstance(e, MCPTimeoutError) and deadline is not None:
+                # Out of time for the whole request rather than for this tool
+                deadline.check()
+            raise
+        self._record(name, time.monotonic() - started, None)
+
+        # Tools report data source errors in-band; those aren't worth keeping
+        failed = isinstance(output, dict) and output.get("success") is False
+        if use_cache and self.cache is not None and not failed:
+            self.cache.put(name, arguments, output)
+        return output
+
+    def call_tools(
+        self,
+        calls: List[Tuple[str, Dict[str, Any]]],
+        deadline: Optional[Deadline] = None,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """Run several tool calls concurrently; results are in call order."""
+        futures = [
+            self._executor.submit(self.call_tool, name, arguments, deadline)
+            for name, arguments in calls
+        ]
+        results: List[Any] = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    async def acall_tool(
+        self,
+        name: str,
+        arguments: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Any:
+        """call_tool for the event loop; runs on the client's thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(self.call_tool, name, arguments, deadline),
+        )
+
+    async def acall_tools(
+        self,
+        calls: List[Tuple[str, Dict[str, Any]]],
+        deadline: Optional[Deadline] = None,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """call_tools for the event loop."""
+        return await asyncio.gather(
+            *(self.acall_tool(name, arguments, deadline) for name, arguments in calls),
+            return_exceptions=return_exceptions,
+        )
+
+    def _rpc(self, method: str, params: Dict[str, Any], timeout: float) -> Any:
+        session_id = self._ensure_session(timeout)
+        request_id = next(self._ids)
+        payload = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": method,
+            "params": params,
+        }
+        response = self._post(payload, timeout, session_id)
+        if response.status_code == 404 and session_id is not None:
+            # The server dropped our session (e.g. restarted); start a new one
+            self._reset_session(session_id)
+            session_id = self._ensure_session(timeout)
+            response = self._post(payload, timeout, session_id)
+        _raise_for_status(response)
+
+        message = _response_message(response, request_id)
+        if "error" in message:
+            error = message["error"]
+            raise MCPError(f"{method} failed: {error.get('message', error)}")
+        return message.get("result", {})
+
+    def _ensure_session(self, timeout: float) -> Optional[str]:
+        """Run the initialize handshake once; returns the session id, if any."""
+        with self._session_lock:
+            if self._initialized:
+                return self._session_id
+            request_id = next(self._ids)
+            response = self._post(
+                {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "method": "initialize",
+                    "params": {
+                        "protocolVersion": PROTOCOL_VERSION,
+                        "capabilities": {},
+                        "clientInfo": {"name": "fastapi-server", "version": "1.0.0"},
+                    },
+                },
+                timeout,
+                None,
+            )
+            _raise_for_status(response)
+            _response_message(response, request_id)
+            session_id = response.headers.get(SESSION_HEADER)
+            _raise_for_status(
+                self._post(
+                    {"jsonrpc": "2.0", "method": "notifications/initialized"},
+                    timeout,
+                    session_id,
+                )
+            )
+            self._session_id = session_id
+            self._initialized = True
+            self.sessions += 1
+            print(f"🔌 MCP session started with {self.endpoint}")
+            return session_id
+
+    def _reset_session(self, session_id: Optional[str]) -> None:
+        with self._session_lock:
+            if self._session_id == session_id:
+                self._initialized = False
+                self._session_id = None
+
+    def _post(
+        self, payload: Dict[str, Any], timeout: float, session_id: Optional[str]
+    ) -> httpx.Response:
+        headers = {"Accept": "application/json, text/event-stream"}
+        if session_id is not None:
+            headers[SESSION_HEADER] = session_id
+        try:
+            return self._http.post(
+                self.endpoint, json=payload, headers=headers, timeout=timeout
+            )
+        except httpx.TimeoutException as e:
+            raise MCPTimeoutError(
+                f"MCP {payload.get('method')} timed out after {timeout:.1f}s"
+            ) from e
+        except httpx.HTTPError as e:
+            raise MCPError(f"MCP server unreachable at {self.endpoint}: {e}") from e
+
+    def _record(self, name: str, seconds: float, error: Optional[Exception]) -> None:
+        with self._stats_lock:
+            stats = self._tool_stats.setdefault(
+                name, {"calls": 0, "errors": 0, "timeouts": 0, "total_ms": 0.0}
+            )
+            stats["calls"] += 1
+            stats["total_ms"] += seconds * 1000
+            if error is not None:
+                stats["errors"] += 1
+                if isinstance(error, MCPTimeoutError):
+                    stats["timeouts"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            tools = {
+                name: {
+                    "calls": int(stats["calls"]),
+                    "errors": int(stats["errors"]),
+                    "timeouts": int(stats["timeouts"]),
+                    "average_ms": round(stats["total_ms"] / stats["calls"], 2),
+                }
+                for name, stats in self._tool_stats.items()
+            }
+        return {
+            "endpoint": self.endpoint,
+            "sessions": self.sessions,
+            "coalesced_calls": self.coalesced,
+            "tools": tools,
+            "cache": (
+                self.cache.get_stats() if self.cache is not None else {"enabled": False}
+            ),
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self._http.close()
+
+
+def _raise_for_status(response: httpx.Response) -> None:
+    if response.status_code >= 400:
+        raise MCPError(
+            f"MCP server returned {response.status_code}: {response.text[:200]}"
+        )
+
+
+def _response_message(response: httpx.Response, request_id: int) -> Dict[str, Any]:
+    """The JSON-RPC reply to request_id, from a JSON or server-sent event body."""
+    if not response.headers.get("content-type", "").startswith("text/event-stream"):
+        return response.json()
+
+    for event in response.text.split("\n\n"):
+        data = "\n".join(
+            line[len("data:") :].strip()
+            for line in event.splitlines()
+            if line.startswith("data:")
+        )
+        if not data:
+            continue
+        message = json.loads(data)
+        if message.get("id") == request_id:
+            return message
+    raise MCPError(f"MCP server sent no reply to request {request_id}")
+
+
+def _tool_output(name: str, result: Dict[str, Any]) -> Any:
+    """Decode a tools/call result: structured content, else the JSON text content."""
+    text = "".join(
+        item.get("text", "")
+        for item in result.get("content", [])
+        if item.get("type") == "text"
+    )
+    if result.get("isError"):
+        raise MCPError(f"Tool {name} failed: {text[:200]}")
+
+    structured = result.get("structuredContent")
+    if structured is not None:
+        # Non-object return values are wrapped as {"result": value}
+        if isinstance(structured, dict) and list(structured) == ["result"]:
+            return structured["result"]
+        return structured
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
@@ -0,0 +1,100 @@
+"""
+CrewAI tools backed by the MCP data server.
+Each tool forwards to the shared MCPClient, so agents reuse its connections and cache.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+# crewai 0.28 agents run LangChain tools, whose argument schemas are pydantic v1 models
+from langchain_core.pydantic_v1 import BaseModel, Field, create_model
+from langchain_core.tools import BaseTool
+
+from .mcp_client import MCPClient, MCPError
+from .run_context import current_run
+
+# Longest tool output handed back to an agent; rows past this are cut off
+MAX_TOOL_OUTPUT_CHARS = 4000
+
+# MCP server tool -> (description, argument fields)
+MCP_TOOL_SPECS: Dict[str, Tuple[str, Dict[str, Tuple[Any, Any]]]] = {
+    "mysql_get_tables": ("List the tables in the MySQL database.", {}),
+    "mysql_get_schema": (
+        "Get the columns of a MySQL table.",
+        {"table_name": (str, Field(description="Name of the table"))},
+    ),
+    "mysql_query": (
+        "Run a read-only SQL query against MySQL and return the rows. "
+        "Always use a LIMIT.",
+        {"query": (str, Field(description="SQL SELECT statement"))},
+    ),
+    "mongo_get_collections": ("List the collections in the MongoDB database.", {}),
+    "mongo_get_schema": (
+        "Get the fields of a MongoDB collection.",
+        {"collection": (str, Field(description="Name of the collection"))},
+    ),
+    "mongo_query": (
+        "Find documents in a MongoDB collection.",
+        {
+            "collection": (str, Field(description="Name of the collection")),
+            "query": (str, Field(description='JSON filter, e.g. "{}"')),
+            "limit": (Optional[int], Field(None, description="Maximum documents")),
+        },
+    ),
+    "csv_list_files": ("List the available CSV files.", {}),
+    "csv_get_info": (
+        "Get the columns and types of a CSV file.",
+        {"filename": (str, Field(description="Name of the CSV file"))},
+    ),
+    "csv_read": (
+        "Read rows from a CSV file.",
+        {
+            "filename": (str, Field(description="Name of the CSV file")),
+            "limit": (Optional[int], Field(None, description="Maximum rows")),
+        },
+    ),
+}
+
+
+class MCPTool(BaseTool):
+    """Forwards an agent's tool call to one tool of the MCP data server."""
+
+    name: str
+    description: str
+    args_schema: Type[BaseModel]
+    tool_name: str
+    client: Any = Field(exclude=True)
+
+    def _run(self, **kwargs: Any) -> str:
+        arguments = {key: value for key, value in kwargs.items() if value is not None}
+        run = current_run.get()
+        try:
+            result = self.client.call_tool(
+                self.tool_name,
+                arguments,
+                deadline=run.deadline if run is not None else None,
+            )
+        except MCPError as e:
+            # Let the agent carry on without the data rather than fail the task
+            return f"Error: {e}"
+        output = json.dumps(result, default=str, ensure_ascii=False)
+        if len(output) > MAX_TOOL_OUTPUT_CHARS:
+            output = output[:MAX_TOOL_OUTPUT_CHARS] + " ...(truncated)"
+        return output
+
+
+def create_mcp_tools(client: MCPClient) -> List[MCPTool]:
+    """One CrewAI tool per MCP data server tool, sharing the client."""
+    tools = []
+    for tool_name, (description, fields) in MCP_TOOL_SPECS.items():
+        schema = create_model(f"{tool_name.title().replace('_', '')}Args", **fields)
+        tools.append(
+            MCPTool(
+                name=tool_name,
+                description=description,
+                args_schema=schema,
+                tool_name=tool_name,
+                client=client,
+            )
+        )
+    return tools
@@ -0,0 +1,184 @@
+"""
+Offline mock LLM.
+Scripted responses with configurable latency, for tests and benchmarks without network access.
+"""
+
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
+
+import yaml
+
+DEFAULT_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "config", "mock_llm.yaml")
+
+
+class LatencyModel:
+    """
+    Samples simulated response latencies.
+
+    Distributions (all values in milliseconds):
+        fixed:      ms
+        uniform:    min_ms, max_ms
+        normal:     mean_ms, stddev_ms (clipped at 0)
+        lognormal:  median_ms, sigma (long right tail, like real providers)
+        empirical:  samples_ms (resampled, e.g. latencies recorded in production)
+    """
+
+    def __init__(self, spec: Optional[Dict[str, Any]], rng: random.Random):
+        self.spec = dict(spec or {"distribution": "fixed", "ms": 0})
+        self.distribution = self.spec.get("distribution", "fixed")
+        self._rng = rng
+        if self.distribution not in (
+            "fixed",
+            "uniform",
+            "normal",
+            "lognormal",
+            "empirical",
+        ):
+            raise ValueError(f"Unknown latency distribution: {self.distribution}")
+        if self.distribution == "empirical" and not self.spec.get("samples_ms"):
+            raise ValueError("empirical latency needs samples_ms")
+
+    def sample(self) -> float:
+        """One latency in seconds."""
+        spec = self.spec
+        if self.distribution == "fixed":
+            ms = spec.get("ms", 0)
+        elif self.distribution == "uniform":
+            ms = self._rng.uniform(spec["min_ms"], spec["max_ms"])
+        elif self.distribution == "normal":
+            ms = max(0.0, self._rng.gauss(spec["mean_ms"], spec["stddev_ms"]))
+        elif self.distribution == "lognormal":
+            ms = self._rng.lognormvariate(math.log(spec["median_ms"]), spec["sigma"])
+        else:
+            ms = self._rng.choice(spec["samples_ms"])
+        return ms / 1000
+
+
+class _ScriptEntry:
+    def __init__(
+        self,
+        name: str,
+        pattern: Optional[Pattern[str]],
+        response: str,
+        latency: Optional[LatencyModel],
+    ):
+        self.name = name
+        self.pattern = pattern
+        self.response = response
+        self.latency = latency
+
+
+class MockLLM:
+    """
+    Local stand-in for an LLM provider.
+
+    Each prompt is answered by the first script entry whose `match` regex is
+    found in it (or the script's default), after a latency drawn from the
+    entry's distribution. `call` has the provider signature used by LLMPool,
+    so the mock goes through the same rate limits, hedging and streaming
+    path as a real provider.
+    """
+
+    def __init__(
+        self,
+        script: Dict[str, Any],
+        seed: Optional[int] = None,
+        latency_scale: float = 1.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.latency_scale = latency_scale
+        self.time_to_first_token_ratio = float(
+            script.get("time_to_first_token_ratio", 0.3)
+        )
+        self._sleep = sleep
+        default_latency = LatencyModel(script.get("latency"), self._rng)
+
+        self._entries: List[_ScriptEntry] = [
+            _ScriptEntry(
+                entry.get("name", f"response_{i}"),
+                re.compile(entry["match"], re.IGNORECASE),
+                entry["response"],
+                (
+                    LatencyModel(entry["latency"], self._rng)
+                    if entry.get("latency")
+                    else default_latency
+                ),
+            )
+            for i, entry in enumerate(script.get("responses", []))
+        ]
+        self._default = _ScriptEntry(
+            "default", None, script.get("default", ""), default_latency
+        )
+
+        self._stats_lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.simulated_seconds = 0.0
+
+    @classmethod
+    def from_yaml(cls, path: Optional[str] = None, **kwargs: Any) -> "MockLLM":
+        with open(path or DEFAULT_SCRIPT_PATH, "r", encoding="utf-8") as f:
+            return cls(yaml.safe_load(f) or {}, **kwargs)
+
+    def respond(self, prompt: str) -> Tuple[str, str, float]:
+        """Pick the scripted answer for a prompt: (entry name, text, latency seconds)."""
+        entry = next(
+            (e for e in self._entries if e.pattern.search(prompt)), self._default
+        )
+        with self._rng_lock:
+            latency = entry.latency.sample() * self.latency_scale
+        with self._stats_lock:
+            self.calls[entry.name] = self.calls.get(entry.name, 0) + 1
+            self.simulated_seconds += latency
+        return entry.name, entry.response, latency
+
+    def call(
+        self,
+        messages: Any,
+        stop: Optional[List[str]] = None,
+        on_token: Optional[Callable[[str], bool]] = None,
+    ) -> str:
+        """Provider call: answer after the simulated latency, optionally streaming."""
+        _, text, latency = self.respond(_prompt_text(messages))
+        for stop_sequence in stop or []:
+            cut = text.find(stop_sequence)
+            if cut >= 0:
+                text = text[:cut]
+
+        if on_token is None:
+            self._sleep(latency)
+            return text
+
+        # Spread the rest of the latency over the gaps between word-sized tokens
+        tokens = re.findall(r"\S+\s*|\s+", text) or [text]
+        first_token = (
+            latency * self.time_to_first_token_ratio if len(tokens) > 1 else latency
+        )
+        per_token = (latency - first_token) / max(1, len(tokens) - 1)
+        sent = []
+        for i, token in enumerate(tokens):
+            self._sleep(per_token if i else first_token)
+            if not on_token(token):
+                break
+            sent.append(token)
+        return "".join(sent)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "calls": dict(self.calls),
+                "simulated_ms": round(self.simulated_seconds * 1000, 2),
+            }
+
+
+def _prompt_text(messages: Any) -> str:
+    """Flatten LangChain messages (or plain strings) into one prompt string."""
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(getattr(m, "content", m)) for m in messages)
@@ -0,0 +1,107 @@
+"""
+Crew registry.
+Builds LLM clients and crews once per process and keeps them warm for reuse.
+"""
+
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+
+class CrewRegistry:
+    """
+    Process-wide cache of LLM clients and pooled, prebuilt crews.
+
+    LLM clients are shared by every agent that uses the same model string, so
+    their HTTP connection pools stay warm. Crews hold per-run state (task
+    outputs, agent executors), so each profile keeps a small pool of crews and
+    a crew is only ever used by one kickoff at a time.
+    """
+
+    def __init__(
+        self,
+        builders: Dict[str, Callable[[], Any]],
+        llm_factory: Callable[[str], Any],
+        pool_size: int = 4,
+    ):
+        self._builders = builders
+        self._llm_factory = llm_factory
+        self.pool_size = max(1, pool_size)
+
+        self._lock = threading.Lock()
+        self._llms: Dict[str, Any] = {}
+        self._pools: Dict[str, "queue.LifoQueue[Any]"] = {
+            profile: queue.LifoQueue() for profile in builders
+        }
+        self._created: Dict[str, int] = {profile: 0 for profile in builders}
+
+    def get_llm(self, llm_config: str) -> Any:
+        """Return the shared LLM client for a configuration string."""
+        llm = self._llms.get(llm_config)
+        if llm is not None:
+            return llm
+
+        with self._lock:
+            llm = self._llms.get(llm_config)
+            if llm is None:
+                llm = self._llm_factory(llm_config)
+                self._llms[llm_config] = llm
+            return llm
+
+    @contextmanager
+    def checkout(self, profile: str) -> Iterator[Any]:
+        """Borrow a crew for one kickoff and return it to the pool afterwards."""
+        crew = self._acquire(profile)
+        try:
+            yield crew
+        finally:
+            self._pools[profile].put(crew)
+
+    def _acquire(self, profile: str) -> Any:
+        if profile not in self._builders:
+            raise KeyError(f"Unknown crew profile: {profile}")
+
+        pool = self._pools[profile]
+        try:
+            return pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_build = self._created[profile] < self.pool_size
+            if can_build:
+                self._created[profile] += 1
+
+        if not can_build:
+            # Every crew of this profile is busy; wait for one to come back
+            return pool.get()
+
+        try:
+            return self._builders[profile]()
+        except Exception:
+            with self._lock:
+                self._created[profile] -= 1
+            raise
+
+    def warm_up(self, profiles: Optional[Iterable[str]] = None) -> None:
+        """Build one crew per profile (and their LLM clients) ahead of traffic."""
+        for profile in profiles or self._builders:
+            if self._created[profile] > 0:
+                continue
+            with self.checkout(profile):
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool sizes and cached client counts."""
+        return {
+            "llm_clients": len(self._llms),
+            "pool_size": self.pool_size,
+            "crews": {
+                profile: {
+                    "created": self._created[profile],
+                    "idle": self._pools[profile].qsize(),
+                }
+                for profile in self._builders
+            },
+        }
@@ -0,0 +1,595 @@
+"""
+Response cache for crew results.
+Serves repeated (and optionally near-duplicate) requests without running the crew.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+SparseVector = Dict[int, float]
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s.!?,;:…]+$")
+# Numbers and comparisons; near-duplicates must agree on all of them
+_LITERALS = re.compile(r"\d+(?:\.\d+)?|[<>!=]=?")
+
+
+def normalize_message(message: str) -> str:
+    """
+    Lowercase, collapse whitespace and drop trailing sentence punctuation.
+
+    Other punctuation is kept: "revenue > 100" and "revenue < 100", "1.5"
+    and "15", or "top-10" and "top 10" are different requests.
+    """
+    text = unicodedata.normalize("NFKC", message).lower()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+def context_fingerprint(conversation_context: str) -> str:
+    """Stable short hash of the conversation context."""
+    return hashlib.sha256(conversation_context.encode("utf-8")).hexdigest()[:16]
+
+
+def ngram_embedding(text: str, dims: int = 512, n: int = 3) -> SparseVector:
+    """
+    Cheap local embedding: hashed character n-grams, L2-normalized.
+
+    Good enough to catch rephrasings and typos of the same request without
+    calling an embedding model.
+    """
+    padded = f" {text} "
+    counts: SparseVector = {}
+    for i in range(max(1, len(padded) - n + 1)):
+        gram = padded[i : i + n]
+        bucket = (
+            int.from_bytes(
+                hashlib.blake2b(gram.encode(), digest_size=4).digest(), "big"
+            )
+            % dims
+        )
+        counts[bucket] = counts.get(bucket, 0.0) + 1.0
+
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {k: v / norm for k, v in counts.items()}
+
+
+def cosine_similarity(a: SparseVector, b: SparseVector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+class CacheEntry:
+    """A cached crew result and its bookkeeping."""
+
+    __slots__ = (
+        "key",
+        "context_hash",
+        "message",
+        "value",
+        "embedding",
+        "size",
+        "expires_at",
+    )
+
+    def __init__(
+        self,
+        key: str,
+        context_hash: str,
+        message: str,
+        value: Optional[Dict[str, Any]],
+        embedding: Optional[SparseVector],
+        size: int,
+        expires_at: float,
+    ):
+        self.key = key
+        self.context_hash = context_hash
+        self.message = message
+        self.value = value
+        self.embedding = embedding
+        self.size = size
+        self.expires_at = expires_at
+
+
+class MemoryCacheBackend:
+    """In-process LRU store with TTL expiry and a byte budget."""
+
+    blocking = False
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 10000):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._by_context: Dict[str, set] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, entry: CacheEntry) -> None:
+        with self._lock:
+            if entry.key in self._entries:
+                self._remove(entry.key)
+            if entry.size > self.max_bytes:
+                return
+            self._entries[entry.key] = entry
+            self._by_context.setdefault(entry.context_hash, set()).add(entry.key)
+            self._bytes += entry.size
+
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def candidates(self, context_hash: str) -> List[CacheEntry]:
+        """Live entries recorded under the same conversation context."""
+        now = time.time()
+        with self._lock:
+            keys = list(self._by_context.get(context_hash, ()))
+            return [
+                self._entries[key]
+                for key in keys
+                if key in self._entries and self._entries[key].expires_at > now
+            ]
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        keys = self._by_context.get(entry.context_hash)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_context[entry.context_hash]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteCacheBackend:
+    """
+    File-backed store shared by every worker process on the host.
+
+    Calls wait on the disk and on other processes' writes, so ResponseCache
+    runs them in a thread (blocking). Triggers keep the cached bytes and
+    entries in a totals row, so keeping to the budget deletes a bounded
+    number of the least recently used rows instead of scanning the table.
+    Embeddings live in their own table: similarity lookups decode those,
+    never the cached results.
+    """
+
+    blocking = True
+    # Files from before the separate embeddings table are dropped and recreated
+    SCHEMA_VERSION = 2
+    # Most expired rows one put deletes
+    EXPIRED_BATCH = 64
+
+    def __init__(
+        self,
+        path: str = "./response_cache.db",
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entries: int = 10000,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._transaction():
+            self._create_schema()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        # IMMEDIATE takes the write lock up front, so concurrent writers queue
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _create_schema(self) -> None:
+        (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+        if version < self.SCHEMA_VERSION:
+            # Cached results can always be recomputed; start over
+            for table in (
+                "response_cache",
+                "response_cache_embeddings",
+                "response_cache_totals",
+            ):
+                self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                context_hash TEXT NOT NULL,
+                message TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS response_cache_embeddings (
+                key TEXT PRIMARY KEY,
+                context_hash TEXT NOT NULL,
+                message TEXT NOT NULL,
+                embedding TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS response_cache_totals (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                bytes INTEGER NOT NULL,
+                entries INTEGER NOT NULL
+            )
+            """)
+        self._conn.execute(
+            "INSERT OR IGNORE INTO response_cache_totals (id, bytes, entries) "
+            "VALUES (1, 0, 0)"
+        )
+        for name, table, column in [
+            ("ix_response_cache_access", "response_cache", "last_access"),
+            ("ix_response_cache_expiry", "response_cache", "expires_at"),
+            (
+                "ix_response_cache_embeddings_context",
+                "response_cache_embeddings",
+                "context_hash",
+            ),
+        ]:
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})"
+            )
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS response_cache_added
+            AFTER INSERT ON response_cache
+            BEGIN
+                UPDATE response_cache_totals
+                SET bytes = bytes + NEW.size, entries = entries + 1;
+            END
+            """)
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS response_cache_resized
+            AFTER UPDATE OF size ON response_cache
+            BEGIN
+                UPDATE response_cache_totals SET bytes = bytes + NEW.size - OLD.size;
+            END
+            """)
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS response_cache_removed
+            AFTER DELETE ON response_cache
+            BEGIN
+                UPDATE response_cache_totals
+                SET bytes = bytes - OLD.size, entries = entries - 1;
+                DELETE FROM response_cache_embeddings WHERE key = OLD.key;
+            END
+            """)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT context_hash, message, value, size, expires_at "
+                "FROM response_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE response_cache SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+        context_hash, message, value, size, expires_at = row
+        return CacheEntry(
+            key=key,
+            context_hash=context_hash,
+            message=message,
+            value=json.loads(value),
+            embedding=None,
+            size=size,
+            expires_at=expires_at,
+        )
+
+    def put(self, entry: CacheEntry) -> None:
+        if entry.size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, self._transaction():
+            self._conn.execute(
+                "INSERT INTO response_cache "
+                "(key, context_hash, message, value, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET "
+                "context_hash = excluded.context_hash, message = excluded.message, "
+                "value = excluded.value, size = excluded.size, "
+                "expires_at = excluded.expires_at, last_access = excluded.last_access",
+                (
+                    entry.key,
+                    entry.context_hash,
+                    entry.message,
+                    json.dumps(entry.value, default=str),
+                    entry.size,
+                    entry.expires_at,
+                    now,
+                ),
+            )
+            if entry.embedding:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO response_cache_embeddings "
+                    "(key, context_hash, message, embedding, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        entry.key,
+                        entry.context_hash,
+                        entry.message,
+                        json.dumps(entry.embedding),
+                        entry.expires_at,
+                    ),
+                )
+            else:
+                self._conn.execute(
+                    "DELETE FROM response_cache_embeddings WHERE key = ?",
+                    (entry.key,),
+                )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute(
+            "DELETE FROM response_cache WHERE key IN (SELECT key FROM response_cache "
+            "WHERE expires_at <= ? LIMIT ?)",
+            (now, self.EXPIRED_BATCH),
+        )
+        # Drop least recently used rows until back under budget; one put
+        # overshoots by one entry, so this is usually a single small delete
+        while True:
+            total_bytes, total_entries = self._totals()
+            if total_bytes <= self.max_bytes and total_entries <= self.max_entries:
+                return
+            deleted = self._conn.execute(
+                "DELETE FROM response_cache WHERE key IN (SELECT key FROM "
+                "response_cache ORDER BY last_access ASC LIMIT ?)",
+                (max(total_entries - self.max_entries, 1),),
+            ).rowcount
+            if not deleted:
+                return
+            self.evictions += deleted
+
+    def _totals(self) -> Tuple[int, int]:
+        return self._conn.execute(
+            "SELECT bytes, entries FROM response_cache_totals WHERE id = 1"
+        ).fetchone()
+
+    def candidates(self, context_hash: str) -> List[CacheEntry]:
+        """Live entries under a conversation context, with embeddings but no values."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, message, embedding, expires_at "
+                "FROM response_cache_embeddings "
+                "WHERE context_hash = ? AND expires_at > ?",
+                (context_hash, time.time()),
+            ).fetchall()
+        return [
+            CacheEntry(
+                key=key,
+                context_hash=context_hash,
+                message=message,
+                value=None,
+                embedding={int(k): v for k, v in json.loads(embedding).items()},
+                size=0,
+                expires_at=expires_at,
+            )
+            for key, message, embedding, expires_at in rows
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total_bytes, total_entries = self._totals()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": total_entries,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+class ResponseCache:
+    """
+    Cache of crew results keyed on the normalized message and a context hash.
+
+    Exact lookups hit on the normalized message. When a similarity threshold
+    is set, a miss falls back to the most similar cached message recorded
+    under the same conversation context. Messages whose numbers differ
+    ("every 5 min" vs "every 10 min") are never treated as near-duplicates.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        ttl_seconds: int = 3600,
+        similarity_threshold: float = 0.0,
+        embedder: Optional[Callable[[str], SparseVector]] = None,
+    ):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.embedder = embedder or ngram_embedding
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.stores = 0
+        # Lookups of blocking backends run in threads
+        self._counter_lock = threading.Lock()
+
+    @property
+    def similarity_enabled(self) -> bool:
+        return self.similarity_threshold > 0
+
+    def make_key(self, message: str, conversation_context: str) -> Tuple[str, str, str]:
+        """Return (key, context_hash, normalized_message)."""
+        normalized = normalize_message(message)
+        context_hash = context_fingerprint(conversation_context)
+        key = hashlib.sha256(f"{context_hash}:{normalized}".encode("utf-8")).hexdigest()
+        return key, context_hash, normalized
+
+    def get(self, message: str, conversation_context: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached result; returns a copy safe to mutate."""
+        key, context_hash, normalized = self.make_key(message, conversation_context)
+
+        entry = self.backend.get(key)
+        if entry is not None:
+            self._count("hits")
+            return copy.deepcopy(entry.value)
+
+        if self.similarity_enabled and normalized:
+            match = self._find_similar(context_hash, normalized)
+            # Candidates may come without their value; this also marks it used
+            entry = self.backend.get(match.key) if match is not None else None
+            if entry is not None:
+                self._count("near_hits")
+                return copy.deepcopy(entry.value)
+
+        self._count("misses")
+        return None
+
+    async def get_async(
+        self, message: str, conversation_context: str
+    ) -> Optional[Dict[str, Any]]:
+        """get, run in a thread when the backend blocks (SQLite)."""
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.get, message, conversation_context)
+        return self.get(message, conversation_context)
+
+    def _find_similar(self, context_hash: str, normalized: str) -> Optional[CacheEntry]:
+        literals = _LITERALS.findall(normalized)
+        embedding = self.embedder(normalized)
+
+        best: Optional[CacheEntry] = None
+        best_score = self.similarity_threshold
+        for entry in self.backend.candidates(context_hash):
+            if not entry.embedding or _LITERALS.findall(entry.message) != literals:
+                continue
+            score = cosine_similarity(embedding, entry.embedding)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def put(
+        self, message: str, conversation_context: str, value: Dict[str, Any]
+    ) -> None:
+        """Store a crew result."""
+        key, context_hash, normalized = self.make_key(message, conversation_context)
+        size = len(json.dumps(value, default=str)) + len(normalized)
+        self.backend.put(
+            CacheEntry(
+                key=key,
+                context_hash=context_hash,
+                message=normalized,
+                value=copy.deepcopy(value),
+                embedding=(
+                    self.embedder(normalized) if self.similarity_enabled else None
+                ),
+                size=size,
+                expires_at=time.time() + self.ttl_seconds,
+            )
+        )
+        self._count("stores")
+
+    async def put_async(
+        self, message: str, conversation_context: str, value: Dict[str, Any]
+    ) -> None:
+        """put, run in a thread when the backend blocks (SQLite)."""
+        if self.backend.blocking:
+            await asyncio.to_thread(self.put, message, conversation_context, value)
+        else:
+            self.put(message, conversation_context, value)
+
+    def _count(self, counter: str) -> None:
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and backend usage."""
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            **self.backend.get_stats(),
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": (
+                round((self.hits + self.near_hits) / lookups * 100, 2) if lookups else 0
+            ),
+            "ttl_seconds": self.ttl_seconds,
+            "similarity_threshold": self.similarity_threshold,
+        }
+
+
+def create_response_cache(
+    backend: str = "memory",
+    path: str = "./response_cache.db",
+    ttl_seconds: int = 3600,
+    max_bytes: int = 64 * 1024 * 1024,
+    max_entries: int = 10000,
+    similarity_threshold: float = 0.0,
+) -> ResponseCache:
+    """Build a response cache with the named backend ("memory" or "sqlite")."""
+    if backend == "sqlite":
+        store: Any = SQLiteCacheBackend(
+            path, max_bytes=max_bytes, max_entries=max_entries
+        )
+    elif backend == "memory":
+        store = MemoryCacheBackend(max_bytes=max_bytes, max_entries=max_entries)
+    else:
+        raise ValueError(f"Unknown response cache backend: {backend}")
+    return ResponseCache(
+        store, ttl_seconds=ttl_seconds, similarity_threshold=similarity_threshold
+    )
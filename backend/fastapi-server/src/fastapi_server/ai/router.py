@@ -0,0 +1,267 @@
+"""
+Message router.
+Picks the crew pipeline for a message with a naive Bayes classifier trained on
+seed examples and stored chats, instead of a fixed keyword list.
+"""
+
+import collections
+import json
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple
+
+import yaml
+
+from .intent_parser import IntentParser
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config", "routing.yaml")
+
+ROUTES = ("direct", "minimal", "intent_only", "full")
+
+# model_used of chats answered without running the crew
+DIRECT_MODEL = "direct_reply"
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+# Additive smoothing for unseen features
+_ALPHA = 0.5
+
+
+def message_features(
+    message: str, intent: Optional[Dict[str, Any]] = None
+) -> List[str]:
+    """
+    Features of a message: words, word pairs, length and question shape, plus
+    what the local intent parser found in it.
+    """
+    text = (message or "").lower().strip()
+    words = _WORD.findall(text)
+    features = [f"w:{word}" for word in words]
+    features += [f"b:{first}_{second}" for first, second in zip(words, words[1:])]
+    features.append(f"len:{min(len(words) // 4, 5)}")
+    if text.endswith("?"):
+        features.append("question")
+    if intent is not None:
+        if intent.get("component_type"):
+            features.append("intent:component")
+        if intent.get("interval"):
+            features.append("intent:interval")
+        features.append(f"intent:confidence:{int(intent.get('confidence', 0) * 4)}")
+    return features
+
+
+def label_chat(chat: Dict[str, Any]) -> Optional[str]:
+    """
+    Route a stored chat should have taken, judged from its outcome; None for
+    failed runs, which say nothing about the message.
+    """
+    intent = chat.get("intent")
+    if intent is None:
+        return None
+    if chat.get("component_suggestion"):
+        return "full"
+    if intent.get("component_type") and intent.get("action") != "unknown":
+        return "full"
+    if intent:
+        return "intent_only"
+    if chat.get("model_used") == DIRECT_MODEL:
+        return "direct"
+    return "minimal"
+
+
+class RouteDecision:
+    """Route picked for a message and how sure the classifier was."""
+
+    def __init__(self, route: str, confidence: float, source: str):
+        self.route = route
+        self.confidence = confidence
+        self.source = source  # "classifier" or "keywords"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "route": self.route,
+            "confidence": round(self.confidence, 3),
+            "source": self.source,
+        }
+
+
+class RoutingClassifier:
+    """Multinomial naive Bayes over message features."""
+
+    def __init__(
+        self,
+        priors: Optional[Dict[str, float]] = None,
+        counts: Optional[Dict[str, Dict[str, int]]] = None,
+        examples: int = 0,
+    ):
+        self.priors = priors or {}
+        self.counts = counts or {}
+        self.examples = examples
+        self._prepare()
+
+    @classmethod
+    def fit(cls, examples: Iterable[Tuple[List[str], str]]) -> "RoutingClassifier":
+        """Train on (features, route) pairs."""
+        routes: collections.Counter = collections.Counter()
+        counts: Dict[str, collections.Counter] = {}
+        for features, route in examples:
+            routes[route] += 1
+            counts.setdefault(route, collections.Counter()).update(features)
+        total = sum(routes.values())
+        return cls(
+            priors={route: n / total for route, n in routes.items()},
+            counts={route: dict(c) for route, c in counts.items()},
+            examples=total,
+        )
+
+    def _prepare(self) -> None:
+        vocabulary = {f for counts in self.counts.values() for f in counts}
+        self._vocabulary_size = max(1, len(vocabulary))
+        self._totals = {
+            route: sum(counts.values()) for route, counts in self.counts.items()
+        }
+
+    def predict(self, features: List[str]) -> Tuple[str, float]:
+        """Most likely route and its posterior probability."""
+        if not self.priors:
+            raise ValueError("Routing classifier has not been trained")
+        scores = {}
+        for route, prior in self.priors.items():
+            counts = self.counts.get(route, {})
+            denominator = self._totals.get(route, 0) + _ALPHA * self._vocabulary_size
+            scores[route] = math.log(prior) + sum(
+                math.log((counts.get(f, 0) + _ALPHA) / denominator) for f in features
+            )
+        best = max(scores, key=scores.get)  # type: ignore[arg-type]
+        normalizer = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1 / normalizer
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"priors": self.priors, "counts": self.counts, "examples": self.examples}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RoutingClassifier":
+        return cls(data["priors"], data["counts"], data.get("examples", 0))
+
+
+class MessageRouter:
+    """
+    Routes messages to crew pipelines.
+
+    The classifier is trained from the seed examples in routing.yaml plus
+    whatever chat history it is given; a saved model can be loaded instead.
+    Decisions below min_confidence are left to the caller's fallback rule.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        intent_parser: Optional[IntentParser] = None,
+        classifier: Optional[RoutingClassifier] = None,
+    ):
+        self.min_confidence = float(config.get("min_confidence", 0.6))
+        self.intent_parser = intent_parser
+        self._direct_replies: List[Tuple[Pattern[str], str]] = [
+            (re.compile(entry["match"], re.IGNORECASE), entry["response"].strip())
+            for entry in config.get("direct_replies", [])
+        ]
+        self._seed = [
+            (message, route)
+            for route, messages in config.get("examples", {}).items()
+            for message in messages
+        ]
+        self.classifier = classifier or self._fit([])
+        self._lock = threading.Lock()
+        self._decisions: collections.Counter = collections.Counter()
+        self._confidence_total = 0.0
+        self._fallbacks = 0
+
+    @classmethod
+    def from_yaml(
+        cls,
+        path: str = DEFAULT_CONFIG_PATH,
+        intent_parser: Optional[IntentParser] = None,
+        model_path: Optional[str] = None,
+    ) -> "MessageRouter":
+        """Router from routing.yaml, with a saved model when one exists."""
+        with open(path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+        classifier = None
+        if model_path and os.path.exists(model_path):
+            with open(model_path, "r", encoding="utf-8") as f:
+                classifier = RoutingClassifier.from_dict(json.load(f))
+        return cls(config, intent_parser, classifier)
+
+    def _features(
+        self, message: str, intent: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        if intent is None and self.intent_parser is not None:
+            intent = self.intent_parser.parse(message)
+        return message_features(message, intent)
+
+    def _fit(self, history: List[Tuple[str, str]]) -> RoutingClassifier:
+        return RoutingClassifier.fit(
+            (self._features(message), route)
+            for message, route in self._seed + history
+            if route in ROUTES
+        )
+
+    def train(self, history: List[Tuple[str, str]]) -> int:
+        """Retrain on the seed examples plus (message, route) history."""
+        self.classifier = self._fit(history)
+        return self.classifier.examples
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.classifier.to_dict(), f)
+
+    def classify(
+        self, message: str, intent: Optional[Dict[str, Any]] = None
+    ) -> RouteDecision:
+        """The classifier's route for a message, whatever its confidence."""
+        route, confidence = self.classifier.predict(self._features(message, intent))
+        return RouteDecision(route, confidence, "classifier")
+
+    def route(
+        self,
+        message: str,
+        fallback: str,
+        intent: Optional[Dict[str, Any]] = None,
+    ) -> RouteDecision:
+        """
+        Route for a message: the classifier's when it is confident, else the
+        fallback. The direct route also needs a matching direct reply.
+        """
+        decision = self.classify(message, intent)
+        if decision.confidence < self.min_confidence:
+            decision = RouteDecision(fallback, decision.confidence, "keywords")
+        elif decision.route == "direct" and self.direct_reply(message) is None:
+            decision = RouteDecision("minimal", decision.confidence, "classifier")
+        with self._lock:
+            self._decisions[decision.route] += 1
+            self._confidence_total += decision.confidence
+            if decision.source == "keywords":
+                self._fallbacks += 1
+        return decision
+
+    def direct_reply(self, message: str) -> Optional[str]:
+        text = (message or "").strip()
+        for pattern, response in self._direct_replies:
+            if pattern.search(text):
+                return response
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            decisions = sum(self._decisions.values())
+            return {
+                "trained_examples": self.classifier.examples,
+                "min_confidence": self.min_confidence,
+                "decisions": dict(self._decisions),
+                "keyword_fallbacks": self._fallbacks,
+                "average_confidence": (
+                    round(self._confidence_total / decisions, 3) if decisions else 0
+                ),
+            }
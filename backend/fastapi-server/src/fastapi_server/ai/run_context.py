@@ -0,0 +1,264 @@
+"""
+Per-run context shared between the chat service and crew worker threads.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .deadline import Deadline
+
+# Progress stage reported for each crew task
+TASK_STAGES = {
+    "message_planning_task": "planning",
+    "intent_analysis_task": "intent",
+    "data_retrieval_task": "data",
+    "component_generation_task": "component",
+    "response_generation_task": "response",
+}
+
+# Agents prefix their final output with this marker (ReAct format)
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+
+class EventSink:
+    """Thread-safe bridge that delivers run events to an asyncio queue."""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        """Queue an event; safe to call from any thread."""
+        self._loop.call_soon_threadsafe(
+            self._queue.put_nowait, {"event": event, "data": data}
+        )
+
+    async def get(self) -> Dict[str, Any]:
+        return await self._queue.get()
+
+    def get_nowait(self) -> Dict[str, Any]:
+        return self._queue.get_nowait()
+
+    def empty(self) -> bool:
+        return self._queue.empty()
+
+
+class SinkGroup:
+    """Fans run events out to every sink attached to a shared run."""
+
+    def __init__(self, sinks: Optional[List[EventSink]] = None):
+        self._sinks: List[EventSink] = list(sinks or [])
+        self._lock = threading.Lock()
+
+    def add(self, sink: EventSink) -> None:
+        with self._lock:
+            self._sinks.append(sink)
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            sinks = list(self._sinks)
+        for sink in sinks:
+            sink.emit(event, data)
+
+
+class RunContext:
+    """
+    State for a single crew run.
+
+    Tracks which stages are active, records their timing, and forwards stage
+    progress and response tokens to the attached sink, if any. Stages may run
+    concurrently when the crew is scheduled as a task graph.
+    """
+
+    def __init__(
+        self,
+        sink: Optional[Union[EventSink, SinkGroup]] = None,
+        deadline: Optional[Deadline] = None,
+    ):
+        self.sink = sink
+        self.deadline = deadline
+        self.task_names: List[str] = []
+        self.spans: Dict[str, Tuple[float, float]] = {}
+        # Raw output of each completed task, for partial results
+        self.outputs: Dict[str, str] = {}
+        self._started_at = time.monotonic()
+        self._starts: Dict[str, float] = {}
+        self._next_index = 0
+        self._lock = threading.Lock()
+        self._answer_buffer = ""
+        self._answer_started = False
+        # Time from run creation until the crew started (executor queue wait)
+        self.queue_ms: Optional[float] = None
+        # Time spent waiting on model calls, to separate it from framework overhead
+        self.llm_calls = 0
+        self.llm_ms = 0.0
+        self.task_usage: Dict[str, Dict[str, Any]] = {}
+        self.model_calls: Dict[str, int] = {}
+
+    @property
+    def active_stages(self) -> List[str]:
+        return [TASK_STAGES.get(name, name) for name in self._starts]
+
+    def _emit(self, event: str, data: Dict[str, Any]) -> None:
+        if self.sink is not None:
+            self.sink.emit(event, data)
+
+    def _offset_ms(self) -> float:
+        return (time.monotonic() - self._started_at) * 1000
+
+    def start(self, task_names: List[str], sequential: bool = True) -> None:
+        """
+        Begin a crew run over the given tasks.
+
+        In sequential mode the first task is marked started here and each
+        task_completed() call advances to the next one.
+        """
+        self.task_names = list(task_names)
+        self._next_index = 0
+        if self.queue_ms is None:
+            self.queue_ms = self._offset_ms()
+        if sequential and self.task_names:
+            self.stage_started(self.task_names[0])
+
+    def stage_started(self, task_name: str) -> None:
+        with self._lock:
+            self._starts[task_name] = self._offset_ms()
+            self._answer_buffer = ""
+            self._answer_started = False
+        self._emit(
+            "stage",
+            {"stage": TASK_STAGES.get(task_name, task_name), "status": "started"},
+        )
+
+    def stage_completed(self, task_name: str) -> None:
+        with self._lock:
+            started = self._starts.pop(task_name, None)
+            if started is not None:
+                self.spans[task_name] = (started, self._offset_ms())
+        self._emit(
+            "stage",
+            {"stage": TASK_STAGES.get(task_name, task_name), "status": "completed"},
+        )
+
+    def task_completed(self, output: Optional[str] = None) -> None:
+        """Sequential mode: complete the current task and start the next one."""
+        if self._next_index >= len(self.task_names):
+            return
+        if output is not None:
+            self.record_output(self.task_names[self._next_index], output)
+        self.stage_completed(self.task_names[self._next_index])
+        self._next_index += 1
+        if self._next_index < len(self.task_names):
+            self.stage_started(self.task_names[self._next_index])
+
+    def record_output(self, task_name: str, output: str) -> None:
+        with self._lock:
+            self.outputs[task_name] = output
+
+    def check_deadline(self) -> None:
+        """Raise DeadlineExceededError or RunCancelledError if the run should stop."""
+        if self.deadline is not None:
+            self.deadline.check()
+
+    @property
+    def incomplete_tasks(self) -> List[str]:
+        return [name for name in self.task_names if name not in self.outputs]
+
+    def record_llm_call(
+        self,
+        seconds: float,
+        model: Optional[str] = None,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        retries: int = 0,
+    ) -> None:
+        """
+        Record one model call against the task that made it.
+
+        The task is the one set in current_task (graph mode), or the single
+        active task (sequential mode). Calls may overlap in graph mode.
+        """
+        with self._lock:
+            task_name = current_task.get()
+            if task_name is None:
+                task_name = (
+                    next(iter(self._starts), None) if len(self._starts) == 1 else None
+                )
+            usage = self.task_usage.setdefault(
+                task_name or "unattributed",
+                {
+                    "llm_calls": 0,
+                    "llm_ms": 0.0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "retries": 0,
+                    "models": [],
+                },
+            )
+            usage["llm_calls"] += 1
+            usage["llm_ms"] += seconds * 1000
+            usage["prompt_tokens"] += prompt_tokens
+            usage["completion_tokens"] += completion_tokens
+            usage["retries"] += retries
+            if model:
+                if model not in usage["models"]:
+                    usage["models"].append(model)
+                self.model_calls[model] = self.model_calls.get(model, 0) + 1
+            self.llm_calls += 1
+            self.llm_ms += seconds * 1000
+
+    def usage_report(self) -> Dict[str, Any]:
+        """Run-level queue wait and LLM usage, plus the per-task breakdown."""
+        with self._lock:
+            tasks = {
+                name: dict(
+                    usage,
+                    llm_ms=round(usage["llm_ms"], 2),
+                    models=list(usage["models"]),
+                )
+                for name, usage in self.task_usage.items()
+            }
+            model_calls = dict(self.model_calls)
+        return {
+            "queue_ms": round(self.queue_ms or 0.0, 2),
+            "llm_calls": self.llm_calls,
+            "llm_ms": round(self.llm_ms, 2),
+            "prompt_tokens": sum(u["prompt_tokens"] for u in tasks.values()),
+            "completion_tokens": sum(u["completion_tokens"] for u in tasks.values()),
+            "retries": sum(u["retries"] for u in tasks.values()),
+            # Model serving the most calls first
+            "models": sorted(model_calls, key=model_calls.__getitem__, reverse=True),
+            "tasks": tasks,
+        }
+
+    def on_token(self, token: str) -> None:
+        """Forward response-stage tokens once the agent starts its final answer."""
+        if self.sink is None or not token or "response" not in self.active_stages:
+            return
+
+        if self._answer_started:
+            self._emit("token", {"text": token})
+            return
+
+        # Hold back the agent's reasoning until the final answer begins
+        self._answer_buffer += token
+        marker_at = self._answer_buffer.find(FINAL_ANSWER_MARKER)
+        if marker_at >= 0:
+            self._answer_started = True
+            answer = self._answer_buffer[marker_at + len(FINAL_ANSWER_MARKER) :]
+            self._answer_buffer = ""
+            if answer.strip():
+                self._emit("token", {"text": answer.lstrip()})
+
+
+current_run: "contextvars.ContextVar[Optional[RunContext]]" = contextvars.ContextVar(
+    "current_run", default=None
+)
+
+# Crew task running in this thread, when tasks run concurrently
+current_task: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar(
+    "current_task", default=None
+)
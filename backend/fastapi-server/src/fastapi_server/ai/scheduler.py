@@ -0,0 +1,204 @@
+"""
+Task graph scheduler.
+Runs crew tasks as a DAG built from their declared context, overlapping independent tasks.
+"""
+
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# (start_ms, end_ms) offsets from the start of the run
+Span = Tuple[float, float]
+
+
+class TaskGraphError(Exception):
+    """Raised for graphs with unknown dependencies or cycles."""
+
+
+class TaskGraph:
+    """
+    Dependency graph of named tasks.
+
+    Edges come from each task's ``context`` list: a task runs once every task
+    in its context has finished, and receives their outputs.
+    """
+
+    def __init__(self, dependencies: Dict[str, List[str]]):
+        self.dependencies = {name: list(deps) for name, deps in dependencies.items()}
+        for name, deps in self.dependencies.items():
+            for dep in deps:
+                if dep not in self.dependencies:
+                    raise TaskGraphError(
+                        f"Task '{name}' depends on unknown task '{dep}'"
+                    )
+        self.order = self._topological_order()
+
+    @classmethod
+    def from_tasks_config(
+        cls, tasks_config: Dict[str, Dict[str, Any]], task_names: Iterable[str]
+    ) -> "TaskGraph":
+        """
+        Build the graph for a subset of tasks from tasks.yaml.
+
+        Context entries that point at tasks outside the subset are dropped, so
+        shortened profiles still form a valid graph.
+        """
+        names = list(task_names)
+        selected = set(names)
+        return cls(
+            {
+                name: [
+                    dep
+                    for dep in tasks_config[name].get("context", []) or []
+                    if dep in selected
+                ]
+                for name in names
+            }
+        )
+
+    def _topological_order(self) -> List[str]:
+        """Kahn's algorithm, keeping declaration order among ready tasks."""
+        remaining = {name: set(deps) for name, deps in self.dependencies.items()}
+        order: List[str] = []
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise TaskGraphError(f"Cycle between tasks: {sorted(remaining)}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    def run(
+        self,
+        runner: Callable[[str, Dict[str, Any]], Any],
+        max_parallel: int = 4,
+        on_start: Optional[Callable[[str], None]] = None,
+        on_complete: Optional[Callable[[str], None]] = None,
+    ) -> "GraphRun":
+        """
+        Execute every task, starting each as soon as its dependencies finish.
+
+        Args:
+            runner: Called as runner(name, upstream_outputs) on a worker thread
+            max_parallel: Maximum number of tasks running at once
+            on_start: Optional hook called before a task starts
+            on_complete: Optional hook called after a task finishes
+
+        Returns:
+            GraphRun with outputs, per-task spans and the critical path
+        """
+        started_at = time.monotonic()
+        outputs: Dict[str, Any] = {}
+        spans: Dict[str, Span] = {}
+        pending = list(self.order)
+        running: Dict[Future, str] = {}
+
+        def offset_ms() -> float:
+            return (time.monotonic() - started_at) * 1000
+
+        def execute(name: str, upstream: Dict[str, Any]) -> Any:
+            if on_start:
+                on_start(name)
+            start = offset_ms()
+            try:
+                return runner(name, upstream)
+            finally:
+                spans[name] = (start, offset_ms())
+                if on_complete:
+                    on_complete(name)
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, max_parallel), thread_name_prefix="crew-task"
+        ) as pool:
+            try:
+                while pending or running:
+                    for name in list(pending):
+                        if len(running) >= max_parallel:
+                            break
+                        if all(dep in outputs for dep in self.dependencies[name]):
+                            pending.remove(name)
+                            upstream = {
+                                dep: outputs[dep] for dep in self.dependencies[name]
+                            }
+                            # Each task thread sees the caller's context (current run)
+                            ctx = contextvars.copy_context()
+                            future = pool.submit(ctx.run, execute, name, upstream)
+                            running[future] = name
+
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        outputs[name] = future.result()
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
+
+        path, path_ms = critical_path(spans, self.dependencies)
+        return GraphRun(outputs, spans, path, path_ms, offset_ms())
+
+
+class GraphRun:
+    """Outputs and timing for one execution of a task graph."""
+
+    def __init__(
+        self,
+        outputs: Dict[str, Any],
+        spans: Dict[str, Span],
+        critical_path: List[str],
+        critical_path_ms: float,
+        wall_ms: float,
+    ):
+        self.outputs = outputs
+        self.spans = spans
+        self.critical_path = critical_path
+        self.critical_path_ms = critical_path_ms
+        self.wall_ms = wall_ms
+
+    def timing(self) -> Dict[str, Any]:
+        return timing_report(self.spans, self.critical_path, self.critical_path_ms)
+
+
+def critical_path(
+    spans: Dict[str, Span], dependencies: Dict[str, List[str]]
+) -> Tuple[List[str], float]:
+    """
+    The chain of tasks that determined the end-to-end latency.
+
+    Walks back from the last task to finish, each time following the
+    dependency that finished last (the one the task was waiting on).
+    """
+    if not spans:
+        return [], 0.0
+
+    current: Optional[str] = max(spans, key=lambda name: spans[name][1])
+    path: List[str] = []
+    while current is not None:
+        path.append(current)
+        deps = [dep for dep in dependencies.get(current, []) if dep in spans]
+        current = max(deps, key=lambda dep: spans[dep][1]) if deps else None
+    path.reverse()
+
+    return path, round(spans[path[-1]][1] - spans[path[0]][0], 2)
+
+
+def timing_report(
+    spans: Dict[str, Span], path: List[str], path_ms: float
+) -> Dict[str, Any]:
+    """Serializable per-task timing plus the critical path."""
+    return {
+        "critical_path": path,
+        "critical_path_ms": path_ms,
+        "tasks": {
+            name: {
+                "start_ms": round(start, 2),
+                "end_ms": round(end, 2),
+                "duration_ms": round(end - start, 2),
+            }
+            for name, (start, end) in spans.items()
+        },
+    }
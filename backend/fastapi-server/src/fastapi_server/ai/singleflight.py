@@ -0,0 +1,69 @@
+"""
+Request coalescing.
+Concurrent identical requests share a single execution ("singleflight").
+"""
+
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    Runs one execution per key at a time; callers arriving while it is in
+    flight wait for it and receive a copy of its result (or its exception).
+
+    The execution runs as its own task, so a caller that disconnects does not
+    cancel the run the other callers are waiting on.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        on_join: Optional[Callable[[], None]] = None,
+    ) -> Tuple[Any, bool]:
+        """
+        Run fn for key, or join the execution already in flight.
+
+        Args:
+            key: Identity of the request
+            fn: Coroutine function performing the work
+            on_join: Optional hook called when this caller joins a flight
+
+        Returns:
+            (result, shared) where shared is True for callers that joined
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            if on_join is not None:
+                on_join()
+            result = await asyncio.shield(flight)
+            # Every caller gets its own copy to mutate
+            return copy.deepcopy(result), True
+
+        self.executions += 1
+        flight = asyncio.ensure_future(fn())
+        self._flights[key] = flight
+        flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        return await asyncio.shield(flight), False
+
+    def get_stats(self) -> Dict[str, Any]:
+        requests = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._flights),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalescing_rate": (
+                round(self.coalesced / requests * 100, 2) if requests else 0
+            ),
+        }
@@ -3,11 +3,68 @@ Chat agent for processing user messages.
 Clean, simple implementation using AI crew.
 """
 
-import httpx
+import asyncio
 import json
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Union
 from .config import Config
 from .ai import DashboardCrew
+from .ai.deadline import Deadline, RunInterruptedError
+from .ai.execution import CrewExecutor
+from .ai.mcp_client import MCPError, data_preview_calls
+from .ai.response_cache import (
+    context_fingerprint,
+    create_response_cache,
+    normalize_message,
+)
+from .ai.run_context import EventSink, RunContext, SinkGroup, current_run
+from .ai.singleflight import SingleFlight
+
+# Crew used by process-pool workers; each worker process builds its own
+_worker_crew: Optional[DashboardCrew] = None
+
+
+def _get_worker_crew() -> DashboardCrew:
+    global _worker_crew
+    if _worker_crew is None:
+        _worker_crew = DashboardCrew()
+    return _worker_crew
+
+
+def warm_up_worker() -> None:
+    """Process pool initializer: build and warm this worker's crew."""
+    if Config.CREW_WARM_UP:
+        _get_worker_crew().warm_up()
+
+
+def run_crew_message(
+    message: str,
+    session_id: Optional[str] = None,
+    chat_history: Optional[List[Dict[str, Any]]] = None,
+    conversation_context: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Worker entry point for process pools: run a message through this process's crew."""
+    # Deadlines can't cross the process boundary, so the worker gets its own
+    run_token = current_run.set(RunContext(deadline=Deadline(timeout)))
+    try:
+        return _get_worker_crew().process_message(
+            message,
+            session_id=session_id,
+            chat_history=chat_history,
+            conversation_context=conversation_context,
+        )
+    finally:
+        current_run.reset(run_token)
+
+
+class _Flight:
+    """Shared state of a coalesced crew run: event sinks, deadline and waiters."""
+
+    def __init__(self, deadline: Deadline):
+        self.sinks = SinkGroup()
+        # Follows the latest waiter's deadline; cancelled once nobody waits
+        self.deadline = Deadline(deadline.remaining())
+        self.waiters = 0
 
 
 class ChatAgent:
@@ -16,12 +73,38 @@ class ChatAgent:
     def __init__(self):
         self.mcp_server_url = Config.MCP_SERVER_URL
         self.crew = DashboardCrew()
+        self.executor = CrewExecutor(
+            max_workers=Config.CREW_MAX_WORKERS,
+            kind=Config.CREW_EXECUTOR_KIND,
+            max_queue_size=Config.CREW_MAX_QUEUE_SIZE,
+            max_pending_per_session=Config.CREW_MAX_PENDING_PER_SESSION,
+            initializer=(
+                warm_up_worker if Config.CREW_EXECUTOR_KIND == "process" else None
+            ),
+        )
+        self.response_cache = (
+            create_response_cache(
+                backend=Config.RESPONSE_CACHE_BACKEND,
+                path=Config.RESPONSE_CACHE_PATH,
+                ttl_seconds=Config.RESPONSE_CACHE_TTL_SECONDS,
+                max_bytes=Config.RESPONSE_CACHE_MAX_BYTES,
+                max_entries=Config.RESPONSE_CACHE_MAX_ENTRIES,
+                similarity_threshold=Config.RESPONSE_CACHE_SIMILARITY,
+            )
+            if Config.RESPONSE_CACHE_ENABLED
+            else None
+        )
+        self.singleflight = SingleFlight() if Config.CHAT_COALESCING_ENABLED else None
+        self._flights: Dict[Tuple[str, str], _Flight] = {}
 
     async def process_message(
         self,
         message: str,
         session_id: Optional[str] = None,
         chat_history: Optional[List[Dict[str, Any]]] = None,
+        conversation_context: Optional[str] = None,
+        sink: Optional[EventSink] = None,
+        deadline: Optional[Deadline] = None,
     ) -> Dict[str, Any]:
         """
         Process user message using AI crew with chat history context.
@@ -29,47 +112,193 @@ class ChatAgent:
         Args:
             message: The user's natural language message
             session_id: Optional session ID for conversation tracking
-            chat_history: Optional list of previous chat messages
+            chat_history: Optional list of recent chat messages, newest first
+            conversation_context: Optional prebuilt prompt context (summary
+                plus recent turns); built from chat_history when omitted
+            sink: Optional sink receiving stage progress and response tokens
+                (only delivered with the thread executor)
+            deadline: Optional request deadline; cancelled when the caller goes away
 
         Returns:
-            Dict containing response, component_suggestion, and data
+            Dict containing response, component_suggestion, and data; marked
+            partial when the deadline cut the run short
+
+        Raises:
+            CrewBackpressureError: If the crew execution queue cannot admit the request
+            DeadlineExceededError: If the deadline passed before any stage finished
         """
-        return self.crew.process_message(
-            message, session_id=session_id, chat_history=chat_history
+        if deadline is None:
+            deadline = Deadline()
+        cache_context = self._cache_context(chat_history)
+        if self.response_cache is not None:
+            cached = await self.response_cache.get_async(message, cache_context)
+            if cached is not None:
+                print(f"⚡ Response cache hit for message: '{message}'")
+                if sink is not None:
+                    sink.emit("stage", {"stage": "cache", "status": "hit"})
+                return dict(cached, served_from="cache")
+
+        async def execute(
+            run_sink: Optional[Union[EventSink, SinkGroup]],
+            run_deadline: Deadline,
+        ) -> Dict[str, Any]:
+            # The crew is blocking, so it runs on the worker pool rather than the event loop
+            kwargs: Dict[str, Any] = {
+                "session_id": session_id,
+                "chat_history": chat_history,
+                "conversation_context": conversation_context,
+            }
+            if self.executor.kind == "process":
+                run = run_crew_message
+                kwargs["timeout"] = run_deadline.remaining()
+            else:
+                run = self.crew.process_message
+
+            # The executor copies this context into the worker thread
+            run_token = current_run.set(RunContext(run_sink, deadline=run_deadline))
+            try:
+                result = await self.executor.submit(session_id, run, message, **kwargs)
+            finally:
+                current_run.reset(run_token)
+
+            # Sample rows of the data behind a component request
+            intent = result.get("intent") or {}
+            if Config.MCP_PREVIEW_ROWS > 0 and intent and not result.get("data"):
+                data = await self._get_data_from_mcp(intent, run_deadline)
+                if data is not None:
+                    result["data"] = data
+
+            # Failed and partial runs aren't worth replaying; don't cache those
+            if (
+                self.response_cache is not None
+                and result.get("intent") is not None
+                and not result.get("partial")
+            ):
+                await self.response_cache.put_async(message, cache_context, result)
+            return result
+
+        if self.singleflight is None:
+            try:
+                return await execute(sink, deadline)
+            except asyncio.CancelledError:
+                # Worker threads can't be interrupted; tell the crew to stop early
+                deadline.cancel("client disconnected")
+                raise
+
+        # Identical concurrent requests share one crew run and its events
+        key = self._flight_key(message, cache_context)
+        if not self.singleflight.in_flight(key):
+            self._flights[key] = _Flight(deadline)
+        flight = self._flights.setdefault(key, _Flight(deadline))
+        flight.deadline.extend(deadline)
+        flight.waiters += 1
+        if sink is not None:
+            flight.sinks.add(sink)
+
+        def joined() -> None:
+            print(f"🔗 Coalesced with in-flight request for message: '{message}'")
+            if sink is not None:
+                sink.emit("stage", {"stage": "coalesced", "status": "joined"})
+
+        try:
+            result, shared = await self.singleflight.do(
+                key, lambda: execute(flight.sinks, flight.deadline), on_join=joined
+            )
+        except asyncio.CancelledError:
+            # The run keeps going for other waiters; stop it once the last one leaves
+            deadline.cancel("client disconnected")
+            flight.waiters -= 1
+            if flight.waiters == 0:
+                flight.deadline.cancel("all clients disconnected")
+            raise
+        finally:
+            if not self.singleflight.in_flight(key):
+                self._flights.pop(key, None)
+        if shared:
+            result["served_from"] = "coalesced"
+        return result
+
+    def _flight_key(self, message: str, cache_context: str) -> Tuple[str, str]:
+        return normalize_message(message), context_fingerprint(cache_context)
+
+    def _cache_context(self, chat_history: Optional[List[Dict[str, Any]]]) -> str:
+        """The part of the conversation that can change the answer to a message."""
+        recent = (chat_history or [])[: Config.RESPONSE_CACHE_CONTEXT_TURNS]
+        return "\n".join(
+            f"{chat.get('user_message', '')}|{chat.get('agent_response', '')}"
+            for chat in recent
         )
 
+    def warm_up(self) -> None:
+        """Build LLM clients and crews before the first request arrives."""
+        if self.executor.kind == "process":
+            # Workers warm themselves up in the pool initializer
+            return
+        self.crew.warm_up()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Runtime metrics for the chat pipeline."""
+        return {
+            "executor": self.executor.get_metrics(),
+            "registry": self.crew.registry.get_stats(),
+            "llm_providers": self.crew.llm_providers.get_stats(),
+            "llm_recorder": (
+                self.crew.llm_providers.recorder.get_stats()
+                if self.crew.llm_providers.recorder is not None
+                else {"mode": "off"}
+            ),
+            "response_cache": (
+                self.response_cache.get_stats()
+                if self.response_cache is not None
+                else {"enabled": False}
+            ),
+            "mcp": (
+                self.crew.mcp_client.get_stats()
+                if self.crew._mcp_client is not None
+                else {"connected": False}
+            ),
+            "router": (
+                self.crew.router.get_stats()
+                if Config.ROUTER_ENABLED
+                else {"enabled": False}
+            ),
+            "coalescing": (
+                self.singleflight.get_stats()
+                if self.singleflight is not None
+                else {"enabled": False}
+            ),
+        }
+
+    def shutdown(self) -> None:
+        """Release worker pool resources."""
+        self.executor.shutdown()
+        self.crew.shutdown()
+
     async def _get_data_from_mcp(
-        self, intent: Dict[str, Any]
+        self, intent: Dict[str, Any], deadline: Optional[Deadline] = None
     ) -> Optional[Dict[str, Any]]:
-        """Get data from MCP server based on intent."""
+        """
+        Preview the data behind an intent through the MCP server.
+
+        The layout and sample rows are fetched concurrently over the shared
+        client's pooled connections; repeated previews come from its cache.
+        Returns None when the data is unavailable or the deadline is too close.
+        """
+        calls = data_preview_calls(intent, Config.MCP_PREVIEW_ROWS)
+        if not calls:
+            return None
         try:
-            async with httpx.AsyncClient() as client:
-                if intent.get("data_source") == "mysql":
-                    return {
-                        "source": "mysql",
-                        "data": [{"id": 1, "value": 100}, {"id": 2, "value": 200}],
-                        "count": 2,
-                    }
-                elif intent.get("data_source") == "mongodb":
-                    return {
-                        "source": "mongodb",
-                        "data": [
-                            {"_id": "1", "value": 150},
-                            {"_id": "2", "value": 250},
-                        ],
-                        "count": 2,
-                    }
-                elif intent.get("data_source") == "csv":
-                    return {
-                        "source": "csv",
-                        "data": [{"row": 1, "value": 300}, {"row": 2, "value": 400}],
-                        "count": 2,
-                    }
-                else:
-                    return {
-                        "source": "mysql",
-                        "data": [{"id": 1, "value": 100}, {"id": 2, "value": 200}],
-                        "count": 2,
-                    }
-        except Exception as e:
+            results = await self.crew.mcp_client.acall_tools(calls, deadline=deadline)
+        except (MCPError, RunInterruptedError) as e:
+            print(f"⚠️ Data preview unavailable: {e}")
+            return None
+
+        # The sample (or listing) is the last call; the layout comes first
+        preview = results[-1]
+        if not isinstance(preview, dict) or preview.get("success") is False:
             return None
+        if len(results) > 1 and isinstance(results[0], dict):
+            layout = results[0].get("schema") or results[0].get("info")
+            if layout is not None:
+                preview = dict(preview, schema=layout)
+        return preview
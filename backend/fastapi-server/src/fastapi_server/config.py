@@ -7,10 +7,149 @@ load_dotenv()
 class Config:
     # Database Configuration
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./components.db")
+    # Serve requests through an async driver (aiosqlite, asyncpg) so queries don't block
+    # the event loop; false uses the blocking driver of DATABASE_URL
+    DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "true").lower() == "true"
+    # How chats are stored. immediate: a transaction per chat in the request; batched:
+    # requests wait for a transaction shared with concurrent chats (group commit);
+    # write_behind: return before the commit, losing queued chats if the process dies.
+    # write_behind hands out chat ids before the rows exist: from the id sequence on
+    # PostgreSQL, elsewhere from blocks reserved in the database. Servers sharing a
+    # SQLite or MySQL database must then all use write_behind, or none of them
+    CHAT_WRITE_MODE = os.getenv("CHAT_WRITE_MODE", "batched")
+    # Chat ids a write_behind server reserves at a time, without PostgreSQL
+    CHAT_ID_BLOCK_SIZE = int(os.getenv("CHAT_ID_BLOCK_SIZE", 100))
+    # A shared transaction is committed at this many chats, or this long after the first
+    CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", 100))
+    CHAT_WRITE_FLUSH_MS = float(os.getenv("CHAT_WRITE_FLUSH_MS", 10))
+    # Queued writes beyond this make new chats wait for room
+    CHAT_WRITE_MAX_PENDING = int(os.getenv("CHAT_WRITE_MAX_PENDING", 10000))
+    # Recent turns and rolling summary of active sessions, kept in memory and updated as
+    # chats are stored, so a session's next turn reads nothing from the database
+    HISTORY_CACHE_ENABLED = os.getenv("HISTORY_CACHE_ENABLED", "true").lower() == "true"
+    # Latest turns kept per session
+    HISTORY_CACHE_TURNS = int(os.getenv("HISTORY_CACHE_TURNS", 50))
+    HISTORY_CACHE_MAX_BYTES = int(
+        os.getenv("HISTORY_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+    )
+    HISTORY_CACHE_MAX_SESSIONS = int(os.getenv("HISTORY_CACHE_MAX_SESSIONS", 10000))
+    # Sessions idle this long are dropped
+    HISTORY_CACHE_TTL_SECONDS = int(os.getenv("HISTORY_CACHE_TTL_SECONDS", 1800))
+    # auto: the database's full-text index (SQLite FTS5, PostgreSQL tsvector); like: substring
+    CHAT_SEARCH_BACKEND = os.getenv("CHAT_SEARCH_BACKEND", "auto")
+    # Latency percentiles come from sketches kept per time bucket of this many seconds,
+    # accurate to this relative error; run rebuild_statistics.py after changing either
+    LATENCY_BUCKET_SECONDS = int(os.getenv("LATENCY_BUCKET_SECONDS", 3600))
+    LATENCY_SKETCH_ACCURACY = float(os.getenv("LATENCY_SKETCH_ACCURACY", 0.01))
 
     # MCP Server Configuration
     MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://localhost:8001")
+    MCP_SERVER_PATH = os.getenv("MCP_SERVER_PATH", "/mcp")
+    MCP_TIMEOUT_SECONDS = float(os.getenv("MCP_TIMEOUT_SECONDS", 10))
+    # tool:seconds, comma-separated; overrides MCP_TIMEOUT_SECONDS per tool
+    MCP_TOOL_TIMEOUTS = os.getenv("MCP_TOOL_TIMEOUTS", "")
+    MCP_MAX_CONNECTIONS = int(os.getenv("MCP_MAX_CONNECTIONS", 10))
+    # Successful tool results are reused for this long; 0 disables the cache
+    MCP_CACHE_TTL_SECONDS = float(os.getenv("MCP_CACHE_TTL_SECONDS", 300))
+    MCP_CACHE_MAX_ENTRIES = int(os.getenv("MCP_CACHE_MAX_ENTRIES", 1000))
+    # Give the data connector agent the MCP data tools
+    MCP_TOOLS_ENABLED = os.getenv("MCP_TOOLS_ENABLED", "true").lower() == "true"
+    # Sample rows fetched for a component's data preview; 0 disables previews
+    MCP_PREVIEW_ROWS = int(os.getenv("MCP_PREVIEW_ROWS", 5))
 
     # API Configuration
     API_HOST = os.getenv("API_HOST", "0.0.0.0")
     API_PORT = int(os.getenv("API_PORT", 8000))
+
+    # Crew Execution Configuration
+    CREW_EXECUTOR_KIND = os.getenv("CREW_EXECUTOR_KIND", "thread")  # thread or process
+    CREW_MAX_WORKERS = int(os.getenv("CREW_MAX_WORKERS", 4))
+    CREW_MAX_QUEUE_SIZE = int(os.getenv("CREW_MAX_QUEUE_SIZE", 32))
+    CREW_MAX_PENDING_PER_SESSION = int(os.getenv("CREW_MAX_PENDING_PER_SESSION", 2))
+    CREW_WARM_UP = os.getenv("CREW_WARM_UP", "true").lower() == "true"
+    # blocking: load the crew before serving; background: load it after startup;
+    # lazy: load it on the first chat request
+    WARM_START_MODE = os.getenv("WARM_START_MODE", "background")
+    # sequential runs tasks one after another; graph overlaps independent tasks
+    CREW_PROCESS = os.getenv("CREW_PROCESS", "sequential")
+    CREW_GRAPH_MAX_PARALLEL = int(os.getenv("CREW_GRAPH_MAX_PARALLEL", 3))
+
+    # LLM Configuration
+    LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() == "true"
+    OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL")
+    # Comma-separated provider/model strings tried after an agent's own llm
+    LLM_FALLBACKS = [
+        m.strip() for m in os.getenv("LLM_FALLBACKS", "").split(",") if m.strip()
+    ]
+    # provider:requests_per_second[:burst], comma-separated
+    LLM_RATE_LIMITS = os.getenv("LLM_RATE_LIMITS", "")
+    LLM_RATE_LIMIT_TIMEOUT_SECONDS = float(
+        os.getenv("LLM_RATE_LIMIT_TIMEOUT_SECONDS", 10)
+    )
+    LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "true").lower() == "true"
+    LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+    LLM_HEDGE_MIN_DELAY_MS = int(os.getenv("LLM_HEDGE_MIN_DELAY_MS", 500))
+    # Used until a provider has enough latency samples for a percentile
+    LLM_HEDGE_DEFAULT_DELAY_MS = int(os.getenv("LLM_HEDGE_DEFAULT_DELAY_MS", 8000))
+    LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", 5))
+    LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", 30))
+    LLM_POOL_MAX_WORKERS = int(os.getenv("LLM_POOL_MAX_WORKERS", 16))
+    # Use one model for every agent, e.g. "mock" for offline runs and benchmarks
+    LLM_MODEL_OVERRIDE = os.getenv("LLM_MODEL_OVERRIDE", "")
+    MOCK_LLM_SCRIPT = os.getenv("MOCK_LLM_SCRIPT", "")
+    MOCK_LLM_LATENCY_SCALE = float(os.getenv("MOCK_LLM_LATENCY_SCALE", 1.0))
+    MOCK_LLM_SEED = (
+        int(os.getenv("MOCK_LLM_SEED")) if os.getenv("MOCK_LLM_SEED") else None
+    )
+    # off, record (call and save), replay (saved only) or auto (replay, record misses)
+    LLM_RECORD_MODE = os.getenv("LLM_RECORD_MODE", "off").lower()
+    LLM_RECORDINGS_PATH = os.getenv("LLM_RECORDINGS_PATH", "./llm_recordings.db")
+
+    # Response Cache Configuration
+    RESPONSE_CACHE_ENABLED = (
+        os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    )
+    # memory or sqlite
+    RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "./response_cache.db")
+    RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 3600))
+    RESPONSE_CACHE_MAX_BYTES = int(
+        os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+    )
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 10000))
+    # Cosine similarity for near-duplicate hits; 0 disables the similarity lookup
+    RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", 0))
+    # Most recent turns of the conversation that are part of the cache key
+    RESPONSE_CACHE_CONTEXT_TURNS = int(os.getenv("RESPONSE_CACHE_CONTEXT_TURNS", 2))
+
+    # Share one crew run between identical concurrent requests
+    CHAT_COALESCING_ENABLED = (
+        os.getenv("CHAT_COALESCING_ENABLED", "true").lower() == "true"
+    )
+
+    # Request Deadline Configuration (seconds; 0 disables the default deadline)
+    CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", 120))
+    # Upper bound for deadlines asked for with the X-Request-Timeout header
+    CHAT_MAX_DEADLINE_SECONDS = float(os.getenv("CHAT_MAX_DEADLINE_SECONDS", 300))
+    # Runs with less time than this left use a lean profile without optional stages
+    CREW_LEAN_BUDGET_SECONDS = float(os.getenv("CREW_LEAN_BUDGET_SECONDS", 20))
+    CHAT_DISCONNECT_POLL_SECONDS = float(os.getenv("CHAT_DISCONNECT_POLL_SECONDS", 0.5))
+    CHAT_BATCH_MAX_MESSAGES = int(os.getenv("CHAT_BATCH_MAX_MESSAGES", 50))
+    # Messages of a batch run through the crew at once (per-session limits still apply)
+    CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", 4))
+
+    # Message Routing Configuration
+    ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+    ROUTER_MODEL_PATH = os.getenv("ROUTER_MODEL_PATH", "./routing_model.json")
+    # Most recent chats the routing classifier is retrained on at startup
+    ROUTER_TRAINING_LIMIT = int(os.getenv("ROUTER_TRAINING_LIMIT", 5000))
+
+    # Intent Fast Path Configuration
+    INTENT_FAST_PATH_ENABLED = (
+        os.getenv("INTENT_FAST_PATH_ENABLED", "true").lower() == "true"
+    )
+
+    # Conversation Context Configuration
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 800))
+    CONTEXT_VERBATIM_TURNS = int(os.getenv("CONTEXT_VERBATIM_TURNS", 3))
+    SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", 300))
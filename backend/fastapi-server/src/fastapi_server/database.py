@@ -1,19 +1,115 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Union
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 from .config import Config
 from .models import Base
 
+# Async driver per database; DATABASE_URL names the blocking one
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
 engine = create_engine(Config.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+def async_database_url(database_url: str) -> URL:
+    """
+    The URL of the same database through its async driver.
+
+    Raises:
+        ValueError: If there is no async driver for the database
+    """
+    url = make_url(database_url)
+    if url.drivername in ASYNC_DRIVERS.values():
+        return url
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(
+            f"No async driver for {backend} databases; set DATABASE_ASYNC=false"
+        )
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+if Config.DATABASE_ASYNC:
+    async_engine = create_async_engine(async_database_url(Config.DATABASE_URL))
+    # Rows outlive the commit that stored them; reloading them would need
+    # another round trip outside the session's async context
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+@asynccontextmanager
+async def open_db() -> AsyncIterator[Union[AsyncSession, Session]]:
+    """A session of the configured kind (see DATABASE_ASYNC), closed on exit."""
+    if Config.DATABASE_ASYNC:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def get_db():
+    async with open_db() as db:
         yield db
-    finally:
-        db.close()
 
 
 def create_tables():
+    from .repositories.chat_search import install_search_index
+    from .repositories.statistics_repository import StatisticsRepository
+
+    # Databases from before the running totals have chats but no totals yet
+    inspector = inspect(engine)
+    new_aggregates = not all(
+        inspector.has_table(table)
+        for table in ("chat_aggregates", "latency_sketch_bins")
+    )
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that exist; add indexes and nullable columns introduced since
+    _add_missing_columns()
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    install_search_index(engine, Config.CHAT_SEARCH_BACKEND)
+    if new_aggregates:
+        db = SessionLocal()
+        try:
+            StatisticsRepository().rebuild(db)
+            print("📊 Built statistics aggregates from stored rows")
+        finally:
+            db.close()
+
+
+def _add_missing_columns():
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                    )
+                )
+                print(f"🧱 Added column {table.name}.{column.name}")
+
+
+async def dispose_engines():
+    """Close pooled connections on shutdown."""
+    if Config.DATABASE_ASYNC:
+        await async_engine.dispose()
+    engine.dispose()
@@ -1,195 +1,459 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from datetime import datetime
 from typing import List, Optional
-import uvicorn
+import asyncio
+import json
 
-from .database import get_db, create_tables
+from .ai.deadline import Deadline
+from .database import get_db, create_tables, dispose_engines, open_db, SessionLocal
 from .models import Component, Chat
+from .repositories.base_repository import DbSession
 from .schemas import (
     ComponentCreate,
     ComponentUpdate,
     ComponentResponse,
+    ChatBatchRequest,
+    ChatBatchResponse,
     ChatRequest,
     ChatResponse,
     ChatHistoryResponse,
     ChatStatisticsResponse,
+    ChatStagesResponse,
+    StageBreakdownResponse,
+    LatencyStatisticsResponse,
 )
 from .services.component_service import ComponentService
 from .services.chat_service import ChatService
 from .config import Config
 
-# Create tables
-create_tables()
-
-app = FastAPI(title="Component Management API", version="1.0.0")
-
-# Create a proper ASGI application
-asgi_app = app
-
-# Initialize services
+# Initialize services; the chat agent behind ChatService is built on first use
 component_service = ComponentService()
 chat_service = ChatService()
 
-
-@app.get("/")
+router = APIRouter()
+
+
+def train_router():
+    db = SessionLocal()
+    try:
+        chat_service.train_router(db)
+    finally:
+        db.close()
+
+
+async def warm_start():
+    """Import and build the AI crew, retrain the router and warm up LLM clients."""
+    await chat_service.load_crew()
+    if Config.ROUTER_ENABLED:
+        try:
+            await asyncio.to_thread(train_router)
+        except Exception as e:
+            # The seed-trained classifier still routes
+            print(f"⚠️ Could not train routing classifier: {e}")
+    if Config.CREW_WARM_UP:
+        # Building LLM clients and crews is blocking, keep it off the event loop
+        await asyncio.to_thread(chat_service.crew.warm_up)
+
+
+async def background_warm_start():
+    try:
+        await warm_start()
+        print("🔥 Chat agent warmed up")
+    except Exception as e:
+        # The first chat request builds whatever is missing
+        print(f"⚠️ Background warm start failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    create_tables()
+    warm_up = None
+    if Config.WARM_START_MODE == "blocking":
+        await warm_start()
+    elif Config.WARM_START_MODE == "background":
+        # Serve requests that don't need the crew right away
+        warm_up = asyncio.create_task(background_warm_start())
+    yield
+    if warm_up is not None and not warm_up.done():
+        warm_up.cancel()
+    chat_service.shutdown()
+    # Queued chats are committed before the connections go
+    await chat_service.flush_writes()
+    await dispose_engines()
+
+
+def create_app() -> FastAPI:
+    """Build the API application; tables and the chat agent are set up by its lifespan."""
+    app = FastAPI(title="Component Management API", version="1.0.0", lifespan=lifespan)
+    app.include_router(router)
+    return app
+
+
+@router.get("/")
 async def root():
     return {"message": "Component Management API"}
 
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest, db: Session = Depends(get_db)):
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"
+
+
+def request_deadline(http_request: Request) -> Deadline:
+    """
+    Deadline for a chat request: the X-Request-Timeout header (seconds),
+    capped at CHAT_MAX_DEADLINE_SECONDS, else CHAT_DEADLINE_SECONDS.
+    """
+    timeout = Config.CHAT_DEADLINE_SECONDS
+    header = http_request.headers.get(REQUEST_TIMEOUT_HEADER)
+    if header is not None:
+        try:
+            timeout = float(header)
+        except ValueError:
+            raise HTTPException(
+                status_code=400, detail=f"Invalid {REQUEST_TIMEOUT_HEADER} header"
+            )
+        if timeout <= 0:
+            raise HTTPException(
+                status_code=400, detail=f"{REQUEST_TIMEOUT_HEADER} must be positive"
+            )
+        timeout = min(timeout, Config.CHAT_MAX_DEADLINE_SECONDS)
+    return Deadline(timeout if timeout > 0 else None)
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(
+    request: ChatRequest,
+    http_request: Request,
+    deadline: Deadline = Depends(request_deadline),
+    db: DbSession = Depends(get_db),
+):
     """
     Chat endpoint that processes natural language requests and suggests components.
     Stores chat history in database.
     """
     print(f"Chat request: {request}")
-    return await chat_service.process_chat_message(db, request, request.session_id)
+    return await run_until_disconnected(
+        http_request,
+        chat_service.process_chat_message(
+            db, request, request.session_id, deadline=deadline
+        ),
+    )
 
 
-@app.get("/chat/history/{session_id}", response_model=ChatHistoryResponse)
-async def get_chat_history(
-    session_id: str, limit: int = Query(50, ge=1, le=100), db: Session = Depends(get_db)
+async def run_until_disconnected(http_request: Request, coroutine):
+    """
+    Await a chat run, cancelling it when the client goes away instead of
+    finishing it.
+    """
+    task = asyncio.ensure_future(coroutine)
+    try:
+        while True:
+            done, _ = await asyncio.wait(
+                {task}, timeout=Config.CHAT_DISCONNECT_POLL_SECONDS
+            )
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                print("🔌 Client disconnected, cancelling chat request")
+                # Nginx's "client closed request"; nobody reads it
+                return Response(status_code=499)
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest, deadline: Deadline = Depends(request_deadline)
 ):
     """
-    Get chat history for a specific session.
+    Streaming variant of the chat endpoint using server-sent events.
+    Emits stage progress, then response tokens, then the stored result.
+    """
+
+    async def event_stream():
+        # The session must outlive the request handler, so the stream owns it
+        async with open_db() as db:
+            async for event in chat_service.stream_chat_message(
+                db, request, request.session_id, deadline=deadline
+            ):
+                payload = json.dumps(event["data"], default=str)
+                yield f"event: {event['event']}\ndata: {payload}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch(
+    request: ChatBatchRequest,
+    http_request: Request,
+    stream: bool = Query(False),
+    deadline: Deadline = Depends(request_deadline),
+    db: DbSession = Depends(get_db),
+):
     """
-    chats = chat_service.get_chat_history(db, session_id, limit)
-    return ChatHistoryResponse(
-        chats=chats, total_count=len(chats), session_id=session_id
+    Process several chat messages in one request.
+    With stream=true, results are sent as NDJSON lines as they complete,
+    followed by a "done" line with the stored chats.
+    """
+    chat_service.validate_batch(request)
+    if not stream:
+        return await run_until_disconnected(
+            http_request,
+            chat_service.process_chat_batch(db, request, deadline=deadline),
+        )
+
+    async def result_stream():
+        # The session must outlive the request handler, so the stream owns it
+        async with open_db() as db:
+            async for event in chat_service.stream_chat_batch(
+                db, request, deadline=deadline
+            ):
+                yield json.dumps(
+                    {"event": event["event"], **event["data"]}, default=str
+                ) + "\n"
+
+    return StreamingResponse(
+        result_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
-@app.get("/chat/statistics", response_model=ChatStatisticsResponse)
+@router.get("/chat/history/{session_id}", response_model=ChatHistoryResponse)
+async def get_chat_history(
+    session_id: str,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    db: DbSession = Depends(get_db),
+):
+    """
+    Get chat history for a specific session, newest first.
+    Pass the returned next_cursor as cursor to get the page after it.
+    """
+    history = await chat_service.get_chat_history(db, session_id, limit, cursor)
+    return ChatHistoryResponse(**history)
+
+
+@router.get("/chat/statistics", response_model=ChatStatisticsResponse)
 async def get_chat_statistics(
-    session_id: Optional[str] = Query(None), db: Session = Depends(get_db)
+    session_id: Optional[str] = Query(None), db: DbSession = Depends(get_db)
 ):
     """
     Get chat statistics.
     """
-    stats = chat_service.get_chat_statistics(db, session_id)
+    stats = await chat_service.get_chat_statistics(db, session_id)
     return ChatStatisticsResponse(**stats)
 
 
-@app.get("/chat/search")
+@router.get("/chat/statistics/stages", response_model=StageBreakdownResponse)
+async def get_stage_breakdown(
+    session_id: Optional[str] = Query(None), db: DbSession = Depends(get_db)
+):
+    """
+    Get latency, token usage and retries per crew stage, the slowest stage first.
+    """
+    breakdown = await chat_service.get_stage_breakdown(db, session_id)
+    return StageBreakdownResponse(**breakdown)
+
+
+@router.get("/chat/statistics/latency", response_model=LatencyStatisticsResponse)
+async def get_latency_statistics(
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    model_used: Optional[str] = Query(None),
+    pipeline: Optional[str] = Query(None),
+    group_by: Optional[str] = Query(None),
+    db: DbSession = Depends(get_db),
+):
+    """
+    Get p50/p90/p99 processing times over a window (default: the last day).
+
+    Filter by model_used or pipeline, or break down by group_by=model or pipeline.
+    """
+    latency = await chat_service.get_latency_statistics(
+        db, start, end, model_used, pipeline, group_by
+    )
+    return LatencyStatisticsResponse(**latency)
+
+
+@router.get("/chat/metrics")
+async def get_chat_metrics():
+    """
+    Get runtime metrics for chat processing (queue depth, wait times).
+    """
+    return chat_service.get_runtime_metrics()
+
+
+@router.get("/chat/search")
 async def search_chats(
     search_term: str = Query(..., min_length=1),
     session_id: Optional[str] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None),
+    db: DbSession = Depends(get_db),
 ):
     """
-    Search chats by user message or agent response.
+    Full-text search of chats by user message or agent response, best match first.
+    Supports "quoted phrases" and prefix* terms; matches are highlighted.
+    Page with skip, or with the returned next_cursor as cursor.
     """
-    chats = chat_service.search_chats(db, search_term, session_id, skip, limit)
-    return {"chats": chats, "total": len(chats)}
+    page = await chat_service.search_chats(
+        db, search_term, session_id, skip, limit, cursor
+    )
+    return {
+        "chats": page.items,
+        "total": len(page.items),
+        "next_cursor": page.next_cursor,
+    }
 
 
-@app.get("/chat/{chat_id}")
-async def get_chat(chat_id: int, db: Session = Depends(get_db)):
+@router.get("/chat/{chat_id}")
+async def get_chat(chat_id: int, db: DbSession = Depends(get_db)):
     """
     Get a specific chat by ID.
     """
-    return chat_service.get_chat_by_id(db, chat_id)
+    return await chat_service.get_chat_by_id(db, chat_id)
+
+
+@router.get("/chat/{chat_id}/stages", response_model=ChatStagesResponse)
+async def get_chat_stages(chat_id: int, db: DbSession = Depends(get_db)):
+    """
+    Get the per-stage timings and token usage of a specific chat.
+    """
+    stages = await chat_service.get_chat_stages(db, chat_id)
+    if stages is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    return ChatStagesResponse(**stages)
 
 
-@app.delete("/chat/{chat_id}")
-async def delete_chat(chat_id: int, db: Session = Depends(get_db)):
+@router.delete("/chat/{chat_id}")
+async def delete_chat(chat_id: int, db: DbSession = Depends(get_db)):
     """
     Delete a specific chat.
     """
-    return chat_service.delete_chat(db, chat_id)
+    return await chat_service.delete_chat(db, chat_id)
 
 
-@app.post("/components", response_model=ComponentResponse)
-async def create_component(component: ComponentCreate, db: Session = Depends(get_db)):
+@router.post("/components", response_model=ComponentResponse)
+async def create_component(component: ComponentCreate, db: DbSession = Depends(get_db)):
     """
     Create a new component.
     """
-    return component_service.create_component(db, component)
+    return await component_service.create_component(db, component)
 
 
-@app.get("/components", response_model=List[ComponentResponse])
+@router.get("/components", response_model=List[ComponentResponse])
 async def get_components(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None),
+    db: DbSession = Depends(get_db),
 ):
     """
-    Get all components with pagination.
+    Get all components with pagination, newest first.
+    The cursor of the next page is sent in the X-Next-Cursor header.
     """
-    return component_service.get_components(db, skip, limit)
+    page = await component_service.get_components(db, skip, limit, cursor)
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
 
 
-@app.get("/components/{component_id}", response_model=ComponentResponse)
-async def get_component(component_id: int, db: Session = Depends(get_db)):
+@router.get("/components/search")
+async def search_components(
+    search_term: str = Query(..., min_length=1),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    db: DbSession = Depends(get_db),
+):
     """
-    Get a specific component by ID.
+    Search components by name or description, newest first.
     """
-    return component_service.get_component(db, component_id)
+    page = await component_service.search_components(
+        db, search_term, skip, limit, cursor
+    )
+    return {
+        "components": page.items,
+        "total": len(page.items),
+        "next_cursor": page.next_cursor,
+    }
 
 
-@app.put("/components/{component_id}", response_model=ComponentResponse)
-async def update_component(
-    component_id: int, component: ComponentUpdate, db: Session = Depends(get_db)
+@router.get("/components/recent", response_model=List[ComponentResponse])
+async def get_recent_components(
+    limit: int = Query(10, ge=1, le=50), db: DbSession = Depends(get_db)
 ):
     """
-    Update a component.
+    Get recently created components.
     """
-    return component_service.update_component(db, component_id, component)
+    return await component_service.get_recent_components(db, limit)
 
 
-@app.delete("/components/{component_id}")
-async def delete_component(component_id: int, db: Session = Depends(get_db)):
+@router.get("/components/statistics")
+async def get_component_statistics(db: DbSession = Depends(get_db)):
     """
-    Delete a component.
+    Get component statistics.
     """
-    return component_service.delete_component(db, component_id)
+    return await component_service.get_component_statistics(db)
 
 
-@app.get("/components/type/{component_type}", response_model=List[ComponentResponse])
-async def get_components_by_type(component_type: str, db: Session = Depends(get_db)):
+@router.get("/components/{component_id}", response_model=ComponentResponse)
+async def get_component(component_id: int, db: DbSession = Depends(get_db)):
     """
-    Get components by type (chart, table, metric, etc.).
+    Get a specific component by ID.
     """
-    return component_service.get_components_by_type(db, component_type)
+    return await component_service.get_component(db, component_id)
 
 
-@app.get("/components/source/{data_source}", response_model=List[ComponentResponse])
-async def get_components_by_source(data_source: str, db: Session = Depends(get_db)):
+@router.put("/components/{component_id}", response_model=ComponentResponse)
+async def update_component(
+    component_id: int, component: ComponentUpdate, db: DbSession = Depends(get_db)
+):
     """
-    Get components by data source (mysql, mongodb, csv).
+    Update a component.
     """
-    return component_service.get_components_by_source(db, data_source)
+    return await component_service.update_component(db, component_id, component)
 
 
-@app.get("/components/search")
-async def search_components(
-    search_term: str = Query(..., min_length=1),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db),
-):
+@router.delete("/components/{component_id}")
+async def delete_component(component_id: int, db: DbSession = Depends(get_db)):
     """
-    Search components by name or description.
+    Delete a component.
     """
-    components = component_service.search_components(db, search_term, skip, limit)
-    return {"components": components, "total": len(components)}
+    return await component_service.delete_component(db, component_id)
 
 
-@app.get("/components/recent", response_model=List[ComponentResponse])
-async def get_recent_components(
-    limit: int = Query(10, ge=1, le=50), db: Session = Depends(get_db)
-):
+@router.get("/components/type/{component_type}", response_model=List[ComponentResponse])
+async def get_components_by_type(component_type: str, db: DbSession = Depends(get_db)):
     """
-    Get recently created components.
+    Get components by type (chart, table, metric, etc.).
     """
-    return component_service.get_recent_components(db, limit)
+    return await component_service.get_components_by_type(db, component_type)
 
 
-@app.get("/components/statistics")
-async def get_component_statistics(db: Session = Depends(get_db)):
+@router.get("/components/source/{data_source}", response_model=List[ComponentResponse])
+async def get_components_by_source(data_source: str, db: DbSession = Depends(get_db)):
     """
-    Get component statistics.
+    Get components by data source (mysql, mongodb, csv).
     """
-    return component_service.get_component_statistics(db)
+    return await component_service.get_components_by_source(db, data_source)
+
+
+app = create_app()
+
+# Create a proper ASGI application
+asgi_app = app
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=Config.API_HOST, port=Config.API_PORT)
@@ -1,4 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Integer,
+    Float,
+    String,
+    Text,
+    DateTime,
+    JSON,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from typing import Optional, Dict, Any
@@ -8,6 +20,8 @@ Base = declarative_base()
 
 class Component(Base):
     __tablename__ = "components"
+    # Keyset pagination walks (created_at, id)
+    __table_args__ = (Index("ix_components_created_at_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False, index=True)
@@ -39,6 +53,11 @@ class Component(Base):
 
 class Chat(Base):
     __tablename__ = "chats"
+    # Keyset pagination walks (created_at, id), within a session for the history
+    __table_args__ = (
+        Index("ix_chats_session_id_created_at_id", "session_id", "created_at", "id"),
+        Index("ix_chats_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String(255), nullable=False, index=True)
@@ -49,6 +68,8 @@ class Chat(Base):
     data_preview = Column(JSON, nullable=True)  # Data preview if any
     processing_time = Column(Integer, nullable=True)  # Processing time in milliseconds
     model_used = Column(String(100), nullable=True)  # Which model was used
+    # How the answer was produced: a crew profile, "direct", "cache" or "coalesced"
+    pipeline = Column(String(50), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     def to_dict(self) -> Dict[str, Any]:
@@ -62,5 +83,147 @@ class Chat(Base):
             "data_preview": self.data_preview,
             "processing_time": self.processing_time,
             "model_used": self.model_used,
+            "pipeline": self.pipeline,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
+
+
+class ChatSummary(Base):
+    __tablename__ = "chat_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String(255), nullable=False, unique=True, index=True)
+    facts = Column(JSON, nullable=True)  # Components requested in the session
+    turns = Column(JSON, nullable=True)  # Gists of the most recent turns
+    turn_count = Column(Integer, nullable=False, default=0)
+    last_chat_id = Column(Integer, nullable=True)  # Last chat folded into the summary
+    token_count = Column(Integer, nullable=True)  # Size of the rendered summary
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "session_id": self.session_id,
+            "facts": self.facts or [],
+            "turns": self.turns or [],
+            "turn_count": self.turn_count,
+            "last_chat_id": self.last_chat_id,
+            "token_count": self.token_count,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class ChatStage(Base):
+    __tablename__ = "chat_stages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chat_id = Column(Integer, ForeignKey("chats.id"), nullable=False, index=True)
+    stage = Column(String(100), nullable=False, index=True)  # Task name, or "queue"
+    start_ms = Column(Float, nullable=True)  # Offset from the start of the request
+    duration_ms = Column(Float, nullable=False, default=0)
+    llm_calls = Column(Integer, nullable=False, default=0)
+    llm_ms = Column(Float, nullable=False, default=0)  # Time spent waiting on models
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    retries = Column(
+        Integer, nullable=False, default=0
+    )  # Hedged and failed-over requests
+    model_used = Column(String(100), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "chat_id": self.chat_id,
+            "stage": self.stage,
+            "start_ms": self.start_ms,
+            "duration_ms": self.duration_ms,
+            "llm_calls": self.llm_calls,
+            "llm_ms": self.llm_ms,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "retries": self.retries,
+            "model_used": self.model_used,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class IdBlock(Base):
+    """
+    High-water mark of the ids reserved for a table's future rows.
+
+    Used where the database has no sequence (see ChatIdAllocator): reserving
+    a block moves next_id past it, so blocks reserved by different processes
+    never overlap.
+    """
+
+    __tablename__ = "id_blocks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    table_name = Column(String(100), nullable=False, unique=True)
+    next_id = Column(BigInteger, nullable=False)  # First id not reserved yet
+
+
+class ChatAggregate(Base):
+    """Running chat totals of a scope: "all" chats or "session:<session_id>"."""
+
+    __tablename__ = "chat_aggregates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(300), nullable=False, unique=True)
+    chat_count = Column(Integer, nullable=False, default=0)
+    processing_time_sum = Column(BigInteger, nullable=False, default=0)  # Milliseconds
+    processing_time_count = Column(Integer, nullable=False, default=0)  # Chats timed
+    suggestion_count = Column(Integer, nullable=False, default=0)
+
+
+class StageAggregate(Base):
+    """Running totals of one crew stage within a scope (see ChatAggregate)."""
+
+    __tablename__ = "stage_aggregates"
+    __table_args__ = (UniqueConstraint("scope", "stage"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(300), nullable=False)
+    stage = Column(String(100), nullable=False)
+    runs = Column(Integer, nullable=False, default=0)
+    duration_ms_sum = Column(Float, nullable=False, default=0)
+    llm_calls = Column(Integer, nullable=False, default=0)
+    llm_ms_sum = Column(Float, nullable=False, default=0)
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    retries = Column(Integer, nullable=False, default=0)
+
+
+class ComponentAggregate(Base):
+    """Number of components per value of a dimension ("all", component_type, data_source)."""
+
+    __tablename__ = "component_aggregates"
+    __table_args__ = (UniqueConstraint("dimension", "value"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    dimension = Column(String(50), nullable=False)
+    value = Column(String(100), nullable=False)
+    component_count = Column(Integer, nullable=False, default=0)
+
+
+class LatencySketchBin(Base):
+    """
+    Chats of one latency sketch bin (see LatencySketch) in a time bucket.
+
+    Each bucket holds a sketch of all chats ("all"), one per model_used and
+    one per pipeline, so percentiles of any window are summed from its buckets.
+    """
+
+    __tablename__ = "latency_sketch_bins"
+    # Windows are read per dimension and value, then by bucket
+    __table_args__ = (UniqueConstraint("dimension", "value", "bucket_start", "bin"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    dimension = Column(String(50), nullable=False)  # "all", "model" or "pipeline"
+    value = Column(String(100), nullable=False)
+    bucket_start = Column(BigInteger, nullable=False)  # Unix time in seconds
+    bin = Column(Integer, nullable=False)
+    chat_count = Column(Integer, nullable=False, default=0)
@@ -4,8 +4,12 @@ Repository layer for data access.
 
 from .component_repository import ComponentRepository
 from .chat_repository import ChatRepository
+from .summary_repository import SummaryRepository
+from .stage_repository import StageRepository
 
 __all__ = [
     "ComponentRepository",
-    "ChatRepository"
+    "ChatRepository",
+    "SummaryRepository",
+    "StageRepository"
 ] 
\ No newline at end of file
@@ -2,12 +2,35 @@
 Base repository class with common CRUD operations.
 """
 
-from typing import Generic, TypeVar, Type, Optional, List, Any, Dict
+from typing import Generic, TypeVar, Type, Optional, List, Any, Dict, Callable, Union
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from fastapi_server.models import Base
+from .pagination import Page, listing_key, paginate
 
 ModelType = TypeVar("ModelType", bound=Base)
+ResultType = TypeVar("ResultType")
+# What request handlers get from get_db, depending on DATABASE_ASYNC
+DbSession = Union[AsyncSession, Session]
+
+
+async def run_db(
+    db: DbSession,
+    operation: Callable[..., ResultType],
+    *args: Any,
+    **kwargs: Any
+) -> ResultType:
+    """
+    Run a repository operation, written against a Session, on either kind of session.
+
+    On an AsyncSession the operation runs through run_sync: its queries go
+    through the async driver and the event loop serves other requests while
+    they wait. On a Session it runs directly and blocks as it always has.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(operation, *args, **kwargs)
+    return operation(db, *args, **kwargs)
 
 
 class BaseRepository(Generic[ModelType]):
@@ -45,6 +68,29 @@ class BaseRepository(Generic[ModelType]):
         
         return query.offset(skip).limit(limit).all()
     
+    def get_page(
+        self,
+        db: Session,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Page[ModelType]:
+        """
+        Get a newest-first page of records and the cursor of the next one.
+
+        Pass either the cursor of the previous page or an offset (skip).
+        """
+        query = db.query(self.model)
+        
+        if filters:
+            for field, value in filters.items():
+                if hasattr(self.model, field):
+                    query = query.filter(getattr(self.model, field) == value)
+        
+        listing = listing_key(self.model.__tablename__, filters)
+        return paginate(query, self.model, listing, limit, cursor, skip)
+    
     def update(
         self, 
         db: Session, 
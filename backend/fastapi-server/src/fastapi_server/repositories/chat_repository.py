@@ -2,11 +2,16 @@
 Chat repository for chat-specific database operations.
 """
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from fastapi_server.models import Chat
+from fastapi_server.models import Chat, ChatStage, IdBlock
 from .base_repository import BaseRepository
-from sqlalchemy import func
+from .chat_search import get_search_index
+from .pagination import Page, encode_cursor, listing_key, page_of, paginate
+from .stage_repository import build_stages
+from .statistics_repository import StatisticsRepository
+from sqlalchemy import case, func
 
 
 class ChatRepository(BaseRepository[Chat]):
@@ -14,6 +19,138 @@ class ChatRepository(BaseRepository[Chat]):
 
     def __init__(self):
         super().__init__(Chat)
+        self.statistics = StatisticsRepository()
+
+    def create_many(
+        self,
+        db: Session,
+        chats_data: List[Dict[str, Any]],
+        timings: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> List[Chat]:
+        """
+        Create chats, and the stage rows of their crew runs, in one transaction.
+
+        Args:
+            db: Database session
+            chats_data: Column values of each chat
+            timings: Optional crew timing report per chat (None to store no stages)
+        """
+        try:
+            chats = self._add_many(db, chats_data, timings)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return chats
+
+    def insert_many(
+        self,
+        db: Session,
+        chats_data: List[Dict[str, Any]],
+        timings: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Like create_many, but return the new chats as dicts instead of the rows.
+
+        Ids and created_at are known once the rows are flushed (read back with
+        RETURNING where the database supports it), so nothing is read after
+        the commit.
+        """
+        try:
+            chats = [chat.to_dict() for chat in self._add_many(db, chats_data, timings)]
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return chats
+
+    def _add_many(
+        self,
+        db: Session,
+        chats_data: List[Dict[str, Any]],
+        timings: Optional[List[Optional[Dict[str, Any]]]],
+    ) -> List[Chat]:
+        chats = [Chat(**data) for data in chats_data]
+        db.add_all(chats)
+        # Assigns the chat ids the stage rows point at
+        db.flush()
+        stages = []
+        for chat, timing in zip(chats, timings or []):
+            if timing:
+                stages.extend(build_stages(chat.id, timing))
+        db.add_all(stages)
+        self.statistics.record_chats(db, chats)
+        self.statistics.record_stages(
+            db, stages, {chat.id: chat.session_id for chat in chats}
+        )
+        return chats
+
+    def delete(self, db: Session, id: int) -> bool:
+        """Delete a chat and its stage rows, and take them out of the statistics."""
+        chat = self.get(db, id)
+        if chat is None:
+            return False
+        stages = db.query(ChatStage).filter(ChatStage.chat_id == id).all()
+        try:
+            self.statistics.record_chats(db, [chat], sign=-1)
+            self.statistics.record_stages(
+                db, stages, {chat.id: chat.session_id}, sign=-1
+            )
+            for stage in stages:
+                db.delete(stage)
+            db.delete(chat)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return True
+
+    def get_max_id(self, db: Session) -> int:
+        """Get the highest chat id in use (0 without chats)."""
+        return db.query(func.max(Chat.id)).scalar() or 0
+
+    def reserve_id_block(self, db: Session, size: int) -> int:
+        """
+        Reserve size chat ids for rows written later, and commit.
+
+        The block starts past both the ids reserved before and the ids
+        stored, and is moved past in a single UPDATE, which holds the row (on
+        SQLite, the database) until the commit; concurrent reservations, from
+        this process or another, wait and get the next block.
+
+        Returns:
+            The first id of the block
+        """
+        stored_max = db.query(func.coalesce(func.max(Chat.id), 0) + 1).scalar_subquery()
+        start = case((IdBlock.next_id > stored_max, IdBlock.next_id), else_=stored_max)
+        try:
+            reserved = (
+                db.query(IdBlock)
+                .filter(IdBlock.table_name == Chat.__tablename__)
+                .update({IdBlock.next_id: start + size}, synchronize_session=False)
+            )
+            if not reserved:
+                db.add(
+                    IdBlock(
+                        table_name=Chat.__tablename__,
+                        next_id=self.get_max_id(db) + 1 + size,
+                    )
+                )
+                db.flush()
+            next_id = (
+                db.query(IdBlock.next_id)
+                .filter(IdBlock.table_name == Chat.__tablename__)
+                .scalar()
+            )
+            db.commit()
+        except IntegrityError:
+            # Another process added the row first; reserve from it
+            db.rollback()
+            return self.reserve_id_block(db, size)
+        except Exception:
+            db.rollback()
+            raise
+        return next_id - size
 
     def get_by_session_id(
         self, db: Session, session_id: str, limit: int = 50
@@ -27,6 +164,32 @@ class ChatRepository(BaseRepository[Chat]):
             .all()
         )
 
+    def get_history_page(
+        self,
+        db: Session,
+        session_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Page[Chat]:
+        """Get a newest-first page of a session's chats and the cursor of the next one."""
+        query = db.query(Chat).filter(Chat.session_id == session_id)
+        listing = listing_key("chat-history", session_id)
+        return paginate(query, Chat, listing, limit, cursor)
+
+    def history_page_of(
+        self, session_id: str, chats: List[Dict[str, Any]], limit: int
+    ) -> Page[Dict[str, Any]]:
+        """
+        First history page from a session's latest chats as dicts, newest first.
+
+        Pass limit + 1 chats (or all of them) to learn whether there is a next
+        page; its cursor is the one get_history_page would return.
+        """
+        listing = listing_key("chat-history", session_id)
+        return page_of(
+            chats[: limit + 1], limit, lambda chat: encode_cursor(listing, [chat["id"]])
+        )
+
     def get_by_session(self, db: Session, session_id: str) -> List[Chat]:
         """Get all chats for a specific session."""
         return (
@@ -39,11 +202,21 @@ class ChatRepository(BaseRepository[Chat]):
     def get_recent_chats(
         self, db: Session, session_id: str, limit: int = 10
     ) -> List[Chat]:
-        """Get recent chats for a session."""
+        """Get recent chats for a session, newest first."""
         return (
             db.query(Chat)
             .filter(Chat.session_id == session_id)
-            .order_by(Chat.created_at.desc())
+            # created_at has one-second resolution; id breaks ties
+            .order_by(Chat.created_at.desc(), Chat.id.desc())
+            .limit(limit)
+            .all()
+        )
+
+    def get_latest_chats(self, db: Session, limit: int = 1000) -> List[Chat]:
+        """Get the most recent chats across all sessions, newest first."""
+        return (
+            db.query(Chat)
+            .order_by(Chat.created_at.desc(), Chat.id.desc())
             .limit(limit)
             .all()
         )
@@ -68,33 +241,40 @@ class ChatRepository(BaseRepository[Chat]):
             .all()
         )
 
-    def get_slow_chats(self, db: Session, threshold_ms: int = 5000) -> List[Chat]:
-        """Get chats that took longer than threshold to process."""
+    def get_slow_chats(
+        self, db: Session, threshold_ms: int = 5000, limit: int = 100
+    ) -> List[Chat]:
+        """
+        Get the slowest chats that took longer than threshold to process.
+
+        For latency percentiles use StatisticsRepository.get_latency_sketches,
+        which reads no chat rows.
+        """
         return (
             db.query(Chat)
             .filter(Chat.processing_time > threshold_ms)
             .order_by(Chat.processing_time.desc())
+            .limit(limit)
             .all()
         )
 
     def get_chat_statistics(
         self, db: Session, session_id: Optional[str] = None
     ) -> dict:
-        """Get statistics for chats."""
-        query = db.query(Chat)
-
-        if session_id:
-            query = query.filter(Chat.session_id == session_id)
-
-        total_chats = query.count()
-        avg_processing_time = db.query(func.avg(Chat.processing_time)).scalar() or 0
-        chats_with_suggestions = query.filter(
-            Chat.component_suggestion.isnot(None)
-        ).count()
+        """Get statistics for chats, from the running totals (no table scan)."""
+        totals = self.statistics.get_chat_totals(db, session_id)
+        total_chats = totals["chat_count"]
+        chats_with_suggestions = totals["suggestion_count"]
 
         return {
             "total_chats": total_chats,
-            "average_processing_time_ms": round(avg_processing_time, 2),
+            "average_processing_time_ms": (
+                round(
+                    totals["processing_time_sum"] / totals["processing_time_count"], 2
+                )
+                if totals["processing_time_count"]
+                else 0
+            ),
             "chats_with_suggestions": chats_with_suggestions,
             "suggestion_rate": (
                 round((chats_with_suggestions / total_chats * 100), 2)
@@ -123,14 +303,15 @@ class ChatRepository(BaseRepository[Chat]):
         session_id: Optional[str] = None,
         skip: int = 0,
         limit: int = 100,
-    ) -> List[Chat]:
-        """Search chats by user message or agent response."""
-        query = db.query(Chat).filter(
-            (Chat.user_message.ilike(f"%{search_term}%"))
-            | (Chat.agent_response.ilike(f"%{search_term}%"))
-        )
+        cursor: Optional[str] = None,
+    ) -> Page[Dict[str, Any]]:
+        """
+        Full-text search over user messages and agent responses, best match first.
 
-        if session_id:
-            query = query.filter(Chat.session_id == session_id)
-
-        return query.offset(skip).limit(limit).order_by(Chat.created_at.desc()).all()
+        Returns a page of chat dicts with a relevance "score" and "highlights"
+        of the matched fields (see chat_search.parse_search_query for the query
+        syntax), and the cursor of the next page.
+        """
+        return get_search_index(db).search(
+            db, search_term, session_id, skip, limit, cursor
+        )
@@ -0,0 +1,444 @@
+"""
+Full-text search over stored chats.
+
+SQLite databases get an FTS5 index kept in sync with the chats table by
+triggers; PostgreSQL gets a GIN index over a tsvector expression. Other
+databases, and SQLite builds without FTS5, fall back to substring matching.
+"""
+
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import URL, Connection, Engine
+from sqlalchemy.orm import Session
+
+from fastapi_server.models import Chat
+from .pagination import (
+    InvalidCursorError,
+    Page,
+    decode_position,
+    encode_cursor,
+    listing_key,
+    page_of,
+    paginate,
+)
+
+# Markers around matched terms in highlights
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+# Tokens of context kept around matches in a highlight
+SNIPPET_TOKENS = 16
+
+_QUERY_TERM = re.compile(r'"([^"]*)"|(\S+)')
+_WORD = re.compile(r"\w+", re.UNICODE)
+# How the unicode61 tokenizer splits session ids
+_TOKEN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+class SearchTerm:
+    """One term of a search query: a word or phrase, optionally a prefix."""
+
+    def __init__(self, words: List[str], prefix: bool = False):
+        self.words = words
+        self.prefix = prefix
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, SearchTerm)
+            and self.words == other.words
+            and self.prefix == other.prefix
+        )
+
+    def __repr__(self) -> str:
+        return f"SearchTerm({self.words!r}, prefix={self.prefix})"
+
+
+def parse_search_query(query: str) -> List[SearchTerm]:
+    """
+    Parse user search input into terms that must all match.
+
+    Words match anywhere, "quoted words" match as a phrase, and a trailing *
+    (word* or "some phrase"*) makes the last word a prefix. Punctuation is
+    dropped, so input can never inject query syntax.
+    """
+    terms = []
+    for match in _QUERY_TERM.finditer(query or ""):
+        phrase, word = match.groups()
+        raw = phrase if phrase is not None else word
+        prefix = word is not None and word.endswith("*")
+        if phrase is not None:
+            prefix = query[match.end() : match.end() + 1] == "*"
+        words = _WORD.findall(raw.lower())
+        if not words:
+            continue
+        if phrase is None and len(words) > 1:
+            # "sales-report" is searched as two words, like the tokenizer sees it
+            terms.extend(SearchTerm([w]) for w in words[:-1])
+            words = words[-1:]
+        terms.append(SearchTerm(words, prefix))
+    return terms
+
+
+def fts5_query(terms: List[SearchTerm]) -> str:
+    """FTS5 MATCH expression: quoted phrases, implicitly ANDed."""
+    return " ".join(
+        '"' + " ".join(term.words) + '"' + ("*" if term.prefix else "")
+        for term in terms
+    )
+
+
+def tsquery(terms: List[SearchTerm]) -> str:
+    """PostgreSQL to_tsquery expression: phrases with <->, terms ANDed."""
+    parts = []
+    for term in terms:
+        words = list(term.words)
+        if term.prefix:
+            words[-1] += ":*"
+        parts.append(" <-> ".join(words) if len(words) > 1 else words[0])
+    return " & ".join(parts)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class ChatSearchIndex:
+    """
+    Substring search, for databases without a full-text index.
+
+    Subclasses install and query a real index; every variant returns pages of
+    hits as chat dicts with a "score" (higher is better) and "highlights".
+    Substring hits come newest first and page by (created_at, id); ranked hits
+    page by (score, id), so a cursor can skip rows or repeat them if chats are
+    added in between and shift the scores.
+    """
+
+    name = "like"
+
+    def install(self, connection: Connection) -> None:
+        """Create the index and whatever keeps it in sync (idempotent)."""
+
+    def search(
+        self,
+        db: Session,
+        query: str,
+        session_id: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Page[Dict[str, Any]]:
+        """
+        Page of hits, best first, with the cursor of the next page.
+
+        Raises:
+            InvalidCursorError: If the cursor isn't one this search returned
+        """
+        terms = parse_search_query(query)
+        if not terms:
+            return Page([])
+        matches = db.query(Chat)
+        for term in terms:
+            pattern = f"%{_escape_like(' '.join(term.words))}%"
+            matches = matches.filter(
+                Chat.user_message.ilike(pattern, escape="\\")
+                | Chat.agent_response.ilike(pattern, escape="\\")
+            )
+        if session_id:
+            matches = matches.filter(Chat.session_id == session_id)
+        page = paginate(
+            matches, Chat, self._listing(query, session_id), limit, cursor, skip
+        )
+        return Page([_hit(chat, None, {}) for chat in page.items], page.next_cursor)
+
+    def _listing(self, query: str, session_id: Optional[str]) -> str:
+        return listing_key(f"chat-search-{self.name}", query, session_id)
+
+
+class SqliteFtsIndex(ChatSearchIndex):
+    """
+    FTS5 external-content index over user_message and agent_response.
+
+    The index stores only the tokens; triggers on the chats table keep it in
+    sync, and results are ranked by BM25 with user messages weighted higher.
+    session_id is indexed too (with no weight), so a session filter narrows the
+    match inside the index instead of after scanning every hit.
+    """
+
+    name = "fts5"
+
+    COLUMNS = ("user_message", "agent_response", "session_id")
+
+    def install(self, connection: Connection) -> None:
+        exists = connection.execute(
+            text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chats_fts'"
+            )
+        ).first()
+        if exists:
+            return
+        columns = ", ".join(self.COLUMNS)
+        new_values = ", ".join(f"new.{column}" for column in self.COLUMNS)
+        old_values = ", ".join(f"old.{column}" for column in self.COLUMNS)
+        insert = (
+            f"INSERT INTO chats_fts(rowid, {columns}) VALUES (new.id, {new_values});"
+        )
+        delete = (
+            f"INSERT INTO chats_fts(chats_fts, rowid, {columns}) "
+            f"VALUES ('delete', old.id, {old_values});"
+        )
+        for statement in (
+            f"CREATE VIRTUAL TABLE chats_fts USING fts5({columns}, "
+            "content='chats', content_rowid='id', "
+            "tokenize='porter unicode61 remove_diacritics 2')",
+            # Matches in the user's own words say more about a chat than the reply
+            "INSERT INTO chats_fts(chats_fts, rank) "
+            "VALUES ('rank', 'bm25(2.0, 1.0, 0.0)')",
+            "CREATE TRIGGER chats_fts_insert AFTER INSERT ON chats "
+            f"BEGIN {insert} END",
+            "CREATE TRIGGER chats_fts_delete AFTER DELETE ON chats "
+            f"BEGIN {delete} END",
+            f"CREATE TRIGGER chats_fts_update AFTER UPDATE OF {columns} ON chats "
+            f"BEGIN {delete} {insert} END",
+            # Index the chats stored before the index existed
+            "INSERT INTO chats_fts(chats_fts) VALUES ('rebuild')",
+        ):
+            connection.execute(text(statement))
+        print("🔎 Created FTS5 chat search index")
+
+    def search(
+        self,
+        db: Session,
+        query: str,
+        session_id: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Page[Dict[str, Any]]:
+        terms = parse_search_query(query)
+        if not terms:
+            return Page([])
+        match = "{user_message agent_response} : (" + fts5_query(terms) + ")"
+        session_join = session_filter = after = ""
+        if session_id:
+            tokens = _TOKEN.findall(session_id.lower())
+            if tokens:
+                match += ' AND session_id : "' + " ".join(tokens) + '"'
+            # The index narrows by the session's tokens; the join makes it exact
+            session_join = "JOIN chats ON chats.id = chats_fts.rowid "
+            session_filter = "AND chats.session_id = :session_id "
+        listing = self._listing(query, session_id)
+        after_rank = after_id = None
+        if cursor is not None:
+            if skip:
+                raise InvalidCursorError("Use either skip or cursor, not both")
+            after_rank, after_id = decode_position(cursor, listing, (int, float), int)
+            after = (
+                "AND (chats_fts.rank > :after_rank OR "
+                "(chats_fts.rank = :after_rank AND chats_fts.rowid > :after_id)) "
+            )
+        rows = db.execute(
+            text(
+                "SELECT chats_fts.rowid, chats_fts.rank, "
+                f"snippet(chats_fts, 0, :start, :end, '…', {SNIPPET_TOKENS}), "
+                f"snippet(chats_fts, 1, :start, :end, '…', {SNIPPET_TOKENS}) "
+                f"FROM chats_fts {session_join}"
+                f"WHERE chats_fts MATCH :query {session_filter}{after}"
+                "ORDER BY chats_fts.rank, chats_fts.rowid LIMIT :limit OFFSET :skip"
+            ),
+            {
+                "query": match,
+                "session_id": session_id,
+                "start": HIGHLIGHT_START,
+                "end": HIGHLIGHT_END,
+                "after_rank": after_rank,
+                "after_id": after_id,
+                "limit": limit + 1,
+                "skip": skip,
+            },
+        ).all()
+        # bm25 is negative, lower is better
+        page = page_of(
+            rows, limit, lambda row: encode_cursor(listing, [row[1], row[0]])
+        )
+        return Page(
+            _load_hits(
+                db,
+                [
+                    (chat_id, -rank, _highlights(user_snippet, agent_snippet))
+                    for chat_id, rank, user_snippet, agent_snippet in page.items
+                ],
+            ),
+            page.next_cursor,
+        )
+
+
+class PostgresFtsIndex(ChatSearchIndex):
+    """
+    GIN index over a tsvector of both message columns.
+
+    Queries repeat the indexed expression so the planner uses the index; no
+    extra column or trigger is needed.
+    """
+
+    name = "tsvector"
+
+    DOCUMENT = (
+        "setweight(to_tsvector('english', coalesce(user_message, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(agent_response, '')), 'B')"
+    )
+
+    def install(self, connection: Connection) -> None:
+        connection.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_chats_search "
+                f"ON chats USING GIN (({self.DOCUMENT}))"
+            )
+        )
+
+    def search(
+        self,
+        db: Session,
+        query: str,
+        session_id: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Page[Dict[str, Any]]:
+        terms = parse_search_query(query)
+        if not terms:
+            return Page([])
+        options = (
+            f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, "
+            "MaxWords=35, MinWords=10"
+        )
+        session_filter = "AND session_id = :session_id " if session_id else ""
+        listing = self._listing(query, session_id)
+        after = ""
+        after_score = after_id = None
+        if cursor is not None:
+            if skip:
+                raise InvalidCursorError("Use either skip or cursor, not both")
+            after_score, after_id = decode_position(cursor, listing, (int, float), int)
+            after = (
+                "WHERE score < :after_score OR "
+                "(score = :after_score AND id < :after_id) "
+            )
+        rows = db.execute(
+            text(
+                "SELECT id, score, "
+                "ts_headline('english', user_message, query, :options), "
+                "ts_headline('english', agent_response, query, :options) "
+                "FROM (SELECT id, user_message, agent_response, query, "
+                "ts_rank_cd(document, query) AS score "
+                "FROM (SELECT id, user_message, agent_response, "
+                f"{self.DOCUMENT} AS document, to_tsquery('english', :query) AS query "
+                f"FROM chats WHERE ({self.DOCUMENT}) @@ to_tsquery('english', :query) "
+                f"{session_filter}) AS matches) AS ranked {after}"
+                "ORDER BY score DESC, id DESC LIMIT :limit OFFSET :skip"
+            ),
+            {
+                "query": tsquery(terms),
+                "session_id": session_id,
+                "options": options,
+                "after_score": after_score,
+                "after_id": after_id,
+                "limit": limit + 1,
+                "skip": skip,
+            },
+        ).all()
+        page = page_of(
+            rows, limit, lambda row: encode_cursor(listing, [row[1], row[0]])
+        )
+        return Page(
+            _load_hits(
+                db,
+                [
+                    (chat_id, score, _highlights(user_snippet, agent_snippet))
+                    for chat_id, score, user_snippet, agent_snippet in page.items
+                ],
+            ),
+            page.next_cursor,
+        )
+
+
+def _highlights(user_snippet: str, agent_snippet: str) -> Dict[str, str]:
+    """Snippets of the fields that matched."""
+    return {
+        field: snippet
+        for field, snippet in (
+            ("user_message", user_snippet),
+            ("agent_response", agent_snippet),
+        )
+        if snippet and HIGHLIGHT_START in snippet
+    }
+
+
+def _hit(
+    chat: Chat, score: Optional[float], highlights: Dict[str, str]
+) -> Dict[str, Any]:
+    hit = chat.to_dict()
+    hit["score"] = score
+    hit["highlights"] = highlights
+    return hit
+
+
+def _load_hits(
+    db: Session, ranked: List[Tuple[int, float, Dict[str, str]]]
+) -> List[Dict[str, Any]]:
+    """Chats for ranked (id, score, highlights) rows, in rank order."""
+    if not ranked:
+        return []
+    chats = {
+        chat.id: chat
+        for chat in db.query(Chat).filter(Chat.id.in_([row[0] for row in ranked]))
+    }
+    return [
+        _hit(chats[chat_id], score, highlights)
+        for chat_id, score, highlights in ranked
+        if chat_id in chats
+    ]
+
+
+_indexes: Dict[str, ChatSearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _index_for(connection: Connection, backend: str) -> ChatSearchIndex:
+    dialect = connection.dialect.name
+    if backend == "like":
+        return ChatSearchIndex()
+    if dialect == "postgresql":
+        return PostgresFtsIndex()
+    if dialect == "sqlite":
+        options = connection.exec_driver_sql("PRAGMA compile_options").all()
+        if any(option == "ENABLE_FTS5" for option, in options):
+            return SqliteFtsIndex()
+    return ChatSearchIndex()
+
+
+def install_search_index(engine: Engine, backend: str = "auto") -> ChatSearchIndex:
+    """
+    Create the full-text index for the engine's database and remember it.
+
+    Args:
+        engine: Engine whose database holds the chats table
+        backend: "auto" for the database's full-text index, "like" for substring search
+    """
+    with engine.begin() as connection:
+        index = _index_for(connection, backend)
+        index.install(connection)
+    with _indexes_lock:
+        _indexes[_database_key(engine.url)] = index
+    return index
+
+
+def get_search_index(db: Session) -> ChatSearchIndex:
+    """The search index installed for the session's database (substring search if none)."""
+    return _indexes.get(_database_key(db.get_bind().url), ChatSearchIndex())
+
+
+def _database_key(url: URL) -> str:
+    # Sync and async engines of one database share its index
+    return str(url.set(drivername=url.get_backend_name()))
@@ -0,0 +1,441 @@
+"""
+Batched persistence of chat rows.
+
+Storing a chat used to be its own transaction in the request path: one
+commit, and on SQLite one fsync and one turn at the database write lock,
+per message. ChatWriter queues chats instead and stores everything queued
+together in one transaction, flushed when CHAT_WRITE_BATCH_SIZE rows are
+waiting or CHAT_WRITE_FLUSH_MS after the first one. CHAT_WRITE_MODE picks
+how long a request waits:
+
+    immediate     write in the request's own transaction, as before
+    batched       wait until the shared transaction has committed
+    write_behind  return as soon as the chat is queued; chats still queued
+                  are lost if the process dies. Chat ids are handed out
+                  before the rows exist, so every server writing chats to
+                  a database without sequences (SQLite, MySQL) must run
+                  this mode: see ChatIdAllocator
+"""
+
+import asyncio
+import contextlib
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .base_repository import DbSession, run_db
+from .chat_repository import ChatRepository
+from .history_cache import SessionHistoryCache
+from .summary_repository import SummaryRepository
+
+WRITE_MODES = ("immediate", "batched", "write_behind")
+
+
+class ChatIdAllocator:
+    """
+    Hands out chat ids before their rows are written (write_behind mode).
+
+    PostgreSQL ids come from the chats id sequence, so they never collide.
+    Elsewhere ids come from blocks of block_size reserved in the id_blocks
+    table, which any number of processes can share. Rows inserted without
+    a reserved id (by a server in another write mode) take the next id
+    after the highest one stored, which may belong to a block in use.
+    """
+
+    def __init__(self, repository: ChatRepository, block_size: int = 100):
+        self.repository = repository
+        self.block_size = max(1, block_size)
+        # Unused ids of the current block: [_next_id, _block_end)
+        self._next_id = 0
+        self._block_end = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, db: Session, count: int) -> List[int]:
+        if db.get_bind().dialect.name == "postgresql":
+            return list(
+                db.execute(
+                    text(
+                        "SELECT nextval(pg_get_serial_sequence('chats', 'id')) "
+                        "FROM generate_series(1, :count)"
+                    ),
+                    {"count": count},
+                ).scalars()
+            )
+        with self._lock:
+            if self._block_end - self._next_id >= count:
+                return self._take(count)
+        # Reserve outside the lock: on an async session the query yields to
+        # the event loop, where another write may be waiting for the lock.
+        # What is left of the current block is dropped.
+        size = max(count, self.block_size)
+        start = self.repository.reserve_id_block(db, size)
+        with self._lock:
+            self._next_id, self._block_end = start, start + size
+            return self._take(count)
+
+    def _take(self, count: int) -> List[int]:
+        ids = list(range(self._next_id, self._next_id + count))
+        self._next_id += count
+        return ids
+
+    def reset(self) -> None:
+        """Drop the current block, e.g. after an id collided."""
+        with self._lock:
+            self._next_id = self._block_end = 0
+
+
+class _PendingWrite:
+    """Chats of one request, stored together, and the future of their ids."""
+
+    __slots__ = ("chats_data", "timings", "summary", "future")
+
+    def __init__(
+        self,
+        chats_data: List[Dict[str, Any]],
+        timings: List[Optional[Dict[str, Any]]],
+        summary: Any,
+        future: Optional[asyncio.Future],
+    ):
+        self.chats_data = chats_data
+        self.timings = timings
+        self.summary = summary
+        self.future = future
+
+
+class ChatWriter:
+    """
+    Stores chats, their stage rows and their sessions' rolling summaries.
+
+    Summaries are derived data: they are saved in a second transaction, and
+    failing to save one never fails the chats. Each is folded onto the one
+    last stored for its session, one save per session at a time. With a
+    history cache, stored chats and summaries are written through to it.
+    """
+
+    def __init__(
+        self,
+        mode: str = "batched",
+        batch_size: int = 100,
+        flush_interval: float = 0.01,
+        max_pending: int = 10000,
+        id_block_size: int = 100,
+        repository: Optional[ChatRepository] = None,
+        summary_repository: Optional[SummaryRepository] = None,
+        session_factory: Optional[Callable[[], Any]] = None,
+        history_cache: Optional[SessionHistoryCache] = None,
+    ):
+        if mode not in WRITE_MODES:
+            raise ValueError(
+                f"Unknown chat write mode {mode!r}; use one of {', '.join(WRITE_MODES)}"
+            )
+        self.mode = mode
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self.max_pending = max(1, max_pending)
+        self.repository = repository or ChatRepository()
+        self.summary_repository = summary_repository or SummaryRepository()
+        self.allocator = ChatIdAllocator(self.repository, id_block_size)
+        self.history_cache = history_cache
+        self._session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Latest write of each session still in flight, for read-your-writes
+        self._sessions: Dict[str, asyncio.Future] = {}
+        # Per-session summary locks and how many callers hold or await each
+        self._summary_locks: Dict[str, List[Any]] = {}
+        self._stats = {
+            "transactions": 0,
+            "chats_written": 0,
+            "largest_batch": 0,
+            "failed_chats": 0,
+            "retried_batches": 0,
+        }
+        self._flush_ms_total = 0.0
+
+    async def write(
+        self,
+        db: DbSession,
+        chats_data: List[Dict[str, Any]],
+        timings: Optional[List[Optional[Dict[str, Any]]]] = None,
+        summary: Any = None,
+    ) -> List[int]:
+        """
+        Store chats (and the stage rows of their timing reports) in one transaction.
+
+        The chats of one call are never split across transactions. A summary
+        (a RollingSummary of the chats' session) has each chat folded in and
+        is saved after them.
+
+        Args:
+            db: The request's session; immediate mode writes through it and
+                write_behind mode reserves the chat ids with it
+            chats_data: Column values of each chat
+            timings: Optional crew timing report per chat
+            summary: Optional rolling summary of the session the chats belong to
+
+        Returns:
+            The chat ids, in the order of chats_data
+        """
+        timings = list(timings or [None] * len(chats_data))
+        if self.mode == "immediate":
+            pending = _PendingWrite(chats_data, timings, summary, None)
+            chats = await run_db(db, self._write_chats, [pending])
+            self._cache_chats(chats)
+            await self._save_summaries(db, [pending], [chats])
+            return [chat["id"] for chat in chats]
+
+        if self.mode == "write_behind":
+            ids = await run_db(db, self.allocator.reserve, len(chats_data))
+            chats_data = [
+                dict(data, id=chat_id) for data, chat_id in zip(chats_data, ids)
+            ]
+
+        self._ensure_running()
+        future = asyncio.get_running_loop().create_future()
+        # Nobody awaits write-behind failures; they are logged instead
+        future.add_done_callback(_consume_exception)
+        pending = _PendingWrite(chats_data, timings, summary, future)
+        for session_id in {data["session_id"] for data in chats_data}:
+            self._sessions[session_id] = future
+            future.add_done_callback(
+                lambda done, session_id=session_id: self._forget(session_id, done)
+            )
+        await self._queue.put(pending)
+
+        if self.mode == "write_behind":
+            return ids
+        return await asyncio.shield(future)
+
+    async def wait_for_session(self, session_id: str) -> None:
+        """Wait until the chats of a session queued so far are stored (or failed)."""
+        future = self._sessions.get(session_id)
+        if future is not None and not future.done():
+            await asyncio.wait([future])
+
+    @contextlib.asynccontextmanager
+    async def summary_lock(self, session_ids: Iterable[str]) -> AsyncIterator[None]:
+        """
+        Hold while reading, changing and saving the summaries of some sessions.
+
+        Without it, two turns of a session saving at the same time would each
+        save their own fold and the last save would drop the other turn.
+        """
+        # Always taken in the same order, so two holders can't deadlock
+        entries = []
+        for session_id in sorted(set(session_ids)):
+            entry = self._summary_locks.setdefault(session_id, [asyncio.Lock(), 0])
+            entry[1] += 1
+            entries.append((session_id, entry))
+        acquired = []
+        try:
+            for _, entry in entries:
+                await entry[0].acquire()
+                acquired.append(entry[0])
+            yield
+        finally:
+            for lock in acquired:
+                lock.release()
+            for session_id, entry in entries:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._summary_locks[session_id]
+
+    async def flush(self) -> None:
+        """Wait until every queued chat is stored."""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """Store what is queued, then stop the writer task."""
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._queue = None
+        self._loop = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        transactions = self._stats["transactions"]
+        return {
+            "mode": self.mode,
+            **self._stats,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "average_batch": (
+                round(self._stats["chats_written"] / transactions, 2)
+                if transactions
+                else 0
+            ),
+            "average_flush_ms": (
+                round(self._flush_ms_total / transactions, 2) if transactions else 0
+            ),
+        }
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._loop is loop and not self._task.done():
+            return
+        # First write, or the loop the writer ran on is gone (tests, restarts)
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._sessions = {}
+        self._task = loop.create_task(self._run())
+
+    def _forget(self, session_id: str, future: asyncio.Future) -> None:
+        if self._sessions.get(session_id) is future:
+            del self._sessions[session_id]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            rows = len(batch[0].chats_data)
+            flush_at = loop.time() + self.flush_interval
+            while rows < self.batch_size:
+                try:
+                    remaining = flush_at - loop.time()
+                    if remaining > 0:
+                        pending = await asyncio.wait_for(self._queue.get(), remaining)
+                    else:
+                        # Past the deadline, take only what is already queued
+                        pending = self._queue.get_nowait()
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                batch.append(pending)
+                rows += len(pending.chats_data)
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                # _flush settles every write; nothing may stop the writer
+                print(f"❌ Chat writer error: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[_PendingWrite]) -> None:
+        try:
+            await self._store(batch)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                self._fail(batch[0], e)
+                return
+            print(
+                f"⚠️ Storing {len(batch)} queued writes failed ({e}); retrying one by one"
+            )
+            self._stats["retried_batches"] += 1
+        # One bad chat must not take the rest of its batch down with it
+        for pending in batch:
+            try:
+                await self._store([pending])
+            except Exception as e:
+                self._fail(pending, e)
+
+    async def _store(self, batch: List[_PendingWrite]) -> None:
+        if self._session_factory is None:
+            from fastapi_server.database import open_db
+
+            self._session_factory = open_db
+        started = time.perf_counter()
+        async with self._session_factory() as db:
+            chats = await run_db(db, self._write_chats, batch)
+            self._flush_ms_total += (time.perf_counter() - started) * 1000
+            self._stats["transactions"] += 1
+            self._stats["chats_written"] += len(chats)
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(chats))
+            # Cached before the requests waiting on their sessions read them
+            self._cache_chats(chats)
+            # Settle the requests before the summaries, which only matter later
+            position = 0
+            stored = []
+            for pending in batch:
+                count = len(pending.chats_data)
+                stored.append(chats[position : position + count])
+                position += count
+                if not pending.future.done():
+                    pending.future.set_result([chat["id"] for chat in stored[-1]])
+            await self._save_summaries(db, batch, stored)
+
+    def _write_chats(
+        self, db: Session, batch: List[_PendingWrite]
+    ) -> List[Dict[str, Any]]:
+        return self.repository.insert_many(
+            db,
+            [data for pending in batch for data in pending.chats_data],
+            [timing for pending in batch for timing in pending.timings],
+        )
+
+    def _cache_chats(self, chats: List[Dict[str, Any]]) -> None:
+        if self.history_cache is not None:
+            self.history_cache.add_chats(chats)
+
+    async def _save_summaries(
+        self,
+        db: DbSession,
+        batch: List[_PendingWrite],
+        stored: List[List[Dict[str, Any]]],
+    ) -> None:
+        folds = [
+            (pending.summary, chats)
+            for pending, chats in zip(batch, stored)
+            if pending.summary is not None and chats
+        ]
+        if not folds:
+            return
+        async with self.summary_lock(chats[0]["session_id"] for _, chats in folds):
+            try:
+                summaries = await run_db(db, self._fold_summaries, folds)
+                if self.history_cache is not None:
+                    for session_id, summary in summaries.items():
+                        self.history_cache.set_summary(session_id, summary)
+                await run_db(db, self.summary_repository.save_many, summaries)
+            except Exception as e:
+                # The summary is derived data; the next turn catches up on these
+                print(f"⚠️ Error updating conversation summaries: {e}")
+
+    def _fold_summaries(
+        self, db: Session, folds: List[Tuple[Any, List[Dict[str, Any]]]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Fold stored chats into the summaries of their sessions.
+
+        Each write's summary was read before its turn ran; where another turn
+        of the session has saved one since, it continues from that one.
+        """
+        session_ids = list({chats[0]["session_id"] for _, chats in folds})
+        latest = {
+            stored.session_id: stored.to_dict()
+            for stored in self.summary_repository.get_many(db, session_ids)
+        }
+        summaries: Dict[str, Dict[str, Any]] = {}
+        for summary, chats in folds:
+            session_id = chats[0]["session_id"]
+            summary.rebase(summaries.get(session_id) or latest.get(session_id))
+            for chat in chats:
+                summary.add_turn(chat)
+            summaries[session_id] = summary.to_dict()
+        return summaries
+
+    def _fail(self, pending: _PendingWrite, error: Exception) -> None:
+        self._stats["failed_chats"] += len(pending.chats_data)
+        if self.mode == "write_behind":
+            print(
+                f"❌ Lost {len(pending.chats_data)} queued chat(s) of session "
+                f"{pending.chats_data[0]['session_id']}: {error}"
+            )
+            # A row written meanwhile may have taken one of the reserved ids
+            self.allocator.reset()
+        if not pending.future.done():
+            pending.future.set_exception(error)
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    if not future.cancelled():
+        future.exception()
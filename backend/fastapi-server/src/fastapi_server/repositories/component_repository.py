@@ -2,10 +2,12 @@
 Component repository for component-specific database operations.
 """
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from sqlalchemy.orm import Session
 from fastapi_server.models import Component
 from .base_repository import BaseRepository
+from .pagination import Page, listing_key, paginate
+from .statistics_repository import StatisticsRepository
 
 
 class ComponentRepository(BaseRepository[Component]):
@@ -13,6 +15,44 @@ class ComponentRepository(BaseRepository[Component]):
     
     def __init__(self):
         super().__init__(Component)
+        self.statistics = StatisticsRepository()
+    
+    def create(self, db: Session, obj_in: Dict[str, Any]) -> Component:
+        """Create a component and count it in the statistics."""
+        component = Component(**obj_in)
+        db.add(component)
+        self.statistics.record_component(db, component)
+        db.commit()
+        db.refresh(component)
+        return component
+    
+    def update(
+        self, 
+        db: Session, 
+        id: int, 
+        obj_in: Dict[str, Any]
+    ) -> Optional[Component]:
+        """Update a component, moving it between counts if its type or source changes."""
+        component = self.get(db, id)
+        if component:
+            self.statistics.record_component(db, component, sign=-1)
+            for field, value in obj_in.items():
+                if hasattr(component, field):
+                    setattr(component, field, value)
+            self.statistics.record_component(db, component)
+            db.commit()
+            db.refresh(component)
+        return component
+    
+    def delete(self, db: Session, id: int) -> bool:
+        """Delete a component and take it out of the statistics."""
+        component = self.get(db, id)
+        if component:
+            self.statistics.record_component(db, component, sign=-1)
+            db.delete(component)
+            db.commit()
+            return True
+        return False
     
     def get_by_type(self, db: Session, component_type: str) -> List[Component]:
         """Get components by type."""
@@ -31,19 +71,16 @@ class ComponentRepository(BaseRepository[Component]):
         db: Session, 
         search_term: str,
         skip: int = 0,
-        limit: int = 100
-    ) -> List[Component]:
-        """Search components by name or description."""
-        return (
-            db.query(Component)
-            .filter(
-                (Component.name.ilike(f"%{search_term}%")) |
-                (Component.description.ilike(f"%{search_term}%"))
-            )
-            .offset(skip)
-            .limit(limit)
-            .all()
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Page[Component]:
+        """Search components by name or description, newest first."""
+        query = db.query(Component).filter(
+            (Component.name.ilike(f"%{search_term}%")) |
+            (Component.description.ilike(f"%{search_term}%"))
         )
+        listing = listing_key("components-search", search_term)
+        return paginate(query, Component, listing, limit, cursor, skip)
     
     def get_recent_components(
         self, 
@@ -0,0 +1,212 @@
+"""
+In-memory cache of active chat sessions.
+
+Every chat turn reads the session's latest chats and rolling summary to build
+its conversation context, and most of the time they are the rows the previous
+turn stored a few seconds earlier. SessionHistoryCache keeps them per session,
+as chat dicts (newest first) and the summary's stored form. ChatWriter adds
+each chat as it is stored (write-through), so a session that stays in the
+cache never reads its history from the database again; a miss loads it.
+
+The cache is per process: chats another process stores for a session are not
+seen until the session is loaded again, at the latest after its idle TTL.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Latest chats of a session (newest first, at most the given number) and its summary
+SessionLoader = Callable[[int], Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]]
+
+
+class CachedSession:
+    """Latest turns and summary of one session."""
+
+    __slots__ = ("session_id", "turns", "summary", "complete", "size", "expires_at")
+
+    def __init__(
+        self,
+        session_id: str,
+        turns: List[Dict[str, Any]],
+        summary: Optional[Dict[str, Any]],
+        complete: bool,
+        expires_at: float,
+    ):
+        self.session_id = session_id
+        # Newest first
+        self.turns = turns
+        self.summary = summary
+        # Whether turns hold every chat of the session
+        self.complete = complete
+        self.size = len(json.dumps([turns, summary], default=str))
+        self.expires_at = expires_at
+
+
+class SessionHistoryCache:
+    """LRU of sessions with an idle TTL, a session limit and a byte budget."""
+
+    def __init__(
+        self,
+        max_turns: int = 50,
+        max_bytes: int = 32 * 1024 * 1024,
+        max_sessions: int = 10000,
+        ttl_seconds: int = 1800,
+    ):
+        self.max_turns = max(1, max_turns)
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, CachedSession]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Sessions being loaded, and those written to meanwhile (their load is stale)
+        self._loading: Dict[str, int] = {}
+        self._stale: set = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, session_id: str) -> Optional[CachedSession]:
+        """The cached session, if present; callers must not modify it."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and entry.expires_at <= time.time():
+                self._remove(session_id)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry.expires_at = time.time() + self.ttl_seconds
+            self._entries.move_to_end(session_id)
+            return entry
+
+    def get_or_load(self, session_id: str, loader: SessionLoader) -> CachedSession:
+        """
+        The cached session, loading it on a miss.
+
+        The loader is asked for one turn more than is kept, to tell whether it
+        returned the whole session. A load that a write of the same session
+        overtook is returned but not cached, as it may lack that write.
+        """
+        entry = self.get(session_id)
+        if entry is not None:
+            return entry
+        with self._lock:
+            self._loading[session_id] = self._loading.get(session_id, 0) + 1
+        try:
+            turns, summary = loader(self.max_turns + 1)
+            entry = CachedSession(
+                session_id,
+                turns[: self.max_turns],
+                summary,
+                complete=len(turns) <= self.max_turns,
+                expires_at=time.time() + self.ttl_seconds,
+            )
+            with self._lock:
+                self.loads += 1
+                if session_id not in self._stale:
+                    self._put(entry)
+            return entry
+        finally:
+            with self._lock:
+                self._loading[session_id] -= 1
+                if not self._loading[session_id]:
+                    del self._loading[session_id]
+                    self._stale.discard(session_id)
+
+    def add_chats(self, chats: List[Dict[str, Any]]) -> None:
+        """
+        Add just-stored chats (oldest first) to the sessions they belong to.
+
+        Sessions that are not cached stay that way: the cache only holds
+        sessions whose latest turns it has seen in full.
+        """
+        with self._lock:
+            for chat in chats:
+                session_id = chat["session_id"]
+                if session_id in self._loading:
+                    self._stale.add(session_id)
+                entry = self._entries.get(session_id)
+                if entry is None:
+                    continue
+                turns = [chat] + entry.turns
+                self._replace(
+                    entry,
+                    turns[: self.max_turns],
+                    entry.summary,
+                    entry.complete and len(turns) <= self.max_turns,
+                )
+
+    def set_summary(self, session_id: str, summary: Dict[str, Any]) -> None:
+        """Replace the summary of a cached session."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._replace(entry, entry.turns, summary, entry.complete)
+
+    def discard_chat(self, chat_id: int) -> None:
+        """Drop the session holding a deleted chat; it is loaded again when needed."""
+        with self._lock:
+            for session_id, entry in list(self._entries.items()):
+                if any(turn["id"] == chat_id for turn in entry.turns):
+                    self._remove(session_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "sessions": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    def _replace(
+        self,
+        entry: CachedSession,
+        turns: List[Dict[str, Any]],
+        summary: Optional[Dict[str, Any]],
+        complete: bool,
+    ) -> None:
+        self._put(
+            CachedSession(
+                entry.session_id,
+                turns,
+                summary,
+                complete,
+                expires_at=time.time() + self.ttl_seconds,
+            )
+        )
+
+    def _put(self, entry: CachedSession) -> None:
+        if entry.session_id in self._entries:
+            self._remove(entry.session_id)
+        if entry.size > self.max_bytes:
+            return
+        self._entries[entry.session_id] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes or len(self._entries) > self.max_sessions:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, session_id: str) -> None:
+        entry = self._entries.pop(session_id)
+        self._bytes -= entry.size
@@ -0,0 +1,92 @@
+"""
+Mergeable quantile sketches (DDSketch) of chat processing times.
+
+A sketch counts values in logarithmic bins: bin k holds the values in
+(gamma^(k-1), gamma^k], with gamma = (1 + a) / (1 - a) for a relative
+accuracy a. Reading any quantile back from its bin is off by at most a
+times the true value, however skewed the distribution. A bin is just a
+counter, so sketches of separate periods merge by adding counts per bin,
+which is what lets the database keep them as rows of running totals and
+sum them over any window: StatisticsRepository.record_chats folds each
+chat into LatencySketchBin rows (_count_latencies, then _increment).
+"""
+
+import math
+from typing import Dict, Iterable, Optional, Tuple
+
+# Processing times are whole milliseconds; values below 1ms (i.e. 0) share
+# this bin, below every other one, and read back as 0
+ZERO_BIN = -1
+MIN_VALUE = 1.0
+
+
+class LatencySketch:
+    """Counts of values per logarithmic bin, with quantiles read from the bins."""
+
+    __slots__ = ("relative_accuracy", "gamma", "_log_gamma", "bins", "count")
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.count = 0
+
+    @classmethod
+    def from_bins(
+        cls, bins: Iterable[Tuple[int, int]], relative_accuracy: float = 0.01
+    ) -> "LatencySketch":
+        """Sketch of (bin, count) pairs, e.g. summed from stored bins."""
+        sketch = cls(relative_accuracy)
+        for key, count in bins:
+            sketch.add_to_bin(key, count)
+        return sketch
+
+    def key(self, value: float) -> int:
+        """Bin a value is counted in."""
+        if value < MIN_VALUE:
+            return ZERO_BIN
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def value(self, key: int) -> float:
+        """Value a bin reads back as: within relative_accuracy of all it holds."""
+        if key == ZERO_BIN:
+            return 0.0
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        self.add_to_bin(self.key(value), count)
+
+    def add_to_bin(self, key: int, count: int) -> None:
+        # Bins emptied by deletes are kept as zero rows; they hold nothing
+        if count <= 0:
+            return
+        self.bins[key] = self.bins.get(key, 0) + count
+        self.count += count
+
+    def merge(self, other: "LatencySketch") -> None:
+        """Add another sketch's counts to this one."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches of the same accuracy can be merged")
+        for key, count in other.bins.items():
+            self.add_to_bin(key, count)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Value at quantile q (0 to 1), or None for an empty sketch.
+
+        The value of rank q * (count - 1) in sorted order, as its bin reads back.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return self.value(key)
+        return self.value(max(self.bins))
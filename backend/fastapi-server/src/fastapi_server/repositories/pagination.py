@@ -0,0 +1,130 @@
+"""
+Keyset (cursor) pagination.
+
+Listings are ordered newest first by (created_at, id); a cursor records
+where the previous page ended, so the next page is an index range scan
+however deep it is, and rows inserted meanwhile cause neither duplicates
+nor gaps. Cursors are opaque to clients and bound to the listing they came from.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+from typing import Any, Callable, Generic, List, Optional, Type, TypeVar
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Query
+
+from fastapi_server.models import Base
+
+ModelType = TypeVar("ModelType", bound=Base)
+ItemType = TypeVar("ItemType")
+
+
+class InvalidCursorError(ValueError):
+    """A cursor that is malformed or belongs to another listing."""
+
+
+class Page(Generic[ItemType]):
+    """One page of a listing and the cursor of the page after it (None on the last)."""
+
+    def __init__(self, items: List[ItemType], next_cursor: Optional[str] = None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
+def listing_key(name: str, *parameters: Any) -> str:
+    """Identify a listing, e.g. a search for one term, so cursors can't cross listings."""
+    if not parameters:
+        return name
+    digest = hashlib.sha256(
+        json.dumps(parameters, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return f"{name}:{digest[:16]}"
+
+
+def encode_cursor(listing: str, position: List[Any]) -> str:
+    payload = json.dumps({"l": listing, "p": position}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, listing: str) -> List[Any]:
+    """
+    Position stored in a cursor.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or from another listing
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        position = data["p"]
+        cursor_listing = data["l"]
+    except (binascii.Error, ValueError, UnicodeError, KeyError, TypeError):
+        raise InvalidCursorError("Invalid pagination cursor")
+    if cursor_listing != listing or not isinstance(position, list):
+        raise InvalidCursorError("Pagination cursor belongs to a different listing")
+    return position
+
+
+def paginate(
+    query: Query,
+    model: Type[ModelType],
+    listing: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+) -> Page[ModelType]:
+    """
+    Newest-first page of a query, by (created_at, id).
+
+    With a cursor the page starts after the row it points at. The cursor holds
+    that row's id and its created_at is read back from the table, so the
+    comparison never depends on how the database formats timestamps; should
+    the row have been deleted, id order (which follows insertion order) takes
+    over. Without one, skip rows are skipped as before. Either way the page
+    comes with a cursor for the page after it.
+
+    Raises:
+        InvalidCursorError: If the cursor is invalid or combined with skip
+    """
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor is not None:
+        if skip:
+            raise InvalidCursorError("Use either skip or cursor, not both")
+        last_id = decode_position(cursor, listing, int)[0]
+        last_created_at = (
+            select(model.created_at).where(model.id == last_id).scalar_subquery()
+        )
+        query = query.filter(
+            or_(
+                model.created_at < last_created_at,
+                and_(model.created_at == last_created_at, model.id < last_id),
+                and_(last_created_at.is_(None), model.id < last_id),
+            )
+        )
+    elif skip:
+        query = query.offset(skip)
+    # One extra row tells whether there is a next page
+    rows = query.limit(limit + 1).all()
+    return page_of(rows, limit, lambda row: encode_cursor(listing, [row.id]))
+
+
+def decode_position(cursor: str, listing: str, *types: type) -> List[Any]:
+    """Position in a cursor, checked against the types of its values."""
+    position = decode_cursor(cursor, listing)
+    if len(position) != len(types) or not all(
+        isinstance(value, kind) and not isinstance(value, bool)
+        for value, kind in zip(position, types)
+    ):
+        raise InvalidCursorError("Invalid pagination cursor")
+    return position
+
+
+def page_of(rows: List[Any], limit: int, cursor_for: Callable[[Any], str]) -> Page:
+    """Page from up to limit + 1 rows; the extra row only signals a next page."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return Page(rows, cursor_for(rows[-1]))
+    return Page(rows)
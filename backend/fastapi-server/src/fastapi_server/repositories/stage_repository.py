@@ -0,0 +1,173 @@
+"""
+Stage repository for per-stage timing and token usage of chat runs.
+"""
+
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from fastapi_server.models import Chat, ChatStage
+from .base_repository import BaseRepository
+from .statistics_repository import StatisticsRepository
+
+# Stage row holding the time a run waited for a crew worker
+QUEUE_STAGE = "queue"
+
+
+def build_stages(chat_id: int, timing: Dict[str, Any]) -> List[ChatStage]:
+    """Queue wait row plus one row per task of a crew run's timing report."""
+    stages = [
+        ChatStage(
+            chat_id=chat_id,
+            stage=QUEUE_STAGE,
+            start_ms=0.0,
+            duration_ms=timing.get("queue_ms", 0.0),
+        )
+    ]
+    for name, task in timing.get("tasks", {}).items():
+        models = task.get("models") or []
+        stages.append(
+            ChatStage(
+                chat_id=chat_id,
+                stage=name,
+                start_ms=task.get("start_ms"),
+                duration_ms=task.get("duration_ms", 0.0),
+                llm_calls=task.get("llm_calls", 0),
+                llm_ms=task.get("llm_ms", 0.0),
+                prompt_tokens=task.get("prompt_tokens", 0),
+                completion_tokens=task.get("completion_tokens", 0),
+                retries=task.get("retries", 0),
+                model_used=",".join(models)[:100] or None,
+            )
+        )
+    return stages
+
+
+class StageRepository(BaseRepository[ChatStage]):
+    """Repository for ChatStage model operations."""
+
+    def __init__(self):
+        super().__init__(ChatStage)
+        self.statistics = StatisticsRepository()
+
+    def create_from_timing(
+        self, db: Session, chat_id: int, timing: Dict[str, Any]
+    ) -> List[ChatStage]:
+        """Store the queue wait and one row per task of a crew run's timing report."""
+        stages = build_stages(chat_id, timing)
+        db.add_all(stages)
+        self.statistics.record_stages(db, stages, self._sessions(db, chat_id))
+        db.commit()
+        return stages
+
+    def get_by_chat(self, db: Session, chat_id: int) -> List[ChatStage]:
+        """Get the stages of a chat in the order they started."""
+        return (
+            db.query(ChatStage)
+            .filter(ChatStage.chat_id == chat_id)
+            .order_by(ChatStage.start_ms.asc(), ChatStage.id.asc())
+            .all()
+        )
+
+    def delete_by_chat(self, db: Session, chat_id: int) -> int:
+        """Delete the stages of a chat."""
+        stages = db.query(ChatStage).filter(ChatStage.chat_id == chat_id).all()
+        if stages:
+            self.statistics.record_stages(
+                db, stages, self._sessions(db, chat_id), sign=-1
+            )
+            for stage in stages:
+                db.delete(stage)
+            db.commit()
+        return len(stages)
+
+    def get_stage_breakdown(
+        self, db: Session, session_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Per-stage latency and token totals, slowest stage (by total time) first."""
+        query = db.query(
+            ChatStage.stage,
+            func.count(ChatStage.id),
+            func.avg(ChatStage.duration_ms),
+            func.max(ChatStage.duration_ms),
+            func.sum(ChatStage.duration_ms),
+            func.avg(ChatStage.llm_ms),
+            func.sum(ChatStage.llm_calls),
+            func.sum(ChatStage.prompt_tokens),
+            func.sum(ChatStage.completion_tokens),
+            func.sum(ChatStage.retries),
+        )
+        if session_id:
+            query = query.join(Chat, Chat.id == ChatStage.chat_id).filter(
+                Chat.session_id == session_id
+            )
+        rows = query.group_by(ChatStage.stage).all()
+
+        total_ms = sum(row[4] or 0 for row in rows)
+        breakdown = [
+            {
+                "stage": stage,
+                "runs": runs,
+                "average_duration_ms": round(avg_ms or 0, 2),
+                "max_duration_ms": round(max_ms or 0, 2),
+                "total_duration_ms": round(sum_ms or 0, 2),
+                "share_of_time": (
+                    round((sum_ms or 0) / total_ms * 100, 2) if total_ms else 0
+                ),
+                "average_llm_ms": round(avg_llm_ms or 0, 2),
+                "llm_calls": llm_calls or 0,
+                "prompt_tokens": prompt_tokens or 0,
+                "completion_tokens": completion_tokens or 0,
+                "retries": retries or 0,
+            }
+            for (
+                stage,
+                runs,
+                avg_ms,
+                max_ms,
+                sum_ms,
+                avg_llm_ms,
+                llm_calls,
+                prompt_tokens,
+                completion_tokens,
+                retries,
+            ) in rows
+        ]
+        breakdown.sort(key=lambda row: row["total_duration_ms"], reverse=True)
+        return breakdown
+
+    def get_usage_totals(
+        self, db: Session, session_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Token, LLM time and retry totals across all stored stages (running totals)."""
+        stages = self.statistics.get_stage_totals(db, session_id)
+        queue = [stage for stage in stages if stage.stage == QUEUE_STAGE]
+        queue_runs = sum(stage.runs for stage in queue)
+        return {
+            "total_prompt_tokens": sum(stage.prompt_tokens for stage in stages),
+            "total_completion_tokens": sum(stage.completion_tokens for stage in stages),
+            "total_llm_calls": sum(stage.llm_calls for stage in stages),
+            "total_llm_ms": round(sum(stage.llm_ms_sum for stage in stages), 2),
+            "total_retries": sum(stage.retries for stage in stages),
+            "average_queue_ms": (
+                round(sum(stage.duration_ms_sum for stage in queue) / queue_runs, 2)
+                if queue_runs
+                else 0
+            ),
+        }
+
+    def get_slowest_stage(
+        self, db: Session, session_id: Optional[str] = None
+    ) -> Optional[str]:
+        """The crew stage taking most time in total (running totals), queue wait aside."""
+        stages = [
+            stage
+            for stage in self.statistics.get_stage_totals(db, session_id)
+            if stage.stage != QUEUE_STAGE
+        ]
+        if not stages:
+            return None
+        return max(stages, key=lambda stage: stage.duration_ms_sum).stage
+
+    def _sessions(self, db: Session, chat_id: int) -> Dict[int, str]:
+        session_id = db.query(Chat.session_id).filter(Chat.id == chat_id).scalar()
+        return {chat_id: session_id}
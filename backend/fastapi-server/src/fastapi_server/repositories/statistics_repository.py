@@ -0,0 +1,454 @@
+"""
+Statistics repository for running totals of chats, crew stages and components.
+
+Statistics used to be computed by scanning the chats, chat_stages and
+components tables on every request. The aggregate tables hold running totals
+instead: the repositories that store and delete those rows add or subtract
+their share in the same transaction, so reading statistics looks up a few rows
+however large the tables grow. rebuild recomputes every total from the rows.
+
+Processing times are kept the same way as latency sketches: the bin counts
+of a LatencySketch per time bucket, for all chats and per model and pipeline.
+Percentiles of a window add up the bins of its buckets instead of reading
+every chat in it.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from sqlalchemy import String, case, cast, func, insert, update
+from sqlalchemy.orm import Session
+
+from fastapi_server.config import Config
+from fastapi_server.models import (
+    Base,
+    Chat,
+    ChatAggregate,
+    ChatStage,
+    Component,
+    ComponentAggregate,
+    LatencySketchBin,
+    StageAggregate,
+)
+from .latency_sketch import LatencySketch
+
+# Scope of the totals over every chat; sessions have "session:<session_id>"
+ALL_SCOPE = "all"
+CHAT_COUNTERS = (
+    "chat_count",
+    "processing_time_sum",
+    "processing_time_count",
+    "suggestion_count",
+)
+STAGE_COUNTERS = (
+    "runs",
+    "duration_ms_sum",
+    "llm_calls",
+    "llm_ms_sum",
+    "prompt_tokens",
+    "completion_tokens",
+    "retries",
+)
+COMPONENT_DIMENSIONS = ("component_type", "data_source")
+# Sketches other than the "all" one, by the chat attribute they split on
+LATENCY_DIMENSIONS = {"model": "model_used", "pipeline": "pipeline"}
+LATENCY_KEYS = ("dimension", "value", "bucket_start", "bin")
+# Value of chats without a model or pipeline (stored before they were recorded)
+UNKNOWN = "unknown"
+
+
+def session_scope(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def scope_of(session_id: Optional[str]) -> str:
+    return session_scope(session_id) if session_id else ALL_SCOPE
+
+
+class StatisticsRepository:
+    """Maintains and reads the chat, stage, component and latency aggregate tables."""
+
+    def __init__(
+        self,
+        latency_bucket_seconds: Optional[int] = None,
+        latency_accuracy: Optional[float] = None,
+    ):
+        self.latency_bucket_seconds = (
+            latency_bucket_seconds or Config.LATENCY_BUCKET_SECONDS
+        )
+        self.latency_accuracy = latency_accuracy or Config.LATENCY_SKETCH_ACCURACY
+        # Maps processing times to bins; it holds no counts itself
+        self._bins = LatencySketch(self.latency_accuracy)
+
+    def record_chats(self, db: Session, chats: Iterable[Chat], sign: int = 1) -> None:
+        """
+        Add (sign 1) or subtract (sign -1) chats from the totals, without committing.
+
+        Chats count as suggesting a component when they have a suggestion;
+        a suggestion of None (stored as JSON null) does not count. Their
+        processing times go into the latency sketches.
+        """
+        chats = list(chats)
+        totals: Dict[str, Dict[str, Any]] = {}
+        for chat in chats:
+            for scope in (ALL_SCOPE, session_scope(chat.session_id)):
+                row = totals.setdefault(scope, dict.fromkeys(CHAT_COUNTERS, 0))
+                row["chat_count"] += sign
+                if chat.processing_time is not None:
+                    row["processing_time_sum"] += sign * chat.processing_time
+                    row["processing_time_count"] += sign
+                if chat.component_suggestion is not None:
+                    row["suggestion_count"] += sign
+        self._increment(
+            db,
+            ChatAggregate,
+            ("scope",),
+            [{"scope": scope, **row} for scope, row in totals.items()],
+        )
+        counts: Dict[tuple, int] = {}
+        self._count_latencies(chats, sign, counts)
+        self._increment(db, LatencySketchBin, LATENCY_KEYS, self._bin_rows(counts))
+
+    def record_stages(
+        self,
+        db: Session,
+        stages: Iterable[ChatStage],
+        sessions: Dict[int, str],
+        sign: int = 1,
+    ) -> None:
+        """
+        Add or subtract stage rows from the totals, without committing.
+
+        Args:
+            db: Database session
+            stages: Stage rows
+            sessions: Session id of each chat the stages belong to, by chat id
+            sign: 1 to add, -1 to subtract
+        """
+        totals: Dict[tuple, Dict[str, Any]] = {}
+        for stage in stages:
+            scopes = (ALL_SCOPE, session_scope(sessions[stage.chat_id]))
+            for scope in scopes:
+                row = totals.setdefault(
+                    (scope, stage.stage), dict.fromkeys(STAGE_COUNTERS, 0)
+                )
+                row["runs"] += sign
+                row["duration_ms_sum"] += sign * (stage.duration_ms or 0)
+                row["llm_calls"] += sign * (stage.llm_calls or 0)
+                row["llm_ms_sum"] += sign * (stage.llm_ms or 0)
+                row["prompt_tokens"] += sign * (stage.prompt_tokens or 0)
+                row["completion_tokens"] += sign * (stage.completion_tokens or 0)
+                row["retries"] += sign * (stage.retries or 0)
+        self._increment(
+            db,
+            StageAggregate,
+            ("scope", "stage"),
+            [
+                {"scope": scope, "stage": stage, **row}
+                for (scope, stage), row in totals.items()
+            ],
+        )
+
+    def record_component(
+        self, db: Session, component: Component, sign: int = 1
+    ) -> None:
+        """Add or subtract a component from the counts, without committing."""
+        rows = [{"dimension": "all", "value": "all", "component_count": sign}]
+        for dimension in COMPONENT_DIMENSIONS:
+            rows.append(
+                {
+                    "dimension": dimension,
+                    "value": getattr(component, dimension),
+                    "component_count": sign,
+                }
+            )
+        self._increment(db, ComponentAggregate, ("dimension", "value"), rows)
+
+    def get_chat_totals(
+        self, db: Session, session_id: Optional[str] = None
+    ) -> Dict[str, int]:
+        """Chat totals of a session, or of all chats."""
+        row = (
+            db.query(ChatAggregate)
+            .filter(ChatAggregate.scope == scope_of(session_id))
+            .first()
+        )
+        return {
+            counter: getattr(row, counter) if row else 0 for counter in CHAT_COUNTERS
+        }
+
+    def get_stage_totals(
+        self, db: Session, session_id: Optional[str] = None
+    ) -> List[StageAggregate]:
+        """Totals of each crew stage in a session, or across all chats."""
+        return (
+            db.query(StageAggregate)
+            .filter(StageAggregate.scope == scope_of(session_id))
+            .filter(StageAggregate.runs > 0)
+            .all()
+        )
+
+    def get_component_counts(self, db: Session) -> Dict[str, Dict[str, int]]:
+        """Component counts by dimension and value, e.g. {"data_source": {"csv": 2}}."""
+        counts: Dict[str, Dict[str, int]] = {}
+        for row in db.query(ComponentAggregate).all():
+            counts.setdefault(row.dimension, {})[row.value] = row.component_count
+        return counts
+
+    def get_latency_sketches(
+        self,
+        db: Session,
+        start: datetime,
+        end: datetime,
+        dimension: str = ALL_SCOPE,
+        value: Optional[str] = None,
+    ) -> Dict[str, LatencySketch]:
+        """
+        Latency sketch of each value of a dimension, over the buckets starting in a window.
+
+        The window is widened to whole buckets (see latency_window).
+
+        Args:
+            db: Database session
+            start: Start of the window
+            end: End of the window
+            dimension: "all", "model" or "pipeline"
+            value: Only this model or pipeline (all values when None)
+        """
+        window_start, window_end = self.latency_window(start, end)
+        count = func.sum(LatencySketchBin.chat_count)
+        query = db.query(LatencySketchBin.value, LatencySketchBin.bin, count).filter(
+            LatencySketchBin.dimension == dimension,
+            LatencySketchBin.bucket_start >= window_start,
+            LatencySketchBin.bucket_start < window_end,
+        )
+        if value is not None:
+            query = query.filter(LatencySketchBin.value == value)
+        sketches: Dict[str, LatencySketch] = {}
+        for group, key, chats in query.group_by(
+            LatencySketchBin.value, LatencySketchBin.bin
+        ):
+            sketch = sketches.setdefault(group, LatencySketch(self.latency_accuracy))
+            sketch.add_to_bin(key, int(chats))
+        return sketches
+
+    def latency_window(self, start: datetime, end: datetime) -> Tuple[int, int]:
+        """
+        Start and end (Unix times in seconds) of the whole buckets covering a window.
+
+        Raises:
+            ValueError: If start is not before end
+        """
+        if _seconds(start) >= _seconds(end):
+            raise ValueError("start must be before end")
+        window_end = self.bucket_of(end)
+        if window_end < _seconds(end):
+            window_end += self.latency_bucket_seconds
+        return self.bucket_of(start), window_end
+
+    def bucket_of(self, moment: Optional[datetime]) -> int:
+        """Start (Unix time in seconds) of the latency bucket a moment falls in."""
+        seconds = _seconds(moment or datetime.now(timezone.utc))
+        return seconds - seconds % self.latency_bucket_seconds
+
+    def rebuild(self, db: Session) -> Dict[str, int]:
+        """
+        Recompute every total from the stored rows, in one transaction.
+
+        Returns:
+            Number of aggregate rows written per table
+        """
+        try:
+            for model in (
+                ChatAggregate,
+                StageAggregate,
+                ComponentAggregate,
+                LatencySketchBin,
+            ):
+                db.query(model).delete(synchronize_session=False)
+            written = {
+                "chat_aggregates": self._insert(db, ChatAggregate, self._chat_rows(db)),
+                "stage_aggregates": self._insert(
+                    db, StageAggregate, self._stage_rows(db)
+                ),
+                "component_aggregates": self._insert(
+                    db, ComponentAggregate, self._component_rows(db)
+                ),
+                "latency_sketch_bins": self._insert(
+                    db, LatencySketchBin, self._latency_rows(db)
+                ),
+            }
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return written
+
+    def _chat_rows(self, db: Session) -> List[Dict[str, Any]]:
+        # Same rule as record_chats: JSON null is no suggestion
+        suggested = cast(Chat.component_suggestion, String) != "null"
+        query = db.query(
+            Chat.session_id,
+            func.count(Chat.id),
+            func.coalesce(func.sum(Chat.processing_time), 0),
+            func.count(Chat.processing_time),
+            func.coalesce(func.sum(case((suggested, 1), else_=0)), 0),
+        ).group_by(Chat.session_id)
+        everything = {"scope": ALL_SCOPE, **dict.fromkeys(CHAT_COUNTERS, 0)}
+        rows = [everything]
+        for session_id, *values in query:
+            row = dict(zip(CHAT_COUNTERS, (int(value) for value in values)))
+            rows.append({"scope": session_scope(session_id), **row})
+            for counter in CHAT_COUNTERS:
+                everything[counter] += row[counter]
+        return rows
+
+    def _stage_rows(self, db: Session) -> List[Dict[str, Any]]:
+        sums = [
+            func.count(ChatStage.id),
+            func.coalesce(func.sum(ChatStage.duration_ms), 0),
+            func.coalesce(func.sum(ChatStage.llm_calls), 0),
+            func.coalesce(func.sum(ChatStage.llm_ms), 0),
+            func.coalesce(func.sum(ChatStage.prompt_tokens), 0),
+            func.coalesce(func.sum(ChatStage.completion_tokens), 0),
+            func.coalesce(func.sum(ChatStage.retries), 0),
+        ]
+        rows = [
+            {"scope": ALL_SCOPE, "stage": stage, **dict(zip(STAGE_COUNTERS, values))}
+            for stage, *values in db.query(ChatStage.stage, *sums).group_by(
+                ChatStage.stage
+            )
+        ]
+        by_session = (
+            db.query(Chat.session_id, ChatStage.stage, *sums)
+            .join(Chat, Chat.id == ChatStage.chat_id)
+            .group_by(Chat.session_id, ChatStage.stage)
+        )
+        rows.extend(
+            {
+                "scope": session_scope(session_id),
+                "stage": stage,
+                **dict(zip(STAGE_COUNTERS, values)),
+            }
+            for session_id, stage, *values in by_session
+        )
+        return rows
+
+    def _component_rows(self, db: Session) -> List[Dict[str, Any]]:
+        rows = [
+            {
+                "dimension": "all",
+                "value": "all",
+                "component_count": db.query(Component).count(),
+            }
+        ]
+        for dimension in COMPONENT_DIMENSIONS:
+            column = getattr(Component, dimension)
+            rows.extend(
+                {"dimension": dimension, "value": value, "component_count": count}
+                for value, count in db.query(column, func.count(Component.id))
+                .group_by(column)
+                .all()
+            )
+        return rows
+
+    def _latency_rows(self, db: Session) -> List[Dict[str, Any]]:
+        chats = (
+            db.query(
+                Chat.created_at, Chat.processing_time, Chat.model_used, Chat.pipeline
+            )
+            .filter(Chat.processing_time.isnot(None))
+            .yield_per(1000)
+        )
+        counts: Dict[tuple, int] = {}
+        self._count_latencies(chats, 1, counts)
+        return self._bin_rows(counts)
+
+    def _count_latencies(
+        self, chats: Iterable[Any], sign: int, counts: Dict[tuple, int]
+    ) -> None:
+        """Add sign per chat to counts of (dimension, value, bucket_start, bin)."""
+        for chat in chats:
+            if chat.processing_time is None:
+                continue
+            bucket = self.bucket_of(chat.created_at)
+            key = self._bins.key(chat.processing_time)
+            values = [(ALL_SCOPE, ALL_SCOPE)]
+            for dimension, attribute in LATENCY_DIMENSIONS.items():
+                values.append((dimension, getattr(chat, attribute) or UNKNOWN))
+            for dimension, value in values:
+                entry = (dimension, value, bucket, key)
+                counts[entry] = counts.get(entry, 0) + sign
+
+    def _bin_rows(self, counts: Dict[tuple, int]) -> List[Dict[str, Any]]:
+        return [
+            {**dict(zip(LATENCY_KEYS, entry)), "chat_count": count}
+            for entry, count in counts.items()
+        ]
+
+    def _insert(
+        self, db: Session, model: Type[Base], rows: List[Dict[str, Any]]
+    ) -> int:
+        if rows:
+            db.execute(insert(model.__table__), rows)
+        return len(rows)
+
+    def _increment(
+        self,
+        db: Session,
+        model: Type[Base],
+        keys: tuple,
+        rows: List[Dict[str, Any]],
+    ) -> None:
+        """Add each row's counters to the aggregate row with its keys, creating it if missing."""
+        if not rows:
+            return
+        # The same order in every transaction, so concurrent ones can't deadlock
+        rows.sort(key=lambda row: tuple(row[key] for key in keys))
+        table = model.__table__
+        counters = [column for column in rows[0] if column not in keys]
+        dialect = db.get_bind().dialect.name
+
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as upsert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as upsert
+            statement = upsert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=list(keys),
+                set_={
+                    column: table.c[column] + statement.excluded[column]
+                    for column in counters
+                },
+            )
+            db.execute(statement, rows)
+            return
+        if dialect in ("mysql", "mariadb"):
+            from sqlalchemy.dialects.mysql import insert as upsert
+
+            statement = upsert(table)
+            statement = statement.on_duplicate_key_update(
+                {
+                    column: table.c[column] + statement.inserted[column]
+                    for column in counters
+                }
+            )
+            db.execute(statement, rows)
+            return
+
+        for row in rows:
+            updated = db.execute(
+                update(table)
+                .where(*(table.c[key] == row[key] for key in keys))
+                .values({column: table.c[column] + row[column] for column in counters})
+            )
+            if not updated.rowcount:
+                db.execute(insert(table).values(**row))
+
+
+def _seconds(moment: datetime) -> int:
+    """Unix time of a moment; naive ones are UTC, as SQLite hands them back."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
@@ -0,0 +1,67 @@
+"""
+Summary repository for per-session conversation summaries.
+"""
+
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session
+from fastapi_server.models import ChatSummary
+from .base_repository import BaseRepository
+
+
+class SummaryRepository(BaseRepository[ChatSummary]):
+    """Repository for ChatSummary model operations."""
+
+    def __init__(self):
+        super().__init__(ChatSummary)
+
+    def get_by_session(self, db: Session, session_id: str) -> Optional[ChatSummary]:
+        """Get the summary for a session, if one has been stored."""
+        return (
+            db.query(ChatSummary).filter(ChatSummary.session_id == session_id).first()
+        )
+
+    def get_many(self, db: Session, session_ids: List[str]) -> List[ChatSummary]:
+        """Get the stored summaries of several sessions."""
+        return (
+            db.query(ChatSummary).filter(ChatSummary.session_id.in_(session_ids)).all()
+        )
+
+    def save(
+        self, db: Session, session_id: str, summary_data: Dict[str, Any]
+    ) -> ChatSummary:
+        """Create or replace the summary for a session."""
+        db_obj = self.get_by_session(db, session_id)
+        if db_obj is None:
+            return self.create(db, {"session_id": session_id, **summary_data})
+
+        for field, value in summary_data.items():
+            if hasattr(db_obj, field):
+                setattr(db_obj, field, value)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def save_many(
+        self, db: Session, summaries: Dict[str, Dict[str, Any]]
+    ) -> List[ChatSummary]:
+        """Create or replace the summaries of several sessions in one transaction."""
+        existing = {
+            summary.session_id: summary
+            for summary in self.get_many(db, list(summaries))
+        }
+        saved = []
+        for session_id, summary_data in summaries.items():
+            db_obj = existing.get(session_id)
+            if db_obj is None:
+                db_obj = ChatSummary(session_id=session_id)
+                db.add(db_obj)
+            for field, value in summary_data.items():
+                if hasattr(db_obj, field):
+                    setattr(db_obj, field, value)
+            saved.append(db_obj)
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return saved
@@ -48,12 +48,30 @@ class ChatResponse(BaseModel):
     session_id: Optional[str] = None
     chat_id: Optional[int] = None
     processing_time: Optional[int] = None
+    timing: Optional[Dict[str, Any]] = None
+    # Set when the request deadline cut the crew run short
+    partial: bool = False
+    incomplete_stages: Optional[List[str]] = None
+
+
+class ChatBatchRequest(BaseModel):
+    messages: List[str]
+    # Shared by every message when set; otherwise each message gets its own session
+    session_id: Optional[str] = None
+
+
+class ChatBatchResponse(BaseModel):
+    results: List[ChatResponse]
+    total_count: int
+    failed_count: int
+    processing_time: int
 
 
 class ChatHistoryResponse(BaseModel):
     chats: List[Dict[str, Any]]
     total_count: int
     session_id: str
+    next_cursor: Optional[str] = None
 
 
 class ChatStatisticsResponse(BaseModel):
@@ -61,3 +79,39 @@ class ChatStatisticsResponse(BaseModel):
     average_processing_time_ms: float
     chats_with_suggestions: int
     suggestion_rate: float
+    total_prompt_tokens: int = 0
+    total_completion_tokens: int = 0
+    total_llm_calls: int = 0
+    total_llm_ms: float = 0
+    total_retries: int = 0
+    average_queue_ms: float = 0
+    slowest_stage: Optional[str] = None
+
+
+class StageBreakdownResponse(BaseModel):
+    stages: List[Dict[str, Any]]
+    session_id: Optional[str] = None
+
+
+class LatencyPercentiles(BaseModel):
+    count: int
+    p50_ms: Optional[float] = None
+    p90_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+
+
+class LatencyStatisticsResponse(LatencyPercentiles):
+    start: datetime
+    end: datetime
+    bucket_seconds: int
+    relative_accuracy: float
+    model_used: Optional[str] = None
+    pipeline: Optional[str] = None
+    groups: Optional[Dict[str, LatencyPercentiles]] = None
+
+
+class ChatStagesResponse(BaseModel):
+    chat_id: int
+    model_used: Optional[str] = None
+    processing_time: Optional[int] = None
+    stages: List[Dict[str, Any]]
@@ -2,13 +2,49 @@
 Chat service for processing user messages and managing chat history.
 """
 
+import asyncio
+import threading
 import time
 import uuid
-from typing import Dict, Any, Optional, List
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, AsyncIterator, Tuple
 from sqlalchemy.orm import Session
-from fastapi_server.chat_agent import ChatAgent
+from fastapi import HTTPException
+from fastapi_server.ai.conversation import RollingSummary, build_conversation_context
+from fastapi_server.ai.deadline import (
+    Deadline,
+    DeadlineExceededError,
+    RunCancelledError,
+)
+from fastapi_server.ai.execution import CrewBackpressureError
+from fastapi_server.ai.response_cache import normalize_message
+from fastapi_server.ai.router import DIRECT_MODEL, label_chat
+from fastapi_server.ai.run_context import EventSink
+from fastapi_server.config import Config
+from fastapi_server.repositories.base_repository import DbSession, run_db
 from fastapi_server.repositories.chat_repository import ChatRepository
-from fastapi_server.schemas import ChatRequest, ChatResponse
+from fastapi_server.repositories.chat_writer import ChatWriter
+from fastapi_server.repositories.history_cache import SessionHistoryCache
+from fastapi_server.repositories.latency_sketch import LatencySketch
+from fastapi_server.repositories.pagination import InvalidCursorError, Page
+from fastapi_server.repositories.stage_repository import StageRepository
+from fastapi_server.repositories.statistics_repository import (
+    ALL_SCOPE,
+    LATENCY_DIMENSIONS,
+)
+from fastapi_server.repositories.summary_repository import SummaryRepository
+from fastapi_server.schemas import (
+    ChatBatchRequest,
+    ChatBatchResponse,
+    ChatRequest,
+    ChatResponse,
+)
+
+if TYPE_CHECKING:
+    from fastapi_server.chat_agent import ChatAgent
+
+# Percentiles reported by get_latency_statistics
+LATENCY_PERCENTILES = {"p50_ms": 0.5, "p90_ms": 0.9, "p99_ms": 0.99}
 
 
 class ChatService:
@@ -16,10 +52,77 @@ class ChatService:
 
     def __init__(self):
         self.repository = ChatRepository()
-        self.crew = ChatAgent()
+        self.summary_repository = SummaryRepository()
+        self.stage_repository = StageRepository()
+        self.history_cache: Optional[SessionHistoryCache] = None
+        if Config.HISTORY_CACHE_ENABLED:
+            self.history_cache = SessionHistoryCache(
+                # Enough turns for the conversation context, whatever the setting
+                max_turns=max(Config.HISTORY_CACHE_TURNS, self._context_turns()),
+                max_bytes=Config.HISTORY_CACHE_MAX_BYTES,
+                max_sessions=Config.HISTORY_CACHE_MAX_SESSIONS,
+                ttl_seconds=Config.HISTORY_CACHE_TTL_SECONDS,
+            )
+        self.chat_writer = ChatWriter(
+            mode=Config.CHAT_WRITE_MODE,
+            batch_size=Config.CHAT_WRITE_BATCH_SIZE,
+            flush_interval=Config.CHAT_WRITE_FLUSH_MS / 1000,
+            max_pending=Config.CHAT_WRITE_MAX_PENDING,
+            id_block_size=Config.CHAT_ID_BLOCK_SIZE,
+            repository=self.repository,
+            summary_repository=self.summary_repository,
+            history_cache=self.history_cache,
+        )
+        self._crew: Optional["ChatAgent"] = None
+        self._crew_lock = threading.Lock()
+
+    @property
+    def crew(self) -> "ChatAgent":
+        """
+        The chat agent, built on first use.
+
+        Importing crewai and building the crew takes seconds, so it is left out
+        of app startup; see load_crew for the event-loop friendly variant.
+        """
+        if self._crew is None:
+            with self._crew_lock:
+                if self._crew is None:
+                    started = time.time()
+                    from fastapi_server.chat_agent import ChatAgent
+
+                    self._crew = ChatAgent()
+                    print(
+                        f"🤖 Chat agent loaded in "
+                        f"{int((time.time() - started) * 1000)}ms"
+                    )
+        return self._crew
+
+    @property
+    def crew_loaded(self) -> bool:
+        return self._crew is not None
+
+    async def load_crew(self) -> "ChatAgent":
+        """Build the chat agent off the event loop if it isn't loaded yet."""
+        if self._crew is None:
+            return await asyncio.to_thread(lambda: self.crew)
+        return self._crew
+
+    def shutdown(self) -> None:
+        """Release the chat agent's worker pools, if it was ever loaded."""
+        if self._crew is not None:
+            self._crew.shutdown()
+
+    async def flush_writes(self) -> None:
+        """Store the chats still queued for writing and stop the writer."""
+        await self.chat_writer.close()
 
     async def process_chat_message(
-        self, db: Session, chat_request: ChatRequest, session_id: Optional[str] = None
+        self,
+        db: DbSession,
+        chat_request: ChatRequest,
+        session_id: Optional[str] = None,
+        sink: Optional[EventSink] = None,
+        deadline: Optional[Deadline] = None,
     ) -> ChatResponse:
         """
         Process a chat message through the AI crew and store the result.
@@ -28,9 +131,15 @@ class ChatService:
             db: Database session
             chat_request: The chat request containing the message
             session_id: Optional session ID for conversation tracking
+            sink: Optional sink receiving stage progress and response tokens
+            deadline: Optional request deadline, cancelled if the client disconnects
 
         Returns:
             ChatResponse with AI-generated response and component suggestions
+
+        Raises:
+            HTTPException: 429/503 when the crew execution queue is saturated,
+                504 when the deadline passed before any stage finished
         """
         start_time = time.time()
 
@@ -39,17 +148,21 @@ class ChatService:
             if not session_id:
                 session_id = str(uuid.uuid4())
 
-            # Get chat history for context
-            chat_history = await self.get_chat_history(db, session_id, limit=10)
-            print(
-                f"📚 Retrieved {len(chat_history['chats'])} previous messages for session {session_id}"
+            crew = await self.load_crew()
+            # The session's previous turn may still be queued for writing
+            await self.chat_writer.wait_for_session(session_id)
+            recent_chats, summary, conversation_context = await run_db(
+                db, self._build_context, session_id
             )
 
-            # Process message through AI crew with chat history
-            result = await self.crew.process_message(
+            # Process message through AI crew with conversation context
+            result = await crew.process_message(
                 chat_request.message,
                 session_id=session_id,
-                chat_history=chat_history["chats"],
+                chat_history=recent_chats,
+                conversation_context=conversation_context,
+                sink=sink,
+                deadline=deadline,
             )
 
             # Calculate processing time
@@ -58,74 +171,310 @@ class ChatService:
             )  # Convert to milliseconds
 
             # Store chat in database
-            chat_data = {
-                "session_id": session_id,
-                "user_message": chat_request.message,
-                "agent_response": result["response"],
-                "intent": result.get("intent"),
-                "component_suggestion": result.get("component_suggestion"),
-                "data_preview": result.get("data"),
-                "processing_time": processing_time,
-                "model_used": self._extract_model_used(result),
-            }
+            chat_data = self._chat_data(
+                session_id, chat_request.message, result, processing_time
+            )
+            chat_id = (
+                await self.chat_writer.write(
+                    db, [chat_data], [self._stage_timing(result)], summary
+                )
+            )[0]
 
-            stored_chat = self.repository.create(db, chat_data)
+            return self._chat_response(result, session_id, chat_id, processing_time)
 
-            return ChatResponse(
-                response=result["response"],
-                component_suggestion=result.get("component_suggestion"),
-                data=result.get("data"),
-                session_id=session_id,
-                chat_id=stored_chat.id,
-                processing_time=processing_time,
+        except CrewBackpressureError as e:
+            print(f"⏳ Chat request rejected by crew executor: {e}")
+            raise HTTPException(
+                status_code=e.status_code,
+                detail=str(e),
+                headers={"Retry-After": "1"},
             )
-
+        except DeadlineExceededError as e:
+            print(f"⏰ Chat request ran out of time: {e}")
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        except RunCancelledError:
+            # Nobody is waiting for a response
+            raise
         except Exception as e:
             # Log the error and return a fallback response
             print(f"Error processing chat message: {e}")
-            return ChatResponse(
-                response=f"Sorry, I encountered an error processing your request: {str(e)}",
-                component_suggestion=None,
-                data=None,
-                session_id=session_id,
-                chat_id=None,
-                processing_time=0,
+            return self._error_response(e, session_id)
+
+    def validate_batch(self, batch: ChatBatchRequest) -> None:
+        """
+        Check a batch before any of it runs.
+
+        Raises:
+            HTTPException: 400 for an empty batch, 413 for one over CHAT_BATCH_MAX_MESSAGES
+        """
+        if not batch.messages:
+            raise HTTPException(
+                status_code=400, detail="A batch needs at least one message"
+            )
+        if len(batch.messages) > Config.CHAT_BATCH_MAX_MESSAGES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"A batch can hold at most {Config.CHAT_BATCH_MAX_MESSAGES} messages",
             )
 
+    async def process_chat_batch(
+        self,
+        db: DbSession,
+        batch: ChatBatchRequest,
+        deadline: Optional[Deadline] = None,
+    ) -> ChatBatchResponse:
+        """
+        Process a batch of chat messages and return every result at once.
+
+        Args:
+            db: Database session
+            batch: Messages and the optional session they share
+            deadline: Optional deadline for the whole batch
+
+        Returns:
+            ChatBatchResponse with one ChatResponse per message, in request order
+        """
+        response = None
+        async for event in self.stream_chat_batch(db, batch, deadline):
+            if event["event"] == "done":
+                response = ChatBatchResponse(**event["data"])
+        return response  # type: ignore[return-value]
+
+    async def stream_chat_batch(
+        self,
+        db: DbSession,
+        batch: ChatBatchRequest,
+        deadline: Optional[Deadline] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a batch of chat messages, yielding results as they complete.
+
+        Messages run through the crew with bounded concurrency; identical
+        messages run once and share the result, and a shared session's
+        conversation context is loaded once. When every message has finished,
+        all chats are stored in one transaction.
+
+        Yields a "result" event per message (index and ChatResponse, not yet
+        stored so without chat_id) in completion order, then a "done" event
+        with the stored ChatBatchResponse.
+
+        Args:
+            db: Database session
+            batch: Messages and the optional session they share
+            deadline: Optional deadline for the whole batch
+        """
+        self.validate_batch(batch)
+        start_time = time.time()
+        messages = batch.messages
+
+        if batch.session_id:
+            sessions = [batch.session_id] * len(messages)
+            await self.chat_writer.wait_for_session(batch.session_id)
+            recent_chats, summary, conversation_context = await run_db(
+                db, self._build_context, batch.session_id
+            )
+            # Runs in one session share its per-session executor limit
+            concurrency = min(
+                Config.CHAT_BATCH_CONCURRENCY, Config.CREW_MAX_PENDING_PER_SESSION
+            )
+        else:
+            # Fresh sessions have no history to load
+            sessions = [str(uuid.uuid4()) for _ in messages]
+            recent_chats, summary = [], None
+            conversation_context = build_conversation_context(
+                None, [], Config.CONTEXT_TOKEN_BUDGET
+            )
+            concurrency = Config.CHAT_BATCH_CONCURRENCY
+
+        # Identical messages get the same answer; run each one once
+        groups: Dict[str, List[int]] = {}
+        for index, message in enumerate(messages):
+            groups.setdefault(normalize_message(message), []).append(index)
+        print(
+            f"📦 Processing batch of {len(messages)} messages "
+            f"({len(groups)} distinct, concurrency {concurrency})"
+        )
+
+        crew = await self.load_crew()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run(indices: List[int]):
+            first = indices[0]
+            async with semaphore:
+                started = time.time()
+                try:
+                    result = await crew.process_message(
+                        messages[first],
+                        session_id=sessions[first],
+                        chat_history=recent_chats,
+                        conversation_context=conversation_context,
+                        deadline=deadline,
+                    )
+                    error = None
+                except RunCancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Error processing batch message {first}: {e}")
+                    result, error = None, e
+                return indices, result, error, int((time.time() - started) * 1000)
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+        responses: List[Optional[ChatResponse]] = [None] * len(messages)
+        processing_times = [0] * len(messages)
+        tasks = [asyncio.ensure_future(run(indices)) for indices in groups.values()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                indices, result, error, processing_time = await next_done
+                for position, index in enumerate(indices):
+                    if error is not None:
+                        responses[index] = self._error_response(error, sessions[index])
+                    else:
+                        if position > 0:
+                            result = dict(result, served_from="coalesced")
+                        results[index] = result
+                        processing_times[index] = processing_time
+                        responses[index] = self._chat_response(
+                            result, sessions[index], None, processing_time
+                        )
+                    yield {
+                        "event": "result",
+                        "data": {
+                            "index": index,
+                            "response": responses[index].model_dump(),
+                        },
+                    }
+        finally:
+            # The client went away before the batch finished
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        # One transaction for every chat of the batch and its stage rows
+        stored = [i for i, result in enumerate(results) if result is not None]
+        chat_ids = await self.chat_writer.write(
+            db,
+            [
+                self._chat_data(
+                    sessions[i], messages[i], results[i], processing_times[i]
+                )
+                for i in stored
+            ],
+            [self._stage_timing(results[i]) for i in stored],
+            summary,
+        )
+        for index, chat_id in zip(stored, chat_ids):
+            responses[index].chat_id = chat_id
+
+        yield {
+            "event": "done",
+            "data": ChatBatchResponse(
+                results=responses,
+                total_count=len(messages),
+                failed_count=len(messages) - len(stored),
+                processing_time=int((time.time() - start_time) * 1000),
+            ).model_dump(),
+        }
+
+    async def stream_chat_message(
+        self,
+        db: DbSession,
+        chat_request: ChatRequest,
+        session_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a chat message and yield progress events as they happen.
+
+        Yields "stage" events as crew tasks start and finish, "token" events
+        for the response text, and a final "done" event with the stored
+        ChatResponse (or "error" if the request was rejected).
+
+        Args:
+            db: Database session
+            chat_request: The chat request containing the message
+            session_id: Optional session ID for conversation tracking
+            deadline: Optional request deadline
+        """
+        sink = EventSink()
+        task = asyncio.ensure_future(
+            self.process_chat_message(
+                db, chat_request, session_id, sink=sink, deadline=deadline
+            )
+        )
+
+        try:
+            while True:
+                next_event = asyncio.ensure_future(sink.get())
+                done, _ = await asyncio.wait(
+                    {next_event, task}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if next_event in done:
+                    yield next_event.result()
+                    continue
+                next_event.cancel()
+                break
+
+            # Events emitted just before the run finished
+            while not sink.empty():
+                yield sink.get_nowait()
+
+            try:
+                response = task.result()
+                yield {"event": "done", "data": response.model_dump()}
+            except HTTPException as e:
+                yield {
+                    "event": "error",
+                    "data": {"status_code": e.status_code, "detail": e.detail},
+                }
+        finally:
+            # The client went away before the run finished
+            if not task.done():
+                task.cancel()
+
     async def get_chat_history(
-        self, db: Session, session_id: str, limit: int = 50
+        self,
+        db: DbSession,
+        session_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
-        Get chat history for a specific session.
+        Get chat history for a specific session, newest first.
 
         Args:
             db: Database session
             session_id: The session ID to get history for
             limit: Maximum number of chats to return
+            cursor: next_cursor of the previous page, to continue after it
 
         Returns:
-            Dict containing chat history and metadata
+            Dict containing chat history, metadata and the next page's cursor
         """
         try:
             print(f"🔍 Retrieving chat history for session: {session_id}")
-            chats = self.repository.get_by_session_id(db, session_id, limit)
-            print(f"📊 Found {len(chats)} chats in database for session {session_id}")
-
-            # Debug: Print first few chats if any exist
-            if chats:
+            await self.chat_writer.wait_for_session(session_id)
+            page = self._cached_history_page(session_id, limit, cursor)
+            if page is None:
+                rows = await run_db(
+                    db, self.repository.get_history_page, session_id, limit, cursor
+                )
+                page = Page([chat.to_dict() for chat in rows.items], rows.next_cursor)
                 print(
-                    f"📝 Sample chat data: {chats[0].to_dict() if chats else 'No chats'}"
+                    f"📊 Found {len(page.items)} chats in database for session {session_id}"
                 )
 
             result = {
                 "session_id": session_id,
-                "chats": [chat.to_dict() for chat in chats],
-                "total_count": len(chats),
+                "chats": page.items,
+                "total_count": len(page.items),
+                "next_cursor": page.next_cursor,
             }
 
             print(f"✅ Chat history retrieval completed: {result['total_count']} chats")
             return result
 
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             print(f"❌ Error getting chat history: {e}")
             import traceback
@@ -134,7 +483,7 @@ class ChatService:
             return {"session_id": session_id, "chats": [], "total_count": 0}
 
     async def get_chat_statistics(
-        self, db: Session, session_id: Optional[str] = None
+        self, db: DbSession, session_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Get chat statistics for analytics.
@@ -147,21 +496,7 @@ class ChatService:
             Dict containing chat statistics
         """
         try:
-            total_chats = self.repository.get_total_count(db)
-            avg_processing_time = self.repository.get_average_processing_time(db)
-            chats_with_suggestions = self.repository.get_count_with_suggestions(db)
-
-            suggestion_rate = 0
-            if total_chats > 0:
-                suggestion_rate = (chats_with_suggestions / total_chats) * 100
-
-            return {
-                "total_chats": total_chats,
-                "average_processing_time_ms": avg_processing_time,
-                "chats_with_suggestions": chats_with_suggestions,
-                "suggestion_rate": suggestion_rate,
-            }
-
+            return await run_db(db, self._chat_statistics, session_id)
         except Exception as e:
             print(f"Error getting chat statistics: {e}")
             return {
@@ -171,24 +506,380 @@ class ChatService:
                 "suggestion_rate": 0,
             }
 
+    async def get_stage_breakdown(
+        self, db: DbSession, session_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get latency and token usage per crew stage across stored chats.
+
+        Args:
+            db: Database session
+            session_id: Optional session ID to filter by
+
+        Returns:
+            Dict with one entry per stage, the stage taking most time first
+        """
+        try:
+            stages = await run_db(
+                db, self.stage_repository.get_stage_breakdown, session_id
+            )
+        except Exception as e:
+            print(f"Error getting stage breakdown: {e}")
+            stages = []
+        return {"session_id": session_id, "stages": stages}
+
+    async def get_latency_statistics(
+        self,
+        db: DbSession,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        model_used: Optional[str] = None,
+        pipeline: Optional[str] = None,
+        group_by: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Get processing time percentiles over a time window, from the latency sketches.
+
+        Sketches are kept per model and per pipeline, not per combination, so
+        one filter or one breakdown can be asked for at a time.
+
+        Args:
+            db: Database session
+            start: Start of the window (default: a day before end)
+            end: End of the window (default: now)
+            model_used: Only chats answered by this model
+            pipeline: Only chats answered by this pipeline
+            group_by: Break the percentiles down by "model" or "pipeline"
+
+        Returns:
+            Dict with the window (widened to whole buckets) and its percentiles
+
+        Raises:
+            HTTPException: If the window is empty or the parameters don't combine
+        """
+        end = end or datetime.now(timezone.utc)
+        start = start or end - timedelta(days=1)
+        if len([given for given in (model_used, pipeline, group_by) if given]) > 1:
+            raise HTTPException(
+                status_code=400,
+                detail="Pass at most one of model_used, pipeline and group_by",
+            )
+        if group_by not in (None, *LATENCY_DIMENSIONS):
+            raise HTTPException(
+                status_code=400,
+                detail=f"group_by must be one of {', '.join(LATENCY_DIMENSIONS)}",
+            )
+        try:
+            return await run_db(
+                db, self._latency_statistics, start, end, model_used, pipeline, group_by
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def get_chat_stages(
+        self, db: DbSession, chat_id: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the stage timings of a single chat.
+
+        Args:
+            db: Database session
+            chat_id: The chat ID to get stages for
+
+        Returns:
+            Dict with the chat's model and stages, or None if the chat doesn't exist
+        """
+        return await run_db(db, self._chat_stages, chat_id)
+
+    def _chat_statistics(
+        self, db: Session, session_id: Optional[str]
+    ) -> Dict[str, Any]:
+        # Running totals: a few rows are read however many chats are stored
+        return {
+            **self.repository.get_chat_statistics(db, session_id),
+            **self.stage_repository.get_usage_totals(db, session_id),
+            "slowest_stage": self.stage_repository.get_slowest_stage(db, session_id),
+        }
+
+    def _latency_statistics(
+        self,
+        db: Session,
+        start: datetime,
+        end: datetime,
+        model_used: Optional[str],
+        pipeline: Optional[str],
+        group_by: Optional[str],
+    ) -> Dict[str, Any]:
+        statistics = self.repository.statistics
+        window_start, window_end = statistics.latency_window(start, end)
+        if model_used:
+            dimension, value = "model", model_used
+        elif pipeline:
+            dimension, value = "pipeline", pipeline
+        else:
+            dimension, value = ALL_SCOPE, ALL_SCOPE
+        sketches = statistics.get_latency_sketches(db, start, end, dimension, value)
+        sketch = sketches.get(value) or LatencySketch(statistics.latency_accuracy)
+
+        groups = None
+        if group_by:
+            by_value = statistics.get_latency_sketches(db, start, end, group_by)
+            groups = {
+                name: self._percentiles(group)
+                for name, group in sorted(by_value.items())
+                if group.count
+            }
+        return {
+            "start": datetime.fromtimestamp(window_start, timezone.utc),
+            "end": datetime.fromtimestamp(window_end, timezone.utc),
+            "bucket_seconds": statistics.latency_bucket_seconds,
+            "relative_accuracy": statistics.latency_accuracy,
+            "model_used": model_used,
+            "pipeline": pipeline,
+            **self._percentiles(sketch),
+            "groups": groups,
+        }
+
+    def _percentiles(self, sketch: LatencySketch) -> Dict[str, Any]:
+        """Chat count and p50/p90/p99 processing times of a sketch, in milliseconds."""
+        percentiles = {"count": sketch.count}
+        for name, q in LATENCY_PERCENTILES.items():
+            value = sketch.quantile(q)
+            percentiles[name] = round(value, 1) if value is not None else None
+        return percentiles
+
+    def _chat_stages(self, db: Session, chat_id: int) -> Optional[Dict[str, Any]]:
+        chat = self.repository.get(db, chat_id)
+        if chat is None:
+            return None
+        stages = self.stage_repository.get_by_chat(db, chat_id)
+        return {
+            "chat_id": chat_id,
+            "model_used": chat.model_used,
+            "processing_time": chat.processing_time,
+            "stages": [stage.to_dict() for stage in stages],
+        }
+
+    def _build_context(
+        self, db: Session, session_id: str
+    ) -> Tuple[List[Dict[str, Any]], RollingSummary, str]:
+        """
+        Recent chats (newest first), rolling summary and prompt context of a session.
+
+        The context is the summary plus the latest turns, fitted to the token budget.
+        Sessions in the history cache are served without reading the database.
+        """
+        limit = self._context_turns()
+        if self.history_cache is None:
+            recent_chats, stored = self._load_session(db, session_id, limit)
+        else:
+            cached = self.history_cache.get_or_load(
+                session_id,
+                lambda count: self._load_session(db, session_id, count),
+            )
+            recent_chats, stored = cached.turns[:limit], cached.summary
+
+        summary = RollingSummary.from_dict(
+            stored, token_budget=Config.SUMMARY_TOKEN_BUDGET
+        )
+        # Catch up on turns whose summary update failed; add_turn skips the rest
+        for chat in reversed(recent_chats):
+            summary.add_turn(chat)
+        conversation_context = build_conversation_context(
+            summary,
+            recent_chats[: Config.CONTEXT_VERBATIM_TURNS],
+            Config.CONTEXT_TOKEN_BUDGET,
+        )
+        print(
+            f"📚 Built conversation context for session {session_id}: "
+            f"{summary.turn_count} previous messages, {len(recent_chats)} recent"
+        )
+        return recent_chats, summary, conversation_context
+
+    def _context_turns(self) -> int:
+        """Latest turns the conversation context and the response cache key look at."""
+        return max(Config.CONTEXT_VERBATIM_TURNS, Config.RESPONSE_CACHE_CONTEXT_TURNS)
+
+    def _cached_history_page(
+        self, session_id: str, limit: int, cursor: Optional[str]
+    ) -> Optional[Page[Dict[str, Any]]]:
+        """The first history page from the history cache, if it holds enough turns."""
+        if self.history_cache is None or cursor is not None:
+            return None
+        cached = self.history_cache.get(session_id)
+        if cached is None or not (cached.complete or len(cached.turns) > limit):
+            return None
+        return self.repository.history_page_of(session_id, cached.turns, limit)
+
+    def _chat_data(
+        self,
+        session_id: str,
+        message: str,
+        result: Dict[str, Any],
+        processing_time: int,
+    ) -> Dict[str, Any]:
+        """Column values of the Chat row for a crew result."""
+        return {
+            "session_id": session_id,
+            "user_message": message,
+            "agent_response": result["response"],
+            "intent": result.get("intent"),
+            "component_suggestion": result.get("component_suggestion"),
+            "data_preview": result.get("data"),
+            "processing_time": processing_time,
+            "model_used": self._extract_model_used(result),
+            "pipeline": self._extract_pipeline(result),
+        }
+
+    def _chat_response(
+        self,
+        result: Dict[str, Any],
+        session_id: str,
+        chat_id: Optional[int],
+        processing_time: int,
+    ) -> ChatResponse:
+        return ChatResponse(
+            response=result["response"],
+            component_suggestion=result.get("component_suggestion"),
+            data=result.get("data"),
+            session_id=session_id,
+            chat_id=chat_id,
+            processing_time=processing_time,
+            timing=result.get("timing"),
+            partial=result.get("partial", False),
+            incomplete_stages=result.get("incomplete_stages"),
+        )
+
+    def _error_response(
+        self, error: Exception, session_id: Optional[str]
+    ) -> ChatResponse:
+        """Fallback response for a message the crew could not process."""
+        return ChatResponse(
+            response=f"Sorry, I encountered an error processing your request: {str(error)}",
+            component_suggestion=None,
+            data=None,
+            session_id=session_id,
+            chat_id=None,
+            processing_time=0,
+        )
+
+    def _load_session(
+        self, db: Session, session_id: str, limit: int
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Latest chats of a session (newest first) and its stored rolling summary.
+
+        Sessions stored before summaries existed are folded in once here;
+        after that ChatWriter folds in each turn as it stores it.
+
+        Args:
+            db: Database session
+            session_id: The session ID to load
+            limit: Maximum number of chats to load
+        """
+        recent_chats = [
+            chat.to_dict()
+            for chat in self.repository.get_recent_chats(db, session_id, limit=limit)
+        ]
+        stored = self.summary_repository.get_by_session(db, session_id)
+        if stored is None and recent_chats:
+            return recent_chats, self._rebuild_summary(db, session_id)
+        return recent_chats, stored.to_dict() if stored else None
+
+    def _rebuild_summary(self, db: Session, session_id: str) -> Dict[str, Any]:
+        """Fold every stored chat of a session into a new summary and save it."""
+        summary = RollingSummary(token_budget=Config.SUMMARY_TOKEN_BUDGET)
+        for chat in self.repository.get_by_session(db, session_id):
+            summary.add_turn(chat.to_dict())
+        self.summary_repository.save(db, session_id, summary.to_dict())
+        return summary.to_dict()
+
+    def train_router(self, db: Session) -> int:
+        """
+        Retrain the routing classifier on recent chats and save the model.
+
+        Each chat is labelled with the route its outcome called for (see
+        label_chat); failed runs are left out.
+
+        Returns:
+            Number of training examples, seed examples included
+        """
+        history = []
+        for chat in self.repository.get_latest_chats(db, Config.ROUTER_TRAINING_LIMIT):
+            chat_data = chat.to_dict()
+            route = label_chat(chat_data)
+            if route is not None:
+                history.append((chat_data["user_message"], route))
+
+        router = self.crew.crew.router
+        examples = router.train(history)
+        router.save(Config.ROUTER_MODEL_PATH)
+        print(
+            f"🔀 Routing classifier trained on {examples} examples "
+            f"({len(history)} from chat history)"
+        )
+        return examples
+
+    def get_runtime_metrics(self) -> Dict[str, Any]:
+        """
+        Get runtime metrics for the chat pipeline.
+
+        Returns:
+            Dict containing executor queue depth, wait times and throughput
+        """
+        metrics = {
+            "chat_writes": self.chat_writer.get_stats(),
+            "history_cache": (
+                self.history_cache.get_stats() if self.history_cache else None
+            ),
+        }
+        if self._crew is None:
+            # Don't load the crew just to report that it is idle
+            return {"crew_loaded": False, **metrics}
+        return {**self.crew.get_metrics(), **metrics}
+
     def _extract_model_used(self, result: Dict[str, Any]) -> str:
         """
         Extract the model used from the result.
-        This is a placeholder - in a real implementation,
-        you'd track which model was actually used in the crew
+
+        Crew runs report the provider/model that served most of their LLM
+        calls; answers served from the response cache are marked as such.
+        """
+        if result.get("served_from") == "cache":
+            return "response_cache"
+        return result.get("model_used") or "dashboard_crew"
+
+    def _extract_pipeline(self, result: Dict[str, Any]) -> Optional[str]:
         """
-        # For now, return a default value
-        # In a real implementation, you'd track which model was actually used
-        return "dashboard_crew"
+        Extract how the answer was produced from the result.
+
+        Answers not run by this chat's own crew are "cache" or "coalesced",
+        routed replies are "direct", crew runs report their crew profile.
+        """
+        if result.get("served_from"):
+            return result["served_from"]
+        if result.get("model_used") == DIRECT_MODEL:
+            return "direct"
+        if result.get("partial"):
+            return "partial"
+        return (result.get("routing") or {}).get("profile")
+
+    def _stage_timing(self, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Timing report to store as stage rows, if this chat ran the crew itself."""
+        # Cached and coalesced answers did not run the crew for this chat
+        if not result.get("timing") or result.get("served_from"):
+            return None
+        return result["timing"]
 
     async def search_chats(
         self,
-        db: Session,
+        db: DbSession,
         search_term: str,
         session_id: Optional[str] = None,
         skip: int = 0,
         limit: int = 100,
-    ) -> List[Dict[str, Any]]:
+        cursor: Optional[str] = None,
+    ) -> Page[Dict[str, Any]]:
         """
         Search chats by user message or agent response.
 
@@ -198,21 +889,29 @@ class ChatService:
             session_id: Optional session ID to filter by
             skip: Number of records to skip
             limit: Maximum number of records to return
+            cursor: next_cursor of the previous page, instead of skip
 
         Returns:
-            List of chat dictionaries
+            Page of chat dictionaries, best match first, with "score" and "highlights"
         """
         try:
-            chats = self.repository.search_chats(
-                db, search_term, session_id, skip, limit
+            return await run_db(
+                db,
+                self.repository.search_chats,
+                search_term,
+                session_id,
+                skip,
+                limit,
+                cursor,
             )
-            return [chat.to_dict() for chat in chats]
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             print(f"Error searching chats: {e}")
-            return []
+            return Page([])
 
     async def get_chat_by_id(
-        self, db: Session, chat_id: int
+        self, db: DbSession, chat_id: int
     ) -> Optional[Dict[str, Any]]:
         """
         Get a specific chat by ID.
@@ -225,13 +924,13 @@ class ChatService:
             Chat dictionary or None if not found
         """
         try:
-            chat = self.repository.get(db, chat_id)
+            chat = await run_db(db, self.repository.get, chat_id)
             return chat.to_dict() if chat else None
         except Exception as e:
             print(f"Error getting chat by ID: {e}")
             return None
 
-    async def delete_chat(self, db: Session, chat_id: int) -> bool:
+    async def delete_chat(self, db: DbSession, chat_id: int) -> bool:
         """
         Delete a specific chat by ID.
 
@@ -243,7 +942,21 @@ class ChatService:
             True if deleted successfully, False otherwise
         """
         try:
-            return self.repository.delete(db, chat_id)
+            chat = await run_db(db, self.repository.get, chat_id)
+            if chat is None:
+                return False
+            session_id = chat.session_id
+            # Removes its stage rows too, in the same transaction
+            deleted = await run_db(db, self.repository.delete, chat_id)
+            if self.history_cache is not None:
+                self.history_cache.discard_chat(chat_id)
+            if deleted:
+                # The session's summary may still hold the deleted turn
+                async with self.chat_writer.summary_lock([session_id]):
+                    summary = await run_db(db, self._rebuild_summary, session_id)
+                    if self.history_cache is not None:
+                        self.history_cache.set_summary(session_id, summary)
+            return deleted
         except Exception as e:
             print(f"Error deleting chat: {e}")
             return False
@@ -5,7 +5,9 @@ Component service for business logic related to components.
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
+from fastapi_server.repositories.base_repository import DbSession, run_db
 from fastapi_server.repositories.component_repository import ComponentRepository
+from fastapi_server.repositories.pagination import InvalidCursorError, Page
 from fastapi_server.schemas import ComponentCreate, ComponentUpdate, ComponentResponse
 
 
@@ -15,15 +17,15 @@ class ComponentService:
     def __init__(self):
         self.repository = ComponentRepository()
     
-    def create_component(
+    async def create_component(
         self, 
-        db: Session, 
+        db: DbSession, 
         component_data: ComponentCreate
     ) -> ComponentResponse:
         """Create a new component."""
         try:
             # Check if component with same name already exists
-            existing = self.repository.get_by_name(db, component_data.name)
+            existing = await run_db(db, self.repository.get_by_name, component_data.name)
             if existing:
                 raise HTTPException(
                     status_code=400, 
@@ -31,7 +33,7 @@ class ComponentService:
                 )
             
             # Create component
-            component = self.repository.create(db, component_data.dict())
+            component = await run_db(db, self.repository.create, component_data.dict())
             return ComponentResponse(**component.to_dict())
             
         except HTTPException:
@@ -42,39 +44,50 @@ class ComponentService:
                 detail=f"Error creating component: {str(e)}"
             )
     
-    def get_component(self, db: Session, component_id: int) -> ComponentResponse:
+    async def get_component(self, db: DbSession, component_id: int) -> ComponentResponse:
         """Get a component by ID."""
-        component = self.repository.get(db, component_id)
+        component = await run_db(db, self.repository.get, component_id)
         if not component:
             raise HTTPException(status_code=404, detail="Component not found")
         
         return ComponentResponse(**component.to_dict())
     
-    def get_components(
+    async def get_components(
         self, 
-        db: Session, 
+        db: DbSession, 
         skip: int = 0, 
-        limit: int = 100
-    ) -> List[ComponentResponse]:
-        """Get all components with pagination."""
-        components = self.repository.get_multi(db, skip=skip, limit=limit)
-        return [ComponentResponse(**component.to_dict()) for component in components]
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Page[ComponentResponse]:
+        """Get a page of components, newest first, by offset or cursor."""
+        try:
+            page = await run_db(
+                db, self.repository.get_page, limit=limit, cursor=cursor, skip=skip
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return Page(
+            [ComponentResponse(**component.to_dict()) for component in page.items],
+            page.next_cursor
+        )
     
-    def update_component(
+    async def update_component(
         self, 
-        db: Session, 
+        db: DbSession, 
         component_id: int, 
         component_data: ComponentUpdate
     ) -> ComponentResponse:
         """Update a component."""
         # Check if component exists
-        existing = self.repository.get(db, component_id)
+        existing = await run_db(db, self.repository.get, component_id)
         if not existing:
             raise HTTPException(status_code=404, detail="Component not found")
         
         # Check for name conflicts if name is being updated
         if component_data.name and component_data.name != existing.name:
-            name_conflict = self.repository.get_by_name(db, component_data.name)
+            name_conflict = await run_db(
+                db, self.repository.get_by_name, component_data.name
+            )
             if name_conflict:
                 raise HTTPException(
                     status_code=400, 
@@ -82,94 +95,107 @@ class ComponentService:
                 )
         
         # Update component
-        updated = self.repository.update(db, component_id, component_data.dict(exclude_unset=True))
+        updated = await run_db(
+            db,
+            self.repository.update,
+            component_id,
+            component_data.dict(exclude_unset=True)
+        )
         if not updated:
             raise HTTPException(status_code=500, detail="Error updating component")
         
         return ComponentResponse(**updated.to_dict())
     
-    def delete_component(self, db: Session, component_id: int) -> Dict[str, str]:
+    async def delete_component(self, db: DbSession, component_id: int) -> Dict[str, str]:
         """Delete a component."""
-        if not self.repository.exists(db, component_id):
+        if not await run_db(db, self.repository.exists, component_id):
             raise HTTPException(status_code=404, detail="Component not found")
         
-        success = self.repository.delete(db, component_id)
+        success = await run_db(db, self.repository.delete, component_id)
         if not success:
             raise HTTPException(status_code=500, detail="Error deleting component")
         
         return {"message": "Component deleted successfully"}
     
-    def get_components_by_type(
+    async def get_components_by_type(
         self, 
-        db: Session, 
+        db: DbSession, 
         component_type: str
     ) -> List[ComponentResponse]:
         """Get components by type."""
-        components = self.repository.get_by_type(db, component_type)
+        components = await run_db(db, self.repository.get_by_type, component_type)
         return [ComponentResponse(**component.to_dict()) for component in components]
     
-    def get_components_by_source(
+    async def get_components_by_source(
         self, 
-        db: Session, 
+        db: DbSession, 
         data_source: str
     ) -> List[ComponentResponse]:
         """Get components by data source."""
-        components = self.repository.get_by_data_source(db, data_source)
+        components = await run_db(db, self.repository.get_by_data_source, data_source)
         return [ComponentResponse(**component.to_dict()) for component in components]
     
-    def search_components(
+    async def search_components(
         self, 
-        db: Session, 
+        db: DbSession, 
         search_term: str,
         skip: int = 0,
-        limit: int = 100
-    ) -> List[ComponentResponse]:
-        """Search components by name or description."""
-        components = self.repository.search_components(db, search_term, skip, limit)
-        return [ComponentResponse(**component.to_dict()) for component in components]
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Page[ComponentResponse]:
+        """Search components by name or description, newest first."""
+        try:
+            page = await run_db(
+                db, self.repository.search_components, search_term, skip, limit, cursor
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return Page(
+            [ComponentResponse(**component.to_dict()) for component in page.items],
+            page.next_cursor
+        )
     
-    def get_recent_components(
+    async def get_recent_components(
         self, 
-        db: Session, 
+        db: DbSession, 
         limit: int = 10
     ) -> List[ComponentResponse]:
         """Get recently created components."""
-        components = self.repository.get_recent_components(db, limit)
+        components = await run_db(db, self.repository.get_recent_components, limit)
         return [ComponentResponse(**component.to_dict()) for component in components]
     
-    def get_components_with_interval(
+    async def get_components_with_interval(
         self, 
-        db: Session, 
+        db: DbSession, 
         interval: str
     ) -> List[ComponentResponse]:
         """Get components with specific update interval."""
-        components = self.repository.get_components_with_interval(db, interval)
+        components = await run_db(
+            db, self.repository.get_components_with_interval, interval
+        )
         return [ComponentResponse(**component.to_dict()) for component in components]
     
-    def get_component_statistics(self, db: Session) -> Dict[str, Any]:
+    async def get_component_statistics(self, db: DbSession) -> Dict[str, Any]:
         """Get statistics about components."""
-        total_components = self.repository.count(db)
-        
-        # Count by type
-        chart_components = len(self.repository.get_by_type(db, "chart"))
-        table_components = len(self.repository.get_by_type(db, "table"))
-        metric_components = len(self.repository.get_by_type(db, "metric"))
-        
-        # Count by data source
-        mysql_components = len(self.repository.get_by_data_source(db, "mysql"))
-        mongodb_components = len(self.repository.get_by_data_source(db, "mongodb"))
-        csv_components = len(self.repository.get_by_data_source(db, "csv"))
+        return await run_db(db, self._component_statistics)
+    
+    def _component_statistics(self, db: Session) -> Dict[str, Any]:
+        # Runs as one unit of work on the session, see run_db; reads the running
+        # counts rather than the components table
+        counts = self.repository.statistics.get_component_counts(db)
+        by_type = counts.get("component_type", {})
+        by_data_source = counts.get("data_source", {})
         
         return {
-            "total_components": total_components,
+            "total_components": counts.get("all", {}).get("all", 0),
             "by_type": {
-                "chart": chart_components,
-                "table": table_components,
-                "metric": metric_components
+                "chart": by_type.get("chart", 0),
+                "table": by_type.get("table", 0),
+                "metric": by_type.get("metric", 0)
             },
             "by_data_source": {
-                "mysql": mysql_components,
-                "mongodb": mongodb_components,
-                "csv": csv_components
+                "mysql": by_data_source.get("mysql", 0),
+                "mongodb": by_data_source.get("mongodb", 0),
+                "csv": by_data_source.get("csv", 0)
             }
         } 
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""
+Fixtures shared by the test modules.
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from fastapi_server.models import Base
+
+
+@pytest.fixture
+def engine():
+    """In-memory database with every table; all sessions share its one connection."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def sessions(engine):
+    """Session factory of the test database."""
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def db(sessions):
+    session = sessions()
+    yield session
+    session.close()
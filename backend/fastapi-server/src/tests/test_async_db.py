@@ -0,0 +1,103 @@
+"""
+Tests for serving repositories through an async database session.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from fastapi_server.database import async_database_url
+from fastapi_server.models import Base
+from fastapi_server.repositories.base_repository import run_db
+from fastapi_server.repositories.chat_repository import ChatRepository
+from fastapi_server.repositories.chat_search import install_search_index
+from fastapi_server.schemas import ComponentCreate
+from fastapi_server.services.chat_service import ChatService
+from fastapi_server.services.component_service import ComponentService
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    install_search_index(engine)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+async def sessions(database_url):
+    engine = create_async_engine(async_database_url(database_url))
+    yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    await engine.dispose()
+
+
+def test_async_database_url():
+    assert str(async_database_url("sqlite:///./components.db")) == (
+        "sqlite+aiosqlite:///./components.db"
+    )
+    assert str(async_database_url("postgresql+psycopg2://u@db/app")) == (
+        "postgresql+asyncpg://u@db/app"
+    )
+    assert str(async_database_url("postgresql+asyncpg://u@db/app")) == (
+        "postgresql+asyncpg://u@db/app"
+    )
+    with pytest.raises(ValueError):
+        async_database_url("oracle://u@db/app")
+
+
+@pytest.mark.asyncio
+async def test_component_service_on_async_session(sessions):
+    """Test that service calls work unchanged on an AsyncSession."""
+    service = ComponentService()
+    async with sessions() as db:
+        assert isinstance(db, AsyncSession)
+        for name in ("revenue", "churn", "signups"):
+            await service.create_component(
+                db,
+                ComponentCreate(
+                    name=name, component_type="chart", query="q", data_source="csv"
+                ),
+            )
+        first = await service.get_components(db, limit=2)
+        rest = await service.get_components(db, limit=2, cursor=first.next_cursor)
+
+    assert [c.name for c in first.items + rest.items] == ["signups", "churn", "revenue"]
+    assert rest.next_cursor is None
+    async with sessions() as db:
+        stats = await service.get_component_statistics(db)
+    assert stats["total_components"] == stats["by_type"]["chart"] == 3
+
+
+@pytest.mark.asyncio
+async def test_chat_queries_on_concurrent_async_sessions(sessions):
+    """Test that concurrent requests each get their own results, searched via FTS5."""
+    async with sessions() as db:
+        await run_db(
+            db,
+            ChatRepository().create_many,
+            [
+                {"session_id": f"s{i}", "user_message": m, "agent_response": "ok"}
+                for i in range(10)
+                for m in ("monthly revenue", "weekly churn")
+            ],
+        )
+
+    service = ChatService()
+
+    async def history(session_id):
+        async with sessions() as db:
+            return await service.get_chat_history(db, session_id, limit=5)
+
+    histories = await asyncio.gather(*(history(f"s{i}") for i in range(10)))
+    assert [h["total_count"] for h in histories] == [2] * 10
+    assert {c["session_id"] for c in histories[3]["chats"]} == {"s3"}
+
+    async with sessions() as db:
+        page = await service.search_chats(db, "revenue", session_id="s4")
+    # A score means the index installed through the sync engine was used
+    assert [hit["user_message"] for hit in page.items] == ["monthly revenue"]
+    assert page.items[0]["score"] is not None
@@ -0,0 +1,54 @@
+"""
+Tests for storing a batch of chats in one transaction.
+"""
+
+import pytest
+
+from fastapi_server.models import Chat, ChatStage
+from fastapi_server.repositories.chat_repository import ChatRepository
+
+TIMING = {
+    "queue_ms": 4.0,
+    "tasks": {
+        "response_generation_task": {
+            "start_ms": 4.0,
+            "duration_ms": 120.0,
+            "llm_calls": 1,
+            "llm_ms": 110.0,
+            "prompt_tokens": 80,
+            "completion_tokens": 20,
+            "retries": 0,
+            "models": ["mock"],
+        },
+    },
+}
+
+
+def chat_data(message):
+    return {"session_id": "batch", "user_message": message, "agent_response": "ok"}
+
+
+def test_create_many_stores_chats_and_stages(db):
+    """Test that chats and the stage rows of crew runs are stored together."""
+    chats = ChatRepository().create_many(
+        db,
+        [chat_data("one"), chat_data("two"), chat_data("one")],
+        [TIMING, TIMING, None],
+    )
+
+    assert [chat.user_message for chat in chats] == ["one", "two", "one"]
+    assert len({chat.id for chat in chats}) == 3
+    # The coalesced duplicate did not run the crew, so it has no stages
+    assert db.query(ChatStage).filter(ChatStage.chat_id == chats[2].id).count() == 0
+    assert db.query(ChatStage).filter(ChatStage.chat_id == chats[0].id).count() == 2
+
+
+def test_create_many_is_all_or_nothing(db):
+    """Test that one bad row rolls back the whole batch."""
+    with pytest.raises(Exception):
+        ChatRepository().create_many(
+            db, [chat_data("one"), {"session_id": "batch", "user_message": "two"}]
+        )
+
+    assert db.query(Chat).count() == 0
+    assert db.query(ChatStage).count() == 0
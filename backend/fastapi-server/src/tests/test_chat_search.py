@@ -0,0 +1,144 @@
+"""
+Tests for full-text chat search.
+"""
+
+import pytest
+
+from fastapi_server.models import Chat
+from fastapi_server.repositories.chat_repository import ChatRepository
+from fastapi_server.repositories.chat_search import (
+    HIGHLIGHT_START,
+    ChatSearchIndex,
+    SearchTerm,
+    SqliteFtsIndex,
+    fts5_query,
+    install_search_index,
+    parse_search_query,
+    tsquery,
+)
+
+CHATS = [
+    ("a", "show monthly revenue in a line chart", "Here is a revenue line chart."),
+    ("a", "add a table of customers", "Created a table component."),
+    (
+        "b",
+        "what is churn?",
+        "Churn is the share of customers that leave; revenue drops.",
+    ),
+    ("b", "track revenue revenue by region", "Added a bar chart."),
+]
+
+
+@pytest.fixture
+def db(engine, sessions):
+    session = sessions()
+    # Chats stored before the index exists are picked up when it is created
+    ChatRepository().create_many(
+        session,
+        [
+            {"session_id": s, "user_message": m, "agent_response": r}
+            for s, m, r in CHATS[:2]
+        ],
+    )
+    install_search_index(engine)
+    ChatRepository().create_many(
+        session,
+        [
+            {"session_id": s, "user_message": m, "agent_response": r}
+            for s, m, r in CHATS[2:]
+        ],
+    )
+    yield session
+    session.close()
+
+
+def messages(page):
+    return [hit["user_message"] for hit in page.items]
+
+
+def test_results_are_ranked_and_highlighted(db):
+    """Test BM25 ranking, with user messages weighted over responses."""
+    page = ChatRepository().search_chats(db, "revenue")
+    hits = page.items
+
+    assert messages(page) == [
+        "track revenue revenue by region",
+        "show monthly revenue in a line chart",
+        "what is churn?",
+    ]
+    assert hits[0]["score"] > hits[1]["score"] > hits[2]["score"]
+    assert hits[0]["highlights"]["user_message"].count(HIGHLIGHT_START) == 2
+    # Only fields that matched are highlighted
+    assert list(hits[2]["highlights"]) == ["agent_response"]
+
+
+def test_prefix_phrase_stemming_and_session_filter(db):
+    repository = ChatRepository()
+
+    assert messages(repository.search_chats(db, "cust*")) == [
+        "add a table of customers",
+        "what is churn?",
+    ]
+    assert messages(repository.search_chats(db, '"line chart"')) == [
+        "show monthly revenue in a line chart"
+    ]
+    # Porter stemming: "charts" finds "chart"
+    assert len(repository.search_chats(db, "charts").items) == 2
+    assert messages(repository.search_chats(db, "revenue", session_id="b")) == [
+        "track revenue revenue by region",
+        "what is churn?",
+    ]
+    assert messages(repository.search_chats(db, "revenue", skip=1, limit=1)) == [
+        "show monthly revenue in a line chart"
+    ]
+
+
+def test_index_follows_updates_and_deletes(db):
+    """Test that the triggers keep the index in sync with the chats table."""
+    repository = ChatRepository()
+    chat = db.query(Chat).filter(Chat.user_message.like("add a table%")).one()
+
+    repository.update(db, chat.id, {"user_message": "add a gauge of customers"})
+    assert messages(repository.search_chats(db, "gauge")) == [
+        "add a gauge of customers"
+    ]
+    assert repository.search_chats(db, '"table of"').items == []
+
+    repository.delete(db, chat.id)
+    assert repository.search_chats(db, "gauge").items == []
+
+
+def test_query_syntax_cannot_break_the_search(db):
+    """Test that FTS operators and quotes in user input are treated as text."""
+    repository = ChatRepository()
+
+    for query in ['revenue"', "NEAR(revenue", "revenue AND", "^*", "-", ""]:
+        repository.search_chats(db, query)
+    assert repository.search_chats(db, "***").items == []
+
+
+def test_substring_fallback(engine, db):
+    """Test the LIKE backend used where no full-text index is available."""
+    index = install_search_index(engine, backend="like")
+    try:
+        assert type(index) is ChatSearchIndex
+        assert ChatRepository().search_chats(db, "100%").items == []
+        page = ChatRepository().search_chats(db, "revenue", session_id="a")
+        assert messages(page) == ["show monthly revenue in a line chart"]
+        assert page.items[0]["score"] is None
+    finally:
+        assert isinstance(install_search_index(engine), SqliteFtsIndex)
+
+
+def test_parse_search_query():
+    assert parse_search_query('Sales "line chart"* reg* sales-report') == [
+        SearchTerm(["sales"]),
+        SearchTerm(["line", "chart"], prefix=True),
+        SearchTerm(["reg"], prefix=True),
+        SearchTerm(["sales"]),
+        SearchTerm(["report"]),
+    ]
+    terms = parse_search_query('"line chart"* reg*')
+    assert fts5_query(terms) == '"line chart"* "reg"*'
+    assert tsquery(terms) == "line <-> chart:* & reg:*"
+    assert parse_search_query('AND "" ()') == [SearchTerm(["and"])]
@@ -0,0 +1,161 @@
+"""
+Tests for batched chat persistence.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from fastapi_server.ai.conversation import RollingSummary
+from fastapi_server.models import Chat, ChatStage, ChatSummary, IdBlock
+from fastapi_server.repositories.chat_writer import ChatWriter
+
+TIMING = {"queue_ms": 1.0, "tasks": {"intent": {"start_ms": 0, "duration_ms": 5}}}
+
+
+def writer_for(sessions, mode, **options):
+    @asynccontextmanager
+    async def open_session():
+        db = sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    return ChatWriter(mode=mode, session_factory=open_session, **options)
+
+
+def chat(session_id, message="show revenue"):
+    return {"session_id": session_id, "user_message": message, "agent_response": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_chats_share_transactions(sessions):
+    """Test that chats queued together are committed together."""
+    writer = writer_for(sessions, "batched", batch_size=10, flush_interval=0.05)
+    db = sessions()
+    summary = RollingSummary()
+
+    results = await asyncio.gather(
+        *(writer.write(db, [chat(f"s{i}")], [TIMING]) for i in range(25)),
+        writer.write(db, [chat("a", "first"), chat("a", "second")], None, summary),
+    )
+    await writer.close()
+
+    ids = [chat_id for ids in results for chat_id in ids]
+    assert len(set(ids)) == 27
+    stats = writer.get_stats()
+    assert stats["chats_written"] == 27
+    assert stats["transactions"] <= 4
+    assert db.query(Chat).count() == 27
+    assert db.query(ChatStage).count() == 25 * 2
+    stored = db.query(ChatSummary).filter(ChatSummary.session_id == "a").one()
+    assert stored.turn_count == 2 and stored.last_chat_id == results[-1][1]
+
+
+@pytest.mark.asyncio
+async def test_write_behind_returns_before_the_commit(sessions):
+    """Test that write-behind ids are reserved up front and the rows follow."""
+    db = sessions()
+    db.add(Chat(**chat("old")))
+    db.commit()
+    writer = writer_for(sessions, "write_behind", flush_interval=0.05)
+
+    first = await writer.write(db, [chat("s")])
+    second = await writer.write(db, [chat("s"), chat("s")])
+    assert first + second == [2, 3, 4]
+    assert db.query(Chat).count() == 1
+
+    # Readers of the session see its queued chats once they are stored
+    await writer.wait_for_session("s")
+    assert db.query(Chat).filter(Chat.session_id == "s").count() == 3
+
+    await writer.write(db, [chat("t")])
+    await writer.close()
+    assert sorted(c.id for c in db.query(Chat)) == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_write_behind_servers_share_the_database(sessions):
+    """Test that write-behind servers reserve disjoint blocks of ids in the database."""
+    db = sessions()
+    # One writer per server process; each has its own allocator
+    writers = [
+        writer_for(sessions, "write_behind", id_block_size=3, flush_interval=0.01)
+        for _ in range(2)
+    ]
+
+    ids = []
+    for i in range(10):
+        ids += await writers[i % 2].write(db, [chat(f"s{i}")])
+    for writer in writers:
+        await writer.close()
+
+    assert len(set(ids)) == 10
+    assert sorted(c.id for c in db.query(Chat)) == sorted(ids)
+    assert writers[0].get_stats()["failed_chats"] == 0
+    assert writers[1].get_stats()["failed_chats"] == 0
+    # Blocks are taken in turn, and each is used up before the next
+    assert ids[:4] == [1, 4, 2, 5]
+    assert db.query(IdBlock).one().next_id == 13
+
+
+@pytest.mark.asyncio
+async def test_a_failing_chat_does_not_fail_its_batch(sessions):
+    """Test that a batch is retried chat by chat when one of them can't be stored."""
+    writer = writer_for(sessions, "batched", flush_interval=0.05)
+    db = sessions()
+    bad = {"session_id": "s", "user_message": None, "agent_response": "ok"}
+
+    results = await asyncio.gather(
+        writer.write(db, [chat("s")]),
+        writer.write(db, [bad]),
+        writer.write(db, [chat("t")]),
+        return_exceptions=True,
+    )
+    await writer.close()
+
+    assert isinstance(results[1], Exception)
+    assert [len(r) for r in (results[0], results[2])] == [1, 1]
+    assert db.query(Chat).count() == 2
+    assert writer.get_stats()["failed_chats"] == 1
+    assert writer.get_stats()["retried_batches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_immediate_mode_writes_in_the_request(sessions):
+    db = sessions()
+    writer = writer_for(sessions, "immediate")
+
+    ids = await writer.write(db, [chat("s")], [TIMING], RollingSummary())
+
+    assert db.query(Chat).filter(Chat.id == ids[0]).count() == 1
+    assert db.query(ChatSummary).one().last_chat_id == ids[0]
+    assert writer.get_stats()["transactions"] == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["immediate", "batched"])
+async def test_concurrent_turns_of_a_session_share_its_summary(sessions, mode):
+    """Test that turns which read the same summary are all folded into it."""
+    db = sessions()
+    writer = writer_for(sessions, mode, flush_interval=0.05)
+
+    await asyncio.gather(
+        *(
+            writer.write(sessions(), [chat("a", f"turn {i}")], None, RollingSummary())
+            for i in range(3)
+        )
+    )
+    await writer.close()
+
+    stored = db.query(ChatSummary).one()
+    assert stored.turn_count == 3
+    assert len(stored.turns) == 3
+    assert not writer._summary_locks
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        ChatWriter(mode="eventually")
@@ -0,0 +1,120 @@
+"""
+Tests for the rolling conversation summary and token-budgeted context.
+"""
+
+from fastapi_server.ai.conversation import (
+    NO_CONTEXT,
+    RollingSummary,
+    build_conversation_context,
+    count_tokens,
+)
+
+
+def make_chat(chat_id, message="add chart of sales", response="Sure. Done."):
+    return {
+        "id": chat_id,
+        "session_id": "s1",
+        "user_message": message,
+        "agent_response": response,
+        "intent": {"action": "add_chart", "query": "sales", "data_source": "mysql"},
+        "component_suggestion": {"type": "chart", "fields": ["a", "b", "c"]},
+    }
+
+
+def test_no_history():
+    """Test the placeholder context for a new session."""
+    assert build_conversation_context(RollingSummary(), [], 500) == NO_CONTEXT
+
+
+def test_summary_stays_within_budget():
+    """Test that the summary size stays flat as the session grows."""
+    summary = RollingSummary(token_budget=120)
+    sizes = []
+    for chat_id in range(1, 60):
+        summary.add_turn(make_chat(chat_id, message=f"add chart of sales {chat_id}"))
+        sizes.append(count_tokens(summary.render()))
+
+    assert summary.turn_count == 59
+    assert max(sizes) <= 120
+    assert summary.facts == ["add_chart sales from mysql"]
+
+
+def test_add_turn_is_idempotent():
+    """Test that replaying an already folded turn does not change the summary."""
+    summary = RollingSummary()
+    summary.add_turn(make_chat(1))
+    summary.add_turn(make_chat(1))
+
+    assert summary.turn_count == 1
+    assert len(summary.turns) == 1
+
+
+def test_concurrent_turns_are_all_kept():
+    """Test that turns folded into copies of one summary survive a rebase."""
+    base = RollingSummary()
+    base.add_turn(make_chat(1))
+    first = RollingSummary.from_dict(base.to_dict())
+    second = RollingSummary.from_dict(base.to_dict())
+    second.add_turn(make_chat(3, message="add table of orders"))
+
+    # The turn stored first is saved last, onto the other turn's summary
+    first.rebase(second.to_dict())
+    first.add_turn(make_chat(2, message="add chart of revenue"))
+    first.add_turn(make_chat(1))
+
+    assert first.turn_count == 3
+    assert [turn["chat_id"] for turn in first.turns] == [1, 3, 2]
+    assert first.last_chat_id == 3
+
+
+def test_rebase_keeps_a_newer_summary():
+    """Test that a summary ahead of the stored one is not rolled back."""
+    stored = RollingSummary()
+    stored.add_turn(make_chat(1))
+    summary = RollingSummary.from_dict(stored.to_dict())
+    summary.add_turn(make_chat(2))
+
+    summary.rebase(stored.to_dict())
+
+    assert summary.turn_count == 2
+
+
+def test_round_trip():
+    """Test that a stored summary restores to the same state."""
+    summary = RollingSummary()
+    summary.add_turn(make_chat(1))
+
+    restored = RollingSummary.from_dict(summary.to_dict())
+
+    assert restored.render() == summary.render()
+    assert restored.last_chat_id == 1
+
+
+def test_context_respects_token_budget():
+    """Test that long histories are cut to the budget, newest turns first."""
+    summary = RollingSummary(token_budget=200)
+    chats = [make_chat(i, response="word " * 150) for i in range(1, 21)]
+    for chat in chats:
+        summary.add_turn(chat)
+    recent = list(reversed(chats))[:3]
+
+    context = build_conversation_context(summary, recent, 400)
+
+    assert count_tokens(context) <= 400
+    assert "Components discussed: add_chart sales from mysql" in context
+    assert "message 21 in the conversation" in context
+    # Raw component payloads no longer reach the prompt
+    assert "fields" not in context
+
+
+def test_recent_turns_not_repeated_in_summary():
+    """Test that turns shown verbatim are left out of the summary gists."""
+    summary = RollingSummary()
+    chats = [make_chat(i, message=f"request number {i}") for i in range(1, 4)]
+    for chat in chats:
+        summary.add_turn(chat)
+
+    context = build_conversation_context(summary, [chats[2]], 1000)
+
+    assert context.count("request number 3") == 1
+    assert "request number 1" in context
@@ -0,0 +1,101 @@
+"""
+Tests for DashboardCrew against the offline mock LLM (no network or API keys).
+"""
+
+import pytest
+
+from fastapi_server.ai.crew import DashboardCrew
+from fastapi_server.ai.intent_parser import IntentParser
+from fastapi_server.config import Config
+
+
+@pytest.fixture
+def crew(monkeypatch):
+    settings = {
+        "LLM_MODEL_OVERRIDE": "mock",
+        "MOCK_LLM_LATENCY_SCALE": 0.0,
+        "MOCK_LLM_SEED": 7,
+        "LLM_STREAMING": False,
+        "LLM_HEDGING_ENABLED": False,
+        "MCP_TOOLS_ENABLED": False,
+        "INTENT_FAST_PATH_ENABLED": True,
+        "ROUTER_ENABLED": False,
+    }
+    for name, value in settings.items():
+        monkeypatch.setattr(Config, name, value)
+    crew = DashboardCrew()
+    yield crew
+    crew.shutdown()
+
+
+def test_confident_intent_takes_the_fast_path(crew):
+    """Test that a clear request skips planning and intent analysis."""
+    result = crew.process_message(
+        "Create a line chart of sales from mysql every 10 min", session_id="s"
+    )
+
+    assert isinstance(crew.rule_intent_parser, IntentParser)
+    assert result["routing"]["profile"] == "intent_fast"
+    assert result["intent"]["component_type"] == "chart"
+    assert result["intent"]["data_source"] == "mysql"
+    assert "intent_analysis_task" not in result["timing"]["tasks"]
+    assert "response_generation_task" in result["timing"]["tasks"]
+    assert result["component_suggestion"]["name"] == "Sales Overview"
+    assert result["component_suggestion"]["data_source"] == "mysql"
+    assert result["response"]
+
+
+def test_intent_comes_from_the_intent_analysis_task(crew, monkeypatch):
+    """Test that without a confident parse the intent is read from the task output."""
+    monkeypatch.setattr(Config, "INTENT_FAST_PATH_ENABLED", False)
+    result = crew.process_message(
+        "Create a line chart of sales from mysql every 10 min", session_id="s"
+    )
+
+    assert result["routing"]["profile"] == "full"
+    assert "intent_analysis_task" in result["timing"]["tasks"]
+    assert result["intent"]["action"] == "add_chart"
+    assert result["intent"]["complexity"] == "low"
+    assert result["component_suggestion"]["component_type"] == "chart"
+
+
+def test_general_queries_have_no_structured_output(crew):
+    """Test that a conversational message leaves intent and component empty."""
+    result = crew.process_message("What can you do?", session_id="s")
+
+    assert result["routing"]["profile"] == "minimal"
+    assert result["intent"] == {}
+    assert result["component_suggestion"] == {}
+
+
+def test_router_is_built_with_the_rule_intent_parser(crew, monkeypatch, tmp_path):
+    """Test the router DashboardCrew builds parses intents and routes messages."""
+    monkeypatch.setattr(Config, "ROUTER_ENABLED", True)
+    monkeypatch.setattr(Config, "ROUTER_MODEL_PATH", str(tmp_path / "model.json"))
+
+    router = crew.router
+    assert router.intent_parser is crew.rule_intent_parser
+    assert router.train([("show me a pie chart of orders", "full")]) > 0
+    router.save(Config.ROUTER_MODEL_PATH)
+
+    decision = router.route("Create a bar chart of revenue from mysql", "minimal")
+    assert decision.route == "full"
+
+    result = crew.process_message("thanks!", session_id="s")
+    assert result["routing"]["route"] == "direct"
+    assert result["response"] == router.direct_reply("thanks!")
+
+
+def test_router_follow_ups_skip_the_fast_path(crew, monkeypatch, tmp_path):
+    """Test that a confident parse doesn't override an intent_only routing."""
+    monkeypatch.setattr(Config, "ROUTER_ENABLED", True)
+    monkeypatch.setattr(Config, "ROUTER_MODEL_PATH", str(tmp_path / "model.json"))
+    message = "add orders to the same chart"
+    assert crew.rule_intent_parser.is_confident(crew.rule_intent_parser.parse(message))
+
+    result = crew.process_message(message, session_id="s")
+
+    assert result["routing"]["route"] == "intent_only"
+    assert result["routing"]["profile"] == "intent_only"
+    assert "intent_analysis_task" in result["timing"]["tasks"]
+    assert "component_generation_task" not in result["timing"]["tasks"]
@@ -0,0 +1,113 @@
+"""
+Tests for request deadlines and cooperative cancellation.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi_server.ai.deadline import (
+    Deadline,
+    DeadlineExceededError,
+    RunCancelledError,
+)
+from fastapi_server.ai.llm_pool import LLMPool, Provider
+from fastapi_server.ai.run_context import RunContext
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=4)
+    yield pool
+    pool.shutdown(wait=False)
+
+
+def slow_call(delay):
+    def call(messages, stop, on_token):
+        time.sleep(delay)
+        return "slow"
+
+    return call
+
+
+def test_deadline_expiry_and_cancellation():
+    """Test that a deadline raises once expired or cancelled."""
+    unbounded = Deadline()
+    assert unbounded.remaining() is None
+    unbounded.check()
+
+    deadline = Deadline(0.05)
+    assert 0 < deadline.remaining() <= 0.05
+    deadline.check()
+    time.sleep(0.06)
+    assert deadline.expired
+    with pytest.raises(DeadlineExceededError):
+        deadline.check()
+
+    cancelled = Deadline(10)
+    cancelled.cancel("client disconnected")
+    with pytest.raises(RunCancelledError, match="client disconnected"):
+        cancelled.check()
+
+
+def test_extend_keeps_the_latest_expiry():
+    """Test that a shared deadline follows the caller willing to wait longest."""
+    shared = Deadline(1)
+    shared.extend(Deadline(0.1))
+    assert shared.remaining() > 0.5
+
+    shared.extend(Deadline(5))
+    assert shared.remaining() > 4
+
+    shared.extend(Deadline())
+    assert shared.remaining() is None
+
+
+def test_pool_stops_waiting_at_the_deadline(executor):
+    """Test that a slow provider call is abandoned when the deadline passes."""
+    provider = Provider("slow", slow_call(1.0))
+    pool = LLMPool([provider], executor, hedging=False)
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        pool.generate("hi", deadline=Deadline(0.1))
+    assert time.monotonic() - started < 0.5
+    # Running out of time is not the provider's fault
+    assert provider.breaker.state == "closed"
+
+
+def test_pool_notices_cancellation(executor):
+    """Test that cancelling the deadline stops a request waiting on a provider."""
+    pool = LLMPool([Provider("slow", slow_call(1.0))], executor, hedging=False)
+    deadline = Deadline()
+    threading.Timer(0.1, deadline.cancel, args=("client disconnected",)).start()
+
+    started = time.monotonic()
+    with pytest.raises(RunCancelledError):
+        pool.generate("hi", deadline=deadline)
+    assert time.monotonic() - started < 0.6
+
+
+def test_pool_rejects_expired_requests_before_calling(executor):
+    """Test that no provider is called once the deadline has passed."""
+    provider = Provider("fast", slow_call(0))
+    pool = LLMPool([provider], executor)
+
+    with pytest.raises(DeadlineExceededError):
+        pool.generate("hi", deadline=Deadline(0))
+    assert provider.requests == 0
+
+
+def test_run_context_tracks_outputs_of_completed_tasks():
+    """Test that the run knows which tasks finished before it was stopped."""
+    run = RunContext(deadline=Deadline(0))
+    run.start(["intent_analysis_task", "response_generation_task"], sequential=True)
+    run.task_completed("intent: create_component")
+
+    assert run.outputs == {"intent_analysis_task": "intent: create_component"}
+    assert run.incomplete_tasks == ["response_generation_task"]
+    with pytest.raises(DeadlineExceededError):
+        run.check_deadline()
+
+    RunContext().check_deadline()
@@ -0,0 +1,142 @@
+"""
+Tests for the crew execution engine.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi_server.ai.execution import (
+    CrewExecutor,
+    CrewQueueFullError,
+    SessionQueueFullError,
+)
+
+
+@pytest.mark.asyncio
+async def test_blocking_work_does_not_block_event_loop():
+    """Test that a blocking run leaves the event loop responsive."""
+    executor = CrewExecutor(max_workers=1)
+
+    run = asyncio.ensure_future(executor.submit("s1", time.sleep, 0.2))
+    started = time.monotonic()
+    await asyncio.sleep(0.01)
+    assert time.monotonic() - started < 0.1
+
+    await run
+    assert executor.get_metrics()["completed"] == 1
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_keyword_arguments_reach_the_callable():
+    """Test that fn may take its own session_id keyword argument."""
+    executor = CrewExecutor(max_workers=1)
+
+    def run(message, session_id=None):
+        return message, session_id
+
+    assert await executor.submit("s1", run, "hi", session_id="s1") == ("hi", "s1")
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_chat_agent_arguments_are_forwarded():
+    """Test the call ChatAgent makes: session_id both as queue key and for the crew."""
+    executor = CrewExecutor(max_workers=2, max_pending_per_session=1)
+    release = threading.Event()
+
+    def process_message(
+        message, session_id=None, chat_history=None, conversation_context=None
+    ):
+        release.wait()
+        return {"message": message, "session_id": session_id, "turns": chat_history}
+
+    first = asyncio.ensure_future(
+        executor.submit(
+            "s1",
+            process_message,
+            "show revenue",
+            session_id="s1",
+            chat_history=[{"user_message": "hi"}],
+            conversation_context=None,
+        )
+    )
+    await asyncio.sleep(0)
+    # Limits follow the positional session, not the keyword passed on to fn
+    second = asyncio.ensure_future(
+        executor.submit("s2", process_message, "hi", session_id="s1")
+    )
+    await asyncio.sleep(0)
+    assert executor.get_metrics()["running"] == 2
+
+    release.set()
+    assert await first == {
+        "message": "show revenue",
+        "session_id": "s1",
+        "turns": [{"user_message": "hi"}],
+    }
+    assert (await second)["session_id"] == "s1"
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_session_limit_rejects_with_429():
+    """Test that a session cannot exceed its pending limit."""
+    executor = CrewExecutor(max_workers=1, max_pending_per_session=1)
+    release = threading.Event()
+
+    first = asyncio.ensure_future(executor.submit("s1", release.wait))
+    await asyncio.sleep(0)
+
+    with pytest.raises(SessionQueueFullError) as exc_info:
+        await executor.submit("s1", release.wait)
+    assert exc_info.value.status_code == 429
+
+    release.set()
+    await first
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_queue_full_rejects_with_503():
+    """Test that the global queue bound is enforced."""
+    executor = CrewExecutor(max_workers=1, max_queue_size=1)
+    release = threading.Event()
+
+    running = asyncio.ensure_future(executor.submit("s1", release.wait))
+    await asyncio.sleep(0)
+    queued = asyncio.ensure_future(executor.submit("s2", release.wait))
+    await asyncio.sleep(0)
+
+    with pytest.raises(CrewQueueFullError) as exc_info:
+        await executor.submit("s3", release.wait)
+    assert exc_info.value.status_code == 503
+    assert executor.get_metrics()["queue_depth"] == 1
+
+    release.set()
+    await asyncio.gather(running, queued)
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_dispatched_round_robin():
+    """Test that queued work alternates between sessions."""
+    executor = CrewExecutor(max_workers=1, max_pending_per_session=3)
+    release = threading.Event()
+    order = []
+
+    blocker = asyncio.ensure_future(executor.submit("blocker", release.wait))
+    await asyncio.sleep(0)
+
+    runs = [
+        asyncio.ensure_future(executor.submit(session, order.append, label))
+        for session, label in [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")]
+    ]
+    await asyncio.sleep(0)
+
+    release.set()
+    await asyncio.gather(blocker, *runs)
+    assert order == ["a1", "b1", "a2", "a3"]
+    executor.shutdown()
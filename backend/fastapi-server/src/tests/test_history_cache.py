@@ -0,0 +1,167 @@
+"""
+Tests for the in-memory session history cache.
+"""
+
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import event
+
+from fastapi_server.ai.conversation import RollingSummary
+from fastapi_server.repositories.chat_writer import ChatWriter
+from fastapi_server.repositories.history_cache import SessionHistoryCache
+from fastapi_server.services.chat_service import ChatService
+
+
+@pytest.fixture
+def service(sessions):
+
+    @asynccontextmanager
+    async def open_session():
+        db = sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    service = ChatService()
+    service.history_cache = SessionHistoryCache(max_turns=5)
+    service.chat_writer = ChatWriter(
+        mode="batched",
+        flush_interval=0.01,
+        session_factory=open_session,
+        history_cache=service.history_cache,
+    )
+    return service
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+    return statements
+
+
+async def store_turn(service, db, session_id, message):
+    _, summary, _ = service._build_context(db, session_id)
+    chat = {"session_id": session_id, "user_message": message, "agent_response": "ok"}
+    return (await service.chat_writer.write(db, [chat], None, summary))[0]
+
+
+@pytest.mark.asyncio
+async def test_hot_session_reads_nothing_from_the_database(service, engine, sessions):
+    """Test that stored turns are written through and the next turn hits the cache."""
+    db = sessions()
+    first = await store_turn(service, db, "s", "show revenue")
+    second = await store_turn(service, db, "s", "now by region")
+    await service.chat_writer.flush()
+
+    statements = count_statements(engine)
+    recent_chats, summary, context = service._build_context(db, "s")
+
+    assert statements == []
+    assert [chat["id"] for chat in recent_chats] == [second, first]
+    assert summary.turn_count == 2 and summary.last_chat_id == second
+    assert "now by region" in context
+    stats = service.history_cache.get_stats()
+    assert stats["loads"] == 1 and stats["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_history_matches_the_database(service, engine, sessions):
+    """Test that history pages from the cache equal those read from the database."""
+    db = sessions()
+    for i in range(4):
+        await store_turn(service, db, "s", f"message {i}")
+    await service.chat_writer.flush()
+
+    statements = count_statements(engine)
+    cached = await service.get_chat_history(db, "s", limit=3)
+    assert statements == []
+
+    service.history_cache.clear()
+    stored = await service.get_chat_history(db, "s", limit=3)
+    assert cached == stored
+    rest = await service.get_chat_history(db, "s", 3, cached["next_cursor"])
+    assert [chat["user_message"] for chat in rest["chats"]] == ["message 0"]
+
+
+@pytest.mark.asyncio
+async def test_long_sessions_page_past_the_cache(service, sessions):
+    """Test that a history longer than the cached turns is read from the database."""
+    db = sessions()
+    for i in range(7):
+        await store_turn(service, db, "s", f"message {i}")
+    await service.chat_writer.flush()
+
+    cached = service.history_cache.get("s")
+    assert len(cached.turns) == 5 and not cached.complete
+    history = await service.get_chat_history(db, "s", limit=10)
+    assert len(history["chats"]) == 7
+
+
+@pytest.mark.asyncio
+async def test_deleted_chats_leave_the_cache(service, sessions):
+    """Test that deleting a chat drops its session from the cache."""
+    db = sessions()
+    chat_id = await store_turn(service, db, "s", "show revenue")
+    await service.chat_writer.flush()
+
+    assert await service.delete_chat(db, chat_id)
+    assert service.history_cache.get("s") is None
+    recent_chats, _, _ = service._build_context(db, "s")
+    assert recent_chats == []
+
+
+@pytest.mark.asyncio
+async def test_deleted_chats_leave_the_summary(service, sessions):
+    """Test that deleting a chat folds its session's summary again without it."""
+    db = sessions()
+    await store_turn(service, db, "s", "show revenue")
+    chat_id = await store_turn(service, db, "s", "show churn")
+    await store_turn(service, db, "s", "show orders")
+    await service.chat_writer.flush()
+
+    assert await service.delete_chat(db, chat_id)
+    _, summary, _ = service._build_context(db, "s")
+    assert summary.turn_count == 2
+    assert "churn" not in summary.render()
+
+
+def test_load_overtaken_by_a_write_is_not_cached():
+    """Test that a load missing a concurrent write is returned but not kept."""
+    cache = SessionHistoryCache()
+    written = {"id": 1, "session_id": "s", "user_message": "hi"}
+
+    def loader(limit):
+        # The write lands while the database is being read
+        cache.add_chats([written])
+        return [], None
+
+    assert cache.get_or_load("s", loader).turns == []
+    assert cache.get("s") is None
+    assert cache.get_or_load("s", lambda limit: ([written], None)).turns == [written]
+    assert cache.get("s") is not None
+
+
+def test_sessions_are_evicted_by_budget_and_idle_time():
+    """Test LRU eviction by session count and expiry after the idle TTL."""
+    cache = SessionHistoryCache(max_sessions=2, ttl_seconds=60)
+    for session_id in ["a", "b", "c"]:
+        cache.get_or_load(session_id, lambda limit: ([], RollingSummary().to_dict()))
+        if session_id == "b":
+            cache.get("a")  # a is now more recent than b
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.get_stats()["evictions"] == 1
+
+    cache.get("a").expires_at = time.time() - 1
+    assert cache.get("a") is None
+    assert cache.get_stats()["expirations"] == 1
+
+    tiny = SessionHistoryCache(max_bytes=50)
+    tiny.get_or_load("s", lambda limit: ([{"id": 1, "text": "x" * 100}], None))
+    assert tiny.get("s") is None
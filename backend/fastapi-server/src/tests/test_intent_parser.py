@@ -0,0 +1,105 @@
+"""
+Tests for the rule-based intent parser.
+"""
+
+import pytest
+from fastapi_server.ai.intent_parser import IntentParser
+
+
+@pytest.fixture(scope="module")
+def parser():
+    """Parser compiled from the shipped keyword tables."""
+    return IntentParser.from_yaml()
+
+
+def test_chart_with_interval(parser):
+    """Test the canonical chart request."""
+    intent = parser.parse(
+        "add chart which shows latest sales details and updates every 10 min"
+    )
+
+    assert intent["action"] == "add_chart"
+    assert intent["component_type"] == "chart"
+    assert intent["data_source"] == "mysql"
+    assert intent["query"] == "sales"
+    assert intent["interval"] == "10 min"
+    assert parser.is_confident(intent)
+
+
+def test_table_with_explicit_source(parser):
+    """Test table request naming its data source."""
+    intent = parser.parse("create a table for user data from mysql database")
+
+    assert intent["action"] == "add_table"
+    assert intent["data_source"] == "mysql"
+    assert intent["query"] == "users"
+    assert parser.is_confident(intent)
+
+
+def test_mongodb_source(parser):
+    """Test MongoDB data source detection."""
+    intent = parser.parse("show me a chart of orders from mongodb")
+
+    assert intent["data_source"] == "mongodb"
+    assert intent["query"] == "orders"
+
+
+def test_interval_aliases(parser):
+    """Test single-word schedules."""
+    assert parser.parse("add metric for revenue updated hourly")["interval"] == "1 hour"
+
+
+def test_unknown_intent(parser):
+    """Test that non-component messages are left to the crew."""
+    intent = parser.parse("hello world")
+
+    assert intent["action"] == "unknown"
+    assert intent["confidence"] == 0.0
+    assert not parser.is_confident(intent)
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "how do I make a chart?",
+        "show a table and a chart of sales",
+        "add chart of widget counts",
+    ],
+)
+def test_low_confidence_falls_back(parser, message):
+    """Test that questions, ambiguous and unknown-subject requests are not trusted."""
+    assert not parser.is_confident(parser.parse(message))
+
+
+@pytest.mark.parametrize(
+    "message, action",
+    [
+        ("update the sales chart to refresh every 10 min", "update_chart"),
+        ("make the orders table refresh every 5 minutes", "update_table"),
+        ("switch the table to show customers", "update_table"),
+        ("remove the revenue table from mysql", "remove_table"),
+        ("delete the sales chart", "remove_chart"),
+    ],
+)
+def test_edits_and_removals_are_not_new_components(parser, message, action):
+    """Test that changing or removing a component never parses as a trusted add."""
+    intent = parser.parse(message)
+
+    assert intent["action"] == action
+    assert not parser.is_confident(intent)
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "don't show the sales chart",
+        "I do not want a bar chart of orders from mysql",
+        "no longer track the revenue metric",
+    ],
+)
+def test_negated_requests_are_not_trusted(parser, message):
+    """Test that a negated request scores below the confidence threshold."""
+    intent = parser.parse(message)
+
+    assert intent["confidence"] < parser.min_confidence
+    assert not parser.is_confident(intent)
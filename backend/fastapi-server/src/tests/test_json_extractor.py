@@ -0,0 +1,111 @@
+"""
+Tests for the streaming JSON extractor and schema validation.
+"""
+
+import json
+
+import pytest
+from fastapi_server.ai.json_extractor import (
+    COMPONENT_SCHEMA,
+    INTENT_SCHEMA,
+    JSONObjectScanner,
+    extract_first_valid,
+    extract_json_objects,
+    extract_key_value_pairs,
+    validate_object,
+)
+
+COMPONENT = {
+    "name": "Sales",
+    "component_type": "chart",
+    "query": "SELECT * FROM sales WHERE note = '}{\\\"'",
+    "data_source": "mysql",
+    "fields": {"x": "date", "y": {"field": "amount"}},
+}
+
+
+def test_objects_with_offsets():
+    """Test that every top-level object is returned with its position."""
+    first = json.dumps({"a": 1})
+    second = json.dumps(COMPONENT)
+    text = f"Thought: {{placeholder}} {first} then {second} done"
+
+    objects = extract_json_objects(text)
+
+    assert [o.value for o in objects] == [{"a": 1}, COMPONENT]
+    for obj in objects:
+        assert json.loads(text[obj.start : obj.end]) == obj.value
+
+
+def test_prose_braces_are_skipped():
+    """Test that stray and placeholder braces do not hide a later object."""
+    text = "{ see note " * 50 + "{not json} } " + json.dumps(COMPONENT)
+
+    assert [o.value for o in extract_json_objects(text)] == [COMPONENT]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_chunked_feed_matches_whole_text(chunk_size):
+    """Test that streamed chunks yield the same objects as the whole text."""
+    text = (
+        "Let me think {about it}.\n```json\n"
+        + json.dumps(COMPONENT)
+        + "\n```\nAlso "
+        + json.dumps({"b": [1, {"c": "\\u00e9"}]})
+        + " trailing {"
+    )
+    scanner = JSONObjectScanner()
+    streamed = []
+    for i in range(0, len(text), chunk_size):
+        streamed.extend(scanner.feed(text[i : i + chunk_size]))
+
+    expected = extract_json_objects(text)
+    assert [(o.value, o.start, o.end, o.fenced) for o in streamed] == [
+        (o.value, o.start, o.end, o.fenced) for o in expected
+    ]
+    assert [o.fenced for o in expected] == [True, False]
+
+
+def test_schema_validation():
+    """Test intent and component shapes."""
+    assert validate_object(COMPONENT, COMPONENT_SCHEMA) == []
+    assert validate_object({"component_type": "chart"}, INTENT_SCHEMA) == []
+
+    errors = validate_object(
+        {"component_type": "chart", "data_source": "oracle", "confidence": True},
+        INTENT_SCHEMA,
+    )
+    assert "'data_source' has unsupported value 'oracle'" in errors
+    assert any("'confidence'" in e for e in errors)
+    assert validate_object({"name": "x"}, COMPONENT_SCHEMA) == [
+        "missing required key 'component_type'",
+        "missing required key 'query'",
+        "missing required key 'data_source'",
+    ]
+
+
+def test_first_valid_prefers_matching_fenced_object():
+    """Test that an example object in the reasoning is not picked over the answer."""
+    text = (
+        'Example: {"component_type": "chart", "data_source": "oracle"}\n'
+        'Draft: {"name": "Sales"}\n'
+        "```json\n" + json.dumps(COMPONENT) + "\n```"
+    )
+
+    assert extract_first_valid(text, COMPONENT_SCHEMA) == COMPONENT
+    assert extract_first_valid("no objects here", INTENT_SCHEMA) is None
+
+
+def test_key_value_fallback():
+    """Test key/value extraction from prose without JSON."""
+    pairs = extract_key_value_pairs(
+        'component_type: chart, "data_source": "mysql", limit: 10, ratio: 0.5, live: true'
+    )
+
+    assert pairs == {
+        "component_type": "chart",
+        "data_source": "mysql",
+        "limit": 10,
+        "ratio": 0.5,
+        "live": True,
+    }
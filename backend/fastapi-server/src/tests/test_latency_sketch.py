@@ -0,0 +1,50 @@
+"""
+Tests for the DDSketch quantile sketches behind the latency percentiles.
+"""
+
+import random
+
+import pytest
+
+from fastapi_server.repositories.latency_sketch import ZERO_BIN, LatencySketch
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_quantiles_are_within_the_relative_accuracy():
+    """Test that every quantile of a long-tailed sample is off by at most 1%."""
+    rng = random.Random(7)
+    values = [int(rng.lognormvariate(7, 1.5)) + 1 for _ in range(20000)]
+    sketch = LatencySketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    assert sketch.count == len(values)
+    for q in (0, 0.5, 0.9, 0.99, 0.999, 1):
+        exact = exact_quantile(values, q)
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.01)
+    # A few hundred bins cover six orders of magnitude
+    assert len(sketch.bins) < 1000
+
+
+def test_merged_sketches_equal_one_sketch_of_everything():
+    """Test that merging sketches of parts gives the sketch of the whole."""
+    parts = [[0, 5, 10], [250, 3000], [12, 12, 7000]]
+    whole = LatencySketch()
+    merged = LatencySketch()
+    for part in parts:
+        sketch = LatencySketch()
+        for value in part:
+            sketch.add(value)
+            whole.add(value)
+        merged.merge(sketch)
+
+    assert merged.bins == whole.bins and merged.count == whole.count
+    assert merged.bins[ZERO_BIN] == 1 and merged.quantile(0) == 0
+    assert LatencySketch.from_bins(merged.bins.items()).bins == merged.bins
+    assert LatencySketch().quantile(0.5) is None
+    with pytest.raises(ValueError):
+        merged.merge(LatencySketch(relative_accuracy=0.02))
@@ -0,0 +1,288 @@
+"""
+Tests for the LLM provider pool: rate limits, circuit breaking and hedging.
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from fastapi_server.ai.conversation import count_tokens
+from fastapi_server.ai.llm_pool import (
+    CircuitBreaker,
+    LLMPool,
+    LLMUnavailableError,
+    Provider,
+    TokenBucket,
+    parse_rate_limits,
+)
+from fastapi_server.ai.llm_providers import (
+    LLMConfigError,
+    PooledChatModel,
+    create_chat_model,
+    provider_call,
+)
+from fastapi_server.ai.run_context import RunContext, current_run
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=4)
+    yield pool
+    pool.shutdown(wait=False)
+
+
+def fake_call(text, delay=0.0, error=None, tokens=None):
+    """Provider call that answers (or fails) after a delay."""
+
+    def call(messages, stop, on_token):
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        if on_token is not None:
+            for token in tokens or [text]:
+                if not on_token(token):
+                    break
+                time.sleep(delay)
+        return text
+
+    return call
+
+
+class FakeChatModel:
+    """Chat client that answers in two chunks and reports (or omits) its usage."""
+
+    def __init__(self, usage=None, metadata=None):
+        self.usage = usage
+        self.metadata = metadata or {}
+
+    def invoke(self, messages, stop=None):
+        return AIMessage(
+            content="hello there",
+            usage_metadata=self.usage,
+            response_metadata=self.metadata,
+        )
+
+    def stream(self, messages, stop=None):
+        yield AIMessageChunk(content="hello ")
+        yield AIMessageChunk(content="there")
+        yield AIMessageChunk(content="", usage_metadata=self.usage)
+
+
+def make_pool(providers, executor, **options):
+    options.setdefault("hedge_default_delay", 0.05)
+    return LLMPool(providers, executor, **options)
+
+
+def test_token_bucket_limits_bursts():
+    """Test that a bucket allows its burst and then refills at its rate."""
+    bucket = TokenBucket(rate=20, capacity=2)
+
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.acquire(timeout=0.5)
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """Test closed -> open -> half-open -> closed transitions."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()  # the half-open trial
+    assert not breaker.allow()  # only one trial at a time
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_fast_primary_is_not_hedged(executor):
+    """Test that a primary answering within its p95 gets no hedge."""
+    backup = Provider("backup", fake_call("backup"))
+    pool = make_pool([Provider("primary", fake_call("primary")), backup], executor)
+
+    assert pool.generate("hi") == "primary"
+    assert backup.requests == 0
+
+
+def test_slow_primary_is_hedged(executor):
+    """Test that the alternate's answer wins when the primary is slow."""
+    primary = Provider("primary", fake_call("primary", delay=0.5))
+    backup = Provider("backup", fake_call("backup"))
+    pool = make_pool([primary, backup], executor)
+
+    started = time.monotonic()
+    assert pool.generate("hi") == "backup"
+    assert time.monotonic() - started < 0.4
+    assert backup.hedges == 1
+    assert backup.hedge_wins == 1
+
+
+def test_hedge_losers_count_toward_latency(executor):
+    """Test that a slow primary's latency is recorded even when its hedge wins."""
+    primary = Provider("primary", fake_call("primary", delay=0.2))
+    backup = Provider("backup", fake_call("backup"))
+    pool = make_pool([primary, backup], executor)
+
+    assert pool.generate("hi") == "backup"
+    executor.shutdown(wait=True)
+
+    assert len(primary.latency) == 1
+    assert primary.latency.percentile(95) >= 0.2
+    assert len(backup.latency) == 1
+
+
+def test_failover_and_circuit_breaking(executor):
+    """Test that failures fail over and eventually open the circuit."""
+    primary = Provider(
+        "primary",
+        fake_call("", error=RuntimeError("down")),
+        breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+    )
+    backup = Provider("backup", fake_call("backup"))
+    pool = make_pool([primary, backup], executor, hedging=False)
+
+    for _ in range(3):
+        assert pool.generate("hi") == "backup"
+
+    assert primary.failures == 2
+    assert primary.requests == 2  # skipped once its circuit opened
+    assert primary.breaker.state == CircuitBreaker.OPEN
+
+
+def test_counts_survive_concurrent_generations():
+    """Test that request and failure counts are exact under concurrent callers."""
+    primary = Provider(
+        "primary",
+        fake_call("", error=RuntimeError("down")),
+        breaker=CircuitBreaker(failure_threshold=10_000),
+    )
+    backup = Provider("backup", fake_call("backup"))
+    with ThreadPoolExecutor(max_workers=16) as pool_executor:
+        pool = make_pool([primary, backup], pool_executor, hedging=False)
+        with ThreadPoolExecutor(max_workers=8) as callers:
+            results = list(callers.map(lambda _: pool.generate("hi"), range(400)))
+
+    assert results == ["backup"] * 400
+    stats = pool.get_stats()
+    assert stats["primary"]["requests"] == stats["primary"]["failures"] == 400
+    assert stats["backup"]["requests"] == 400
+
+
+def test_generation_info_reports_winner_and_attempts(executor):
+    """Test that the pool reports which provider answered and after how many attempts."""
+    primary = Provider("primary", fake_call("", error=RuntimeError("down")))
+    backup = Provider("backup", fake_call("backup"))
+    pool = make_pool([primary, backup], executor, hedging=False)
+
+    generation = pool.generate_with_info("hi")
+
+    assert generation.text == "backup"
+    assert generation.provider == "backup"
+    assert generation.attempts == 2
+    assert generation.failures == 1
+
+
+def test_rate_limited_provider_is_skipped(executor):
+    """Test that a provider without tokens is passed over."""
+    limited = Provider(
+        "limited", fake_call("limited"), bucket=TokenBucket(rate=0.001, capacity=1)
+    )
+    backup = Provider("backup", fake_call("backup"))
+    pool = make_pool([limited, backup], executor, acquire_timeout=0.01)
+
+    assert pool.generate("hi") == "limited"
+    assert pool.generate("hi") == "backup"
+
+
+def test_all_providers_unavailable(executor):
+    """Test the error raised when nothing can serve the request."""
+    pool = make_pool(
+        [Provider("a", fake_call("", error=RuntimeError("down")))],
+        executor,
+        hedging=False,
+    )
+
+    with pytest.raises(LLMUnavailableError):
+        pool.generate("hi")
+
+
+def test_streaming_hedge_does_not_mix_tokens(executor):
+    """Test that only the attempt that streams first reaches the caller."""
+    primary = Provider(
+        "primary", fake_call("slow", delay=0.3, tokens=["s", "l", "o", "w"])
+    )
+    backup = Provider("backup", fake_call("fast", delay=0.01, tokens=["fa", "st"]))
+    pool = make_pool([primary, backup], executor)
+    tokens = []
+
+    assert pool.generate("hi", on_token=tokens.append) == "fast"
+    time.sleep(0.4)  # let the abandoned primary try to stream
+    assert tokens == ["fa", "st"]
+
+
+def test_parse_rate_limits():
+    """Test the LLM_RATE_LIMITS format."""
+    assert parse_rate_limits("openai:10:20, Anthropic:5") == {
+        "openai": (10.0, 20.0),
+        "anthropic": (5.0, None),
+    }
+    assert parse_rate_limits("") == {}
+    with pytest.raises(ValueError):
+        parse_rate_limits("openai")
+
+
+def test_missing_provider_package_names_the_extra(monkeypatch):
+    """Test that a provider without its LangChain package says which extra to install."""
+    monkeypatch.setitem(sys.modules, "langchain_anthropic", None)
+
+    with pytest.raises(LLMConfigError, match="poetry install --extras anthropic"):
+        create_chat_model("anthropic/claude-3-5-sonnet-latest")
+    with pytest.raises(LLMConfigError, match="Unknown LLM provider 'acme'"):
+        create_chat_model("acme/model")
+
+
+def pooled_usage(client, executor, streaming=False):
+    """Token usage a PooledChatModel call on `client` records for the run."""
+    pool = make_pool([Provider("fake", provider_call(client))], executor)
+    model = PooledChatModel(pool=pool, streaming=streaming)
+    run = RunContext()
+    run.start(["intent_analysis_task"])
+    token = current_run.set(run)
+    try:
+        assert model.invoke([HumanMessage(content="hi")]).content == "hello there"
+    finally:
+        current_run.reset(token)
+    report = run.usage_report()
+    return report["prompt_tokens"], report["completion_tokens"]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_provider_usage_is_recorded(executor, streaming):
+    """Test that token counts reported by the provider replace the estimate."""
+    usage = {"input_tokens": 120, "output_tokens": 7, "total_tokens": 127}
+
+    assert pooled_usage(FakeChatModel(usage), executor, streaming) == (120, 7)
+
+
+def test_provider_usage_in_response_metadata(executor):
+    """Test that OpenAI-style token_usage metadata is read too."""
+    client = FakeChatModel(
+        metadata={"token_usage": {"prompt_tokens": 90, "completion_tokens": 4}}
+    )
+
+    assert pooled_usage(client, executor) == (90, 4)
+
+
+def test_usage_is_estimated_without_provider_figures(executor):
+    """Test that the local estimate is used when the provider reports no usage."""
+    assert pooled_usage(FakeChatModel(), executor) == (
+        count_tokens("hi"),
+        count_tokens("hello there"),
+    )
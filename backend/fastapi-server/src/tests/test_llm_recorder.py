@@ -0,0 +1,141 @@
+"""
+Tests for LLM record/replay.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi_server.ai.llm_pool import CircuitBreaker, LLMPool, Provider
+from fastapi_server.ai.llm_recorder import (
+    LLMRecorder,
+    LLMReplayMissError,
+    RecordingStore,
+    request_key,
+)
+
+
+class FakeMessage:
+    def __init__(self, type, content):
+        self.type = type
+        self.content = content
+
+
+class CountingCall:
+    """Provider call that answers with a canned text and counts its calls."""
+
+    def __init__(self, text="Final Answer: ok"):
+        self.text = text
+        self.calls = 0
+
+    def __call__(self, messages, stop, on_token):
+        self.calls += 1
+        if on_token is not None:
+            for token in self.text.split(" "):
+                if not on_token(token):
+                    return ""
+        return self.text
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RecordingStore(str(tmp_path / "recordings.db"))
+    yield store
+    store.close()
+
+
+def test_request_key_covers_model_roles_and_stop():
+    """Test that the key changes with anything that can change the answer."""
+    messages = [FakeMessage("system", "be brief"), FakeMessage("human", "hi")]
+    key = request_key("openai/gpt-4o", messages, ["\nObservation"])
+
+    assert key == request_key("openai/gpt-4o", list(messages), ["\nObservation"])
+    assert key != request_key("openai/gpt-4o-mini", messages, ["\nObservation"])
+    assert key != request_key("openai/gpt-4o", messages, None)
+    assert key != request_key(
+        "openai/gpt-4o",
+        [FakeMessage("human", "be brief"), FakeMessage("human", "hi")],
+        ["\nObservation"],
+    )
+
+
+def test_record_then_replay_without_provider(store):
+    """Test that recorded responses replay without creating the provider."""
+    provider = CountingCall()
+    recorder = LLMRecorder(store, mode="record")
+    call = recorder.wrap("openai/gpt-4o", lambda: provider)
+    assert call(["hello"], None, None) == "Final Answer: ok"
+    assert provider.calls == 1
+
+    def no_provider():
+        raise AssertionError("replay must not build a client")
+
+    replayer = LLMRecorder(store, mode="replay")
+    replay = replayer.wrap("openai/gpt-4o", no_provider)
+    tokens = []
+
+    assert replay(["hello"], None, None) == "Final Answer: ok"
+    assert replay(["hello"], None, lambda t: tokens.append(t) or True) == (
+        "Final Answer: ok"
+    )
+    assert "".join(tokens) == "Final Answer: ok"
+    assert replayer.get_stats()["hits"] == 2
+    assert store.count() == 1
+
+
+def test_replay_miss_is_reported(store):
+    """Test that replay misses raise and are listed in the stats."""
+    recorder = LLMRecorder(store, mode="replay")
+    call = recorder.wrap("openai/gpt-4o", CountingCall)
+
+    with pytest.raises(LLMReplayMissError):
+        call(["never recorded"], None, None)
+
+    stats = recorder.get_stats()
+    assert stats["misses"] == 1
+    assert stats["recent_misses"][0]["model"] == "openai/gpt-4o"
+    assert stats["recent_misses"][0]["prompt_preview"] == "never recorded"
+
+
+def test_auto_mode_records_misses_once(store):
+    """Test that auto mode calls the provider only for unseen requests."""
+    provider = CountingCall()
+    recorder = LLMRecorder(store, mode="auto")
+    call = recorder.wrap("mistral/small", lambda: provider)
+
+    for _ in range(3):
+        assert call(["same prompt"], None, None) == "Final Answer: ok"
+
+    assert provider.calls == 1
+    stats = recorder.get_stats()
+    assert (stats["hits"], stats["misses"], stats["recorded"]) == (2, 1, 1)
+
+
+def test_truncated_streams_are_not_recorded(store):
+    """Test that an attempt that lost the stream is not saved."""
+    recorder = LLMRecorder(store, mode="record")
+    call = recorder.wrap("openai/gpt-4o", CountingCall)
+
+    call(["hello"], None, lambda token: False)
+
+    assert store.count() == 0
+
+
+def test_replay_miss_does_not_open_circuit(store):
+    """Test that replay misses fail over without tripping the breaker."""
+    recorder = LLMRecorder(store, mode="replay")
+    LLMRecorder(store, mode="record").wrap("backup", CountingCall)(["hi"], None, None)
+    primary = Provider(
+        "primary",
+        recorder.wrap("primary", CountingCall),
+        breaker=CircuitBreaker(failure_threshold=1),
+    )
+    backup = Provider("backup", recorder.wrap("backup", CountingCall))
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        pool = LLMPool([primary, backup], executor, hedging=False)
+        assert pool.generate(["hi"]) == "Final Answer: ok"
+    finally:
+        executor.shutdown(wait=False)
+
+    assert primary.failures == 1
+    assert primary.breaker.state == CircuitBreaker.CLOSED
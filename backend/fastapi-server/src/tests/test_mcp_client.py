@@ -0,0 +1,246 @@
+"""
+Tests for the pooled MCP client and its tool-result cache.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import pytest
+from fastapi_server.ai.deadline import Deadline, DeadlineExceededError
+from fastapi_server.ai.mcp_client import (
+    MCPClient,
+    MCPError,
+    MCPTimeoutError,
+    ToolResultCache,
+    data_preview_calls,
+    parse_tool_timeouts,
+)
+
+
+class FakeMCPServer:
+    """Streamable HTTP MCP endpoint answering tools/call from a handler table."""
+
+    def __init__(self, tools, sse=False, delay=0.0):
+        self.tools = tools
+        self.sse = sse
+        self.delay = delay
+        self.methods = []
+        self.timeouts = []
+        self.sessions = 0
+        self.expired = set()
+        self.lock = threading.Lock()
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        message = json.loads(request.content)
+        method = message["method"]
+        with self.lock:
+            self.methods.append(method)
+            self.timeouts.append(request.extensions["timeout"]["read"])
+
+        if method == "initialize":
+            with self.lock:
+                self.sessions += 1
+                session = f"session-{self.sessions}"
+            return self.reply(message, {"protocolVersion": "2025-03-26"}, session)
+        if method == "notifications/initialized":
+            return httpx.Response(202)
+
+        if request.headers.get("Mcp-Session-Id") in self.expired:
+            return httpx.Response(404)
+        name = message["params"]["name"]
+        if self.delay:
+            time.sleep(self.delay)
+        handler = self.tools.get(name)
+        if handler is None:
+            result = {"content": [{"type": "text", "text": "unknown"}], "isError": True}
+        else:
+            output = handler(**message["params"]["arguments"])
+            result = {"content": [{"type": "text", "text": json.dumps(output)}]}
+        return self.reply(message, result)
+
+    def reply(self, message, result, session=None):
+        body = {"jsonrpc": "2.0", "id": message["id"], "result": result}
+        headers = {"Mcp-Session-Id": session} if session else {}
+        if self.sse:
+            text = f"event: message\ndata: {json.dumps(body)}\n\n"
+            headers["content-type"] = "text/event-stream"
+            return httpx.Response(200, text=text, headers=headers)
+        return httpx.Response(200, json=body, headers=headers)
+
+
+def make_client(server, **options):
+    return MCPClient(
+        "http://mcp.test", transport=httpx.MockTransport(server), **options
+    )
+
+
+def query_tool(query):
+    return {"success": True, "data": [{"query": query}], "count": 1}
+
+
+def test_session_is_set_up_once_and_reused():
+    """Test that the handshake runs once and results are decoded."""
+    server = FakeMCPServer({"mysql_query": query_tool})
+    client = make_client(server)
+
+    assert client.call_tool("mysql_query", {"query": "SELECT 1"})["count"] == 1
+    client.call_tool("mysql_query", {"query": "SELECT 2"})
+
+    assert server.methods == [
+        "initialize",
+        "notifications/initialized",
+        "tools/call",
+        "tools/call",
+    ]
+    assert client.get_stats()["tools"]["mysql_query"]["calls"] == 2
+
+
+def test_event_stream_replies_and_tool_errors():
+    """Test SSE-framed replies and isError results."""
+    server = FakeMCPServer({"csv_list_files": lambda: {"files": ["a.csv"]}}, sse=True)
+    client = make_client(server)
+
+    assert client.call_tool("csv_list_files") == {"files": ["a.csv"]}
+    with pytest.raises(MCPError, match="nope"):
+        client.call_tool("nope")
+
+
+def test_expired_session_is_renewed():
+    """Test that a 404 for a dropped session starts a new one and retries."""
+    server = FakeMCPServer({"mysql_query": query_tool})
+    client = make_client(server)
+    client.call_tool("mysql_query", {"query": "SELECT 1"})
+    server.expired.add("session-1")
+
+    assert client.call_tool("mysql_query", {"query": "SELECT 2"})["success"]
+    assert server.sessions == 2
+
+
+def test_results_are_cached_by_tool_and_arguments():
+    """Test that identical calls hit the cache and failed results are not kept."""
+    calls = []
+
+    def mysql_query(query):
+        calls.append(query)
+        return {"success": query != "bad", "data": []}
+
+    server = FakeMCPServer({"mysql_query": mysql_query})
+    client = make_client(server, cache=ToolResultCache(ttl_seconds=60))
+
+    client.call_tool("mysql_query", {"query": "SELECT 1"})
+    client.call_tool("mysql_query", {"query": "SELECT 1"})
+    client.call_tool("mysql_query", {"query": "SELECT 2"})
+    client.call_tool("mysql_query", {"query": "bad"})
+    client.call_tool("mysql_query", {"query": "bad"})
+
+    assert calls == ["SELECT 1", "SELECT 2", "bad", "bad"]
+    assert client.get_stats()["cache"]["hits"] == 1
+
+
+def test_identical_calls_in_flight_share_one_request():
+    """Test that concurrent identical calls wait for the first one's result."""
+    calls = []
+
+    def mysql_get_schema(table_name):
+        calls.append(table_name)
+        return {"success": True, "columns": ["id"]}
+
+    server = FakeMCPServer({"mysql_get_schema": mysql_get_schema}, delay=0.2)
+    client = make_client(server)
+    client.call_tool("mysql_get_schema", {"table_name": "warm_up"})
+
+    results = client.call_tools(
+        [("mysql_get_schema", {"table_name": "sales"})] * 4
+        + [("mysql_get_schema", {"table_name": "users"})]
+    )
+
+    assert sorted(calls) == ["sales", "users", "warm_up"]
+    assert all(r["columns"] == ["id"] for r in results)
+    assert client.get_stats()["coalesced_calls"] == 3
+
+
+def test_cache_ttl_and_lru_eviction():
+    """Test that entries expire after the TTL and the oldest is evicted first."""
+    now = [0.0]
+    cache = ToolResultCache(ttl_seconds=10, max_entries=2, clock=lambda: now[0])
+    cache.put("t", {"a": 1}, "one")
+    cache.put("t", {"a": 2}, "two")
+    assert cache.get("t", {"a": 1}) == "one"
+    cache.put("t", {"a": 3}, "three")
+
+    assert cache.get("t", {"a": 2}) is None
+    assert cache.get("t", {"a": 1}) == "one"
+    now[0] = 11
+    assert cache.get("t", {"a": 1}) is None
+
+
+def test_per_tool_timeouts_are_capped_by_the_deadline():
+    """Test the timeout sent with each call and timeouts raising MCPTimeoutError."""
+    server = FakeMCPServer({"mysql_query": query_tool, "csv_list_files": dict})
+    client = make_client(server, timeout=10, tool_timeouts={"csv_list_files": 2})
+
+    client.call_tool("csv_list_files")
+    client.call_tool("mysql_query", {"query": "SELECT 1"}, deadline=Deadline(5))
+    assert server.timeouts[-2] == 2
+    assert 4 < server.timeouts[-1] <= 5
+
+    with pytest.raises(DeadlineExceededError):
+        client.call_tool("mysql_query", {"query": "SELECT 1"}, deadline=Deadline(0))
+
+    def timeout(request):
+        raise httpx.ReadTimeout("slow", request=request)
+
+    with pytest.raises(MCPTimeoutError):
+        make_client(timeout).call_tool("mysql_query", {"query": "SELECT 1"})
+
+
+def test_tool_calls_run_concurrently():
+    """Test that batched calls overlap instead of running one after another."""
+    server = FakeMCPServer({"mysql_query": query_tool}, delay=0.2)
+    client = make_client(server)
+    client.call_tool("mysql_query", {"query": "warm up"})
+    calls = [("mysql_query", {"query": f"SELECT {i}"}) for i in range(4)]
+
+    started = time.monotonic()
+    results = client.call_tools(calls)
+    assert time.monotonic() - started < 0.6
+    assert [r["data"][0]["query"] for r in results] == [f"SELECT {i}" for i in range(4)]
+
+    started = time.monotonic()
+    results = asyncio.run(
+        client.acall_tools(calls + [("missing", {})], return_exceptions=True)
+    )
+    assert time.monotonic() - started < 0.6
+    assert isinstance(results[-1], MCPError)
+
+
+def test_data_preview_calls():
+    """Test the tool calls used to preview the data behind an intent."""
+    assert data_preview_calls({"data_source": "mysql", "query": "sales"}, 5) == [
+        ("mysql_get_schema", {"table_name": "sales"}),
+        ("mysql_query", {"query": "SELECT * FROM `sales` LIMIT 5"}),
+    ]
+    assert data_preview_calls({"data_source": "csv", "query": "users"}, 3)[1] == (
+        "csv_read",
+        {"filename": "users.csv", "limit": 3},
+    )
+    # Names that aren't plain identifiers never reach a query
+    assert data_preview_calls({"data_source": "mysql", "query": "x; DROP"}, 5) == [
+        ("mysql_get_tables", {})
+    ]
+    assert data_preview_calls({"data_source": "mongodb"}, 5) == [
+        ("mongo_get_collections", {})
+    ]
+
+
+def test_parse_tool_timeouts():
+    assert parse_tool_timeouts("mysql_query:20, csv_read:2.5") == {
+        "mysql_query": 20.0,
+        "csv_read": 2.5,
+    }
+    assert parse_tool_timeouts("") == {}
+    with pytest.raises(ValueError):
+        parse_tool_timeouts("mysql_query")
@@ -0,0 +1,52 @@
+"""
+Tests for the CrewAI tools backed by the MCP data server.
+"""
+
+from crewai import Agent
+
+from fastapi_server.ai.mcp_client import MCPError
+from fastapi_server.ai.mcp_tools import MCP_TOOL_SPECS, create_mcp_tools
+
+
+class FakeClient:
+    """Records tool calls instead of talking to an MCP server."""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    def call_tool(self, name, arguments, deadline=None):
+        self.calls.append((name, arguments))
+        if self.error is not None:
+            raise self.error
+        return {"rows": [{"total": 3}]}
+
+
+def test_tools_forward_calls_to_the_client():
+    """Test that each MCP tool is a working tool of the installed crewai."""
+    client = FakeClient()
+    tools = {tool.name: tool for tool in create_mcp_tools(client)}
+
+    assert set(tools) == set(MCP_TOOL_SPECS)
+    output = tools["mongo_query"].run({"collection": "orders", "query": "{}"})
+    assert output == '{"rows": [{"total": 3}]}'
+    # Optional arguments left out are not sent
+    assert client.calls == [("mongo_query", {"collection": "orders", "query": "{}"})]
+
+    failing = create_mcp_tools(FakeClient(error=MCPError("server down")))[0]
+    assert failing.run({}) == "Error: server down"
+
+
+def test_agents_accept_the_tools(monkeypatch):
+    """Test that crewai agents take the tools (nothing is sent to OpenAI)."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    tools = create_mcp_tools(FakeClient())
+
+    agent = Agent(
+        role="Data connector",
+        goal="Fetch data",
+        backstory="Knows the data sources",
+        tools=tools,
+        allow_delegation=False,
+    )
+    assert [tool.name for tool in agent.tools] == list(MCP_TOOL_SPECS)
@@ -0,0 +1,117 @@
+import random
+
+import pytest
+
+from fastapi_server.ai.mock_llm import LatencyModel, MockLLM
+
+SCRIPT = {
+    "latency": {"distribution": "fixed", "ms": 100},
+    "time_to_first_token_ratio": 0.5,
+    "responses": [
+        {"name": "intent", "match": "understand their intent", "response": "intent"},
+        {
+            "name": "slow",
+            "match": "data sources",
+            "response": "one two three four",
+            "latency": {"distribution": "fixed", "ms": 400},
+        },
+    ],
+    "default": "fallback answer",
+}
+
+
+def make_mock(**kwargs):
+    sleeps = []
+    mock = MockLLM(SCRIPT, sleep=sleeps.append, **kwargs)
+    return mock, sleeps
+
+
+def test_script_matching_and_default():
+    """Prompts are answered by the first matching entry, else the default."""
+    mock, sleeps = make_mock()
+
+    assert mock.call(["Please UNDERSTAND THEIR INTENT"]) == "intent"
+    assert mock.call("Identify appropriate data sources") == "one two three four"
+    assert mock.call(["Something else"]) == "fallback answer"
+    assert sleeps == [0.1, 0.4, 0.1]
+
+    stats = mock.get_stats()
+    assert stats["calls"] == {"intent": 1, "slow": 1, "default": 1}
+    assert stats["simulated_ms"] == pytest.approx(600)
+
+
+def test_latency_scale_and_stop_sequences():
+    """Latency scales uniformly and responses are cut at stop sequences."""
+    mock, sleeps = make_mock(latency_scale=0.5)
+
+    assert mock.call(["data sources"], stop=[" three"]) == "one two"
+    assert sleeps == [0.2]
+
+
+def test_streaming_spreads_latency_over_tokens():
+    """Streaming waits for the first token, then paces the rest."""
+    mock, sleeps = make_mock()
+    tokens = []
+
+    text = mock.call(["data sources"], on_token=lambda t: tokens.append(t) or True)
+
+    assert text == "one two three four"
+    assert "".join(tokens) == text
+    assert len(tokens) == 4
+    assert sleeps[0] == pytest.approx(0.2)
+    assert sum(sleeps) == pytest.approx(0.4)
+
+
+def test_streaming_stops_when_attempt_loses():
+    """A hedged attempt that lost the stream stops emitting tokens."""
+    mock, _ = make_mock()
+    tokens = []
+
+    def on_token(token):
+        tokens.append(token)
+        return len(tokens) < 2
+
+    assert mock.call(["data sources"], on_token=on_token) == "one "
+    assert len(tokens) == 2
+
+
+def test_latency_distributions_are_seeded():
+    """The same seed reproduces the same latencies."""
+    spec = {"distribution": "lognormal", "median_ms": 800, "sigma": 0.35}
+    first = LatencyModel(spec, random.Random(7))
+    second = LatencyModel(spec, random.Random(7))
+    samples = [first.sample() for _ in range(5)]
+
+    assert samples == [second.sample() for _ in range(5)]
+    assert all(s > 0 for s in samples)
+
+    uniform = LatencyModel(
+        {"distribution": "uniform", "min_ms": 10, "max_ms": 20}, random.Random(1)
+    )
+    assert all(0.01 <= uniform.sample() <= 0.02 for _ in range(20))
+
+    empirical = LatencyModel(
+        {"distribution": "empirical", "samples_ms": [50, 70]}, random.Random(1)
+    )
+    assert {empirical.sample() for _ in range(20)} <= {0.05, 0.07}
+
+    with pytest.raises(ValueError):
+        LatencyModel({"distribution": "pareto"}, random.Random())
+
+
+def test_default_script_answers_every_crew_task():
+    """The bundled script has a ReAct final answer for each crew task prompt."""
+    mock = MockLLM.from_yaml(latency_scale=0, sleep=lambda _: None)
+    prompts = {
+        "message_planning": "Analyze the user's message and create a strategic plan",
+        "intent_analysis": "Analyze the user's message to understand their intent",
+        "data_retrieval": "Identify appropriate data sources for the request",
+        "component_generation": "Create component specifications for the dashboard",
+        "response_generation": "Create a natural, helpful response to the user",
+    }
+
+    for name, prompt in prompts.items():
+        entry, text, latency = mock.respond(prompt)
+        assert entry == name
+        assert "Final Answer:" in text
+        assert latency == 0
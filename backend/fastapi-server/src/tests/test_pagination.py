@@ -0,0 +1,140 @@
+"""
+Tests for keyset (cursor) pagination.
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from fastapi_server.repositories.chat_repository import ChatRepository
+from fastapi_server.repositories.chat_search import install_search_index
+from fastapi_server.repositories.pagination import (
+    InvalidCursorError,
+    encode_cursor,
+)
+from fastapi_server.services.component_service import ComponentService
+
+
+@pytest.fixture(autouse=True)
+def search_index(engine):
+    install_search_index(engine)
+
+
+def add_chats(db, session_id, messages):
+    return ChatRepository().create_many(
+        db,
+        [
+            {"session_id": session_id, "user_message": m, "agent_response": "ok"}
+            for m in messages
+        ],
+    )
+
+
+def walk(fetch, limit):
+    """Collect every page of a listing by following its cursors."""
+    pages = []
+    cursor = None
+    while True:
+        page = fetch(limit, cursor)
+        pages.append(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+
+def test_history_pages_have_no_gaps_or_duplicates(db):
+    """Test that chats stored between pages don't shift the pages after them."""
+    repository = ChatRepository()
+    # Stored within the same second, so created_at ties and the id decides
+    chats = add_chats(db, "s", [f"message {i}" for i in range(5)])
+    add_chats(db, "other", ["not in this session"])
+
+    first = repository.get_history_page(db, "s", limit=2)
+    assert [chat.id for chat in first.items] == [chats[4].id, chats[3].id]
+
+    # With offsets, this would push chats[3] onto the second page again
+    add_chats(db, "s", ["newer message"])
+    second = repository.get_history_page(db, "s", 2, first.next_cursor)
+    third = repository.get_history_page(db, "s", 2, second.next_cursor)
+
+    assert [chat.id for chat in second.items + third.items] == [
+        chats[2].id,
+        chats[1].id,
+        chats[0].id,
+    ]
+    assert third.next_cursor is None
+
+
+def test_offset_and_cursor_pages_agree(db):
+    """Test that a cursor taken from an offset page continues where it ended."""
+    repository = ChatRepository()
+    add_chats(db, "s", [f"message {i}" for i in range(7)])
+    everything = [chat.id for chat in repository.get_page(db, limit=100).items]
+
+    offset_page = repository.get_page(db, limit=3, skip=2)
+    after = repository.get_page(db, limit=100, cursor=offset_page.next_cursor)
+
+    assert [chat.id for chat in offset_page.items] == everything[2:5]
+    assert [chat.id for chat in after.items] == everything[5:]
+    assert (
+        sum(walk(lambda limit, cursor: repository.get_page(db, limit, cursor), 3), [])
+        == repository.get_page(db, limit=100).items
+    )
+
+
+def test_cursor_survives_deleting_its_row(db):
+    """Test that a page continues after the row its cursor points at is deleted."""
+    repository = ChatRepository()
+    chats = add_chats(db, "s", [f"message {i}" for i in range(4)])
+
+    first = repository.get_history_page(db, "s", limit=2)
+    repository.delete(db, first.items[-1].id)
+    second = repository.get_history_page(db, "s", 2, first.next_cursor)
+
+    assert [chat.id for chat in second.items] == [chats[1].id, chats[0].id]
+
+
+def test_invalid_cursors_are_rejected(db):
+    """Test that malformed, foreign and mixed skip/cursor requests fail."""
+    repository = ChatRepository()
+    add_chats(db, "s", ["one", "two"])
+    cursor = repository.get_history_page(db, "s", limit=1).next_cursor
+
+    for bad in ["not a cursor", "", encode_cursor("chat-history", ["1"])]:
+        with pytest.raises(InvalidCursorError):
+            repository.get_history_page(db, "s", 1, bad)
+    # Cursors belong to the listing they came from
+    with pytest.raises(InvalidCursorError):
+        repository.get_history_page(db, "other", 1, cursor)
+    with pytest.raises(InvalidCursorError):
+        repository.get_page(db, limit=1, cursor=cursor)
+    with pytest.raises(InvalidCursorError):
+        repository.get_page(db, limit=1, skip=1, cursor=cursor)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(ComponentService().get_components(db, cursor=cursor))
+    assert error.value.status_code == 400
+
+
+def test_search_pages_follow_rank(db):
+    """Test that ranked search results page by (rank, id) without repeats."""
+    repository = ChatRepository()
+    add_chats(db, "a", ["revenue"] * 3 + ["revenue revenue", "monthly revenue chart"])
+
+    everything = repository.search_chats(db, "revenue", limit=100).items
+    pages = walk(
+        lambda limit, cursor: repository.search_chats(
+            db, "revenue", limit=limit, cursor=cursor
+        ),
+        2,
+    )
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [hit["id"] for hit in sum(pages, [])] == [hit["id"] for hit in everything]
+    with pytest.raises(InvalidCursorError):
+        repository.search_chats(
+            db,
+            "churn",
+            cursor=repository.search_chats(db, "revenue", limit=1).next_cursor,
+        )
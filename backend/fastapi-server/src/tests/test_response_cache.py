@@ -0,0 +1,164 @@
+"""
+Tests for the crew response cache.
+"""
+
+import sqlite3
+import time
+
+import pytest
+from fastapi_server.ai.response_cache import (
+    MemoryCacheBackend,
+    ResponseCache,
+    SQLiteCacheBackend,
+)
+
+RESULT = {
+    "response": "Here is your sales chart.",
+    "component_suggestion": {"component_type": "chart"},
+    "data": {},
+    "intent": {"action": "add_chart"},
+}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    """Each test runs against both cache backends."""
+    if request.param == "sqlite":
+        return SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    return MemoryCacheBackend()
+
+
+def test_exact_hit_ignores_case_and_punctuation(backend):
+    """Test that normalized messages share a cache entry."""
+    cache = ResponseCache(backend)
+    cache.put("Show sales chart updating every 10 min", "", RESULT)
+
+    assert cache.get("  show SALES chart updating  every 10 min!", "") == RESULT
+    assert cache.get("show sales chart updating every 10 min", "other context") is None
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_operators_and_decimals_are_part_of_the_key(backend):
+    """Test that messages differing only in symbols miss each other."""
+    cache = ResponseCache(backend)
+    cache.put("chart orders where revenue > 100", "", RESULT)
+    cache.put("table of the top-10 products", "", RESULT)
+    cache.put("metric of orders above 1.5 days", "", RESULT)
+
+    assert cache.get("chart orders where revenue < 100", "") is None
+    assert cache.get("table of the top 10 products", "") is None
+    assert cache.get("metric of orders above 15 days", "") is None
+    assert cache.get("Chart orders where revenue > 100.", "") == RESULT
+
+
+def test_near_duplicates_agree_on_operators_and_numbers(backend):
+    """Test that the similarity lookup never swaps a comparison or a number."""
+    cache = ResponseCache(backend, similarity_threshold=0.5)
+    cache.put("chart orders where revenue > 100", "", RESULT)
+    cache.put("metric of orders above 1.5 days", "", RESULT)
+
+    assert cache.get("chart orders where revenue < 100", "") is None
+    assert cache.get("chart orders where revenue >= 100", "") is None
+    assert cache.get("metric of orders above 15 days", "") is None
+    assert cache.get("chart of orders where revenue > 100", "") == RESULT
+
+
+def test_near_duplicate_hit(backend):
+    """Test the similarity lookup and its numeric guard."""
+    cache = ResponseCache(backend, similarity_threshold=0.8)
+    cache.put("show sales chart updating every 10 min", "", RESULT)
+
+    assert cache.get("show the sales chart updating every 10 min", "") == RESULT
+    assert cache.get("show sales chart updating every 5 min", "") is None
+    assert cache.get_stats()["near_hits"] == 1
+
+
+def test_ttl_expiry(backend):
+    """Test that entries expire after their TTL."""
+    cache = ResponseCache(backend, ttl_seconds=0)
+    cache.put("add metric for revenue", "", RESULT)
+    time.sleep(0.01)
+
+    assert cache.get("add metric for revenue", "") is None
+
+
+def test_lru_eviction_under_byte_budget():
+    """Test that the least recently used entry is evicted first."""
+    backend = MemoryCacheBackend(max_bytes=400)
+    cache = ResponseCache(backend)
+
+    cache.put("first message", "", RESULT)
+    cache.put("second message", "", RESULT)
+    cache.get("first message", "")
+    cache.put("third message", "", RESULT)
+
+    assert cache.get("first message", "") == RESULT
+    assert cache.get("second message", "") is None
+    assert backend.evictions >= 1
+
+
+def test_sqlite_budget_uses_running_totals(tmp_path):
+    """Test that SQLite evicts least recently used rows and keeps its totals exact."""
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"), max_entries=3)
+    cache = ResponseCache(backend, similarity_threshold=0.8)
+    for i in range(3):
+        cache.put(f"message {i}", "", RESULT)
+    cache.get("message 0", "")
+    cache.put("message 3", "", RESULT)
+    cache.put("message 3", "", dict(RESULT, response="replaced"))
+
+    assert cache.get("message 1", "") is None
+    assert cache.get("message 0", "") == RESULT
+    counted = backend._conn.execute(
+        "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM response_cache"
+    ).fetchone()
+    stats = backend.get_stats()
+    assert (stats["bytes"], stats["entries"]) == counted
+    assert stats["entries"] == 3 and backend.evictions == 1
+    # Evicted rows take their embeddings with them
+    embeddings = backend._conn.execute(
+        "SELECT COUNT(*) FROM response_cache_embeddings"
+    ).fetchone()
+    assert embeddings == (3,)
+
+
+def test_sqlite_candidates_skip_cached_values(tmp_path):
+    """Test that similarity candidates carry embeddings but no decoded results."""
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    cache = ResponseCache(backend, similarity_threshold=0.8)
+    cache.put("show sales chart", "", RESULT)
+
+    _, context_hash, _ = cache.make_key("show sales chart", "")
+    (candidate,) = backend.candidates(context_hash)
+    assert candidate.value is None and candidate.embedding
+    assert cache.get("show the sales chart", "") == RESULT
+
+
+def test_sqlite_files_of_the_old_layout_are_recreated(tmp_path):
+    """Test that a cache file from before the embeddings table starts over."""
+    path = str(tmp_path / "cache.db")
+    old = sqlite3.connect(path)
+    old.execute(
+        "CREATE TABLE response_cache (key TEXT PRIMARY KEY, context_hash TEXT, "
+        "message TEXT, value TEXT, embedding TEXT, size INTEGER, "
+        "expires_at REAL, last_access REAL)"
+    )
+    old.commit()
+    old.close()
+
+    cache = ResponseCache(SQLiteCacheBackend(path))
+    cache.put("add metric for revenue", "", RESULT)
+    assert cache.get("add metric for revenue", "") == RESULT
+
+
+@pytest.mark.asyncio
+async def test_async_lookups(backend):
+    """Test get_async and put_async, which run blocking backends in a thread."""
+    cache = ResponseCache(backend)
+    await cache.put_async("add metric for revenue", "", RESULT)
+
+    assert await cache.get_async("add metric for revenue", "") == RESULT
+    assert cache.get_stats()["stores"] == 1 and cache.get_stats()["hits"] == 1
@@ -0,0 +1,121 @@
+"""
+Tests for the message routing classifier.
+"""
+
+import pytest
+from fastapi_server.ai.intent_parser import IntentParser
+from fastapi_server.ai.router import (
+    DIRECT_MODEL,
+    MessageRouter,
+    RoutingClassifier,
+    label_chat,
+    message_features,
+)
+
+
+@pytest.fixture(scope="module")
+def router():
+    return MessageRouter.from_yaml(intent_parser=IntentParser.from_yaml())
+
+
+@pytest.mark.parametrize(
+    "message, route",
+    [
+        ("hello", "direct"),
+        ("thanks a lot", "direct"),
+        ("Make sure to explain what a dashboard is", "minimal"),
+        ("how do I add a kpi?", "minimal"),
+        ("create a line chart of sales from mysql", "full"),
+        ("change it to a table", "intent_only"),
+    ],
+)
+def test_seed_examples_route_common_messages(router, message, route):
+    """Test that the seed-trained classifier routes typical messages."""
+    decision = router.classify(message)
+
+    assert decision.route == route
+    assert decision.confidence >= router.min_confidence
+
+
+def test_unsure_decisions_fall_back_to_keywords(router):
+    """Test that low-confidence decisions use the caller's fallback route."""
+    router.min_confidence = 1.01
+    try:
+        decision = router.route("make a chart", fallback="full")
+    finally:
+        router.min_confidence = 0.6
+
+    assert decision.route == "full"
+    assert decision.source == "keywords"
+    assert router.get_stats()["keyword_fallbacks"] >= 1
+
+
+def test_direct_route_needs_a_direct_reply(router):
+    """Test that direct answers are only given when a canned reply matches."""
+    assert router.route("hi", fallback="minimal").route == "direct"
+    assert "dashboard component assistant" in router.direct_reply("hi")
+
+    # "ok" looks conversational, but there is nothing canned to say to it
+    assert router.direct_reply("ok") is None
+    assert router.route("ok", fallback="minimal").route != "direct"
+
+
+def test_training_on_history_shifts_routes(tmp_path):
+    """Test that chat history teaches the classifier new phrasings."""
+    router = MessageRouter.from_yaml()
+    message = "quarterly churn widget please"
+    history = [(message, "full")] * 5 + [("churn widget", "full")] * 5
+
+    examples = router.train(history)
+    assert router.classify(message).route == "full"
+    assert examples == router.classifier.examples > len(history)
+
+    path = tmp_path / "routing_model.json"
+    router.save(str(path))
+    loaded = MessageRouter.from_yaml(model_path=str(path))
+    assert loaded.classify(message).route == "full"
+    assert loaded.classifier.examples == examples
+
+
+def test_classifier_posteriors():
+    """Test naive Bayes predictions on a toy problem."""
+    classifier = RoutingClassifier.fit(
+        [
+            (["w:chart"], "full"),
+            (["w:chart", "w:sales"], "full"),
+            (["w:why"], "minimal"),
+        ]
+    )
+    route, confidence = classifier.predict(["w:chart"])
+
+    assert route == "full"
+    assert 0.5 < confidence < 1
+    assert RoutingClassifier.from_dict(classifier.to_dict()).predict(["w:why"])[0] == (
+        "minimal"
+    )
+    with pytest.raises(ValueError):
+        RoutingClassifier().predict(["w:chart"])
+
+
+def test_message_features():
+    features = message_features(
+        "Add a chart?", {"component_type": "chart", "confidence": 0.6}
+    )
+
+    assert {"w:add", "b:add_a", "question", "intent:component"} <= set(features)
+    assert "intent:confidence:2" in features
+
+
+def test_label_chat_from_outcome():
+    """Test how stored chats are labelled for training."""
+    assert label_chat({"intent": None}) is None
+    assert label_chat({"intent": {}, "component_suggestion": {"type": "chart"}}) == (
+        "full"
+    )
+    assert (
+        label_chat({"intent": {"action": "add_chart", "component_type": "chart"}})
+        == "full"
+    )
+    assert label_chat({"intent": {"action": "rename"}}) == "intent_only"
+    assert label_chat({"intent": {}, "model_used": DIRECT_MODEL}) == "direct"
+    assert label_chat({"intent": {}, "model_used": "openai/gpt-4o"}) == "minimal"
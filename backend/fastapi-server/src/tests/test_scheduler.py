@@ -0,0 +1,102 @@
+"""
+Tests for the crew task graph scheduler.
+"""
+
+import threading
+import time
+
+import pytest
+from fastapi_server.ai.scheduler import TaskGraph, TaskGraphError, critical_path
+
+
+def test_independent_tasks_overlap():
+    """Test that tasks without edges between them run concurrently."""
+    graph = TaskGraph({"plan": [], "data": ["plan"], "component": ["plan"]})
+    both_running = threading.Barrier(2, timeout=2)
+
+    def runner(name, upstream):
+        if name != "plan":
+            # Deadlocks (and times out) unless both tasks run at once
+            both_running.wait()
+        return name
+
+    result = graph.run(runner, max_parallel=2)
+
+    assert set(result.outputs) == {"plan", "data", "component"}
+    assert result.spans["data"][0] < result.spans["component"][1]
+    assert result.spans["component"][0] < result.spans["data"][1]
+
+
+def test_upstream_outputs_follow_edges():
+    """Test that each task receives exactly its dependencies' outputs."""
+    graph = TaskGraph({"a": [], "b": ["a"], "c": ["a", "b"]})
+    seen = {}
+
+    def runner(name, upstream):
+        seen[name] = dict(upstream)
+        return name.upper()
+
+    result = graph.run(runner)
+
+    assert seen == {"a": {}, "b": {"a": "A"}, "c": {"a": "A", "b": "B"}}
+    assert result.outputs["c"] == "C"
+
+
+def test_from_tasks_config_drops_missing_tasks():
+    """Test that profiles keep only the edges inside their task subset."""
+    tasks_config = {
+        "planning": {},
+        "intent": {"context": ["planning"]},
+        "data": {"context": ["intent"]},
+        "response": {"context": ["planning", "data"]},
+    }
+
+    graph = TaskGraph.from_tasks_config(tasks_config, ["data", "response"])
+
+    assert graph.dependencies == {"data": [], "response": ["data"]}
+    assert graph.order == ["data", "response"]
+
+
+@pytest.mark.parametrize(
+    "dependencies",
+    [{"a": ["b"], "b": ["a"]}, {"a": ["missing"]}],
+)
+def test_invalid_graphs(dependencies):
+    """Test that cycles and unknown dependencies are rejected."""
+    with pytest.raises(TaskGraphError):
+        TaskGraph(dependencies)
+
+
+def test_critical_path_follows_slowest_dependency():
+    """Test that the critical path walks back through the latest finisher."""
+    spans = {
+        "plan": (0.0, 10.0),
+        "data": (10.0, 50.0),
+        "component": (10.0, 30.0),
+        "response": (50.0, 70.0),
+    }
+    dependencies = {
+        "plan": [],
+        "data": ["plan"],
+        "component": ["plan"],
+        "response": ["data", "component"],
+    }
+
+    path, path_ms = critical_path(spans, dependencies)
+
+    assert path == ["plan", "data", "response"]
+    assert path_ms == 70.0
+
+
+def test_failed_task_propagates():
+    """Test that a failing task aborts the run with its exception."""
+    graph = TaskGraph({"a": [], "b": ["a"]})
+
+    def runner(name, upstream):
+        if name == "a":
+            time.sleep(0.01)
+            raise ValueError("boom")
+        return name
+
+    with pytest.raises(ValueError):
+        graph.run(runner)
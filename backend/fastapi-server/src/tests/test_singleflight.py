@@ -0,0 +1,89 @@
+"""
+Tests for coalescing identical in-flight requests.
+"""
+
+import asyncio
+
+import pytest
+from fastapi_server.ai.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_execution():
+    """Test that concurrent callers with the same key run the work once."""
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"response": "done"}
+
+    results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    assert len(calls) == 1
+    assert [shared for _, shared in results] == [False, True, True, True, True]
+    assert all(result == {"response": "done"} for result, _ in results)
+    # Followers get copies they can modify independently
+    results[1][0]["response"] = "changed"
+    assert results[0][0]["response"] == "done"
+
+    stats = flight.get_stats()
+    assert stats["executions"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["coalescing_rate"] == 80.0
+    assert stats["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_different_keys_and_later_requests_run_separately():
+    """Test that only concurrent requests with equal keys are coalesced."""
+    flight = SingleFlight()
+    calls = []
+
+    async def work(name):
+        calls.append(name)
+        await asyncio.sleep(0.01)
+        return name
+
+    await asyncio.gather(
+        flight.do("a", lambda: work("a")), flight.do("b", lambda: work("b"))
+    )
+    await flight.do("a", lambda: work("a"))
+
+    assert sorted(calls) == ["a", "a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller():
+    """Test that a failed execution fails all of its callers."""
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("queue full")
+
+    results = await asyncio.gather(
+        flight.do("key", work), flight.do("key", work), return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert not flight.in_flight("key")
+
+
+@pytest.mark.asyncio
+async def test_leader_disconnect_does_not_cancel_followers():
+    """Test that cancelling the first caller leaves the shared run going."""
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    leader = asyncio.ensure_future(flight.do("key", work))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(flight.do("key", work))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await follower == ("done", True)
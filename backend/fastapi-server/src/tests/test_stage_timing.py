@@ -0,0 +1,125 @@
+"""
+Tests for per-stage LLM instrumentation and its persistence.
+"""
+
+import threading
+
+import pytest
+
+from fastapi_server.ai.run_context import RunContext, current_task
+from fastapi_server.models import Chat
+from fastapi_server.repositories.stage_repository import StageRepository
+
+
+def test_llm_calls_are_attributed_to_the_active_task():
+    """Test that sequential runs charge LLM calls to the single active task."""
+    run = RunContext()
+    run.start(["intent_analysis_task", "response_generation_task"])
+    run.record_llm_call(
+        0.2, model="openai/gpt-4o", prompt_tokens=100, completion_tokens=20
+    )
+    run.task_completed()
+    run.record_llm_call(
+        0.1, model="mock", prompt_tokens=50, completion_tokens=10, retries=1
+    )
+    run.record_llm_call(0.1, model="mock", prompt_tokens=50, completion_tokens=10)
+    run.task_completed()
+
+    report = run.usage_report()
+
+    assert report["llm_calls"] == 3
+    assert report["llm_ms"] == pytest.approx(400)
+    assert report["prompt_tokens"] == 200
+    assert report["completion_tokens"] == 40
+    assert report["retries"] == 1
+    assert report["models"] == ["mock", "openai/gpt-4o"]
+    assert report["queue_ms"] >= 0
+    intent = report["tasks"]["intent_analysis_task"]
+    assert intent["llm_calls"] == 1
+    assert intent["models"] == ["openai/gpt-4o"]
+    assert report["tasks"]["response_generation_task"]["llm_calls"] == 2
+
+
+def test_concurrent_tasks_use_current_task():
+    """Test that graph-mode task threads charge their own task."""
+    run = RunContext()
+    run.start(["data_retrieval_task", "component_generation_task"], sequential=False)
+
+    def task_thread(name):
+        current_task.set(name)
+        run.stage_started(name)
+        run.record_llm_call(0.05, model="mock", prompt_tokens=10, completion_tokens=5)
+        run.stage_completed(name)
+
+    threads = [
+        threading.Thread(target=task_thread, args=(name,))
+        for name in ("data_retrieval_task", "component_generation_task")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    tasks = run.usage_report()["tasks"]
+    assert set(tasks) == {"data_retrieval_task", "component_generation_task"}
+    assert all(usage["llm_calls"] == 1 for usage in tasks.values())
+
+
+def test_stage_rows_and_breakdown(db):
+    """Test that timing reports are stored per stage and aggregated slowest first."""
+    repository = StageRepository()
+    timing = {
+        "queue_ms": 12.5,
+        "tasks": {
+            "intent_analysis_task": {
+                "start_ms": 13.0,
+                "duration_ms": 300.0,
+                "llm_calls": 1,
+                "llm_ms": 280.0,
+                "prompt_tokens": 400,
+                "completion_tokens": 60,
+                "retries": 0,
+                "models": ["openai/gpt-4o"],
+            },
+            "response_generation_task": {
+                "start_ms": 313.0,
+                "duration_ms": 900.0,
+                "llm_calls": 2,
+                "llm_ms": 850.0,
+                "prompt_tokens": 900,
+                "completion_tokens": 200,
+                "retries": 1,
+                "models": ["openai/gpt-4o", "anthropic/claude-3-5-haiku"],
+            },
+        },
+    }
+    for session_id in ("a", "b"):
+        chat = Chat(session_id=session_id, user_message="m", agent_response="r")
+        db.add(chat)
+        db.commit()
+        repository.create_from_timing(db, chat.id, timing)
+
+    stages = repository.get_by_chat(db, chat.id)
+    assert [s.stage for s in stages] == [
+        "queue",
+        "intent_analysis_task",
+        "response_generation_task",
+    ]
+    assert stages[2].model_used == "openai/gpt-4o,anthropic/claude-3-5-haiku"
+
+    breakdown = repository.get_stage_breakdown(db)
+    assert breakdown[0]["stage"] == "response_generation_task"
+    assert breakdown[0]["runs"] == 2
+    assert breakdown[0]["prompt_tokens"] == 1800
+    assert breakdown[0]["average_llm_ms"] == 850.0
+    assert sum(row["share_of_time"] for row in breakdown) == pytest.approx(100, abs=0.1)
+
+    totals = repository.get_usage_totals(db, session_id="a")
+    assert totals["total_prompt_tokens"] == 1300
+    assert totals["total_completion_tokens"] == 260
+    assert totals["total_llm_calls"] == 3
+    assert totals["total_retries"] == 1
+    assert totals["average_queue_ms"] == 12.5
+
+    assert repository.delete_by_chat(db, chat.id) == 3
+    assert repository.get_by_chat(db, chat.id) == []
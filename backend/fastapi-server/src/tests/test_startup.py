@@ -0,0 +1,76 @@
+"""
+Tests for lazy loading of the AI crew at application startup.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+STARTUP_SCRIPT = """
+import json, sys
+import fastapi_server.main as main
+from fastapi.testclient import TestClient
+
+heavy = sorted(
+    m for m in sys.modules
+    if m.split(".")[0] in ("crewai", "langchain", "langchain_openai", "litellm")
+    or m in ("fastapi_server.chat_agent", "fastapi_server.ai.crew")
+)
+with TestClient(main.app) as client:
+    root = client.get("/").status_code
+    metrics = client.get("/chat/metrics").json()
+    components = client.get("/components").status_code
+print(json.dumps({
+    "heavy": heavy,
+    "root": root,
+    "metrics": metrics,
+    "components": components,
+    "crew_loaded": main.chat_service.crew_loaded,
+}))
+"""
+
+
+def run_startup(tmp_path, **env):
+    environment = dict(
+        os.environ,
+        PYTHONPATH=SRC,
+        DATABASE_URL=f"sqlite:///{tmp_path / 'startup.db'}",
+        **env,
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        capture_output=True,
+        text=True,
+        env=environment,
+        cwd=str(tmp_path),
+    )
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_app_starts_without_loading_the_crew(tmp_path):
+    """Test that importing and starting the app in lazy mode leaves crewai unloaded."""
+    result = run_startup(tmp_path, WARM_START_MODE="lazy")
+
+    assert result["heavy"] == []
+    assert result["root"] == 200
+    # The lifespan created the tables
+    assert result["components"] == 200
+    assert result["metrics"]["crew_loaded"] is False
+    assert result["crew_loaded"] is False
+    assert (tmp_path / "startup.db").exists()
+
+
+def test_package_attributes_load_on_access():
+    """Test that the package exports resolve lazily and unknown names still fail."""
+    import fastapi_server
+    import fastapi_server.ai
+
+    assert "DashboardCrew" in fastapi_server.ai.__all__
+    with pytest.raises(AttributeError, match="missing"):
+        fastapi_server.missing
@@ -0,0 +1,192 @@
+"""
+Tests for the incrementally maintained statistics aggregates.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from fastapi_server.models import (
+    ChatAggregate,
+    ComponentAggregate,
+    LatencySketchBin,
+    StageAggregate,
+)
+from fastapi_server.repositories.chat_repository import ChatRepository
+from fastapi_server.repositories.component_repository import ComponentRepository
+from fastapi_server.repositories.statistics_repository import StatisticsRepository
+from fastapi_server.services.chat_service import ChatService
+from fastapi_server.services.component_service import ComponentService
+
+TIMING = {
+    "queue_ms": 10.0,
+    "tasks": {
+        "intent_task": {"start_ms": 0, "duration_ms": 100, "llm_calls": 1},
+        "response_task": {
+            "start_ms": 100,
+            "duration_ms": 400,
+            "llm_calls": 2,
+            "llm_ms": 350.0,
+            "prompt_tokens": 500,
+            "completion_tokens": 80,
+            "retries": 1,
+        },
+    },
+}
+
+
+def chat(session_id, processing_time=100, suggestion=None, **columns):
+    return {
+        "session_id": session_id,
+        "user_message": "show revenue",
+        "agent_response": "ok",
+        "processing_time": processing_time,
+        "component_suggestion": suggestion,
+        **columns,
+    }
+
+
+def snapshot(db):
+    """Every aggregate row, by its keys."""
+    rows = {}
+    for model, keys in [
+        (ChatAggregate, ("scope",)),
+        (StageAggregate, ("scope", "stage")),
+        (ComponentAggregate, ("dimension", "value")),
+        (LatencySketchBin, ("dimension", "value", "bucket_start", "bin")),
+    ]:
+        for row in db.query(model).all():
+            values = {
+                column.name: getattr(row, column.name)
+                for column in model.__table__.columns
+                if column.name != "id" and column.name not in keys
+            }
+            # Emptied scopes stay behind as zero rows; a rebuild leaves them out
+            if any(values.values()):
+                rows[(model.__tablename__,) + tuple(getattr(row, k) for k in keys)] = (
+                    values
+                )
+    return rows
+
+
+def test_running_totals_match_a_rebuild(db):
+    """Test that totals kept through inserts and deletes equal recomputed ones."""
+    repository = ChatRepository()
+    repository.create_many(
+        db,
+        [
+            chat("a", 100, {"component_type": "chart"}, model_used="openai/gpt-4o"),
+            chat("a", 300, pipeline="full"),
+            chat("b", None),
+        ],
+        [TIMING, TIMING, None],
+    )
+    repository.create_many(db, [chat("b", 200, {"component_type": "table"})])
+    doomed = repository.create_many(db, [chat("c", 50)], [TIMING])
+    assert repository.delete(db, doomed[0].id)
+
+    incremental = snapshot(db)
+    StatisticsRepository().rebuild(db)
+    assert snapshot(db) == incremental
+
+    stats = repository.get_chat_statistics(db)
+    # A suggestion of None is not a suggestion
+    assert stats["total_chats"] == 4 and stats["chats_with_suggestions"] == 2
+    assert stats["average_processing_time_ms"] == 200.0
+    session_b = repository.get_chat_statistics(db, "b")
+    assert session_b["total_chats"] == 2
+    assert session_b["average_processing_time_ms"] == 200.0
+
+
+def test_chat_statistics_read_no_chat_or_stage_rows(db, engine):
+    """Test that statistics read only the aggregate tables, per session too."""
+    repository = ChatRepository()
+    for i in range(20):
+        repository.create_many(db, [chat(f"s{i % 3}")], [TIMING])
+
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+    service = ChatService()
+    stats = asyncio.run(service.get_chat_statistics(db))
+    session_stats = asyncio.run(service.get_chat_statistics(db, "s0"))
+
+    assert not any(
+        "FROM chats" in statement or "FROM chat_stages" in statement
+        for statement in statements
+    )
+    assert stats["total_chats"] == 20 and session_stats["total_chats"] == 7
+    assert stats["total_prompt_tokens"] == 20 * 500
+    assert session_stats["total_llm_calls"] == 7 * 3
+    assert stats["average_queue_ms"] == 10.0
+    assert stats["slowest_stage"] == "response_task"
+
+
+def test_component_counts_follow_updates(db):
+    """Test that component counts move with updates and match a rebuild."""
+    repository = ComponentRepository()
+    fields = {"query": "SELECT 1", "name": "c"}
+    chart = repository.create(
+        db, {**fields, "component_type": "chart", "data_source": "mysql"}
+    )
+    repository.create(db, {**fields, "component_type": "table", "data_source": "csv"})
+    doomed = repository.create(
+        db, {**fields, "component_type": "metric", "data_source": "csv"}
+    )
+    repository.update(db, chart.id, {"component_type": "table"})
+    repository.delete(db, doomed.id)
+
+    stats = asyncio.run(ComponentService().get_component_statistics(db))
+    assert stats["total_components"] == 2
+    assert stats["by_type"] == {"chart": 0, "table": 2, "metric": 0}
+    assert stats["by_data_source"] == {"mysql": 1, "mongodb": 0, "csv": 1}
+
+    incremental = snapshot(db)
+    StatisticsRepository().rebuild(db)
+    assert snapshot(db) == incremental
+
+
+@pytest.mark.asyncio
+async def test_latency_percentiles_come_from_the_sketches(db, engine):
+    """Test window percentiles per model and pipeline without reading chat rows."""
+    repository = ChatRepository()
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(days=3)
+    chats = [
+        chat("s", ms, model_used="m1", pipeline="full", created_at=now)
+        for ms in range(1, 1001)
+    ]
+    chats += [chat("s", 20, model_used="m2", pipeline="direct", created_at=now)] * 100
+    chats.append(chat("s", 90000, model_used="m1", pipeline="full", created_at=old))
+    repository.create_many(db, chats)
+
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+    service = ChatService()
+    latency = await service.get_latency_statistics(db)
+    assert not any("FROM chats" in statement for statement in statements)
+
+    # The three day old chat is outside the default window of a day
+    assert latency["count"] == 1100
+    assert latency["p99_ms"] == pytest.approx(990, rel=0.02)
+    full = await service.get_latency_statistics(db, pipeline="full")
+    assert full["count"] == 1000
+    assert full["p50_ms"] == pytest.approx(500, rel=0.02)
+    assert full["p90_ms"] == pytest.approx(900, rel=0.02)
+    by_model = await service.get_latency_statistics(
+        db, start=old - timedelta(hours=1), group_by="model"
+    )
+    assert by_model["groups"]["m1"]["count"] == 1001
+    assert by_model["groups"]["m2"]["p99_ms"] == pytest.approx(20, rel=0.02)
+    assert by_model["start"] <= old - timedelta(hours=1) and by_model["end"] >= now
+
+    with pytest.raises(HTTPException):
+        await service.get_latency_statistics(db, start=now, end=old)
+    with pytest.raises(HTTPException):
+        await service.get_latency_statistics(db, model_used="m1", pipeline="full")